@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark the click engine against a local HTTPS stand-in
+
+A local HTTPS server plays many unsubscribe hosts (host-N.bench.test, all
+resolving to 127.0.0.1). Resolution and full TLS handshakes are slowed down
+artificially, and every response closes the connection, so each click pays
+for DNS and a new TLS connection just like a real batch across many hosts.
+
+Compares a plain UnsubscribeHandler with one using the DNS cache (with
+parallel pre-resolution) and TLS session reuse.
+
+Usage:
+    python benchmarks/bench_click_engine.py --hosts 40 --repeat 3
+"""
+import argparse
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.dns_cache import DNSCache
+from src.core.unsubscribe_handler import UnsubscribeHandler
+
+
+DOMAIN = "bench.test"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers every request with a small page and closes the connection"""
+
+    def do_GET(self):
+        body = b"You have been unsubscribed"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DelayedTLSServer(ThreadingHTTPServer):
+    """HTTPS server that adds latency to every full TLS handshake"""
+
+    daemon_threads = True
+
+    def __init__(self, address, context: ssl.SSLContext, handshake_delay: float):
+        super().__init__(address, _Handler)
+        self.context = context
+        self.handshake_delay = handshake_delay
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+
+    def finish_request(self, request, client_address):
+        try:
+            tls_sock = self.context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        if tls_sock.session_reused:
+            self.resumed_handshakes += 1
+        else:
+            self.full_handshakes += 1
+            time.sleep(self.handshake_delay)
+        self.RequestHandlerClass(tls_sock, client_address, self)
+
+
+def make_certificate(directory: str) -> tuple:
+    """Create a self-signed wildcard certificate for the bench domain"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+        "-keyout", key, "-out", cert, "-days", "1",
+        "-subj", f"/CN=*.{DOMAIN}",
+        "-addext", f"subjectAltName=DNS:*.{DOMAIN}",
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def install_slow_resolver(delay: float):
+    """Make bench hosts resolve to localhost after a delay"""
+    original = socket.getaddrinfo
+
+    def slow_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+        if isinstance(host, str) and host.endswith(DOMAIN):
+            time.sleep(delay)
+            return original("127.0.0.1", port, socket.AF_INET, type or socket.SOCK_STREAM, proto, flags)
+        return original(host, port, family, type, proto, flags)
+
+    socket.getaddrinfo = slow_getaddrinfo
+    return original
+
+
+def run_clicks(handler: UnsubscribeHandler, links: list, prefetch: bool) -> float:
+    """Click every link, optionally pre-resolving hosts first"""
+    start = time.perf_counter()
+    if prefetch:
+        handler.prefetch_hosts({link.split("/")[2].split(":")[0] for link in links})
+    for link in links:
+        result = handler.click_link(link)
+        if not result["success"]:
+            raise RuntimeError(f"Click failed: {link} - {result['error_message']}")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--hosts", type=int, default=40, help="Distinct hosts")
+    parser.add_argument("--repeat", type=int, default=3, help="Clicks per host")
+    parser.add_argument("--dns-delay", type=float, default=0.03, help="Seconds per DNS lookup")
+    parser.add_argument("--handshake-delay", type=float, default=0.03,
+                        help="Seconds added to each full TLS handshake")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert, key)
+
+        server = DelayedTLSServer(("127.0.0.1", 0), server_context, args.handshake_delay)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        original_getaddrinfo = install_slow_resolver(args.dns_delay)
+        links = [
+            f"https://host-{host}.{DOMAIN}:{port}/unsubscribe?id={host}-{n}"
+            for n in range(args.repeat)
+            for host in range(args.hosts)
+        ]
+
+        try:
+            rows = []
+
+            baseline = UnsubscribeHandler(retry_count=1)
+            baseline.session.trust_env = False
+            baseline.session.verify = cert
+            server.full_handshakes = server.resumed_handshakes = 0
+            elapsed = run_clicks(baseline, links, prefetch=False)
+            rows.append(("baseline", elapsed, server.full_handshakes,
+                         server.resumed_handshakes, "-"))
+
+            dns_cache = DNSCache(ttl=300)
+            tuned = UnsubscribeHandler(retry_count=1, dns_cache=dns_cache,
+                                       pool_connections=args.hosts, reuse_tls_sessions=True)
+            tuned.session.trust_env = False
+            tuned.session.verify = cert
+            server.full_handshakes = server.resumed_handshakes = 0
+            elapsed = run_clicks(tuned, links, prefetch=True)
+            rows.append(("dns cache + tls reuse", elapsed, server.full_handshakes,
+                         server.resumed_handshakes, f"{dns_cache.hits}/{dns_cache.misses}"))
+            dns_cache.uninstall()
+        finally:
+            socket.getaddrinfo = original_getaddrinfo
+            server.shutdown()
+
+    print(f"{len(links)} clicks across {args.hosts} hosts "
+          f"(dns delay {args.dns_delay * 1000:.0f} ms, handshake delay {args.handshake_delay * 1000:.0f} ms)")
+    print(f"{'mode':<24}{'total s':>10}{'ms/click':>10}{'full TLS':>10}{'resumed':>10}{'dns hit/miss':>14}")
+    for mode, elapsed, full, resumed, dns in rows:
+        print(f"{mode:<24}{elapsed:>10.2f}{elapsed / len(links) * 1000:>10.1f}"
+              f"{full:>10}{resumed:>10}{dns:>14}")
+
+
+if __name__ == "__main__":
+    main()
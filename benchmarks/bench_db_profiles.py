@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark insert and query throughput per database performance profile
+
+For each profile a fresh database is filled the two ways the app writes:
+one committed row at a time (Database.add_email / add_unsubscribe_link /
+log_operation, as the UI and click paths do) and in batches through
+BatchWriter (as scans do). The hot read queries are then timed on the
+filled database.
+
+Usage:
+    python benchmarks/bench_db_profiles.py --rows 2000 --queries 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.batch_writer import BatchWriter
+from src.database.maintenance import PROFILES, run_maintenance
+from src.database.models import Database
+
+
+def bench_single_inserts(db: Database, rows: int) -> float:
+    """Insert rows one committed write at a time, return rows per second"""
+    started = time.perf_counter()
+    for idx in range(rows):
+        email_id = db.add_email(f"<single-{idx}@bench.test>", f"news{idx % 50}@bench.test",
+                                "Weekly news", datetime.now(), "newsletter")
+        db.add_unsubscribe_link(email_id, f"https://bench.test/unsub?list={idx % 50}&u={idx}")
+        db.log_operation("scan", email_id, "success")
+    return rows / (time.perf_counter() - started)
+
+
+def bench_batched_inserts(db: Database, rows: int) -> float:
+    """Insert rows through BatchWriter, return rows per second"""
+    started = time.perf_counter()
+    with BatchWriter(db, max_records=500, max_delay_ms=60000) as writer:
+        for idx in range(rows):
+            message_id = f"<batch-{idx}@bench.test>"
+            writer.add_email(message_id, f"news{idx % 50}@bench.test", "Weekly news",
+                             datetime.now(), "newsletter", has_unsubscribe_link=True)
+            writer.add_unsubscribe_link(message_id, f"https://bench.test/unsub?b={idx}")
+            writer.log_operation("scan", message_id=message_id)
+    return rows / (time.perf_counter() - started)
+
+
+def bench_queries(db: Database, queries: int) -> float:
+    """Run the hot read queries repeatedly, return query rounds per second"""
+    started = time.perf_counter()
+    for _ in range(queries):
+        db.get_statistics()
+        db.get_recent_operations(50)
+        db.get_subscription_links()
+        db.get_unprocessed_emails()
+    return queries / (time.perf_counter() - started)
+
+
+def run_profile(profile: str, rows: int, queries: int) -> dict:
+    """Benchmark one profile on a fresh database"""
+    temp_dir = tempfile.mkdtemp()
+    db = Database(os.path.join(temp_dir, "bench.db"), profile=profile)
+    try:
+        result = {
+            "single": bench_single_inserts(db, rows),
+            "batched": bench_batched_inserts(db, rows * 5),
+        }
+        run_maintenance(db, ["analyze", "checkpoint"])
+        result["queries"] = bench_queries(db, queries)
+        return result
+    finally:
+        db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000,
+                        help="Emails inserted one at a time (5x this are batched)")
+    parser.add_argument("--queries", type=int, default=200, help="Rounds of read queries")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES),
+                        help="Profiles to compare")
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'single rows/s':>14} {'batched rows/s':>15} {'query rounds/s':>15}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.rows, args.queries)
+        print(f"{profile:<12} {result['single']:>14.0f} {result['batched']:>15.0f} "
+              f"{result['queries']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
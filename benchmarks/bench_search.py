@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark email search latency on a large mailbox
+
+A fresh database is filled with synthetic emails through BatchWriter, then
+each query is timed as the search box runs it (Database.search_emails, first
+page) and compared with the LIKE scan it replaces.
+
+Usage:
+    python benchmarks/bench_search.py --emails 500000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.batch_writer import BatchWriter
+from src.database.models import Database
+
+
+QUERIES = [
+    'sender:shop "black friday"',
+    "shop",
+    "newsletter",
+    "category:marketing invoice",
+    "zz-no-such-sender",
+]
+
+SENDERS = ["news@myshop.com", "deals@shopify.store", "digest@newsletter.io",
+           "billing@service.net", "team@product.dev", "alerts@bank.example"]
+SUBJECTS = ["Black Friday starts now", "Your weekly digest", "Invoice #{n}",
+            "New features this month", "Security alert", "Last chance: 50% off"]
+CATEGORIES = ["marketing", "newsletter", "transactional", "social"]
+
+
+def fill(db: Database, emails: int):
+    """Insert synthetic emails in batches"""
+    rng = random.Random(42)
+    with BatchWriter(db, max_records=5000, max_delay_ms=60000) as writer:
+        for idx in range(emails):
+            sender = rng.choice(SENDERS).replace("@", f"{idx % 997}@")
+            writer.add_email(f"<{idx}@bench.test>", sender,
+                             rng.choice(SUBJECTS).format(n=idx), datetime.now(),
+                             rng.choice(CATEGORIES))
+
+
+def time_ms(func, repeat: int) -> float:
+    """Median wall time of func in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def like_scan(db: Database, text: str):
+    """The LIKE query search replaces, for comparison"""
+    db.connect().execute(
+        "SELECT id FROM emails WHERE sender LIKE ? OR subject LIKE ? ORDER BY id DESC LIMIT 51",
+        (f"%{text}%", f"%{text}%")
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500000, help="Emails in the mailbox")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    db = Database(os.path.join(temp_dir, "bench.db"), profile="bulk-import")
+    try:
+        started = time.perf_counter()
+        fill(db, args.emails)
+        print(f"Inserted {args.emails} emails in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':<32} {'search ms':>10} {'LIKE scan ms':>13}")
+        for query in QUERIES:
+            search = time_ms(lambda: db.search_emails(query, limit=50), args.repeat)
+            like = time_ms(lambda: like_scan(db, query.split()[-1].split(":")[-1].strip('"')),
+                           max(1, args.repeat // 5))
+            print(f"{query:<32} {search:>10.2f} {like:>13.2f}")
+    finally:
+        db.close()
+        for name in os.listdir(temp_dir):
+            os.unlink(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Email Unsubscribe Automation - Command Line Entry Point
+
+Usage:
+    python cli.py scan --max-emails 200
+    python cli.py enqueue --all
+    python cli.py worker --processes 4
+    python cli.py queue-status
+"""
+
+import sys
+import os
+
+# Add src to path for imports
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,552 @@
+"""Command line interface for Email Unsubscribe Automation"""
+import argparse
+import re
+import sys
+from datetime import datetime, timedelta
+
+from src.utils.config import Config
+from src.utils.logger import setup_logging
+
+
+def _build_orchestrator(config: Config, require_credentials: bool = True):
+    """Create an orchestrator, validating credentials if required"""
+    from src.core.orchestrator import EmailUnsubscribeOrchestrator
+
+    if require_credentials:
+        is_valid, error = config.validate()
+        if not is_valid:
+            print(f"Error: {error}", file=sys.stderr)
+            sys.exit(1)
+
+    return EmailUnsubscribeOrchestrator(config)
+
+
+def _deadline(value: str) -> datetime:
+    """Parse --deadline: a duration (90s, 25m, 1h) or a time (23:30, 2024-05-01T06:00)"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smh])", value)
+    if match:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours"}[match.group(2)]
+        return datetime.now() + timedelta(**{unit: float(match.group(1))})
+    try:
+        if re.fullmatch(r"\d{1,2}:\d{2}", value):
+            hour, minute = map(int, value.split(":"))
+            deadline = datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+            return deadline if deadline > datetime.now() else deadline + timedelta(days=1)
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid deadline: {value}")
+
+
+def _print_metrics(metrics):
+    """Print a scan's latency histograms and counters"""
+    histograms = {name: stats for name, stats in metrics.items() if "count" in stats}
+    if histograms:
+        print(f"\n{'timer':<28} {'count':>7} {'total s':>9} {'mean ms':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, stats in sorted(histograms.items(), key=lambda item: -item[1]["sum"]):
+            print(f"{name:<28} {stats['count']:>7} {stats['sum']:>9.2f} "
+                  f"{stats['mean'] * 1000:>9.2f} {stats['p50'] * 1000:>8.2f} "
+                  f"{stats['p95'] * 1000:>8.2f} {stats['p99'] * 1000:>8.2f}")
+    for name, stats in sorted(metrics.items()):
+        if "value" in stats:
+            print(f"{name:<28} {stats['value']:>7g}")
+
+
+def cmd_scan(args, config: Config) -> int:
+    """Scan the mailbox for unsubscribe links"""
+    from src.core.scan_budget import ScanBudget
+
+    orchestrator = _build_orchestrator(config)
+    summary = {}
+    budget = None
+    if args.deadline or args.max_mb is not None or args.message_budget is not None:
+        budget = ScanBudget(
+            args.deadline,
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+            max_messages=args.message_budget
+        )
+    counts = {"scanned": 0, "with_links": 0, "links": 0, "unsubscribed": 0, "errors": 0}
+
+    if args.live:
+        print(f"{'status':<12} {'links':>5}  {'category':<14} {'sender':<32} subject")
+    try:
+        scan = orchestrator.iter_scan(max_emails=args.max_emails, summary=summary,
+                                      run_id=args.resume, budget=budget)
+        for result in scan:
+            counts["scanned"] += 1
+            counts["with_links"] += result.links_found > 0
+            counts["links"] += result.links_found
+            counts["unsubscribed"] += result.status == "unsubscribed"
+            counts["errors"] += result.status == "error"
+            if args.live:
+                print(f"{result.status:<12} {result.links_found:>5}  {result.category:<14} "
+                      f"{result.sender[:32]:<32} {result.subject[:60]}", flush=True)
+    except KeyboardInterrupt:
+        print(f"Scan interrupted; results so far are saved. Continue with "
+              f"`cli.py scan --resume {summary.get('run_id')}`", file=sys.stderr)
+    except (ConnectionError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        if summary.get("run_id"):
+            print(f"Continue with `cli.py scan --resume {summary['run_id']}`", file=sys.stderr)
+        return 1
+
+    print(f"Scan run:               {summary.get('run_id')}")
+    print(f"Total scanned:          {counts['scanned']} of {summary.get('total', 0)}")
+    print(f"With unsubscribe links: {counts['with_links']}")
+    print(f"Total links found:      {counts['links']}")
+    print(f"Already unsubscribed:   {counts['unsubscribed']}")
+    print(f"Errors:                 {counts['errors']}")
+    if summary.get("stopped_by"):
+        print(f"Stopped by {summary['stopped_by']} budget; {summary['remaining']} emails left "
+              f"for the next scan")
+    if summary.get("pipeline"):
+        print(f"\nPipeline (bottleneck: {summary['bottleneck']})")
+        for stage, stats in summary["pipeline"].items():
+            print(f"  {stage:<6} {stats['workers']} workers  {stats['items']:>6} items  "
+                  f"{stats['per_second']:>7.1f}/s  {stats['utilization']:>4.0%} busy  "
+                  f"{stats['blocked_seconds']:.1f}s blocked")
+    if args.metrics:
+        _print_metrics(summary.get("metrics", {}))
+    return 0
+
+
+def cmd_plan(args, config: Config) -> int:
+    """Estimate what a scan would fetch and how long it would take, without scanning"""
+    orchestrator = _build_orchestrator(config, require_credentials=args.account is None)
+    account_id = None
+    if args.account:
+        accounts = {account["name"]: account["id"] for account in orchestrator.db.get_accounts()}
+        if args.account not in accounts:
+            print(f"Error: unknown account {args.account}", file=sys.stderr)
+            return 1
+        account_id = accounts[args.account]
+    try:
+        plan = orchestrator.plan_scan(max_emails=args.max_emails, account_id=account_id,
+                                      folder=args.folder, sample_size=args.sample_size)
+    except (ConnectionError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    status = plan["status"]
+    print(f"Folder:                 {plan['folder']} ({status.get('messages', '?')} messages, "
+          f"{status.get('unseen', '?')} unseen)")
+    print(f"Matching the search:    {plan['matching']}")
+    print(f"Would scan:             {plan['candidates']} (sampled {plan['sampled']})")
+    print(f"Skipped on headers:     {plan['skipped']['whitelisted']} whitelisted, "
+          f"{plan['skipped']['unsubscribed']} unsubscribed")
+    print(f"To fetch:               {plan['to_fetch']} ({plan['already_stored']} already stored)")
+    print(f"Download:               {plan['bytes'] / 1024 / 1024:.1f} MiB")
+    if plan["timing_basis"] is None:
+        print("Duration:               unknown (nothing to sample and no earlier scans)")
+        return 0
+    basis = "earlier scans" if plan["timing_basis"] == "history" else "header sample only, a lower bound"
+    print(f"Duration:               {timedelta(seconds=round(plan['seconds']))} ({basis})")
+    for stage, seconds in plan["stage_seconds"].items():
+        workers = plan["workers"].get(stage, 1)
+        marker = "  <- bottleneck" if stage == plan["bottleneck"] else ""
+        print(f"  {stage:<7} {workers} workers  {seconds:>8.1f}s{marker}")
+    return 0
+
+
+def cmd_scan_runs(args, config: Config) -> int:
+    """List recent scan runs and their checkpoints"""
+    from src.database.models import Database
+
+    db = Database(config.database_path, profile=config.db_profile)
+    runs = db.get_scan_runs(limit=args.limit, status=args.status)
+    db.close()
+    print(f"{'run':>5}  {'mailbox':<28} {'status':<12} {'done':>13}  {'checkpoint UID':>14}  started")
+    for run in runs:
+        mailbox = f"{run['account'] or '-'}/{run['folder']}"
+        print(f"{run['id']:>5}  {mailbox[:28]:<28} {run['status']:<12} "
+              f"{run['processed']:>6}/{run['total']:<6}  "
+              f"{str(run['checkpoint_uid'] or '-'):>14}  {run['started_at']}")
+        if run["error"]:
+            print(f"       {run['error']}")
+    return 0
+
+
+def cmd_accounts(args, config: Config) -> int:
+    """Register, list and enable or disable the accounts scanned by scan-accounts"""
+    from src.database.models import Database
+    from src.utils.config import resolve_secret
+
+    db = Database(config.database_path, profile=config.db_profile)
+    try:
+        if args.action == "add":
+            try:
+                resolve_secret(args.credentials)
+            except ValueError as e:
+                print(f"Warning: {e}", file=sys.stderr)
+            account_id = db.add_account(args.name, args.email, args.credentials,
+                                        imap_server=args.server, folders=args.folder)
+            print(f"Saved account {args.name} (id {account_id})")
+        elif args.action in ("remove", "enable", "disable"):
+            if args.action == "remove":
+                found = db.remove_account(args.name)
+            else:
+                found = db.set_account_enabled(args.name, args.action == "enable")
+            if not found:
+                print(f"Error: no account named {args.name}", file=sys.stderr)
+                return 1
+        else:
+            print(f"{'name':<20} {'address':<32} {'server':<22} {'on':<3} folders")
+            for account in db.get_accounts():
+                print(f"{account['name']:<20} {account['email_address']:<32} "
+                      f"{account['imap_server']:<22} {'yes' if account['enabled'] else 'no':<3} "
+                      f"{', '.join(account['folders'])}")
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_scan_accounts(args, config: Config) -> int:
+    """Scan every folder of the registered accounts concurrently"""
+    orchestrator = _build_orchestrator(config, require_credentials=False)
+    account_ids = None
+    if args.account:
+        accounts = {account["name"]: account["id"] for account in orchestrator.db.get_accounts()}
+        unknown = [name for name in args.account if name not in accounts]
+        if unknown:
+            print(f"Error: unknown account {', '.join(unknown)}", file=sys.stderr)
+            return 1
+        account_ids = [accounts[name] for name in args.account]
+
+    summary = orchestrator.scan_accounts(
+        account_ids=account_ids,
+        max_workers=args.workers,
+        max_connections_per_server=args.per_server,
+        slice_size=args.slice_size
+    )
+
+    print(f"{'account':<20} {'folder':<20} {'run':>5} {'scanned':>8} {'errors':>6}  slices")
+    for mailbox in summary["mailboxes"]:
+        print(f"{mailbox['account']:<20} {mailbox['folder']:<20} {str(mailbox['run_id'] or '-'):>5} "
+              f"{mailbox['scanned']:>8} {mailbox['errors']:>6}  {mailbox['slices']}")
+        if mailbox["error"]:
+            print(f"  {mailbox['error']}")
+    print(f"\nScanned {summary['scanned']} emails with {summary['workers']} workers "
+          f"in {summary['seconds']:.1f}s")
+    if args.metrics:
+        _print_metrics(summary["metrics"])
+    return 1 if summary["failed"] else 0
+
+
+def cmd_reprocess(args, config: Config) -> int:
+    """Re-run extraction on the stored messages without connecting to the mail server"""
+    if not config.message_store_dir:
+        print("The message store is disabled; set MESSAGE_STORE_DIR and scan first", file=sys.stderr)
+        return 1
+    orchestrator = _build_orchestrator(config, require_credentials=False)
+    results = orchestrator.reprocess()
+
+    stats = orchestrator.message_store.get_stats()
+    print(f"Stored messages:        {stats['messages']} in {stats['segments']} segments "
+          f"({stats['stored_bytes'] / 1024 / 1024:.1f} MiB, "
+          f"{stats['raw_bytes'] / 1024 / 1024:.1f} MiB uncompressed)")
+    print(f"Reprocessed:            {results['reprocessed']}")
+    print(f"With unsubscribe links: {results['emails_with_links']}")
+    print(f"Total links found:      {results['total_links_found']}")
+    print(f"Already unsubscribed:   {results['skipped_unsubscribed']}")
+    print(f"Errors:                 {results['errors']}")
+    return 0
+
+
+def cmd_enqueue(args, config: Config) -> int:
+    """Queue unsubscribe links for the click workers"""
+    orchestrator = _build_orchestrator(config, require_credentials=False)
+    results = orchestrator.enqueue_unsubscribe(
+        link_ids=args.link_ids or None,
+        auto_mode=args.all,
+        force=args.force
+    )
+
+    print(f"Queued {results['enqueued']} links")
+    _print_queue_counts(results["queue"])
+    return 0
+
+
+def cmd_worker(args, config: Config) -> int:
+    """Run click worker processes"""
+    from src.core.worker import run_workers
+
+    results = run_workers(
+        config,
+        processes=args.processes,
+        batch_size=args.batch_size,
+        stop_when_empty=args.once
+    )
+    return 0 if all(code == 0 for code in results["exit_codes"]) else 1
+
+
+def cmd_queue_status(args, config: Config) -> int:
+    """Show click job queue counts"""
+    orchestrator = _build_orchestrator(config, require_credentials=False)
+    _print_queue_counts(orchestrator.get_queue_status())
+
+    redirects = orchestrator.get_redirect_stats()
+    if redirects["links"]:
+        print(f"Redirects: {redirects['avg_hops']:.1f} hops on average "
+              f"({redirects['avg_redirect_latency']:.2f}s), "
+              f"{redirects['shortcuts']} tracker shortcuts saved "
+              f"{redirects['latency_saved']:.1f}s")
+    return 0
+
+
+def cmd_rebuild_statistics(args, config: Config) -> int:
+    """Recompute the dashboard statistics counters"""
+    orchestrator = _build_orchestrator(config, require_credentials=False)
+    orchestrator.rebuild_statistics()
+
+    stats = orchestrator.get_statistics()
+    print(f"Processed emails:  {stats['total_processed']}")
+    print(f"Emails with links: {stats['emails_with_links']}")
+    print(f"Links clicked:     {stats['links_clicked']} ({stats['successful_clicks']} successful)")
+    return 0
+
+
+def cmd_maintenance(args, config: Config) -> int:
+    """Run database maintenance tasks"""
+    from src.database.maintenance import MAINTENANCE_TASKS, run_maintenance
+    from src.database.models import Database
+
+    unknown = [task for task in args.tasks if task not in MAINTENANCE_TASKS]
+    if unknown:
+        print(f"Error: unknown maintenance task {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    db = Database(config.database_path, profile=config.db_profile)
+    results = run_maintenance(db, args.tasks or None, vacuum_pages=args.vacuum_pages)
+    for task, result in results.items():
+        details = ", ".join(f"{key}={value}" for key, value in result.items() if key != "seconds")
+        print(f"{task:<11} {result['seconds']:.2f}s {details}".rstrip())
+    db.close()
+    return 0
+
+
+def cmd_prune_history(args, config: Config) -> int:
+    """Archive and delete operation history past the retention period"""
+    from src.database.models import Database
+    from src.database.retention import prune_operation_history
+
+    db = Database(config.database_path, profile=config.db_profile)
+    results = prune_operation_history(
+        db,
+        retention_days=args.days if args.days is not None else config.operation_retention_days,
+        archive_dir=config.operation_archive_dir,
+        batch_size=args.batch_size or config.retention_batch_size,
+        max_batches=args.max_batches
+    )
+    print(f"Archived {results['archived']} rows older than {results['cutoff']} "
+          f"in {results['batches']} batches")
+    for path in results["segments"]:
+        print(f"  {path}")
+    db.close()
+    return 0
+
+
+def cmd_export(args, config: Config) -> int:
+    """Stream links, emails or operation history to a CSV, JSONL or Parquet file"""
+    from src.database.export import export_dataset, export_incremental
+    from src.database.models import Database
+
+    options = dict(
+        fmt=args.format,
+        compression=args.compression,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        status=args.status,
+        category=args.category,
+        chunk_size=args.chunk_size
+    )
+    db = Database(config.database_path, profile=config.db_profile)
+    try:
+        if args.incremental:
+            result = export_incremental(db, args.incremental, args.dataset, args.output, **options)
+        else:
+            result = export_dataset(db, args.dataset, args.output, **options)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    print(f"Exported {result['rows']} {args.dataset} rows to {result['path']} "
+          f"(watermark {result['watermark']})")
+    return 0
+
+
+def cmd_daemon(args, config: Config) -> int:
+    """Run scheduled background jobs until interrupted"""
+    from src.core.daemon import Daemon
+
+    daemon = Daemon(config)
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+def _print_queue_counts(counts):
+    """Print job queue counts"""
+    for state in ("pending", "leased", "done", "failed"):
+        print(f"  {state:<8} {counts.get(state, 0)}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(
+        description="Email Unsubscribe Automation command line interface"
+    )
+    parser.add_argument("--env-file", default=".env", help="Path to .env file")
+    parser.add_argument("--log-level", default="INFO", help="Logging level")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = subparsers.add_parser("scan", help="Scan emails for unsubscribe links")
+    scan_parser.add_argument("--max-emails", type=int, default=None,
+                             help="Maximum number of emails to scan")
+    scan_parser.add_argument("--live", action="store_true",
+                             help="Print each email as it is processed")
+    scan_parser.add_argument("--resume", type=int, default=None, metavar="RUN_ID",
+                             help="Continue an interrupted scan run")
+    scan_parser.add_argument("--deadline", type=_deadline, default=None,
+                             help="Stop at this time (23:30, ISO date-time) or after this "
+                                  "long (90s, 25m, 1h); the most valuable emails go first")
+    scan_parser.add_argument("--max-mb", type=float, default=None,
+                             help="Stop after downloading this many MiB of messages")
+    scan_parser.add_argument("--message-budget", type=int, default=None,
+                             help="Stop after downloading this many messages")
+    scan_parser.add_argument("--metrics", action="store_true",
+                             help="Print per-stage latency histograms after the scan")
+    scan_parser.set_defaults(func=cmd_scan)
+
+    plan_parser = subparsers.add_parser("plan",
+                                        help="Estimate a scan's size and duration without scanning")
+    plan_parser.add_argument("--max-emails", type=int, default=None,
+                             help="Maximum number of emails the scan would take")
+    plan_parser.add_argument("--sample-size", type=int, default=200,
+                             help="Messages whose headers and sizes are sampled")
+    plan_parser.add_argument("--account", default=None, metavar="NAME",
+                             help="Plan for a registered account instead of EMAIL_ADDRESS")
+    plan_parser.add_argument("--folder", default=None, help="Folder to plan for (default INBOX)")
+    plan_parser.set_defaults(func=cmd_plan)
+
+    runs_parser = subparsers.add_parser("scan-runs", help="List recent scan runs")
+    runs_parser.add_argument("--limit", type=int, default=20)
+    runs_parser.add_argument("--status", choices=["running", "completed", "interrupted", "failed"],
+                             default=None)
+    runs_parser.set_defaults(func=cmd_scan_runs)
+
+    accounts_parser = subparsers.add_parser("accounts",
+                                            help="Manage the accounts scanned by scan-accounts")
+    account_actions = accounts_parser.add_subparsers(dest="action")
+    add_parser = account_actions.add_parser("add", help="Register or update an account")
+    add_parser.add_argument("name", help="Unique account name")
+    add_parser.add_argument("email", help="Login address")
+    add_parser.add_argument("--credentials", required=True, metavar="REF",
+                            help="Where the password is found: env:NAME or file:PATH")
+    add_parser.add_argument("--server", default="imap.gmail.com", help="IMAP server")
+    add_parser.add_argument("--folder", action="append", default=None,
+                            help="Folder to scan (repeatable, default INBOX)")
+    for action in ("remove", "enable", "disable"):
+        action_parser = account_actions.add_parser(action, help=f"{action.capitalize()} an account")
+        action_parser.add_argument("name")
+    account_actions.add_parser("list", help="List accounts")
+    accounts_parser.set_defaults(func=cmd_accounts, action="list")
+
+    scan_accounts_parser = subparsers.add_parser(
+        "scan-accounts", help="Scan all registered accounts and folders concurrently"
+    )
+    scan_accounts_parser.add_argument("--account", action="append", default=None,
+                                      help="Only scan this account (repeatable)")
+    scan_accounts_parser.add_argument("--workers", type=int, default=None,
+                                      help="Mailboxes scanned at once")
+    scan_accounts_parser.add_argument("--per-server", type=int, default=None,
+                                      help="Connections per IMAP server")
+    scan_accounts_parser.add_argument("--slice-size", type=int, default=None,
+                                      help="Messages scanned per turn before the next account")
+    scan_accounts_parser.add_argument("--metrics", action="store_true",
+                                      help="Print per-stage latency histograms after the round")
+    scan_accounts_parser.set_defaults(func=cmd_scan_accounts)
+
+    reprocess_parser = subparsers.add_parser(
+        "reprocess", help="Re-run link extraction and categorization on stored messages (offline)"
+    )
+    reprocess_parser.set_defaults(func=cmd_reprocess)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Queue links for the click workers")
+    enqueue_parser.add_argument("link_ids", nargs="*", type=int, help="Link IDs to queue")
+    enqueue_parser.add_argument("--all", action="store_true", help="Queue all unclicked links")
+    enqueue_parser.add_argument("--force", action="store_true",
+                                help="Click even on hosts that keep failing")
+    enqueue_parser.set_defaults(func=cmd_enqueue)
+
+    worker_parser = subparsers.add_parser("worker", help="Run click worker processes")
+    worker_parser.add_argument("-n", "--processes", type=int, default=None,
+                               help="Number of worker processes")
+    worker_parser.add_argument("--batch-size", type=int, default=None,
+                               help="Jobs leased per batch")
+    worker_parser.add_argument("--once", action="store_true",
+                               help="Exit once the queue is drained")
+    worker_parser.set_defaults(func=cmd_worker)
+
+    status_parser = subparsers.add_parser("queue-status", help="Show click job queue counts")
+    status_parser.set_defaults(func=cmd_queue_status)
+
+    rebuild_parser = subparsers.add_parser("rebuild-statistics",
+                                           help="Recompute the statistics counters and senders")
+    rebuild_parser.set_defaults(func=cmd_rebuild_statistics)
+
+    from src.database.maintenance import MAINTENANCE_TASKS
+    maintenance_parser = subparsers.add_parser("maintenance", help="Run database maintenance")
+    maintenance_parser.add_argument("tasks", nargs="*",
+                                    help=f"Tasks to run: {', '.join(MAINTENANCE_TASKS)} "
+                                         "(default: all)")
+    maintenance_parser.add_argument("--vacuum-pages", type=int, default=1000,
+                                    help="Free pages released by an incremental vacuum")
+    maintenance_parser.set_defaults(func=cmd_maintenance)
+
+    prune_parser = subparsers.add_parser("prune-history",
+                                         help="Archive operation history past retention")
+    prune_parser.add_argument("--days", type=int, default=None,
+                              help="Days of detailed history to keep")
+    prune_parser.add_argument("--batch-size", type=int, default=None,
+                              help="Rows archived and deleted per batch")
+    prune_parser.add_argument("--max-batches", type=int, default=None,
+                              help="Stop after this many batches")
+    prune_parser.set_defaults(func=cmd_prune_history)
+
+    export_parser = subparsers.add_parser("export",
+                                          help="Export links, emails or operation history")
+    export_parser.add_argument("dataset", choices=["links", "emails", "operations"])
+    export_parser.add_argument("output", help="Output file")
+    export_parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    export_parser.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    export_parser.add_argument("--from", dest="date_from", default=None,
+                               help="Only rows at or after this date (YYYY-MM-DD)")
+    export_parser.add_argument("--to", dest="date_to", default=None,
+                               help="Only rows before this date (YYYY-MM-DD)")
+    export_parser.add_argument("--status", action="append", default=None,
+                               help="Only rows with this status (repeatable)")
+    export_parser.add_argument("--category", action="append", default=None,
+                               help="Only emails in this category (repeatable)")
+    export_parser.add_argument("--incremental", metavar="NAME", default=None,
+                               help="Only rows added since the last export with this name")
+    export_parser.add_argument("--chunk-size", type=int, default=5000,
+                               help="Rows read and written at a time")
+    export_parser.set_defaults(func=cmd_export)
+
+    daemon_parser = subparsers.add_parser("daemon", help="Run scheduled background jobs")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """Main command line entry point"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_level)
+    config = Config(args.env_file)
+    return args.func(args, config)
@@ -0,0 +1,227 @@
+"""Long-running background service for scheduled jobs"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from src.database.maintenance import run_maintenance
+from src.database.models import Database
+from src.database.retention import prune_operation_history
+from src.utils.config import Config
+from src.utils.metrics import REGISTRY, MetricsRegistry
+
+
+class ScheduledTask(NamedTuple):
+    """A job the daemon runs every interval seconds"""
+    name: str
+    interval: float
+    func: Callable
+    defer_while_scanning: bool = False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics in the Prometheus text format"""
+
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"Metrics request: {format % args}")
+
+
+class Daemon:
+    """Runs scheduled jobs until stopped
+
+    Each task first runs one interval after the daemon starts. A task that
+    raises is logged and rescheduled; it does not stop the daemon. With
+    METRICS_PORT set, the process's metrics (see src/utils/metrics.py) are
+    served at /metrics while the daemon runs. Database maintenance is held
+    back while an account scan round is running, since a VACUUM or
+    checkpoint would contend with the round's batch writes; it is retried
+    every SCAN_DEFER_SECONDS until the round ends.
+    """
+
+    SCAN_DEFER_SECONDS = 60
+
+    def __init__(self, config: Config, db: Database = None):
+        """Initialize daemon with the database maintenance schedule"""
+        self.config = config
+        self.db = db or Database(config.database_path, profile=config.db_profile)
+        self.logger = logging.getLogger(__name__)
+        self.tasks: List[ScheduledTask] = []
+        self._next_run: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._metrics_server: Optional[ThreadingHTTPServer] = None
+        self._scheduler = None
+        self._scan_thread: Optional[threading.Thread] = None
+
+        self.add_task(
+            "maintenance",
+            config.maintenance_interval_minutes * 60,
+            lambda: run_maintenance(self.db, ["optimize", "checkpoint"]),
+            defer_while_scanning=True
+        )
+        self.add_task(
+            "history retention",
+            config.maintenance_interval_minutes * 60,
+            lambda: prune_operation_history(
+                self.db,
+                retention_days=config.operation_retention_days,
+                archive_dir=config.operation_archive_dir,
+                batch_size=config.retention_batch_size
+            )
+        )
+        self.add_task(
+            "full maintenance",
+            config.vacuum_interval_hours * 3600,
+            lambda: run_maintenance(self.db, ["analyze", "vacuum", "checkpoint"]),
+            defer_while_scanning=True
+        )
+        self.add_task(
+            "account scans",
+            config.account_scan_interval_minutes * 60,
+            self._scan_accounts
+        )
+
+    def _scan_accounts(self):
+        """
+        Start a round of account scans (see src/core/scheduler.py) on its own thread
+
+        A round can take a long time, so it runs in the background while
+        the other tasks stay on schedule. A round still running when the
+        next one is due is left to finish instead.
+        """
+        from src.core.orchestrator import EmailUnsubscribeOrchestrator
+        from src.core.scheduler import ScanScheduler
+
+        if self.scanning():
+            self.logger.info("Previous account scan round is still running")
+            return
+        self._scheduler = ScanScheduler(EmailUnsubscribeOrchestrator(self.config, self.db))
+        self._scan_thread = threading.Thread(target=self._run_scan_round,
+                                             args=(self._scheduler,),
+                                             name="account-scans", daemon=True)
+        self._scan_thread.start()
+
+    def scanning(self) -> bool:
+        """Whether an account scan round is running"""
+        return self._scan_thread is not None and self._scan_thread.is_alive()
+
+    def _run_scan_round(self, scheduler):
+        """Account scan thread: run one round and log its outcome"""
+        try:
+            summary = scheduler.run()
+        except Exception as e:
+            self.logger.error(f"Account scan round failed: {str(e)}")
+            return
+        self.logger.info(f"Account scan: {summary['scanned']} emails in "
+                         f"{len(summary['mailboxes'])} mailboxes, {summary['failed']} failed")
+
+    def add_task(self, name: str, interval: float, func: Callable,
+                 defer_while_scanning: bool = False):
+        """
+        Schedule func to run every interval seconds (0 or less disables it)
+
+        Args:
+            name: Task name used in logs
+            interval: Seconds between runs
+            func: Job to run
+            defer_while_scanning: Hold the task back while an account scan round runs
+        """
+        if interval <= 0:
+            return
+        self.tasks.append(ScheduledTask(name, interval, func, defer_while_scanning))
+        self._next_run[name] = time.monotonic() + interval
+
+    def run_pending(self, now: float = None) -> List[str]:
+        """
+        Run every task that is due
+
+        Returns:
+            Names of the tasks that ran
+        """
+        now = time.monotonic() if now is None else now
+        ran = []
+        for task in self.tasks:
+            if self._next_run[task.name] > now:
+                continue
+            # Scan rounds are only started from this loop, so a round can't
+            # begin while a deferred task runs
+            if task.defer_while_scanning and self.scanning():
+                self.logger.info(f"Deferring {task.name} until the account scan round ends")
+                self._next_run[task.name] = now + min(task.interval, self.SCAN_DEFER_SECONDS)
+                continue
+            try:
+                task.func()
+            except Exception as e:
+                self.logger.error(f"Scheduled task {task.name} failed: {str(e)}")
+            self._next_run[task.name] = now + task.interval
+            ran.append(task.name)
+        return ran
+
+    def seconds_until_next(self, now: float = None) -> float:
+        """Get how long until the next task is due"""
+        now = time.monotonic() if now is None else now
+        if not self._next_run:
+            return 60.0
+        return max(0.0, min(self._next_run.values()) - now)
+
+    def start_metrics_server(self, port: int = None, host: str = None) -> int:
+        """
+        Serve the metrics endpoint on a background thread
+
+        Args:
+            port: Port to listen on (default METRICS_PORT; 0 picks a free one)
+            host: Address to listen on (default METRICS_HOST)
+
+        Returns:
+            The port listened on
+        """
+        port = self.config.metrics_port if port is None else port
+        host = host or self.config.metrics_host
+        self._metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._metrics_server.daemon_threads = True
+        threading.Thread(target=self._metrics_server.serve_forever, name="metrics-server",
+                         daemon=True).start()
+        port = self._metrics_server.server_address[1]
+        self.logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return port
+
+    def stop_metrics_server(self):
+        """Stop serving the metrics endpoint"""
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+            self._metrics_server = None
+
+    def run_forever(self):
+        """Run tasks as they become due until stop() is called"""
+        if self.config.metrics_port > 0:
+            self.start_metrics_server()
+        self.logger.info(f"Daemon started with {len(self.tasks)} scheduled tasks")
+        try:
+            while not self._stop.is_set():
+                self.run_pending()
+                self._stop.wait(self.seconds_until_next())
+        finally:
+            if self._scan_thread is not None:
+                self._scan_thread.join()
+            self.stop_metrics_server()
+        self.logger.info("Daemon stopped")
+
+    def stop(self):
+        """Ask run_forever to return; an account scan round stops after its current emails"""
+        self._stop.set()
+        if self._scheduler is not None:
+            self._scheduler.stop()
@@ -0,0 +1,264 @@
+"""In-process DNS cache and TLS session reuse for the click engine"""
+import logging
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+
+class DNSCache:
+    """Caches host name resolution with a TTL
+
+    The cache is used by the connections of the click session only (see
+    TunedHTTPAdapter in src/core/unsubscribe_handler.py); IMAP, SMTP and
+    the metrics server resolve hosts as usual. Each host is resolved once
+    per TTL; answers for other ports or address families are derived from
+    the cached addresses. Failed lookups are remembered for a shorter
+    negative TTL so prefetch() doesn't repeat them, but connections always
+    resolve such a host again, so one transient resolver failure doesn't
+    fail every retry.
+    """
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30,
+                 resolver: Callable = None):
+        """Initialize DNS cache"""
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._resolver = resolver
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+
+    def _resolve_uncached(self, host: str):
+        """Resolve a host with the underlying resolver"""
+        resolver = self._resolver or socket.getaddrinfo
+        return resolver(host, None, 0, socket.SOCK_STREAM)
+
+    def lookup(self, host: str, retry_failed: bool = False):
+        """
+        Get the cached addresses for a host, resolving it if needed
+
+        Args:
+            host: Host name
+            retry_failed: Resolve a host whose last lookup failed again
+                          instead of raising the cached failure
+
+        Raises:
+            socket.gaierror: If the host cannot be resolved
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[0] > now and not (retry_failed and isinstance(entry[1], Exception)):
+                self.hits += 1
+                if isinstance(entry[1], Exception):
+                    raise entry[1]
+                return entry[1]
+            self.misses += 1
+
+        try:
+            addresses = self._resolve_uncached(host)
+        except socket.gaierror as e:
+            with self._lock:
+                self._entries[host] = (now + self.negative_ttl, e)
+            raise
+
+        with self._lock:
+            self._entries[host] = (now + self.ttl, addresses)
+        return addresses
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Drop-in replacement for socket.getaddrinfo backed by the cache"""
+        if not isinstance(host, str) or flags or _is_ip_address(host):
+            return socket.getaddrinfo(host, port, family, type, proto, flags)
+
+        if isinstance(port, str):
+            port = int(port) if port.isdigit() else socket.getservbyname(port)
+
+        results = []
+        for entry_family, entry_type, entry_proto, canonname, sockaddr in self.lookup(
+                host, retry_failed=True):
+            if family and entry_family != family:
+                continue
+            results.append((
+                entry_family,
+                type or entry_type,
+                proto or entry_proto,
+                canonname,
+                (sockaddr[0], port or 0) + tuple(sockaddr[2:])
+            ))
+        if not results:
+            raise socket.gaierror(socket.EAI_FAMILY, "Address family not available")
+        return results
+
+    def prefetch(self, hosts: Iterable[str], max_workers: int = 32) -> Dict[str, bool]:
+        """
+        Resolve hosts in parallel ahead of use
+
+        Hosts that are already cached are not resolved again.
+
+        Returns:
+            Dict mapping each host to whether it resolved
+        """
+        now = time.monotonic()
+        with self._lock:
+            pending = sorted({
+                host for host in hosts
+                if host and not (host in self._entries and self._entries[host][0] > now)
+            })
+
+        results = {}
+        if not pending:
+            return results
+
+        def resolve(host):
+            try:
+                self.lookup(host)
+                return host, True
+            except (socket.gaierror, UnicodeError):
+                return host, False
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            for host, resolved in executor.map(resolve, pending):
+                results[host] = resolved
+
+        self.logger.debug(f"Pre-resolved {len(results)} hosts")
+        return results
+
+    def create_connection(self, address, timeout=None, source_address=None,
+                          socket_options=None) -> socket.socket:
+        """
+        Connect to (host, port) through the cached addresses
+
+        Like urllib3.util.connection.create_connection: each address is
+        tried in turn and the last error is raised if none connects. A
+        timeout that isn't a number (urllib3's default) leaves the socket's.
+        """
+        host, port = address
+        if host.startswith("["):
+            host = host.strip("[]")
+        error = None
+        for family, socktype, proto, _, sockaddr in self.getaddrinfo(host, port, 0,
+                                                                     socket.SOCK_STREAM):
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                for option in socket_options or ():
+                    sock.setsockopt(*option)
+                if isinstance(timeout, (int, float)):
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+        if error is not None:
+            raise error
+        raise OSError(f"No addresses for {host}")
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+_process_cache: Optional[DNSCache] = None
+_process_cache_lock = threading.Lock()
+
+
+def get_process_dns_cache(ttl: float = 300) -> DNSCache:
+    """Get the DNS cache shared by the click sessions of this process
+
+    Handlers created from configuration all share this instance, so a host
+    resolved by one is cached for the others.
+    """
+    global _process_cache
+    with _process_cache_lock:
+        if _process_cache is None:
+            _process_cache = DNSCache(ttl=ttl)
+        return _process_cache
+
+
+class _SessionCapturingSSLSocket(ssl.SSLSocket):
+    """SSL socket that hands its session back to the context on close
+
+    With TLS 1.3 the resumable session ticket arrives after the handshake,
+    so the session is captured again when the connection is closed.
+    """
+
+    def close(self):
+        """Remember the session, then close the socket"""
+        if isinstance(self.context, SessionReusingSSLContext):
+            self.context.remember_session(self)
+        super().close()
+
+
+class SessionReusingSSLContext(ssl.SSLContext):
+    """SSL context that resumes TLS sessions per server name
+
+    urllib3 does not expose TLS session resumption, but it wraps every
+    socket through its SSL context. Sharing one instance of this context
+    across all connection pools lets a new connection to a host we have
+    talked to before resume the previous session and skip the full
+    handshake.
+    """
+
+    sslsocket_class = _SessionCapturingSSLSocket
+
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        context = super().__new__(cls, protocol, *args, **kwargs)
+        context._sessions = {}
+        context._sessions_lock = threading.Lock()
+        context.sessions_reused = 0
+        return context
+
+    def remember_session(self, ssl_sock: ssl.SSLSocket):
+        """Store the socket's session for its server name"""
+        try:
+            session = ssl_sock.session
+        except (OSError, ValueError):
+            return
+        if ssl_sock.server_hostname and session is not None:
+            with self._sessions_lock:
+                self._sessions[ssl_sock.server_hostname] = session
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        """Wrap a socket, offering a cached session for the server name"""
+        if session is None and server_hostname:
+            with self._sessions_lock:
+                session = self._sessions.get(server_hostname)
+
+        ssl_sock = super().wrap_socket(
+            sock, *args, server_hostname=server_hostname, session=session, **kwargs
+        )
+
+        if server_hostname:
+            if ssl_sock.session_reused:
+                self.sessions_reused += 1
+            self.remember_session(ssl_sock)
+        return ssl_sock
+
+
+def create_session_reusing_context() -> SessionReusingSSLContext:
+    """Create a verifying client SSL context with TLS session reuse"""
+    context = SessionReusingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_default_certs()
+    return context
+
+
+def _is_ip_address(host: str) -> bool:
+    """Check if a host string is a literal IPv4 or IPv6 address"""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (OSError, ValueError):
+            continue
+    return False
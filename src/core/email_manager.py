@@ -1,25 +1,79 @@
 """Email manager for handling IMAP operations and email processing"""
 import os
 import imaplib
+import time
 import email as email_module
 from email.header import decode_header
 from email.message import Message
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
 import re
 import logging
 
+from src.utils.metrics import REGISTRY
+
+
+# Search criteria of a scan: messages mentioning unsubscribing
+SCAN_CRITERIA = '(BODY "unsubscribe")'
+
+# Header fields fetched during the header phase of a scan
+HEADER_FIELDS = "FROM SUBJECT DATE MESSAGE-ID LIST-UNSUBSCRIBE"
+
+# Errors after which a command is retried on a new connection (socket and
+# SSL errors are OSErrors; imaplib raises abort when the server hangs up)
+RECONNECT_ERRORS = (imaplib.IMAP4.abort, OSError)
+
+_UID_RE = re.compile(rb"UID (\d+)")
+_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)")
+_STATUS_ITEM_RE = re.compile(rb"([A-Z]+) (\d+)")
+
+_SEARCH_SECONDS = REGISTRY.histogram("imap_search_seconds", "IMAP UID SEARCH round trips")
+_FETCH_SECONDS = REGISTRY.histogram("imap_fetch_seconds", "IMAP UID FETCH of one full message")
+_FETCH_HEADERS_SECONDS = REGISTRY.histogram("imap_fetch_headers_seconds",
+                                            "IMAP UID FETCH of one batch of headers")
+_FETCHED_BYTES = REGISTRY.counter("imap_fetched_bytes_total", "Bytes of full messages fetched")
+_MIME_PARSE_SECONDS = REGISTRY.histogram("mime_parse_seconds", "MIME parsing of one message")
+_HTML_EXTRACT_SECONDS = REGISTRY.histogram("html_extract_seconds",
+                                           "Unsubscribe link extraction from one HTML part")
+_CATEGORIZE_SECONDS = REGISTRY.histogram("categorize_seconds", "Categorization of one message")
+
+
+def quote_mailbox(name: str) -> str:
+    """Quote a mailbox name for SELECT if it contains spaces or quotes"""
+    if re.fullmatch(r'[^\s"\\(){}%*]+', name):
+        return name
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
 
 class EmailManager:
     """Manages email connections and operations"""
     
-    def __init__(self, email_address: str, password: str, imap_server: str = "imap.gmail.com"):
-        """Initialize email manager"""
+    def __init__(self, email_address: str, password: str, imap_server: str = "imap.gmail.com",
+                 reconnect_attempts: int = 5, reconnect_backoff: float = 1.0,
+                 folder: str = "inbox"):
+        """
+        Initialize email manager
+        
+        Args:
+            email_address: Login address
+            password: Login password
+            imap_server: IMAP server host
+            reconnect_attempts: Times a command is retried on a new
+                                connection after the old one drops
+            reconnect_backoff: Seconds before the first reconnect; doubled
+                               on each further attempt (capped at 60)
+            folder: Mailbox selected on connect (e.g. "[Gmail]/All Mail")
+        """
         self.email_address = email_address
         self.password = password
         self.imap_server = imap_server
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.folder = folder
         self.mail = None
+        self.uidvalidity = None
+        self.reconnects = 0
         self.logger = logging.getLogger(__name__)
     
     def connect(self) -> bool:
@@ -27,13 +81,52 @@ class EmailManager:
         try:
             self.mail = imaplib.IMAP4_SSL(self.imap_server)
             self.mail.login(self.email_address, self.password)
-            self.mail.select("inbox")
+            self.mail.select(quote_mailbox(self.folder))
+            self.uidvalidity = self._read_uidvalidity()
             self.logger.info(f"Successfully connected to {self.imap_server}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to connect to email: {str(e)}")
             return False
     
+    def _read_uidvalidity(self) -> Optional[int]:
+        """UIDVALIDITY of the selected mailbox (UIDs are only comparable while it is unchanged)"""
+        try:
+            _, data = self.mail.response("UIDVALIDITY")
+            return int(data[0]) if data and data[0] is not None else None
+        except Exception:
+            return None
+    
+    def _uid(self, command: str, *args):
+        """
+        Run a UID command, reconnecting with backoff if the connection drops
+        
+        Raises:
+            ConnectionError: If the command still fails after
+                             reconnect_attempts new connections
+        """
+        attempt = 0
+        while True:
+            try:
+                if self.mail is None:
+                    raise imaplib.IMAP4.abort("not connected")
+                return self.mail.uid(command, *args)
+            except RECONNECT_ERRORS as e:
+                attempt += 1
+                if attempt > self.reconnect_attempts:
+                    raise ConnectionError(f"Lost connection to {self.imap_server}: {str(e)}") from e
+                delay = min(self.reconnect_backoff * 2 ** (attempt - 1), 60)
+                self.logger.warning(f"IMAP connection lost ({str(e)}), reconnecting in "
+                                    f"{delay:.1f}s (attempt {attempt}/{self.reconnect_attempts})")
+                time.sleep(delay)
+                previous_uidvalidity = self.uidvalidity
+                if not self.connect():
+                    self.mail = None
+                    continue
+                self.reconnects += 1
+                if previous_uidvalidity is not None and self.uidvalidity != previous_uidvalidity:
+                    raise ConnectionError("Mailbox UIDVALIDITY changed while reconnecting") from e
+    
     def disconnect(self):
         """Disconnect from email server"""
         if self.mail:
@@ -43,13 +136,39 @@ class EmailManager:
             except Exception as e:
                 self.logger.error(f"Error disconnecting: {str(e)}")
     
-    def search_emails(self, criteria: str = '(BODY "unsubscribe")', max_emails: int = None) -> List[bytes]:
-        """Search for emails based on criteria"""
+    def mailbox_status(self) -> Dict[str, int]:
+        """
+        Get the folder's counters with a single STATUS command
+        
+        Returns:
+            Dict with "messages", "unseen", "uidnext" and "uidvalidity"
+            (empty if the server refused)
+        """
+        try:
+            if not self.mail:
+                self.connect()
+            _, data = self.mail.status(quote_mailbox(self.folder),
+                                       "(MESSAGES UNSEEN UIDNEXT UIDVALIDITY)")
+            items = data[0].rsplit(b"(", 1)[-1]
+            return {name.decode().lower(): int(value)
+                    for name, value in _STATUS_ITEM_RE.findall(items)}
+        except Exception as e:
+            self.logger.error(f"Error reading mailbox status: {str(e)}")
+            return {}
+    
+    def search_emails(self, criteria: str = SCAN_CRITERIA, max_emails: int = None) -> List[bytes]:
+        """
+        Search for emails based on criteria
+        
+        Returns:
+            Message UIDs in ascending order (the newest max_emails if set)
+        """
         try:
             if not self.mail:
                 self.connect()
             
-            _, search_data = self.mail.search(None, criteria)
+            with _SEARCH_SECONDS.time():
+                _, search_data = self._uid("SEARCH", None, criteria)
             email_ids = search_data[0].split()
             
             if max_emails:
@@ -57,20 +176,86 @@ class EmailManager:
             
             self.logger.info(f"Found {len(email_ids)} emails matching criteria")
             return email_ids
+        except ConnectionError:
+            raise
         except Exception as e:
             self.logger.error(f"Error searching emails: {str(e)}")
             return []
     
     def fetch_email(self, email_id: bytes) -> Optional[Message]:
-        """Fetch a single email by ID"""
+        """
+        Fetch a single email by UID
+        
+        Raises:
+            ConnectionError: If the connection is lost and cannot be re-established
+        """
         try:
-            _, data = self.mail.fetch(email_id, "(RFC822)")
-            msg = email_module.message_from_bytes(data[0][1])
+            with _FETCH_SECONDS.time():
+                _, data = self._uid("FETCH", email_id, "(RFC822)")
+            raw = data[0][1]
+            _FETCHED_BYTES.inc(len(raw))
+            with _MIME_PARSE_SECONDS.time():
+                msg = email_module.message_from_bytes(raw)
             return msg
+        except ConnectionError:
+            raise
         except Exception as e:
             self.logger.error(f"Error fetching email {email_id}: {str(e)}")
             return None
     
+    def fetch_headers(self, email_ids: List[bytes], batch_size: int = 100,
+                      sizes: Dict[bytes, int] = None,
+                      stop: Callable[[], bool] = None) -> Dict[bytes, Message]:
+        """
+        Fetch only the headers needed for triage, in batches
+        
+        Uses BODY.PEEK so messages are not marked as read. Each batch is a
+        single UID FETCH round trip for up to batch_size messages.
+        
+        Args:
+            email_ids: Message UIDs
+            batch_size: UIDs per FETCH
+            sizes: Optional dict filled in with each message's full size in
+                   bytes (RFC822.SIZE), for byte budgets
+            stop: Optional callback checked before each batch; once it
+                  returns True the remaining batches are not fetched
+        
+        Returns:
+            Dict mapping email UID to a header-only Message
+        
+        Raises:
+            ConnectionError: If the connection is lost and cannot be re-established
+        """
+        headers = {}
+        
+        for start in range(0, len(email_ids), batch_size):
+            if stop is not None and stop():
+                break
+            batch = email_ids[start:start + batch_size]
+            try:
+                message_set = b",".join(batch).decode()
+                with _FETCH_HEADERS_SECONDS.time():
+                    _, data = self._uid(
+                        "FETCH", message_set,
+                        f"(UID RFC822.SIZE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])"
+                    )
+                for item in data:
+                    if not isinstance(item, tuple):
+                        continue
+                    match = _UID_RE.search(item[0])
+                    if not match:
+                        continue
+                    headers[match.group(1)] = email_module.message_from_bytes(item[1])
+                    size = _SIZE_RE.search(item[0])
+                    if sizes is not None and size:
+                        sizes[match.group(1)] = int(size.group(1))
+            except ConnectionError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error fetching headers: {str(e)}")
+        
+        return headers
+    
     def extract_email_data(self, msg: Message) -> Dict:
         """Extract relevant data from email message"""
         try:
@@ -145,6 +330,10 @@ class EmailManager:
     
     def extract_unsubscribe_links(self, html_content: str) -> List[str]:
         """Extract unsubscribe links from HTML content"""
+        with _HTML_EXTRACT_SECONDS.time():
+            return self._extract_unsubscribe_links(html_content)
+    
+    def _extract_unsubscribe_links(self, html_content: str) -> List[str]:
         links = []
         
         try:
@@ -170,6 +359,10 @@ class EmailManager:
     
     def categorize_email(self, sender: str, subject: str) -> str:
         """Categorize email based on sender and subject"""
+        with _CATEGORIZE_SECONDS.time():
+            return self._categorize(sender, subject)
+    
+    def _categorize(self, sender: str, subject: str) -> str:
         sender_lower = sender.lower()
         subject_lower = subject.lower()
         
@@ -0,0 +1,56 @@
+"""Per-domain click policy derived from historical outcomes"""
+from typing import Dict, List
+
+from src.database.models import Database
+
+
+class HostPolicy:
+    """Decides timeouts and skipping for unsubscribe hosts
+
+    Uses the domain_stats table: hosts that keep failing are skipped unless
+    the click is forced, and hosts that are known to work get a timeout
+    sized to their observed latency instead of the full request timeout.
+    """
+
+    def __init__(self, db: Database, base_timeout: float = 10, min_timeout: float = 3,
+                 latency_factor: float = 4.0, failure_threshold: int = 3):
+        """Initialize host policy"""
+        self.db = db
+        self.base_timeout = base_timeout
+        self.min_timeout = min_timeout
+        self.latency_factor = latency_factor
+        self.failure_threshold = failure_threshold
+        self._stats: Dict[str, Dict] = {}
+
+    def load(self):
+        """(Re)load domain statistics from the database"""
+        self._stats = {row["domain"]: row for row in self.db.get_domain_stats()}
+
+    def is_dead(self, domain: str) -> bool:
+        """Check if a domain has failed too many times in a row"""
+        stats = self._stats.get(domain)
+        return bool(stats) and stats["consecutive_failures"] >= self.failure_threshold
+
+    def timeout_for(self, domain: str) -> float:
+        """Get the request timeout to use for a domain"""
+        stats = self._stats.get(domain)
+        if not stats or not stats["avg_latency"]:
+            return self.base_timeout
+        timeout = stats["avg_latency"] * self.latency_factor
+        return min(self.base_timeout, max(self.min_timeout, timeout))
+
+    def sort_key(self, domain: str):
+        """Sort key putting fast, reliable hosts first and dead hosts last"""
+        stats = self._stats.get(domain)
+        if not stats:
+            # Unknown hosts go after known-good ones but before flaky ones
+            return (0, -0.5, self.base_timeout)
+        return (
+            int(self.is_dead(domain)),
+            -stats["success_rate"],
+            stats["avg_latency"] or self.base_timeout,
+        )
+
+    def order(self, items: List[Dict], domain_key: str = "domain") -> List[Dict]:
+        """Order items (e.g. jobs) by the sort key of their domain"""
+        return sorted(items, key=lambda item: self.sort_key(item.get(domain_key) or ""))
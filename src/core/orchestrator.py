@@ -1,13 +1,111 @@
 """Main orchestrator for email unsubscribe automation"""
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, NamedTuple, Optional, Callable, Iterator, Union
 import logging
-from datetime import datetime
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import Message
 
-from src.core.email_manager import EmailManager
-from src.core.unsubscribe_handler import UnsubscribeHandler
-from src.database.models import Database
-from src.utils.config import Config
+from src.core.email_manager import EmailManager, SCAN_CRITERIA
+from src.core.unsubscribe_handler import create_unsubscribe_handler
+from src.core.host_policy import HostPolicy
+from src.core.pipeline import Pipeline
+from src.core.scan_budget import ScanBudget, prioritize
+from src.core.scan_progress import ScanProgress
+from src.core.redirect_cache import RedirectCache
+from src.database.models import Database, Page
+from src.database.batch_writer import BatchWriter
+from src.database.export import export_dataset, export_incremental
+from src.database.message_store import MessageStore
+from src.database.job_queue import JobQueue
+from src.utils.config import Config, resolve_secret
 from src.utils.logger import setup_logging
+from src.utils.metrics import REGISTRY
+from src.utils.url_canonicalizer import url_domain
+
+
+def _as_local_naive(value: datetime) -> datetime:
+    """Convert an aware datetime to naive local time for comparisons"""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class ScanRecord(NamedTuple):
+    """Parse stage output for one fetched message
+    
+    Carries the message itself to the write stage for the message store;
+    status takes the values of ScanResult.status.
+    """
+    email_id: bytes
+    status: str
+    email_data: Optional[Dict] = None
+    category: Optional[str] = None
+    links: List[str] = []
+    error: Optional[str] = None
+    msg: Optional[Message] = None
+    html_parts: List[str] = []
+
+
+class ScanResult(NamedTuple):
+    """Outcome of one scanned email, as yielded by iter_scan
+    
+    status is "processed", "whitelisted", "unsubscribed", "missing" (the
+    message could not be fetched or parsed) or "error". category and
+    links_found are only set for processed emails.
+    """
+    email_id: bytes
+    status: str
+    message_id: str = ""
+    sender: str = ""
+    subject: str = ""
+    category: str = ""
+    links_found: int = 0
+    error: str = ""
+    
+    @classmethod
+    def skipped(cls, email_id, status: str, email_data: Optional[Dict] = None,
+                error: Optional[str] = None) -> "ScanResult":
+        """Build the result of an email that was not processed"""
+        email_data = email_data or {}
+        return cls(email_id, status, email_data.get("message_id", ""),
+                   email_data.get("sender", ""), email_data.get("subject", ""),
+                   error=error or "")
+
+
+class _FetchConnections:
+    """IMAP connections of one scan's fetch workers
+    
+    The first worker reuses the connection the scan searched with; each
+    further worker opens its own, since an IMAP connection handles one
+    command at a time.
+    """
+    
+    def __init__(self, manager: EmailManager, factory: Callable[[], EmailManager]):
+        self.manager = manager
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._main_in_use = False
+    
+    def acquire(self) -> EmailManager:
+        """Get a connection for a fetch worker"""
+        with self._lock:
+            if not self._main_in_use:
+                self._main_in_use = True
+                return self.manager
+        manager = self.factory()
+        if not manager.connect():
+            raise ConnectionError(f"Could not open another connection to {manager.imap_server}")
+        return manager
+    
+    def release(self, manager: EmailManager):
+        """Close a fetch worker's own connection"""
+        if manager is self.manager:
+            with self._lock:
+                self._main_in_use = False
+        elif manager is not None:
+            manager.disconnect()
 
 
 class EmailUnsubscribeOrchestrator:
@@ -16,166 +114,733 @@ class EmailUnsubscribeOrchestrator:
     def __init__(self, config: Config, db: Database = None):
         """Initialize orchestrator"""
         self.config = config
-        self.db = db or Database(config.database_path)
-        self.email_manager = EmailManager(
-            config.email_address,
-            config.email_password,
-            config.imap_server
+        self.db = db or Database(
+            config.database_path,
+            single_writer=config.db_single_writer,
+            write_queue_size=config.db_write_queue_size,
+            profile=config.db_profile
+        )
+        self.email_manager = self._new_email_manager()
+        self.redirect_cache = RedirectCache(
+            self.db,
+            min_observations=config.redirect_shortcut_min_observations
         )
-        self.unsubscribe_handler = UnsubscribeHandler(
-            timeout=config.request_timeout,
-            retry_count=2
+        self.unsubscribe_handler = create_unsubscribe_handler(config, self.redirect_cache)
+        self.job_queue = JobQueue(
+            self.db,
+            lease_seconds=config.worker_lease_seconds
         )
+        self.host_policy = HostPolicy(self.db, base_timeout=config.request_timeout)
+        self.message_store = None
+        if config.message_store_dir:
+            self.message_store = MessageStore(
+                self.db,
+                config.message_store_dir,
+                codec=config.message_store_codec,
+                segment_bytes=config.message_store_segment_mb * 1024 * 1024
+            )
         self.logger = logging.getLogger(__name__)
     
-    def scan_emails(self, max_emails: int = None, progress_callback: Callable = None) -> Dict:
+    def scan_emails(self, max_emails: int = None, progress_callback: Callable = None,
+                    deadline: Union[datetime, float] = None, max_bytes: int = None,
+                    max_messages: int = None) -> Dict:
         """
         Scan emails for unsubscribe links
         
+        Collects the records of iter_scan into totals. Large scans that
+        don't need every processed email in memory should use iter_scan.
+        
+        With a deadline or budget the most valuable messages are scanned
+        first (see ScanBudget) and the scan stops cleanly when a limit is
+        reached. What is left stays in the scan run and is scanned first by
+        the next budgeted scan.
+        
         Args:
             max_emails: Maximum number of emails to scan
             progress_callback: Optional callback function for progress updates
+            deadline: Time to stop at, or seconds from now
+            max_bytes: Total size of the messages to download
+            max_messages: Number of messages to download
+        
+        Returns:
+            Dictionary with scan results, including the scan "run_id",
+            "remaining" (emails of the run left to scan), "stopped_by"
+            (deadline, bytes, messages or None) and "metrics" (per-stage
+            latency histograms, see iter_scan)
+        """
+        budget = None
+        if deadline is not None or max_bytes is not None or max_messages is not None:
+            budget = ScanBudget(deadline, max_bytes, max_messages)
+        summary = {}
+        return self._collect_scan(self.iter_scan(max_emails, summary, budget=budget), summary,
+                                  progress_callback)
+    
+    def resume_scan(self, run_id: int, progress_callback: Callable = None) -> Dict:
+        """
+        Continue an interrupted scan run from its last checkpoint
+        
+        Messages whose results were committed are not fetched again.
+        
+        Args:
+            run_id: ID of the scan run (see Database.get_scan_runs)
+            progress_callback: Optional callback function for progress updates
+        
+        Returns:
+            Dictionary with the results of the resumed part of the scan
+        """
+        summary = {}
+        return self._collect_scan(self.iter_scan(summary=summary, run_id=run_id), summary,
+                                  progress_callback)
+    
+    def scan_accounts(self, account_ids: List[int] = None, max_workers: int = None,
+                      max_connections_per_server: int = None, slice_size: int = None,
+                      progress_callback: Callable = None) -> Dict:
+        """
+        Scan every folder of the registered accounts concurrently
+        
+        See src/core/scheduler.py; arguments left as None use the
+        SCAN_MAX_WORKERS, SCAN_MAX_CONNECTIONS_PER_SERVER and
+        SCAN_SLICE_SIZE settings.
+        
+        Returns:
+            ScanScheduler.run's summary
+        """
+        from src.core.scheduler import ScanScheduler
+        
+        scheduler = ScanScheduler(self, max_workers=max_workers,
+                                  max_connections_per_server=max_connections_per_server,
+                                  slice_size=slice_size)
+        return scheduler.run(account_ids, progress_callback)
+    
+    def plan_scan(self, max_emails: int = None, account_id: int = None, folder: str = None,
+                  sample_size: int = 200) -> Dict:
+        """
+        Estimate what a scan would fetch and how long it would take, without scanning
+        
+        See src/core/scan_planner.py.
         
         Returns:
-            Dictionary with scan results
+            ScanPlanner.plan's estimate
         """
+        from src.core.scan_planner import ScanPlanner
+        
+        return ScanPlanner(self, sample_size=sample_size).plan(max_emails, account_id, folder)
+    
+    def _collect_scan(self, scan: Iterator[ScanResult], summary: Dict,
+                      progress_callback: Callable = None) -> Dict:
+        """Total up the records of an iter_scan run"""
         results = {
             "total_scanned": 0,
             "emails_with_links": 0,
             "total_links_found": 0,
             "errors": 0,
+            "skipped_unsubscribed": 0,
             "emails_processed": []
         }
         
         try:
-            # Connect to email
-            if not self.email_manager.connect():
-                self.logger.error("Failed to connect to email server")
-                return results
-            
-            # Get whitelist and blacklist
-            whitelist = [item["email_pattern"] for item in self.db.get_whitelist()]
-            blacklist = [item["email_pattern"] for item in self.db.get_blacklist()]
+            for done, result in enumerate(scan, 1):
+                if progress_callback:
+                    progress_callback(done, summary["total"])
+                self._count_result(results, result)
+        except Exception as e:
+            self.logger.error(f"Error during email scan: {str(e)}")
+            results["errors"] += 1
+        
+        results["total_scanned"] = summary.get("total", 0)
+        results["run_id"] = summary.get("run_id")
+        results["remaining"] = summary.get("remaining", 0)
+        results["stopped_by"] = summary.get("stopped_by")
+        results["metrics"] = summary.get("metrics", {})
+        if "pipeline" in summary:
+            results["pipeline"] = summary["pipeline"]
+            results["bottleneck"] = summary["bottleneck"]
+        return results
+    
+    def iter_scan(self, max_emails: int = None, summary: Dict = None,
+                  run_id: int = None, account_id: int = None, folder: str = None,
+                  slice_size: int = None, fetch_workers: int = None,
+                  budget: ScanBudget = None) -> Iterator[ScanResult]:
+        """
+        Scan emails for unsubscribe links, yielding each email's outcome
+        
+        One ScanResult is yielded per searched email as soon as it is
+        written (skipped ones included), so callers can show live progress
+        without the scan holding its results. Stopping the iteration early
+        stops the scan; what was yielded so far is committed.
+        
+        Every scan is recorded as a scan run whose checkpoint is committed
+        with the scanned rows. A run that was interrupted (stopped early,
+        connection lost for good, crash) can be continued by passing its
+        run_id; only the messages not yet committed are fetched.
+        
+        A scan with a budget first continues the mailbox's unfinished run,
+        if it has one, and takes the messages in order of value (see
+        src/core/scan_budget.py) until a limit is reached.
+        
+        Args:
+            max_emails: Maximum number of emails to scan (new runs only)
+            summary: Optional dict filled in with "run_id", "total" (emails
+                     to scan now, set before the first record) and, once the
+                     scan ends, "pipeline" stage counters, the "bottleneck"
+                     stage, "remaining" (emails of the run not yet scanned),
+                     "stopped_by" (the budget limit that was hit) and
+                     "metrics" (latency histograms and counters that
+                     changed during the scan, see src/utils/metrics.py;
+                     concurrent scans in the process are included)
+            run_id: Scan run to resume instead of starting a new one (its
+                    account and folder are used)
+            account_id: Registered account to scan (see Database.add_account)
+                        instead of the configured EMAIL mailbox
+            folder: Mailbox to scan (default INBOX)
+            slice_size: Only scan this many of the run's messages now,
+                        leaving the run interrupted for a later resume
+            fetch_workers: IMAP connections the scan may use (default
+                           SCAN_FETCH_WORKERS)
+            budget: Deadline and byte/message limits of the scan
+        
+        Raises:
+            ConnectionError: If the mail server cannot be reached or the
+                             connection is lost and cannot be re-established
+            ValueError: If run_id is unknown or the mailbox's UIDs changed
+        """
+        summary = summary if summary is not None else {}
+        metrics_before = REGISTRY.snapshot()
+        
+        if budget is not None and run_id is None:
+            # Left over by an earlier scan that ran out of budget
+            run_id = self.db.get_open_scan_run(account_id, folder or "INBOX")
+        
+        run = None
+        if run_id is not None:
+            run = self.db.get_scan_run(run_id)
+            if run is None:
+                raise ValueError(f"Unknown scan run {run_id}")
+            if run["status"] == "completed":
+                summary.update(run_id=run_id, total=0)
+                return
+            account_id, folder = run["account_id"], run["folder"]
+        
+        account = None
+        if account_id is not None:
+            account = self.db.get_account(account_id)
+            if account is None:
+                raise ValueError(f"Unknown account {account_id}")
+        folder = folder or "INBOX"
+        manager = self._mailbox_manager(account, folder)
+        
+        # Connect to email
+        if not manager.connect():
+            raise ConnectionError(f"Failed to connect to email server {manager.imap_server}")
+        
+        status, error = "interrupted", None
+        try:
+            whitelist, blacklist, unsubscribed_senders, grace = self._triage_lists(account_id)
             
             # Search for emails
-            max_emails = max_emails or self.config.max_emails_per_scan
-            email_ids = self.email_manager.search_emails(max_emails=max_emails)
-            results["total_scanned"] = len(email_ids)
+            if run is None:
+                max_emails = max_emails or self.config.max_emails_per_scan
+                email_ids = manager.search_emails(criteria=SCAN_CRITERIA, max_emails=max_emails)
+                uids = [int(email_id) for email_id in email_ids]
+                run_id = self.db.create_scan_run(SCAN_CRITERIA, uids, manager.uidvalidity,
+                                                 folder=folder, account_id=account_id)
+                progress = ScanProgress(uids)
+            else:
+                progress = self._resume_progress(run, manager)
+                email_ids = [str(uid).encode() for uid in progress.remaining()]
+                self.db.set_scan_run_status(run_id, "running")
+            
+            # Header phase: triage every message on its headers alone so
+            # skipped messages never have their body fetched
+            headers, sizes = {}, {}
+            header_started = time.perf_counter()
+            if budget is not None and email_ids:
+                # Newest first, so a deadline that passes while the headers
+                # are fetched leaves the newest messages to scan
+                headers = manager.fetch_headers(email_ids[::-1], sizes=sizes,
+                                                stop=budget.expired)
+                if len(headers) < len(email_ids) and budget.expired():
+                    email_ids = [email_id for email_id in email_ids if email_id in headers]
+                senders = [self.email_manager.extract_email_data(msg).get("sender", "")
+                           for msg in headers.values()]
+                email_ids = prioritize(email_ids, headers, self.db.get_known_senders(senders))
+            if slice_size:
+                email_ids = email_ids[:slice_size]
+            if budget is None:
+                headers = manager.fetch_headers(email_ids) if email_ids else {}
+            summary["headers"] = {
+                "workers": 1,
+                "items": len(headers),
+                "busy_seconds": round(time.perf_counter() - header_started, 3)
+            }
+            summary["run_id"] = run_id
+            summary["total"] = len(email_ids)
             
-            self.logger.info(f"Processing {len(email_ids)} emails")
+            self.logger.info(f"Processing {len(email_ids)} emails (scan run {run_id})")
             
-            # Process each email
-            for idx, email_id in enumerate(email_ids):
+            connections = _FetchConnections(
+                manager, lambda: self._new_email_manager(account, folder)
+            )
+            with self._batch_writer(account_id) as writer:
+                yield from self._scan_messages(email_ids, headers, writer, whitelist, blacklist,
+                                               unsubscribed_senders, grace, summary,
+                                               run_id, progress, connections,
+                                               fetch_workers or self.config.scan_fetch_workers,
+                                               budget, sizes)
+            if self.message_store is not None:
+                self.message_store.flush()
+            status = "completed" if progress.complete else "interrupted"
+            summary["remaining"] = len(progress.remaining())
+            summary["stopped_by"] = budget.stopped_by if budget is not None else None
+            if summary["stopped_by"]:
+                self.logger.info(f"Scan run {run_id} stopped by its {summary['stopped_by']} "
+                                 f"budget with {summary['remaining']} emails left")
+        except ValueError as e:
+            status, error = "failed", str(e)
+            raise
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if run_id is not None:
+                self.db.set_scan_run_status(run_id, status, error,
+                                            timings=self._scan_timings(summary))
+            # Disconnect
+            manager.disconnect()
+            summary["metrics"] = REGISTRY.summary(since=metrics_before)
+    
+    @staticmethod
+    def _scan_timings(summary: Dict) -> Optional[Dict]:
+        """Per-stage timings of a scan, as kept for the scan planner"""
+        if not summary.get("pipeline"):
+            return None
+        timings = {"headers": summary["headers"]}
+        for stage, stats in summary["pipeline"].items():
+            timings[stage] = {key: stats[key] for key in ("workers", "items", "busy_seconds")}
+        return timings
+    
+    def _resume_progress(self, run: Dict, manager: EmailManager) -> ScanProgress:
+        """Search the part of a scan run that is not yet committed"""
+        uidvalidity = manager.uidvalidity
+        if run["uidvalidity"] is not None and uidvalidity is not None \
+                and uidvalidity != run["uidvalidity"]:
+            raise ValueError(f"Scan run {run['id']} cannot be resumed: the mailbox's "
+                             f"UIDVALIDITY changed, so its message UIDs were reassigned")
+        
+        start = (run["checkpoint_uid"] if run["checkpoint_uid"] is not None
+                 else (run["first_uid"] or 0) - 1) + 1
+        uids = []
+        if run["last_uid"] is not None and start <= run["last_uid"]:
+            email_ids = manager.search_emails(
+                criteria=f"(UID {start}:{run['last_uid']} {run['criteria']})"
+            )
+            uids = [int(email_id) for email_id in email_ids]
+        self.logger.info(f"Resuming scan run {run['id']} after UID {run['checkpoint_uid']}")
+        return ScanProgress(uids, run["checkpoint_uid"], run["done_uids"], run["processed"])
+    
+    def _new_email_manager(self, account: Dict = None, folder: str = "inbox") -> EmailManager:
+        """
+        Create an (unconnected) email manager
+        
+        Args:
+            account: Registered account (default: the EMAIL configuration)
+            folder: Mailbox to select
+        
+        Raises:
+            ValueError: If the account's credentials cannot be resolved
+        """
+        if account is None:
+            address, password = self.config.email_address, self.config.email_password
+            server = self.config.imap_server
+        else:
+            address, server = account["email_address"], account["imap_server"]
+            password = resolve_secret(account["credentials_ref"])
+        return EmailManager(
+            address,
+            password,
+            server,
+            reconnect_attempts=self.config.imap_reconnect_attempts,
+            reconnect_backoff=self.config.imap_reconnect_backoff,
+            folder=folder
+        )
+    
+    def _mailbox_manager(self, account: Optional[Dict], folder: str) -> EmailManager:
+        """Email manager a scan of account's folder searches with"""
+        if account is None and folder.upper() == "INBOX":
+            return self.email_manager
+        return self._new_email_manager(account, folder)
+    
+    def _batch_writer(self, account_id: int = None) -> BatchWriter:
+        """Create a batch writer sized from configuration, storing emails under account_id"""
+        return BatchWriter(
+            self.db,
+            max_records=self.config.batch_write_size,
+            max_delay_ms=self.config.batch_write_interval_ms,
+            account_id=account_id
+        )
+    
+    def _scan_messages(self, email_ids: List[bytes], headers: Dict, writer: BatchWriter,
+                       whitelist: List[str], blacklist: List[str],
+                       unsubscribed_senders: Dict[str, datetime], grace: timedelta,
+                       summary: Dict, run_id: int, progress: ScanProgress,
+                       connections: _FetchConnections, fetch_workers: int,
+                       budget: ScanBudget = None,
+                       sizes: Dict[bytes, int] = None) -> Iterator[ScanResult]:
+        """
+        Fetch, parse and write the searched messages as a staged pipeline
+        
+        Messages skipped on their headers are yielded first; the rest flow
+        through "fetch" (one of connections per worker), "parse" (MIME
+        parsing, triage, categorization and link extraction) and "write",
+        which runs on this thread and queues rows on the batch writer,
+        followed by the run's checkpoint. Per-stage counters are added to
+        summary["pipeline"].
+        
+        With a budget, messages are only fed to the pipeline while it lasts,
+        and once the deadline passes messages waiting to be fetched are
+        left for the next scan while those already fetched are written.
+        """
+        def done(result: ScanResult) -> ScanResult:
+            progress.mark_done(int(result.email_id))
+            writer.set_scan_progress(run_id, progress)
+            return result
+        
+        to_fetch = []
+        for email_id in email_ids:
+            if budget is not None and budget.expired():
+                break
+            header_msg = headers.get(email_id)
+            if header_msg is not None:
+                email_data = self.email_manager.extract_email_data(header_msg)
+                skip_reason = self._triage(
+                    email_data, whitelist, blacklist, unsubscribed_senders, grace
+                )
+                if skip_reason:
+                    yield done(ScanResult.skipped(email_id, skip_reason, email_data))
+                    continue
+            to_fetch.append((email_id, header_msg))
+        
+        pipeline = Pipeline(queue_size=self.config.scan_queue_size)
+        connection_lost = []
+        
+        def fetch(item, manager: EmailManager):
+            if connection_lost or (budget is not None and budget.expired()):
+                return None
+            return item[0], item[1], manager.fetch_email(item[0])
+        
+        def fetch_failed(item, e: Exception):
+            if isinstance(e, ConnectionError):
+                # Reconnecting already failed: stop instead of failing every
+                # remaining message, but let what was fetched be written so
+                # a resumed run starts after it
+                connection_lost.append(e)
+                pipeline.stop_feeding()
+                return None
+            return ScanRecord(item[0], "error", error=str(e))
+        
+        pipeline.add_stage(
+            "fetch",
+            fetch,
+            workers=min(fetch_workers, max(1, len(to_fetch))),
+            setup=connections.acquire,
+            teardown=connections.release,
+            on_error=fetch_failed
+        )
+        pipeline.add_stage(
+            "parse",
+            lambda item, _: self._parse_fetched(item, whitelist, blacklist,
+                                                unsubscribed_senders, grace),
+            workers=self.config.scan_parse_workers,
+            on_error=lambda item, e: ScanRecord(item[0], "error", error=str(e))
+        )
+        
+        items = iter(to_fetch)
+        if budget is not None:
+            items = budget.admit(to_fetch, lambda item: (sizes or {}).get(item[0], 0))
+        
+        try:
+            for record in pipeline.run(items, consumer="write"):
+                yield done(self._write_record(record, writer))
+            if connection_lost:
+                raise connection_lost[0]
+        finally:
+            summary["pipeline"] = pipeline.stats()
+            summary["bottleneck"] = pipeline.bottleneck()
+            self.logger.info(f"Scan pipeline bottleneck: {summary['bottleneck']}")
+    
+    def _parse_fetched(self, item, whitelist: List[str], blacklist: List[str],
+                       unsubscribed_senders: Dict[str, datetime],
+                       grace: timedelta) -> ScanRecord:
+        """Parse stage: turn a fetched message into a ScanRecord"""
+        email_id, header_msg, msg = item
+        if not msg:
+            return ScanRecord(email_id, "missing")
+        
+        # Extract email data
+        email_data = self.email_manager.extract_email_data(msg)
+        if not email_data:
+            return ScanRecord(email_id, "missing")
+        
+        # Headers could not be fetched separately, triage now
+        if header_msg is None:
+            skip_reason = self._triage(
+                email_data, whitelist, blacklist, unsubscribed_senders, grace
+            )
+            if skip_reason:
+                return ScanRecord(email_id, skip_reason, email_data)
+        
+        # Extract HTML content
+        html_parts = self.email_manager.extract_html_content(msg)
+        category, links = self._analyze_message(email_data, msg, html_parts)
+        return ScanRecord(email_id, "processed", email_data, category, links,
+                          msg=msg, html_parts=html_parts)
+    
+    def _write_record(self, record: ScanRecord, writer: BatchWriter) -> ScanResult:
+        """Write stage: store a parsed message and queue its rows"""
+        if record.status == "error":
+            self.logger.error(f"Error processing email {record.email_id}: {record.error}")
+            writer.log_operation("scan", None, "error", record.error)
+        if record.status != "processed":
+            return ScanResult.skipped(record.email_id, record.status, record.email_data,
+                                      record.error)
+        try:
+            # Keep what was fetched so it can be reprocessed offline
+            if self.message_store is not None:
                 try:
-                    # Progress callback
-                    if progress_callback:
-                        progress_callback(idx + 1, len(email_ids))
-                    
-                    # Fetch email
-                    msg = self.email_manager.fetch_email(email_id)
-                    if not msg:
-                        continue
-                    
-                    # Extract email data
-                    email_data = self.email_manager.extract_email_data(msg)
+                    self.message_store.put(record.email_data["message_id"], record.msg,
+                                           record.html_parts)
+                except Exception as e:
+                    self.logger.error(f"Could not store message {record.email_id}: {str(e)}")
+            
+            return self._record_message(record.email_id, record.email_data, record.category,
+                                        record.links, writer)
+        except Exception as e:
+            self.logger.error(f"Error processing email {record.email_id}: {str(e)}")
+            writer.log_operation("scan", None, "error", str(e))
+            return ScanResult.skipped(record.email_id, "error", record.email_data, str(e))
+    
+    def _analyze_message(self, email_data: Dict, msg, html_parts: List[str]):
+        """
+        Categorize a message and extract its unsubscribe links
+        
+        Returns:
+            Tuple of (category, list of distinct links)
+        """
+        # Categorize email
+        category = self.email_manager.categorize_email(
+            email_data["sender"],
+            email_data["subject"]
+        )
+        
+        # Extract unsubscribe links
+        all_links = []
+        for html in html_parts:
+            links = self.email_manager.extract_unsubscribe_links(html)
+            all_links.extend(links)
+        
+        # Also check List-Unsubscribe header
+        list_unsub = self.email_manager.get_list_unsubscribe_header(msg)
+        if list_unsub:
+            # Parse List-Unsubscribe header
+            urls = re.findall(r'<(https?://[^>]+)>', list_unsub)
+            all_links.extend(urls)
+        
+        # Remove duplicates
+        return category, list(set(all_links))
+    
+    def _process_message(self, email_id, email_data: Dict, msg, html_parts: List[str],
+                         writer: BatchWriter, operation: str = "scan") -> ScanResult:
+        """
+        Categorize a message, extract its links and queue its rows
+        
+        Shared by scans and reprocessing, so stored messages go through
+        exactly the extraction a scan would run now.
+        
+        Args:
+            email_id: Mailbox ID or store hash of the message
+            email_data: Output of EmailManager.extract_email_data
+            msg: The message (only its headers are read here)
+            html_parts: Its decoded HTML parts
+            writer: Batch writer the rows are queued on
+            operation: Operation type of the log entry ("scan" or "reprocess")
+        """
+        category, all_links = self._analyze_message(email_data, msg, html_parts)
+        return self._record_message(email_id, email_data, category, all_links, writer, operation)
+    
+    def _record_message(self, email_id, email_data: Dict, category: str, all_links: List[str],
+                        writer: BatchWriter, operation: str = "scan") -> ScanResult:
+        """Queue an analyzed message's email, link and log rows"""
+        # Queue the email, its links and the log entry; they are
+        # written together when the batch writer flushes
+        message_id = email_data["message_id"]
+        writer.add_email(
+            message_id,
+            email_data["sender"],
+            email_data["subject"],
+            email_data["received_date"],
+            category,
+            has_unsubscribe_link=bool(all_links),
+            update_category=operation == "reprocess"
+        )
+        
+        for link in all_links:
+            writer.add_unsubscribe_link(message_id, link)
+        
+        # Log operation
+        writer.log_operation(
+            operation,
+            status="success",
+            details=f"Found {len(all_links)} unsubscribe links",
+            message_id=message_id
+        )
+        
+        return ScanResult(email_id, "processed", message_id, email_data["sender"],
+                          email_data["subject"], category, len(all_links))
+    
+    @staticmethod
+    def _count_result(results: Dict, result: ScanResult):
+        """Add one ScanResult to scan_emails-style totals"""
+        if result.status == "unsubscribed":
+            results["skipped_unsubscribed"] += 1
+        elif result.status == "error":
+            results["errors"] += 1
+        elif result.status == "processed":
+            if result.links_found:
+                results["emails_with_links"] += 1
+                results["total_links_found"] += result.links_found
+            results["emails_processed"].append({
+                "sender": result.sender,
+                "subject": result.subject,
+                "links_found": result.links_found,
+                "category": result.category
+            })
+    
+    def reprocess(self, progress_callback: Callable = None) -> Dict:
+        """
+        Re-run extraction and categorization on the stored messages
+        
+        Replays the raw message store through the current triage and
+        _process_message without connecting to the mail server. Emails are
+        recategorized and newly found links are added; existing links are
+        kept.
+        
+        Args:
+            progress_callback: Optional callback(current, total)
+        
+        Returns:
+            Dictionary with scan-style results plus "reprocessed"
+        """
+        results = {
+            "total_scanned": 0,
+            "reprocessed": 0,
+            "emails_with_links": 0,
+            "total_links_found": 0,
+            "errors": 0,
+            "skipped_unsubscribed": 0,
+            "emails_processed": []
+        }
+        if self.message_store is None:
+            self.logger.error("Reprocessing needs the message store (set MESSAGE_STORE_DIR)")
+            return results
+        
+        whitelist = [item["email_pattern"] for item in self.db.get_whitelist()]
+        blacklist = [item["email_pattern"] for item in self.db.get_blacklist()]
+        unsubscribed_senders = self.db.get_unsubscribed_senders()
+        grace = timedelta(days=self.config.unsubscribe_grace_days)
+        total = self.message_store.get_stats()["messages"]
+        
+        with self._batch_writer() as writer:
+            for idx, stored in enumerate(self.message_store.iter_messages()):
+                results["total_scanned"] += 1
+                if progress_callback:
+                    progress_callback(idx + 1, total)
+                try:
+                    email_data = self.email_manager.extract_email_data(stored.headers)
                     if not email_data:
                         continue
-                    
-                    # Check whitelist/blacklist
-                    is_listed, list_type = self.email_manager.check_whitelist_blacklist(
-                        email_data["sender"], whitelist, blacklist
+                    skip_reason = self._triage(
+                        email_data, whitelist, blacklist, unsubscribed_senders, grace
                     )
-                    
-                    if list_type == "whitelisted":
-                        self.logger.info(f"Skipping whitelisted sender: {email_data['sender']}")
+                    if skip_reason:
+                        self._count_result(results, ScanResult.skipped(
+                            stored.hash, skip_reason, email_data))
                         continue
                     
-                    # Categorize email
-                    category = self.email_manager.categorize_email(
-                        email_data["sender"],
-                        email_data["subject"]
-                    )
-                    
-                    # Save email to database
-                    email_db_id = self.db.add_email(
-                        email_data["message_id"],
-                        email_data["sender"],
-                        email_data["subject"],
-                        email_data["received_date"],
-                        category
-                    )
-                    
-                    # Extract HTML content
-                    html_parts = self.email_manager.extract_html_content(msg)
-                    
-                    # Extract unsubscribe links
-                    all_links = []
-                    for html in html_parts:
-                        links = self.email_manager.extract_unsubscribe_links(html)
-                        all_links.extend(links)
-                    
-                    # Also check List-Unsubscribe header
-                    list_unsub = self.email_manager.get_list_unsubscribe_header(msg)
-                    if list_unsub:
-                        # Parse List-Unsubscribe header
-                        import re
-                        urls = re.findall(r'<(https?://[^>]+)>', list_unsub)
-                        all_links.extend(urls)
-                    
-                    # Remove duplicates
-                    all_links = list(set(all_links))
-                    
-                    # Save links to database
-                    if all_links:
-                        results["emails_with_links"] += 1
-                        results["total_links_found"] += len(all_links)
-                        
-                        for link in all_links:
-                            self.db.add_unsubscribe_link(email_db_id, link)
-                        
-                        self.db.mark_email_processed(email_db_id, has_unsubscribe=True)
-                    else:
-                        self.db.mark_email_processed(email_db_id, has_unsubscribe=False)
-                    
-                    # Log operation
-                    self.db.log_operation(
-                        "scan",
-                        email_db_id,
-                        "success",
-                        f"Found {len(all_links)} unsubscribe links"
-                    )
-                    
-                    results["emails_processed"].append({
-                        "sender": email_data["sender"],
-                        "subject": email_data["subject"],
-                        "links_found": len(all_links),
-                        "category": category
-                    })
-                    
+                    self._count_result(results, self._process_message(
+                        stored.hash, email_data, stored.headers, stored.html_parts,
+                        writer, operation="reprocess"))
+                    results["reprocessed"] += 1
                 except Exception as e:
-                    self.logger.error(f"Error processing email {email_id}: {str(e)}")
+                    self.logger.error(f"Error reprocessing stored message {stored.hash}: {str(e)}")
                     results["errors"] += 1
-                    self.db.log_operation("scan", None, "error", str(e))
-            
-            # Disconnect
-            self.email_manager.disconnect()
-            
-        except Exception as e:
-            self.logger.error(f"Error during email scan: {str(e)}")
-            results["errors"] += 1
         
+        self.logger.info(f"Reprocessed {results['reprocessed']} of {results['total_scanned']} "
+                         f"stored messages")
         return results
     
+    def _triage_lists(self, account_id: int = None):
+        """
+        Load what _triage checks against, once per scan
+        
+        Args:
+            account_id: Account being scanned (None for the configured EMAIL
+                        mailbox); only its own unsubscribes are skipped
+        
+        Returns:
+            Tuple of (whitelist, blacklist, unsubscribed_senders, grace)
+        """
+        # Get whitelist and blacklist
+        whitelist = [item["email_pattern"] for item in self.db.get_whitelist()]
+        blacklist = [item["email_pattern"] for item in self.db.get_blacklist()]
+        
+        # Senders already unsubscribed from in this mailbox
+        unsubscribed_senders = self.db.get_unsubscribed_senders(account_id)
+        grace = timedelta(days=self.config.unsubscribe_grace_days)
+        return whitelist, blacklist, unsubscribed_senders, grace
+    
+    def _triage(self, email_data: Dict, whitelist: List[str], blacklist: List[str],
+                unsubscribed_senders: Dict[str, datetime], grace: timedelta) -> Optional[str]:
+        """
+        Decide from header data whether a message can be skipped
+        
+        Returns:
+            "whitelisted" or "unsubscribed" if the message should be skipped,
+            None if it should be processed
+        """
+        sender = email_data.get("sender", "")
+        
+        is_listed, list_type = self.email_manager.check_whitelist_blacklist(
+            sender, whitelist, blacklist
+        )
+        if list_type == "whitelisted":
+            self.logger.info(f"Skipping whitelisted sender: {sender}")
+            return "whitelisted"
+        
+        # Mail from an unsubscribed sender is expected for a grace period
+        # while it is still in flight; anything later is processed again
+        unsubscribed_at = unsubscribed_senders.get(sender.lower())
+        if unsubscribed_at is not None:
+            received = email_data.get("received_date")
+            if received is None or _as_local_naive(received) <= unsubscribed_at + grace:
+                return "unsubscribed"
+        
+        return None
+    
     def unsubscribe_from_links(self, link_ids: List[int] = None, 
                               auto_mode: bool = False,
-                              progress_callback: Callable = None) -> Dict:
+                              progress_callback: Callable = None,
+                              force: bool = False) -> Dict:
         """
         Unsubscribe from selected links
         
+        Links on fast, reliable hosts are clicked first. Links on hosts that
+        keep failing are skipped unless force is set.
+        
         Args:
             link_ids: List of link IDs to unsubscribe from. If None, processes all unclicked links.
             auto_mode: If True, automatically clicks all unclicked links
             progress_callback: Optional callback for progress updates
+            force: Also click links on hosts that keep failing
         
         Returns:
             Dictionary with unsubscribe results
@@ -184,120 +849,230 @@ class EmailUnsubscribeOrchestrator:
             "total_attempted": 0,
             "successful": 0,
             "failed": 0,
+            "skipped": 0,
             "details": []
         }
         
         try:
-            # Get links to process
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
+            # Get links to process, one per subscription; the click result
+            # is fanned out to the other links of the same subscription
             if link_ids:
-                placeholders = ",".join("?" * len(link_ids))
-                cursor.execute(f"""
-                    SELECT id, link FROM unsubscribe_links 
-                    WHERE id IN ({placeholders}) AND clicked = 0
-                """, link_ids)
+                rows = self.db.get_subscription_links(link_ids)
             elif auto_mode:
-                cursor.execute("""
-                    SELECT id, link FROM unsubscribe_links 
-                    WHERE clicked = 0
-                """)
+                rows = self.db.get_subscription_links()
             else:
                 return results
             
-            links_to_process = cursor.fetchall()
+            self.host_policy.load()
+            self.redirect_cache.load()
+            for row in rows:
+                row["domain"] = url_domain(row["link"])
+            rows = self.host_policy.order(rows)
+            
+            if not force:
+                dead = [row for row in rows if self.host_policy.is_dead(row["domain"])]
+                if dead:
+                    self.logger.info(f"Skipping {len(dead)} links on hosts that keep failing")
+                    results["skipped"] = len(dead)
+                    rows = [row for row in rows if not self.host_policy.is_dead(row["domain"])]
+            
+            self.unsubscribe_handler.prefetch_hosts(row["domain"] for row in rows)
+            
+            links_to_process = [(row["id"], row["link"], row["domain"]) for row in rows]
             results["total_attempted"] = len(links_to_process)
             
             self.logger.info(f"Processing {len(links_to_process)} unsubscribe links")
             
-            # Process each link
-            for idx, (link_id, link) in enumerate(links_to_process):
-                try:
-                    # Progress callback
-                    if progress_callback:
-                        progress_callback(idx + 1, len(links_to_process))
-                    
-                    # Click the link
-                    result = self.unsubscribe_handler.click_link(link)
-                    
-                    # Update database
-                    self.db.update_link_status(
-                        link_id,
-                        clicked=True,
-                        status_code=result["status_code"],
-                        error_message=result["error_message"]
-                    )
-                    
-                    if result["success"]:
-                        results["successful"] += 1
-                        self.db.log_operation(
-                            "unsubscribe",
-                            None,
-                            "success",
-                            f"Successfully unsubscribed: {link}"
+            # Results are buffered and written in batches; the writer
+            # checkpoints when the batch is done
+            with self._batch_writer() as writer:
+                # Process each link
+                for idx, (link_id, link, domain) in enumerate(links_to_process):
+                    try:
+                        # Progress callback
+                        if progress_callback:
+                            progress_callback(idx + 1, len(links_to_process))
+                        
+                        # Click the link
+                        result = self.unsubscribe_handler.click_link(
+                            link,
+                            timeout=self.host_policy.timeout_for(domain)
                         )
-                    else:
-                        results["failed"] += 1
-                        self.db.log_operation(
-                            "unsubscribe",
-                            None,
-                            "failed",
-                            f"Failed to unsubscribe: {link} - {result.get('error_message')}"
+                        
+                        # Queue the result; it is written with the rest of the
+                        # batch. A failed click leaves the subscription unclicked
+                        # so it is tried again
+                        writer.update_link_status(
+                            link_id,
+                            clicked=bool(result["success"]),
+                            status_code=result["status_code"],
+                            error_message=result["error_message"]
                         )
-                    
-                    results["details"].append({
-                        "link_id": link_id,
-                        "link": link,
-                        "success": result["success"],
-                        "status_code": result["status_code"],
-                        "error_message": result["error_message"]
-                    })
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing link {link_id}: {str(e)}")
-                    results["failed"] += 1
-                    self.db.log_operation("unsubscribe", None, "error", str(e))
+                        writer.record_redirects(link_id, result)
+                        writer.record_domain_outcome(
+                            domain,
+                            result["success"],
+                            response_time=result.get("response_time"),
+                            status_code=result["status_code"],
+                            error_message=result["error_message"]
+                        )
+                        
+                        if result["success"]:
+                            results["successful"] += 1
+                            writer.log_operation(
+                                "unsubscribe",
+                                None,
+                                "success",
+                                f"Successfully unsubscribed: {link}"
+                            )
+                        else:
+                            results["failed"] += 1
+                            writer.log_operation(
+                                "unsubscribe",
+                                None,
+                                "failed",
+                                f"Failed to unsubscribe: {link} - {result.get('error_message')}"
+                            )
+                        
+                        results["details"].append({
+                            "link_id": link_id,
+                            "link": link,
+                            "success": result["success"],
+                            "status_code": result["status_code"],
+                            "error_message": result["error_message"],
+                            "final_url": result.get("final_url"),
+                            "shortcut": result.get("shortcut", False)
+                        })
+                        
+                    except Exception as e:
+                        self.logger.error(f"Error processing link {link_id}: {str(e)}")
+                        results["failed"] += 1
+                        writer.log_operation("unsubscribe", None, "error", str(e))
             
         except Exception as e:
             self.logger.error(f"Error during unsubscribe operation: {str(e)}")
         
         return results
     
+    def enqueue_unsubscribe(self, link_ids: List[int] = None,
+                            auto_mode: bool = False, force: bool = False) -> Dict:
+        """
+        Queue unsubscribe links for the click workers
+        
+        Unlike unsubscribe_from_links this returns immediately; the clicks
+        are performed by worker processes (see src/core/worker.py) and
+        survive restarts of the caller.
+        
+        Args:
+            link_ids: List of link IDs to queue
+            auto_mode: If True, queues all unclicked links
+            force: Click even on hosts that keep failing
+        
+        Returns:
+            Dictionary with the number of queued jobs and queue counts
+        """
+        if link_ids:
+            enqueued = self.job_queue.enqueue(link_ids, force=force)
+        elif auto_mode:
+            enqueued = self.job_queue.enqueue_all_unclicked(force=force)
+        else:
+            enqueued = 0
+        
+        self.logger.info(f"Queued {enqueued} unsubscribe links")
+        return {
+            "enqueued": enqueued,
+            "queue": self.job_queue.get_counts()
+        }
+    
+    def get_queue_status(self) -> Dict[str, int]:
+        """Get the number of click jobs in each state"""
+        return self.job_queue.get_counts()
+    
+    def get_domain_stats(self, limit: int = None) -> List[Dict]:
+        """Get per-domain click statistics"""
+        return self.db.get_domain_stats(limit)
+    
+    def get_redirect_stats(self) -> Dict:
+        """Get redirect chain statistics and latency saved by tracker shortcuts"""
+        return self.db.get_redirect_stats()
+    
     def get_statistics(self) -> Dict:
         """Get statistics about operations"""
         return self.db.get_statistics()
     
+    def get_daily_statistics(self, days: int = 30) -> List[Dict]:
+        """Get per-day scan, click and operation counts"""
+        return self.db.get_daily_statistics(days)
+    
+    def rebuild_statistics(self):
+        """Recompute the statistics counters and senders from the stored emails and links"""
+        self.db.rebuild_statistics()
+        self.db.rebuild_senders()
+    
     def get_recent_operations(self, limit: int = 50) -> List[Dict]:
         """Get recent operations"""
         return self.db.get_recent_operations(limit)
     
+    def page_operations(self, after=None, limit: int = 50, operation_type=None,
+                        status=None) -> Page:
+        """Get a page of operation history, newest first"""
+        return self.db.page_operations(after, limit, operation_type, status)
+    
+    def page_pending_subscriptions(self, after=None, limit: int = 50, category=None,
+                                   sender: str = None) -> Page:
+        """Get a page of subscriptions with unclicked links, newest first"""
+        return self.db.page_pending_subscriptions(after, limit, category, sender)
+    
+    def page_senders(self, after=None, limit: int = 50, sort: str = "volume",
+                     **filters) -> Page:
+        """Get a page of senders by volume or recency (filters as Database.page_senders)"""
+        return self.db.page_senders(after, limit, sort, **filters)
+    
+    def unsubscribe_senders(self, addresses: List[str] = None, domains: List[str] = None,
+                            force: bool = False) -> Dict:
+        """
+        Queue every pending subscription of whole senders or domains
+        
+        Args:
+            addresses: Sender addresses
+            domains: Sender domains
+            force: Click even on hosts that keep failing
+        
+        Returns:
+            Dictionary with the number of queued jobs and queue counts
+        """
+        return self.enqueue_unsubscribe(self.db.get_sender_link_ids(addresses, domains),
+                                        force=force)
+    
+    def whitelist_senders(self, addresses: List[str], notes: str = None) -> int:
+        """Whitelist sender addresses, returning how many were not listed yet"""
+        return sum(1 for address in addresses if self.db.add_to_whitelist(address.lower(), notes))
+    
+    def search_emails(self, query: str, limit: int = 50, after=None) -> Page:
+        """Search stored emails by sender, subject and category, newest first"""
+        return self.db.search_emails(query, limit, after)
+    
+    def iter_pending_link_ids(self, category=None, sender: str = None) -> Iterator[int]:
+        """Yield the representative link ID of every matching pending subscription"""
+        for row in self.db.iter_pages(self.db.page_pending_subscriptions,
+                                      category=category, sender=sender):
+            yield row["id"]
+    
     def export_links(self, filename: str = "unsubscribe_links.txt"):
         """Export all unsubscribe links to a file"""
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT ul.link, e.sender, e.subject, ul.clicked, ul.click_timestamp
-                FROM unsubscribe_links ul
-                JOIN emails e ON ul.email_id = e.id
-                ORDER BY ul.created_at DESC
-            """)
-            
             with open(filename, "w") as f:
                 f.write("Email Unsubscribe Links Export\n")
                 f.write(f"Generated: {datetime.now().isoformat()}\n")
                 f.write("=" * 80 + "\n\n")
                 
-                for row in cursor.fetchall():
-                    link, sender, subject, clicked, click_time = row
-                    f.write(f"Sender: {sender}\n")
-                    f.write(f"Subject: {subject}\n")
-                    f.write(f"Link: {link}\n")
-                    f.write(f"Clicked: {'Yes' if clicked else 'No'}\n")
-                    if click_time:
-                        f.write(f"Click Time: {click_time}\n")
+                for row in self.db.iter_pages(self.db.page_links):
+                    f.write(f"Sender: {row['sender']}\n")
+                    f.write(f"Subject: {row['subject']}\n")
+                    f.write(f"Link: {row['link']}\n")
+                    f.write(f"Clicked: {'Yes' if row['clicked'] else 'No'}\n")
+                    if row['click_timestamp']:
+                        f.write(f"Click Time: {row['click_timestamp']}\n")
                     f.write("-" * 80 + "\n")
             
             self.logger.info(f"Exported links to {filename}")
@@ -305,3 +1080,30 @@ class EmailUnsubscribeOrchestrator:
         except Exception as e:
             self.logger.error(f"Error exporting links: {str(e)}")
             return False
+
+    def export(self, dataset: str, path: str, fmt: str = "csv", compression: str = None,
+               incremental: str = None, **filters) -> Optional[Dict]:
+        """
+        Stream a dataset to a CSV, JSONL or Parquet file
+        
+        Args:
+            dataset: "links", "emails" or "operations"
+            path: Output file
+            fmt: "csv", "jsonl" or "parquet"
+            compression: None, "gzip" or "zstd"
+            incremental: Name of an incremental export; only rows added
+                         since its last run are written
+            **filters: date_from, date_to, status and category
+        
+        Returns:
+            Dict with rows, path and watermark, or None if the export failed
+        """
+        try:
+            if incremental:
+                return export_incremental(self.db, incremental, dataset, path, fmt=fmt,
+                                          compression=compression, **filters)
+            return export_dataset(self.db, dataset, path, fmt=fmt, compression=compression,
+                                  **filters)
+        except Exception as e:
+            self.logger.error(f"Error exporting {dataset}: {str(e)}")
+            return None
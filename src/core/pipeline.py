@@ -0,0 +1,314 @@
+"""Staged producer/consumer pipeline with bounded queues
+
+Each stage runs a pool of threads that take items from the stage's input
+queue and put their results on the next stage's queue. Queues are bounded,
+so a slow stage blocks the stages before it (backpressure) and the number
+of items in flight never exceeds the queue sizes plus the worker counts.
+Results of the last stage are consumed on the calling thread.
+
+Every stage keeps StageStats counters: busy time is spent in the stage's
+function, idle time waiting for input and blocked time waiting for room in
+the next queue. The stage with the highest utilization is the bottleneck.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+_STOP = object()
+
+# How often blocked threads re-check whether the pipeline was cancelled
+_POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """Throughput counters of one stage, safe to update from its workers"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 0, errors: int = 0, busy: float = 0.0, idle: float = 0.0,
+            blocked: float = 0.0):
+        """Add to the counters"""
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy_seconds += busy
+            self.idle_seconds += idle
+            self.blocked_seconds += blocked
+
+    def to_dict(self, elapsed: float) -> Dict:
+        """
+        Summarize the counters over a run of elapsed seconds
+
+        per_second is items over wall time; utilization is the share of the
+        workers' time spent working rather than idle or blocked.
+        """
+        capacity = elapsed * self.workers
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "errors": self.errors,
+            "per_second": round(self.items / elapsed, 1) if elapsed else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "utilization": round(min(self.busy_seconds / capacity, 1.0), 3) if capacity else 0.0,
+        }
+
+
+class _Stage:
+    def __init__(self, name: str, func: Callable, workers: int, setup: Optional[Callable],
+                 teardown: Optional[Callable], on_error: Optional[Callable], queue_size: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.setup = setup
+        self.teardown = teardown
+        self.on_error = on_error
+        self.input: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats(name, self.workers)
+        self.running = 0
+        self.started = 0
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """Chain of thread-pool stages connected by bounded queues
+
+    Usage:
+        pipeline = Pipeline(queue_size=100)
+        pipeline.add_stage("fetch", fetch, workers=4, setup=connect, teardown=disconnect)
+        pipeline.add_stage("parse", parse, workers=2)
+        for result in pipeline.run(items):
+            write(result)
+
+    A stage function is called as func(item, state), where state is what
+    the stage's setup() returned for that worker thread (None without a
+    setup). It returns the item for the next stage, or None to drop it. An
+    exception is logged and counted in the stage's errors unless the stage
+    has an on_error callable, whose return value is passed on instead.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        """
+        Initialize the pipeline
+
+        Args:
+            queue_size: Capacity of each queue between stages
+        """
+        self.queue_size = max(1, queue_size)
+        self.logger = logging.getLogger(__name__)
+        self._stages: List[_Stage] = []
+        self._output: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._cancelled = threading.Event()
+        self._input_closed = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.consumer_stats: Optional[StageStats] = None
+
+    def add_stage(self, name: str, func: Callable[[Any, Any], Any], workers: int = 1,
+                  setup: Callable[[], Any] = None, teardown: Callable[[Any], None] = None,
+                  on_error: Callable[[Any, Exception], Any] = None):
+        """
+        Append a stage
+
+        Args:
+            name: Stage name used in the counters
+            func: func(item, state) -> item for the next stage or None
+            workers: Number of threads running func
+            setup: Called once per worker thread; its result is the state
+                   (a worker whose setup raises exits, the others carry on)
+            teardown: Called with the state when the worker exits
+            on_error: on_error(item, exception) -> item to pass on instead
+        """
+        stage = _Stage(name, func, workers, setup, teardown, on_error, self.queue_size)
+        self._stages.append(stage)
+
+    def cancel(self):
+        """Stop feeding and processing; items in flight are dropped"""
+        self._cancelled.set()
+
+    def stop_feeding(self):
+        """Stop taking new input; items already fed still run to the end"""
+        self._input_closed.set()
+
+    def _put(self, target: queue.Queue, item, stats: StageStats) -> bool:
+        """Put with backpressure; False if the pipeline was cancelled"""
+        started = time.perf_counter()
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    target.put(item, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.add(blocked=time.perf_counter() - started)
+
+    def _get(self, source: queue.Queue, stats: StageStats):
+        """Get, counting the wait as idle time; _STOP if cancelled"""
+        started = time.perf_counter()
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    return source.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            return _STOP
+        finally:
+            stats.add(idle=time.perf_counter() - started)
+
+    def _next_queue(self, index: int) -> queue.Queue:
+        if index + 1 < len(self._stages):
+            return self._stages[index + 1].input
+        return self._output
+
+    def _run_worker(self, index: int):
+        """Worker thread of stage index"""
+        stage = self._stages[index]
+        target = self._next_queue(index)
+        state = None
+        try:
+            if stage.setup is not None:
+                state = stage.setup()
+        except Exception as e:
+            self.logger.error(f"Pipeline stage {stage.name} worker failed to start: {str(e)}")
+            stage.stats.add(errors=1)
+            self._worker_exited(index, target)
+            return
+        with stage.lock:
+            stage.started += 1
+
+        try:
+            while True:
+                item = self._get(stage.input, stage.stats)
+                if item is _STOP:
+                    break
+                started = time.perf_counter()
+                try:
+                    result = stage.func(item, state)
+                except Exception as e:
+                    stage.stats.add(errors=1)
+                    if stage.on_error is None:
+                        self.logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+                        result = None
+                    else:
+                        result = stage.on_error(item, e)
+                stage.stats.add(items=1, busy=time.perf_counter() - started)
+                if result is not None and not self._put(target, result, stage.stats):
+                    break
+        finally:
+            if stage.teardown is not None:
+                try:
+                    stage.teardown(state)
+                except Exception as e:
+                    self.logger.error(f"Pipeline stage {stage.name} teardown failed: {str(e)}")
+            self._worker_exited(index, target)
+
+    def _worker_exited(self, index: int, target: queue.Queue):
+        """Pass the stop marker on once the last worker of a stage exits"""
+        stage = self._stages[index]
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if not last:
+            return
+        if index + 1 < len(self._stages):
+            for _ in range(self._stages[index + 1].workers):
+                self._put(target, _STOP, stage.stats)
+        else:
+            self._put(target, _STOP, stage.stats)
+        if stage.started == 0 and not self._cancelled.is_set():
+            # Every worker failed to start: nobody will drain the input
+            self.logger.error(f"Pipeline stage {stage.name} has no workers")
+            self.cancel()
+
+    def _feed(self, items: Iterable):
+        """Feeder thread: put every item on the first stage's queue"""
+        first = self._stages[0]
+        feed_stats = StageStats("feed", 1)
+        try:
+            for item in items:
+                if self._input_closed.is_set():
+                    break
+                if not self._put(first.input, item, feed_stats):
+                    return
+        except Exception as e:
+            self.logger.error(f"Pipeline input failed: {str(e)}")
+            self.cancel()
+        finally:
+            for _ in range(first.workers):
+                self._put(first.input, _STOP, feed_stats)
+
+    def run(self, items: Iterable, consumer: str = "consume") -> Iterator:
+        """
+        Start the stages and yield the last stage's results
+
+        Results are yielded on the calling thread as they arrive; time the
+        caller spends between them is counted as the busy time of a final
+        stage named consumer. Closing the iterator early cancels the run.
+
+        Args:
+            items: Input items, read lazily by a feeder thread
+            consumer: Name of the calling thread's stage in stats()
+        """
+        if not self._stages:
+            raise ValueError("Pipeline has no stages")
+        self.consumer_stats = StageStats(consumer, 1)
+        self._started = time.perf_counter()
+        for index, stage in enumerate(self._stages):
+            stage.running = stage.workers
+            for number in range(stage.workers):
+                thread = threading.Thread(target=self._run_worker, args=(index,),
+                                          name=f"pipeline-{stage.name}-{number}", daemon=True)
+                self._threads.append(thread)
+        feeder = threading.Thread(target=self._feed, args=(items,), name="pipeline-feed",
+                                  daemon=True)
+        self._threads.append(feeder)
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            while True:
+                result = self._get(self._output, self.consumer_stats)
+                if result is _STOP:
+                    break
+                started = time.perf_counter()
+                yield result
+                self.consumer_stats.add(items=1, busy=time.perf_counter() - started)
+        finally:
+            # Cancel on early exit so blocked workers and the feeder return
+            if any(thread.is_alive() for thread in self._threads):
+                self.cancel()
+            for thread in self._threads:
+                thread.join()
+            self._finished = time.perf_counter()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Counters of every stage, in order, ending with the consumer"""
+        if self._started is None:
+            return {}
+        elapsed = (self._finished or time.perf_counter()) - self._started
+        stages = [stage.stats for stage in self._stages]
+        if self.consumer_stats is not None:
+            stages.append(self.consumer_stats)
+        return {stats.name: stats.to_dict(elapsed) for stats in stages}
+
+    def bottleneck(self) -> Optional[str]:
+        """Name of the stage with the highest utilization"""
+        stats = self.stats()
+        if not stats:
+            return None
+        return max(stats, key=lambda name: stats[name]["utilization"])
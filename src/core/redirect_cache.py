@@ -0,0 +1,140 @@
+"""Learned shortcuts through click-tracking redirectors"""
+import logging
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from src.database.models import Database
+from src.utils.url_canonicalizer import canonicalize_url
+
+
+def tracker_prefix(url: str) -> Optional[str]:
+    """Get the host and path that identify a tracker endpoint
+
+    Example: https://click.esp.com/ls/click?upn=... -> click.esp.com/ls/click
+    """
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if not parts.hostname:
+        return None
+    return f"{parts.hostname.lower()}{parts.path or '/'}"
+
+
+def _embedded_urls(url: str) -> Dict[str, str]:
+    """Get the query parameters of a URL whose values are http(s) URLs"""
+    try:
+        params = parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    except ValueError:
+        return {}
+
+    embedded = {}
+    for name, value in params:
+        value = unquote(value) if "%3A" in value.upper() else value
+        if value.lower().startswith(("http://", "https://")):
+            embedded[name] = value
+    return embedded
+
+
+class RedirectCache:
+    """Maps tracker URL prefixes to the redirect hops they can skip
+
+    Many unsubscribe links go through an ESP click tracker that carries the
+    real destination in a query parameter and answers with a redirect to
+    it. When a click's redirect chain shows that a tracker prefix redirects
+    to the URL in one of its parameters, the prefix and parameter are
+    recorded. Once a prefix has been seen doing so min_observations times,
+    later links on it are sent straight to the embedded URL.
+
+    Trackers that use opaque tokens cannot be skipped safely and are only
+    recorded in the link's redirect chain.
+    """
+
+    def __init__(self, db: Database, min_observations: int = 2):
+        """Initialize redirect cache"""
+        self.db = db
+        self.min_observations = min_observations
+        self._prefixes: Dict[str, Dict] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        """(Re)load learned tracker prefixes from the database"""
+        self._prefixes = {row["prefix"]: row for row in self.db.get_redirect_prefixes()}
+
+    def shortcut(self, link: str) -> Optional[Dict]:
+        """
+        Get the URL to request instead of a tracker link, if it is known
+
+        Returns:
+            Dict with the target url, the prefix and expected_saved (average
+            seconds the skipped hops took), or None
+        """
+        if self.min_observations <= 0:
+            return None
+
+        prefix = tracker_prefix(link)
+        learned = self._prefixes.get(prefix)
+        if not learned or learned["observations"] < self.min_observations:
+            return None
+
+        target = _embedded_urls(link).get(learned["param"])
+        if not target or tracker_prefix(target) == prefix:
+            return None
+
+        return {
+            "url": target,
+            "prefix": prefix,
+            "expected_saved": learned["latency_total"] / learned["observations"],
+        }
+
+    def learn(self, link: str, chain: List[str], hop_latencies: List[float]) -> Optional[Dict]:
+        """
+        Check whether a redirect chain skipped through a parameter-carrying tracker
+
+        Args:
+            link: URL that was requested (first entry of the chain)
+            chain: Every URL requested, ending with the final URL
+            hop_latencies: Seconds taken by each redirect response in the chain
+
+        Returns:
+            Dict with prefix, param, hops and latency that a shortcut would
+            skip, or None if the link cannot be shortcut
+        """
+        if len(chain) < 2:
+            return None
+
+        embedded = _embedded_urls(link)
+        if not embedded:
+            return None
+
+        later_hops = {canonicalize_url(url): idx for idx, url in enumerate(chain) if idx > 0}
+        for param, target in embedded.items():
+            idx = later_hops.get(canonicalize_url(target))
+            if idx is None:
+                continue
+
+            observation = {
+                "prefix": tracker_prefix(link),
+                "param": param,
+                "hops": idx,
+                "latency": sum(hop_latencies[:idx]),
+            }
+            self._remember(observation)
+            return observation
+        return None
+
+    def _remember(self, observation: Dict):
+        """Update the in-memory prefix table with a new observation"""
+        learned = self._prefixes.get(observation["prefix"])
+        if learned and learned["param"] == observation["param"]:
+            learned["observations"] += 1
+            learned["hops_total"] += observation["hops"]
+            learned["latency_total"] += observation["latency"]
+        else:
+            self._prefixes[observation["prefix"]] = {
+                "prefix": observation["prefix"],
+                "param": observation["param"],
+                "observations": 1,
+                "hops_total": observation["hops"],
+                "latency_total": observation["latency"],
+            }
@@ -0,0 +1,120 @@
+"""Deadline and budget limits for scans, and the order of their work"""
+import threading
+import time
+from datetime import datetime
+from email.message import Message
+from email.utils import parseaddr
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+
+# Priority points on top of recency, which ranges over (0, 1] from the
+# oldest to the newest message: a message worth both bonuses outranks the
+# newest message worth neither
+UNKNOWN_SENDER_WEIGHT = 1.0
+LIST_UNSUBSCRIBE_WEIGHT = 1.0
+
+
+def prioritize(email_ids: List[bytes], headers: Dict[bytes, Message],
+               known_senders: Set[str]) -> List[bytes]:
+    """
+    Order messages most valuable first
+
+    Newer messages (higher UIDs) score higher, plus UNKNOWN_SENDER_WEIGHT
+    for a sender not in known_senders and LIST_UNSUBSCRIBE_WEIGHT for a
+    List-Unsubscribe header. Messages without headers score on recency.
+
+    Args:
+        email_ids: Message UIDs
+        headers: Header-only messages by UID (see EmailManager.fetch_headers)
+        known_senders: Lowercased addresses seen before
+    """
+    ordered = sorted(email_ids, key=int)
+
+    def score(rank: int, email_id: bytes) -> float:
+        value = (rank + 1) / len(ordered)
+        msg = headers.get(email_id)
+        if msg is not None:
+            sender = parseaddr(msg.get("From", ""))[1].lower()
+            if sender and sender not in known_senders:
+                value += UNKNOWN_SENDER_WEIGHT
+            if msg.get("List-Unsubscribe"):
+                value += LIST_UNSUBSCRIBE_WEIGHT
+        return value
+
+    scored = sorted(((score(rank, email_id), email_id) for rank, email_id in enumerate(ordered)),
+                    key=lambda pair: pair[0], reverse=True)
+    return [email_id for _, email_id in scored]
+
+
+class ScanBudget:
+    """Limits on how much a scan may do before it stops
+
+    The deadline is wall-clock time. Byte and message budgets count the
+    messages downloaded; messages skipped on their headers are free. A
+    message too large for the bytes left is passed over for smaller ones.
+    stopped_by records the limit that ended the scan (the deadline or the
+    message limit), or "bytes" if messages were only passed over.
+    """
+
+    def __init__(self, deadline: Union[datetime, float] = None, max_bytes: int = None,
+                 max_messages: int = None):
+        """
+        Initialize the budget
+
+        Args:
+            deadline: Time to stop at, or seconds from now
+            max_bytes: Total size of the messages downloaded
+            max_messages: Number of messages downloaded
+        """
+        if isinstance(deadline, datetime):
+            now = datetime.now(deadline.tzinfo) if deadline.tzinfo else datetime.now()
+            deadline = (deadline - now).total_seconds()
+        self._deadline_at = time.monotonic() + deadline if deadline is not None else None
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self.bytes_taken = 0
+        self.messages_taken = 0
+        self.stopped_by: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _stop(self, reason: str):
+        if self.stopped_by is None or (self.stopped_by == "bytes" and reason != "bytes"):
+            self.stopped_by = reason
+
+    def seconds_left(self) -> Optional[float]:
+        """Seconds until the deadline (None without one)"""
+        if self._deadline_at is None:
+            return None
+        return max(0.0, self._deadline_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed"""
+        if self._deadline_at is not None and time.monotonic() >= self._deadline_at:
+            self._stop("deadline")
+            return True
+        return False
+
+    def take(self, size: int = 0) -> bool:
+        """Reserve the budget to download one message of size bytes; False if it doesn't fit"""
+        with self._lock:
+            if self.expired():
+                return False
+            if self.max_messages is not None and self.messages_taken >= self.max_messages:
+                self._stop("messages")
+                return False
+            if self.max_bytes is not None and self.bytes_taken + size > self.max_bytes:
+                self._stop("bytes")
+                return False
+            self.messages_taken += 1
+            self.bytes_taken += size
+            return True
+
+    def admit(self, items: Iterable, size_of: Callable[..., int]) -> Iterator:
+        """Yield the items that fit the budget, stopping at the deadline or message limit"""
+        for item in items:
+            if self.take(size_of(item)):
+                yield item
+            elif self.stopped_by != "bytes":
+                # The deadline or message limit ends the scan even after
+                # messages were passed over for their size
+                return
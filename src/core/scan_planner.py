@@ -0,0 +1,177 @@
+"""Dry-run cost estimates for scans
+
+ScanPlanner answers "what would this scan cost?" without scanning. It
+reads the folder's STATUS, runs the scan's SEARCH to count the candidates
+and fetches the headers and RFC822.SIZE of a random sample of them. The
+sample is triaged like a real scan to estimate how many messages would be
+skipped on their headers, and looked up in the database to estimate how
+many were stored by an earlier scan (those are fetched again and their
+rows updated in place).
+
+Durations come from the per-stage timings recorded by earlier scan runs
+(see Database.get_scan_timings), scaled to the configured number of
+workers: the stages overlap, so a scan takes its header phase plus its
+slowest stage. Without history the sample's own header round trips stand
+in for the fetch stage, which gives a lower bound.
+
+Nothing is written and no scan run is created.
+"""
+import logging
+import random
+import time
+from typing import Dict, List
+
+from src.core.email_manager import SCAN_CRITERIA
+
+
+# Stages of the scan pipeline, in order (see EmailUnsubscribeOrchestrator._scan_messages)
+_STAGES = ("fetch", "parse", "write")
+
+
+class ScanPlanner:
+    """Estimates the cost of a scan from cheap IMAP calls and past timings
+
+    Usage:
+        plan = ScanPlanner(orchestrator).plan(max_emails=500)
+        print(plan["to_fetch"], plan["bytes"], plan["seconds"])
+    """
+
+    def __init__(self, orchestrator, sample_size: int = 200, history: int = 10):
+        """
+        Initialize the planner
+
+        Args:
+            orchestrator: EmailUnsubscribeOrchestrator whose mailbox and
+                          triage rules are planned for
+            sample_size: Messages whose headers and sizes are fetched
+            history: Recent scan runs whose timings are averaged
+        """
+        self.orchestrator = orchestrator
+        self.config = orchestrator.config
+        self.db = orchestrator.db
+        self.sample_size = max(1, sample_size)
+        self.history = history
+        self.logger = logging.getLogger(__name__)
+
+    def plan(self, max_emails: int = None, account_id: int = None,
+             folder: str = None) -> Dict:
+        """
+        Estimate a scan of a mailbox
+
+        Args:
+            max_emails: Maximum number of emails the scan would take
+                        (default MAX_EMAILS_PER_SCAN)
+            account_id: Registered account to plan for instead of the
+                        configured EMAIL mailbox
+            folder: Mailbox to plan for (default INBOX)
+
+        Returns:
+            Dict with "folder", "status" (the STATUS counts), "matching"
+            (messages the scan's search finds), "candidates" (those the scan
+            would take), "sampled", "skipped" (estimated counts by reason),
+            "to_fetch", "already_stored" (of to_fetch), "bytes", "workers"
+            and "stage_seconds" by stage, "bottleneck", "seconds" and
+            "timing_basis" ("history", "sample" or None)
+
+        Raises:
+            ConnectionError: If the mail server cannot be reached
+            ValueError: If account_id is unknown
+        """
+        orchestrator = self.orchestrator
+        account = None
+        if account_id is not None:
+            account = self.db.get_account(account_id)
+            if account is None:
+                raise ValueError(f"Unknown account {account_id}")
+        folder = folder or "INBOX"
+        manager = orchestrator._mailbox_manager(account, folder)
+        if not manager.connect():
+            raise ConnectionError(f"Failed to connect to email server {manager.imap_server}")
+        try:
+            status = manager.mailbox_status()
+            matching = manager.search_emails(criteria=SCAN_CRITERIA)
+            max_emails = max_emails or self.config.max_emails_per_scan
+            candidates = matching[-max_emails:] if max_emails else matching
+            sample = random.sample(candidates, min(self.sample_size, len(candidates)))
+            sample.sort(key=int)
+            sizes: Dict[bytes, int] = {}
+            started = time.perf_counter()
+            headers = manager.fetch_headers(sample, sizes=sizes) if sample else {}
+            sample_seconds = time.perf_counter() - started
+        finally:
+            manager.disconnect()
+
+        whitelist, blacklist, unsubscribed_senders, grace = orchestrator._triage_lists(account_id)
+        skipped = {"whitelisted": 0, "unsubscribed": 0}
+        kept: List[bytes] = []
+        message_ids = []
+        for email_id in sample:
+            msg = headers.get(email_id)
+            if msg is None:
+                kept.append(email_id)
+                continue
+            email_data = orchestrator.email_manager.extract_email_data(msg)
+            reason = orchestrator._triage(email_data, whitelist, blacklist,
+                                          unsubscribed_senders, grace)
+            if reason is not None:
+                skipped[reason] += 1
+                continue
+            kept.append(email_id)
+            message_ids.append(email_data.get("message_id"))
+        stored = len(self.db.get_stored_message_ids(message_ids))
+
+        scale = len(candidates) / len(sample) if sample else 0.0
+        skipped = {reason: round(count * scale) for reason, count in skipped.items()}
+        to_fetch = max(0, len(candidates) - sum(skipped.values()))
+        kept_sizes = [sizes[email_id] for email_id in kept if email_id in sizes]
+        average_size = sum(kept_sizes) / len(kept_sizes) if kept_sizes else 0
+
+        workers = {
+            "fetch": max(1, self.config.scan_fetch_workers),
+            "parse": max(1, self.config.scan_parse_workers),
+            "write": 1,
+        }
+        per_item = self._per_item_seconds()
+        timing_basis = "history" if per_item else None
+        if sample and "fetch" not in per_item:
+            # One header round trip per message is the cheapest a fetch can be
+            per_item["fetch"] = sample_seconds / len(sample)
+            timing_basis = timing_basis or "sample"
+        if "headers" not in per_item and sample:
+            per_item["headers"] = sample_seconds / len(sample)
+        stage_seconds = {}
+        if "headers" in per_item:
+            stage_seconds["headers"] = round(per_item["headers"] * len(candidates), 1)
+        for stage in _STAGES:
+            if stage in per_item:
+                stage_seconds[stage] = round(per_item[stage] * to_fetch / workers[stage], 1)
+        pipelined = {stage: stage_seconds[stage] for stage in _STAGES if stage in stage_seconds}
+        bottleneck = max(pipelined, key=pipelined.get) if pipelined else None
+
+        return {
+            "folder": folder,
+            "status": status,
+            "matching": len(matching),
+            "candidates": len(candidates),
+            "sampled": len(sample),
+            "skipped": skipped,
+            "to_fetch": to_fetch,
+            "already_stored": min(to_fetch, round(stored * scale)),
+            "bytes": round(average_size * to_fetch),
+            "workers": workers,
+            "stage_seconds": stage_seconds,
+            "bottleneck": bottleneck,
+            "seconds": round(stage_seconds.get("headers", 0.0)
+                             + (pipelined[bottleneck] if bottleneck else 0.0), 1),
+            "timing_basis": timing_basis,
+        }
+
+    def _per_item_seconds(self) -> Dict[str, float]:
+        """Average seconds one worker spends per message in each stage, over recent scans"""
+        busy: Dict[str, float] = {}
+        items: Dict[str, int] = {}
+        for timings in self.db.get_scan_timings(self.history):
+            for stage, stats in timings.items():
+                busy[stage] = busy.get(stage, 0.0) + stats.get("busy_seconds", 0.0)
+                items[stage] = items.get(stage, 0) + stats.get("items", 0)
+        return {stage: busy[stage] / items[stage] for stage in busy if items[stage]}
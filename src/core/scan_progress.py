@@ -0,0 +1,89 @@
+"""Checkpoint tracking for resumable scans"""
+from collections import deque
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+
+class ScanProgress:
+    """Tracks which UIDs of a scan run are done
+
+    The pipeline finishes messages out of order, so progress is kept as a
+    checkpoint (every UID up to it is done) plus the UIDs done above it.
+    The latter are saved as [first, last] ranges of the run's UIDs: in UID
+    order they never hold more than the messages in flight, and budgeted
+    scans, which take the newest messages first, leave one range that
+    grows at its lower end until the oldest are done.
+    """
+
+    def __init__(self, uids: Iterable[int], checkpoint_uid: Optional[int] = None,
+                 done_uids: Iterable[Union[int, Sequence[int]]] = (), processed: int = 0):
+        """
+        Initialize progress
+
+        Args:
+            uids: UIDs of the run above checkpoint_uid, done or not
+            checkpoint_uid: Saved checkpoint of a resumed run
+            done_uids: Saved ranges done above the checkpoint (single UIDs,
+                       as older runs saved them, are accepted too)
+            processed: Saved count of done UIDs
+        """
+        self.checkpoint_uid = checkpoint_uid
+        self.processed = processed
+        self._pending = deque(sorted(uids))
+        # Saved UIDs no longer in the mailbox are dropped
+        ranges = sorted(tuple(item) if isinstance(item, (list, tuple)) else (item, item)
+                        for item in done_uids)
+        self._done = set()
+        index = 0
+        for uid in self._pending:
+            while index < len(ranges) and ranges[index][1] < uid:
+                index += 1
+            if index < len(ranges) and ranges[index][0] <= uid:
+                self._done.add(uid)
+        self._advance()
+
+    def remaining(self) -> List[int]:
+        """UIDs not done yet, in ascending order"""
+        return [uid for uid in self._pending if uid not in self._done]
+
+    @property
+    def complete(self) -> bool:
+        """Whether every UID is done"""
+        return not self._pending
+
+    def mark_done(self, uid: int):
+        """Record a UID as done"""
+        if uid in self._done:
+            return
+        self._done.add(uid)
+        self.processed += 1
+        self._advance()
+
+    def _advance(self):
+        while self._pending and self._pending[0] in self._done:
+            self.checkpoint_uid = self._pending.popleft()
+            self._done.discard(self.checkpoint_uid)
+
+    def done_ranges(self) -> List[List[int]]:
+        """[first, last] runs of consecutive pending UIDs that are done"""
+        ranges = []
+        if not self._done:
+            return ranges
+        previous_done = False
+        for uid in self._pending:
+            if uid in self._done:
+                if previous_done:
+                    ranges[-1][1] = uid
+                else:
+                    ranges.append([uid, uid])
+                previous_done = True
+            else:
+                previous_done = False
+        return ranges
+
+    def state(self) -> Tuple[Optional[int], List[List[int]], int]:
+        """(checkpoint_uid, done ranges, processed) for BatchWriter.set_scan_checkpoint
+
+        Walks the pending UIDs, so it is read when a batch is flushed
+        (see BatchWriter.set_scan_progress) rather than per message.
+        """
+        return self.checkpoint_uid, self.done_ranges(), self.processed
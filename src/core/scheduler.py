@@ -0,0 +1,242 @@
+"""Concurrent scanning of many accounts and folders
+
+ScanScheduler scans every folder of every enabled account (see
+Database.add_account) with a fixed budget of worker threads, so the wall
+time of a round depends on the budget and the amount of mail, not on the
+number of accounts.
+
+Work is handed out in slices of slice_size messages. Accounts take turns:
+a worker takes the next slice of the first account in the rotation that
+has one waiting, and that account moves to the back. A large mailbox
+therefore cannot hold up the others. Each slice uses one IMAP connection,
+and an account whose server already has max_connections_per_server slices
+in flight is passed over until one finishes.
+
+A slice is a scan run, or the continuation of one, so every mailbox keeps
+its own checkpoint. A round that is stopped or crashes carries on where
+each mailbox left off the next time it runs.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+from src.utils.metrics import REGISTRY
+
+
+class _Mailbox:
+    """One folder of one account and its progress in the current round"""
+
+    def __init__(self, account: Dict, folder: str, run_id: Optional[int]):
+        self.account = account
+        self.folder = folder
+        self.run_id = run_id
+        self.server = account["imap_server"].lower()
+        self.scanned = 0
+        self.errors = 0
+        self.slices = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "account": self.account["name"],
+            "folder": self.folder,
+            "run_id": self.run_id,
+            "scanned": self.scanned,
+            "errors": self.errors,
+            "slices": self.slices,
+            "error": self.error,
+        }
+
+
+class ScanScheduler:
+    """Scans registered accounts concurrently within a worker budget
+
+    Usage:
+        scheduler = ScanScheduler(orchestrator, max_workers=8)
+        summary = scheduler.run()
+    """
+
+    def __init__(self, orchestrator, max_workers: int = None,
+                 max_connections_per_server: int = None, slice_size: int = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            orchestrator: EmailUnsubscribeOrchestrator whose iter_scan runs the slices
+            max_workers: Slices scanned at once (default SCAN_MAX_WORKERS)
+            max_connections_per_server: Slices in flight per IMAP server
+                                        (default SCAN_MAX_CONNECTIONS_PER_SERVER)
+            slice_size: Messages scanned before the account's turn ends
+                        (default SCAN_SLICE_SIZE)
+        """
+        config = orchestrator.config
+        self.orchestrator = orchestrator
+        self.db = orchestrator.db
+        self.max_workers = max(1, max_workers or config.scan_max_workers)
+        self.max_connections_per_server = max(
+            1, max_connections_per_server or config.scan_max_connections_per_server
+        )
+        self.slice_size = max(1, slice_size or config.scan_slice_size)
+        self.logger = logging.getLogger(__name__)
+        self._condition = threading.Condition()
+        self._rotation: deque = deque()
+        self._waiting: Dict[int, deque] = {}
+        self._unfinished: Dict[int, int] = {}
+        self._connections: Dict[str, int] = {}
+        self._in_flight = 0
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """Stop handing out slices; slices in flight stop after their current message"""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def run(self, account_ids: List[int] = None,
+            progress_callback: Callable = None) -> Dict:
+        """
+        Scan every folder of the enabled accounts until each is complete
+
+        Unfinished scan runs of a mailbox are resumed rather than started
+        over.
+
+        Args:
+            account_ids: Only scan these accounts (default: all enabled)
+            progress_callback: Called as progress_callback(account_name,
+                               folder, scan_result) for every email, from
+                               the worker threads
+
+        Returns:
+            Dict with "mailboxes" (per-mailbox run_id, scanned, errors,
+            slices and error), "scanned", "failed" (mailboxes that stopped
+            on an error), "workers", "seconds" and "metrics" (see
+            MetricsRegistry.summary)
+        """
+        metrics_before = REGISTRY.snapshot()
+        mailboxes = []
+        for account in self.db.get_accounts(enabled_only=True):
+            if account_ids is not None and account["id"] not in account_ids:
+                continue
+            waiting = deque(
+                _Mailbox(account, folder, self.db.get_open_scan_run(account["id"], folder))
+                for folder in account["folders"]
+            )
+            if not waiting:
+                continue
+            mailboxes.extend(waiting)
+            self._waiting[account["id"]] = waiting
+            self._unfinished[account["id"]] = len(waiting)
+            self._rotation.append(account["id"])
+
+        workers = min(self.max_workers, len(mailboxes))
+        self.logger.info(f"Scanning {len(mailboxes)} mailboxes of {len(self._rotation)} "
+                         f"accounts with {workers} workers")
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._work, args=(progress_callback,),
+                             name=f"scan-scheduler-{number}", daemon=True)
+            for number in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            "mailboxes": [mailbox.to_dict() for mailbox in mailboxes],
+            "scanned": sum(mailbox.scanned for mailbox in mailboxes),
+            "failed": sum(mailbox.error is not None for mailbox in mailboxes),
+            "workers": workers,
+            "seconds": round(time.perf_counter() - started, 3),
+            "metrics": REGISTRY.summary(since=metrics_before),
+        }
+
+    def _work(self, progress_callback: Optional[Callable]):
+        """Worker thread: scan slices until none are left"""
+        while True:
+            mailbox = self._next_mailbox()
+            if mailbox is None:
+                return
+            more = False
+            try:
+                more = self._scan_slice(mailbox, progress_callback)
+            except Exception as e:
+                mailbox.error = str(e)
+                self.logger.error(f"Scan of {mailbox.account['name']}/{mailbox.folder} "
+                                  f"failed: {str(e)}")
+            finally:
+                self._finish(mailbox, more)
+
+    def _next_mailbox(self) -> Optional[_Mailbox]:
+        """Take the next account's turn, waiting while every server is at its cap"""
+        with self._condition:
+            while not self._stopped.is_set():
+                for account_id in self._rotation:
+                    waiting = self._waiting[account_id]
+                    if not waiting:
+                        continue
+                    if self._connections.get(waiting[0].server, 0) >= self.max_connections_per_server:
+                        continue
+                    mailbox = waiting.popleft()
+                    self._rotation.remove(account_id)
+                    self._rotation.append(account_id)
+                    self._connections[mailbox.server] = self._connections.get(mailbox.server, 0) + 1
+                    self._in_flight += 1
+                    return mailbox
+                if self._in_flight == 0:
+                    return None
+                self._condition.wait()
+            return None
+
+    def _finish(self, mailbox: _Mailbox, more: bool):
+        """Release a slice's connection and put the mailbox back in line if it has more"""
+        account_id = mailbox.account["id"]
+        with self._condition:
+            self._connections[mailbox.server] -= 1
+            self._in_flight -= 1
+            if more and not self._stopped.is_set():
+                self._waiting[account_id].append(mailbox)
+                finished = False
+            else:
+                self._unfinished[account_id] -= 1
+                finished = self._unfinished[account_id] == 0 and not more
+            self._condition.notify_all()
+        if finished and mailbox.error is None:
+            self.db.touch_account(account_id)
+
+    def _scan_slice(self, mailbox: _Mailbox, progress_callback: Optional[Callable]) -> bool:
+        """
+        Scan up to slice_size messages of a mailbox
+
+        Returns:
+            Whether the mailbox has messages left
+        """
+        summary = {}
+        scanned = 0
+        scan = self.orchestrator.iter_scan(summary=summary, run_id=mailbox.run_id,
+                                           account_id=mailbox.account["id"],
+                                           folder=mailbox.folder, slice_size=self.slice_size,
+                                           fetch_workers=1)
+        with closing(scan):
+            for result in scan:
+                scanned += 1
+                mailbox.scanned += 1
+                mailbox.errors += result.status == "error"
+                if progress_callback:
+                    progress_callback(mailbox.account["name"], mailbox.folder, result)
+                if self._stopped.is_set():
+                    break
+        mailbox.slices += 1
+        mailbox.run_id = summary.get("run_id")
+
+        run = self.db.get_scan_run(mailbox.run_id) if mailbox.run_id is not None else None
+        if run is None or run["status"] == "completed":
+            return False
+        if scanned == 0:
+            # Nothing could be scanned; retrying now would spin
+            mailbox.error = f"Scan run {mailbox.run_id} made no progress"
+            return False
+        return True
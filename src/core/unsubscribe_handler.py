@@ -1,46 +1,198 @@
 """Unsubscribe link handler"""
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from typing import Dict, Optional
+import socket
+from typing import Dict, Iterable, Optional
+import ssl
 import time
 
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from src.core.dns_cache import DNSCache, create_session_reusing_context, get_process_dns_cache
+from src.core.redirect_cache import RedirectCache
+from src.utils.metrics import REGISTRY
+
+
+_CLICK_SECONDS = REGISTRY.histogram("http_click_seconds",
+                                    "HTTP requests of unsubscribe links, redirects included")
+_CLICKS = REGISTRY.counter("http_clicks_total", "Unsubscribe links clicked")
+_CLICK_FAILURES = REGISTRY.counter("http_click_failures_total",
+                                   "Unsubscribe link clicks that failed after retries")
+
+
+class _CachedDNSConnectionMixin:
+    """urllib3 connection that resolves its host through a DNSCache"""
+    
+    dns_cache: DNSCache = None
+    
+    def _new_conn(self):
+        """Open the socket through the cache, raising what urllib3 would"""
+        try:
+            return self.dns_cache.create_connection(
+                (self._dns_host, self.port),
+                self.timeout,
+                source_address=self.source_address,
+                socket_options=self.socket_options
+            )
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+def _cached_dns_pool(pool_class: type, dns_cache: DNSCache) -> type:
+    """Subclass a connection pool so its connections resolve through dns_cache"""
+    connection_class = type(
+        f"CachedDNS{pool_class.ConnectionCls.__name__}",
+        (_CachedDNSConnectionMixin, pool_class.ConnectionCls),
+        {"dns_cache": dns_cache}
+    )
+    return type(f"CachedDNS{pool_class.__name__}", (pool_class,),
+                {"ConnectionCls": connection_class})
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """HTTP adapter that shares one SSL context across connection pools
+    
+    With a DNS cache, the adapter's connections resolve hosts through it;
+    nothing else in the process does.
+    """
+    
+    def __init__(self, ssl_context: ssl.SSLContext = None, dns_cache: DNSCache = None,
+                 **kwargs):
+        """Initialize adapter"""
+        self._ssl_context = ssl_context
+        self._dns_cache = dns_cache
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager with the shared SSL context and DNS cache"""
+        if self._ssl_context is not None:
+            kwargs.setdefault("ssl_context", self._ssl_context)
+        super().init_poolmanager(*args, **kwargs)
+        if self._dns_cache is not None:
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _cached_dns_pool(HTTPConnectionPool, self._dns_cache),
+                "https": _cached_dns_pool(HTTPSConnectionPool, self._dns_cache),
+            }
+
 
 class UnsubscribeHandler:
     """Handles clicking unsubscribe links and tracking results"""
     
-    def __init__(self, timeout: int = 10, retry_count: int = 2):
-        """Initialize unsubscribe handler"""
+    def __init__(self, timeout: int = 10, retry_count: int = 2,
+                 dns_cache: DNSCache = None, pool_connections: int = 10,
+                 pool_maxsize: int = 10, reuse_tls_sessions: bool = False,
+                 redirect_cache: RedirectCache = None):
+        """Initialize unsubscribe handler
+        
+        Args:
+            timeout: Request timeout in seconds
+            retry_count: Attempts per link
+            dns_cache: Optional DNS cache for the session's connections
+            pool_connections: Number of per-host connection pools to keep
+            pool_maxsize: Maximum keep-alive connections per host
+            reuse_tls_sessions: Resume TLS sessions for hosts seen before
+            redirect_cache: Optional cache of tracker redirects to skip
+        """
         self.timeout = timeout
         self.retry_count = retry_count
         self.logger = logging.getLogger(__name__)
+        self.dns_cache = dns_cache
+        self.redirect_cache = redirect_cache
+        self.ssl_context = create_session_reusing_context() if reuse_tls_sessions else None
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        adapter = TunedHTTPAdapter(
+            ssl_context=self.ssl_context,
+            dns_cache=dns_cache,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
-    def click_link(self, link: str) -> Dict:
+    def prefetch_hosts(self, hosts: Iterable[str]) -> Dict[str, bool]:
+        """Resolve hosts in parallel ahead of clicking (needs a DNS cache)"""
+        if self.dns_cache is None:
+            return {}
+        return self.dns_cache.prefetch(hosts)
+    
+    def click_link(self, link: str, timeout: float = None) -> Dict:
         """
         Attempt to click an unsubscribe link
         
+        If the redirect cache knows the link's tracker, the tracker's
+        redirect hops are skipped; the full link is clicked if that fails.
+        
+        Args:
+            link: URL to request
+            timeout: Optional per-request timeout overriding self.timeout
+        
         Returns:
             Dict with status information including:
             - success: bool
             - status_code: int or None
             - error_message: str or None
+            - redirect_chain: list of URLs requested, ending with final_url
+            - shortcut: whether tracker hops were skipped
+            - latency_saved: expected seconds saved by the shortcut
         """
+        result = self._click(link, timeout)
+        _CLICKS.inc()
+        if not result["success"]:
+            _CLICK_FAILURES.inc()
+        return result
+    
+    def _click(self, link: str, timeout: float = None) -> Dict:
+        """Click a link, through its tracker shortcut if there is one"""
+        shortcut = self.redirect_cache.shortcut(link) if self.redirect_cache else None
+        if shortcut:
+            result = self._request(shortcut["url"], timeout)
+            if result["success"]:
+                result["shortcut"] = True
+                result["latency_saved"] = shortcut["expected_saved"]
+                self.logger.debug(f"Skipped tracker {shortcut['prefix']} for link: {link}")
+                return result
+            self.logger.info(f"Tracker shortcut failed, clicking full link: {link}")
+        
+        result = self._request(link, timeout)
+        if self.redirect_cache and result["success"]:
+            result["learned_redirect"] = self.redirect_cache.learn(
+                link, result["redirect_chain"], result["hop_latencies"]
+            )
+        return result
+    
+    def _request(self, link: str, timeout: float = None) -> Dict:
+        """Request a link with retries, recording its redirect chain"""
         result = {
             "success": False,
             "status_code": None,
             "error_message": None,
-            "response_time": None
+            "response_time": None,
+            "redirect_chain": [link],
+            "final_url": None,
+            "hop_latencies": [],
+            "shortcut": False,
+            "latency_saved": 0.0
         }
         
         for attempt in range(self.retry_count):
             try:
                 start_time = time.time()
-                response = self.session.get(link, timeout=self.timeout, allow_redirects=True)
+                with _CLICK_SECONDS.time():
+                    response = self.session.get(link, timeout=timeout or self.timeout,
+                                                allow_redirects=True)
                 result["response_time"] = time.time() - start_time
                 result["status_code"] = response.status_code
+                self._record_redirects(result, link, response)
                 
                 if 200 <= response.status_code < 400:
                     result["success"] = True
@@ -68,6 +220,14 @@ class UnsubscribeHandler:
         
         return result
     
+    def _record_redirects(self, result: Dict, link: str, response):
+        """Store the redirect chain and per-hop latencies of a response"""
+        history = response.history if isinstance(response.history, list) else []
+        final_url = response.url if isinstance(response.url, str) else link
+        result["redirect_chain"] = [hop.url for hop in history] + [final_url]
+        result["final_url"] = final_url
+        result["hop_latencies"] = [hop.elapsed.total_seconds() for hop in history]
+    
     def validate_link(self, link: str) -> bool:
         """Validate if a link is properly formatted and safe"""
         try:
@@ -123,3 +283,25 @@ class UnsubscribeHandler:
                 time.sleep(delay)
         
         return results
+
+
+def create_unsubscribe_handler(config, redirect_cache: RedirectCache = None) -> UnsubscribeHandler:
+    """Create a handler tuned for batch clicking from configuration
+    
+    Uses the DNS cache shared by click sessions (unless DNS_CACHE_TTL is
+    0), TLS session reuse, the configured connection pool sizes and, if
+    given, the redirect cache.
+    """
+    dns_cache = None
+    if config.dns_cache_ttl > 0:
+        dns_cache = get_process_dns_cache(config.dns_cache_ttl)
+    
+    return UnsubscribeHandler(
+        timeout=config.request_timeout,
+        retry_count=2,
+        dns_cache=dns_cache,
+        pool_connections=config.click_pool_connections,
+        pool_maxsize=config.click_pool_maxsize,
+        reuse_tls_sessions=True,
+        redirect_cache=redirect_cache
+    )
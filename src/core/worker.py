@@ -0,0 +1,157 @@
+"""Click workers that drain the persistent job queue"""
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.core.host_policy import HostPolicy
+from src.core.redirect_cache import RedirectCache
+from src.core.unsubscribe_handler import create_unsubscribe_handler
+from src.database.job_queue import JobQueue
+from src.database.models import Database
+from src.utils.config import Config
+
+
+class ClickWorker:
+    """Leases click jobs in batches and clicks their unsubscribe links"""
+
+    def __init__(self, config: Config, db: Database = None, worker_id: str = None,
+                 batch_size: int = None):
+        """Initialize click worker"""
+        self.config = config
+        self.db = db or Database(config.database_path, profile=config.db_profile)
+        self.queue = JobQueue(
+            self.db,
+            lease_seconds=config.worker_lease_seconds
+        )
+        self.redirect_cache = RedirectCache(
+            self.db,
+            min_observations=config.redirect_shortcut_min_observations
+        )
+        self.unsubscribe_handler = create_unsubscribe_handler(config, self.redirect_cache)
+        self.host_policy = HostPolicy(self.db, base_timeout=config.request_timeout)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size or config.worker_batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def run_once(self) -> int:
+        """
+        Lease and process a single batch of jobs
+
+        Returns:
+            Number of jobs processed
+        """
+        jobs = self.queue.lease(self.worker_id, self.batch_size)
+        if jobs:
+            self.host_policy.load()
+            self.redirect_cache.load()
+            # Resolve this batch's hosts and the ones queued behind it in
+            # parallel, so clicks don't wait on DNS one host at a time
+            self.unsubscribe_handler.prefetch_hosts(
+                [job["domain"] for job in jobs] + self.queue.get_pending_domains()
+            )
+
+        for idx, job in enumerate(jobs):
+            try:
+                result = self.unsubscribe_handler.click_link(
+                    job["link"],
+                    timeout=self.host_policy.timeout_for(job["domain"])
+                )
+                self.queue.complete(job, result)
+            except Exception as e:
+                self.logger.error(f"Error processing job {job['id']}: {str(e)}")
+                self.queue.release(job, str(e))
+
+            # Delay between requests to be respectful
+            if self.config.link_click_delay > 0 and idx < len(jobs) - 1:
+                time.sleep(self.config.link_click_delay)
+
+        return len(jobs)
+
+    def run(self, stop_when_empty: bool = False, poll_interval: float = 2.0,
+            stop_event: Optional[threading.Event] = None) -> int:
+        """
+        Process jobs until stopped
+
+        Args:
+            stop_when_empty: Return once the queue has no more eligible jobs
+            poll_interval: Seconds to wait before polling an empty queue again
+            stop_event: Optional event that stops the loop when set
+
+        Returns:
+            Total number of jobs processed
+        """
+        total = 0
+        self.logger.info(f"Worker {self.worker_id} started")
+
+        while not (stop_event and stop_event.is_set()):
+            processed = self.run_once()
+            total += processed
+
+            if processed == 0:
+                if stop_when_empty:
+                    break
+                time.sleep(poll_interval)
+
+        self.logger.info(f"Worker {self.worker_id} stopped after {total} jobs")
+        return total
+
+
+def _worker_process(env_file: str, batch_size: int, stop_when_empty: bool):
+    """Entry point for a worker process
+
+    Each process opens its own database connection; nothing is shared with
+    the parent besides the environment.
+    """
+    from src.utils.logger import setup_logging
+
+    setup_logging("INFO")
+    config = Config(env_file)
+    worker = ClickWorker(config, batch_size=batch_size)
+    worker.run(stop_when_empty=stop_when_empty)
+
+
+def run_workers(config: Config, processes: int = None, batch_size: int = None,
+                stop_when_empty: bool = False) -> Dict:
+    """
+    Run click workers in separate processes and wait for them to exit
+
+    Args:
+        config: Application configuration
+        processes: Number of worker processes (defaults to config)
+        batch_size: Jobs leased per batch (defaults to config)
+        stop_when_empty: Let workers exit once the queue is drained
+
+    Returns:
+        Dictionary with the exit codes of the worker processes
+    """
+    logger = logging.getLogger(__name__)
+    processes = processes or config.worker_processes
+    batch_size = batch_size or config.worker_batch_size
+
+    workers: List[multiprocessing.Process] = []
+    for idx in range(processes):
+        process = multiprocessing.Process(
+            target=_worker_process,
+            args=(config.env_file, batch_size, stop_when_empty),
+            name=f"click-worker-{idx + 1}"
+        )
+        process.start()
+        workers.append(process)
+
+    logger.info(f"Started {processes} click worker processes")
+
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping click workers")
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+    return {"exit_codes": [process.exitcode for process in workers]}
@@ -0,0 +1,336 @@
+"""Buffered, transactional writes for scans and click batches"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.database.models import (
+    Database,
+    INSERT_OPERATION_SQL,
+    RECORD_DOMAIN_OUTCOME_SQL,
+    UPDATE_LINK_REDIRECTS_SQL,
+    UPDATE_LINK_STATUS_SQL,
+    UPDATE_SCAN_CHECKPOINT_SQL,
+    UPDATE_SUBSCRIPTION_STATUS_SQL,
+    UPSERT_REDIRECT_PREFIX_SQL,
+    domain_outcome_params,
+    redirect_params,
+    redirect_prefix_params,
+)
+from src.utils.metrics import REGISTRY
+from src.utils.url_canonicalizer import canonicalize_url
+
+
+UPSERT_SCANNED_EMAIL_SQL = """
+    INSERT INTO emails (message_id, sender, subject, received_date, category,
+                        has_unsubscribe_link, processed, account_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (message_id) DO UPDATE SET
+        has_unsubscribe_link = excluded.has_unsubscribe_link,
+        processed = excluded.processed,
+        category = CASE WHEN ? THEN excluded.category ELSE category END
+"""
+
+INSERT_SUBSCRIPTION_BY_MESSAGE_SQL = """
+    INSERT INTO subscriptions (account_id, canonical_url, sender)
+    SELECT account_id, ?, LOWER(sender) FROM emails WHERE message_id = ?
+    ON CONFLICT (canonical_url, sender, COALESCE(account_id, 0)) DO NOTHING
+"""
+
+INSERT_LINK_BY_MESSAGE_SQL = """
+    INSERT INTO unsubscribe_links (email_id, link, canonical_url, subscription_id)
+    SELECT e.id, ?, ?, s.id
+    FROM emails e
+    JOIN subscriptions s ON s.sender = LOWER(e.sender) AND s.canonical_url = ?
+                        AND s.account_id IS e.account_id
+    WHERE e.message_id = ?
+    ON CONFLICT (email_id, link) DO NOTHING
+"""
+
+INSERT_OPERATION_BY_MESSAGE_SQL = """
+    INSERT INTO operation_history (operation_type, email_id, status, details)
+    VALUES (?, COALESCE(?, (SELECT id FROM emails WHERE message_id = ?)), ?, ?)
+"""
+
+_FLUSH_SECONDS = REGISTRY.histogram("db_write_seconds", "Batch writer flushes (one transaction)")
+_ROWS_WRITTEN = REGISTRY.counter("db_rows_written_total", "Rows flushed by batch writers")
+
+
+class BatchWriter:
+    """Unit of work that buffers writes and flushes them in one transaction
+
+    Mirrors the write methods of Database, but instead of committing every
+    row it queues them and writes each kind with executemany once
+    max_records writes are pending or the oldest pending write is
+    max_delay_ms old (checked whenever a write is added). Emails are keyed
+    by message ID, so links and log entries can be queued before the email
+    row has an ID. New emails belong to the writer's account_id, and their
+    links to that account's subscriptions.
+
+    While the writer is open its connection runs with synchronous=NORMAL
+    (OFF stays OFF under the bulk-import profile): flushed transactions are
+    consistent but only guaranteed to survive a power loss after
+    checkpoint(), which also runs on close(). If the
+    database has a single writer thread, each flush is queued to it as one
+    write instead and checkpoints go through the writer thread.
+    """
+
+    def __init__(self, db: Database, max_records: int = 500, max_delay_ms: int = 1000,
+                 account_id: int = None):
+        """Initialize batch writer"""
+        self.db = db
+        self.max_records = max_records
+        self.max_delay_ms = max_delay_ms
+        self.account_id = account_id
+        self.logger = logging.getLogger(__name__)
+
+        self._emails: List[tuple] = []
+        self._links: List[tuple] = []
+        self._link_statuses: List[tuple] = []
+        self._redirects: List[tuple] = []
+        self._redirect_prefixes: List[tuple] = []
+        self._domain_outcomes: List[tuple] = []
+        self._operations: List[tuple] = []
+        self._scan_checkpoints: Dict[int, tuple] = {}
+        self._scan_progress: Dict[int, object] = {}
+        self._pending = 0
+        self._oldest_pending_at: Optional[float] = None
+        self._unsynced = False
+        self.flushes = 0
+
+        self._previous_synchronous = None
+        self._batch_synchronous = 1
+        if self.db.writer is None:
+            conn = self.db.connect()
+            self._previous_synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            self._batch_synchronous = min(int(self._previous_synchronous), 1)
+            conn.execute(f"PRAGMA synchronous={self._batch_synchronous}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered writes"""
+        return self._pending
+
+    def add_email(self, message_id: str, sender: str, subject: str,
+                  received_date: datetime, category: str = "uncategorized",
+                  has_unsubscribe_link: bool = False, processed: bool = True,
+                  update_category: bool = False):
+        """Queue an email record, marking it processed if it already exists
+
+        An existing email keeps its account, and its category unless
+        update_category is set (as when stored messages are reprocessed with
+        new rules).
+        """
+        self._emails.append((message_id, sender, subject, received_date, category,
+                             has_unsubscribe_link, processed, self.account_id,
+                             update_category))
+        self._added()
+
+    def add_unsubscribe_link(self, message_id: str, link: str):
+        """Queue an unsubscribe link for the email with the given message ID"""
+        self._links.append((link, canonicalize_url(link), message_id))
+        self._added()
+
+    def update_link_status(self, link_id: int, clicked: bool, status_code: int = None,
+                           error_message: str = None):
+        """Queue a link status update (fanned out like Database.update_link_status)"""
+        self._link_statuses.append((link_id, clicked, status_code, error_message, datetime.now()))
+        self._added()
+
+    def record_redirects(self, link_id: int, result: Dict):
+        """Queue the redirect chain of a click and what was learned from it"""
+        params = redirect_params(link_id, result)
+        if params is None:
+            return
+        self._redirects.append(params)
+        learned = result.get("learned_redirect")
+        if learned:
+            self._redirect_prefixes.append(redirect_prefix_params(learned, datetime.now()))
+        self._added()
+
+    def record_domain_outcome(self, domain: str, success: bool, response_time: float = None,
+                              status_code: int = None, error_message: str = None):
+        """Queue a click result for the per-domain outcome statistics"""
+        if not domain:
+            return
+        self._domain_outcomes.append(domain_outcome_params(
+            domain, success, response_time, status_code, error_message, datetime.now()
+        ))
+        self._added()
+
+    def log_operation(self, operation_type: str, email_id: int = None,
+                      status: str = "success", details: str = None,
+                      message_id: str = None):
+        """Queue an operation log entry, by email ID or by message ID"""
+        self._operations.append((operation_type, email_id, message_id, status, details))
+        self._added()
+
+    def set_scan_checkpoint(self, run_id: int, checkpoint_uid: Optional[int],
+                            done_uids: List[List[int]], processed: int):
+        """Queue a scan run's progress, committed with the rows written so far
+
+        done_uids are the [first, last] ranges of ScanProgress.state().
+
+        Only the latest checkpoint of each run is kept, so a resumed scan
+        never sees progress whose rows were not committed with it.
+        """
+        self._scan_checkpoints[run_id] = (checkpoint_uid, json.dumps(done_uids), processed, run_id)
+        self._added()
+
+    def set_scan_progress(self, run_id: int, progress):
+        """Queue a scan run's ScanProgress, whose state is read when the batch flushes
+
+        Like set_scan_checkpoint, but the checkpoint is built once per flush
+        instead of once per message.
+        """
+        self._scan_progress[run_id] = progress
+        self._added()
+
+    def _added(self):
+        """Count a queued write and flush if a threshold is reached"""
+        if self._pending == 0:
+            self._oldest_pending_at = time.monotonic()
+        self._pending += 1
+
+        age_ms = (time.monotonic() - self._oldest_pending_at) * 1000
+        if self._pending >= self.max_records or age_ms >= self.max_delay_ms:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered records in one transaction
+
+        Statements run in dependency order (emails, then their links, then
+        updates and log entries). On error the transaction is rolled back,
+        the buffer is discarded and the error is raised.
+        """
+        if not self._pending:
+            return
+
+        started = time.perf_counter()
+        rows = self._pending
+        for run_id, progress in self._scan_progress.items():
+            checkpoint_uid, done_uids, processed = progress.state()
+            self._scan_checkpoints[run_id] = (checkpoint_uid, json.dumps(done_uids),
+                                              processed, run_id)
+        try:
+            if self.db.writer is not None:
+                self.db.writer.submit(self._write_buffers).result()
+            else:
+                conn = self.db.connect()
+                try:
+                    self._write_buffers()
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except Exception:
+            self.logger.error(f"Batch write of {self._pending} records failed")
+            raise
+        finally:
+            self._clear()
+
+        self._unsynced = True
+        self.flushes += 1
+        _FLUSH_SECONDS.observe(time.perf_counter() - started)
+        _ROWS_WRITTEN.inc(rows)
+
+    def _write_buffers(self):
+        """Execute the buffered writes without committing"""
+        cursor = self.db.connect().cursor()
+        if self._emails:
+            cursor.executemany(UPSERT_SCANNED_EMAIL_SQL, self._emails)
+        if self._links:
+            cursor.executemany(INSERT_SUBSCRIPTION_BY_MESSAGE_SQL,
+                               [(canonical, message_id)
+                                for _, canonical, message_id in self._links])
+            cursor.executemany(INSERT_LINK_BY_MESSAGE_SQL,
+                               [(link, canonical, canonical, message_id)
+                                for link, canonical, message_id in self._links])
+        if self._link_statuses:
+            cursor.executemany(UPDATE_SUBSCRIPTION_STATUS_SQL, [
+                (clicked, now, status_code, error, link_id)
+                for link_id, clicked, status_code, error, now in self._link_statuses
+            ])
+            cursor.executemany(UPDATE_LINK_STATUS_SQL, [
+                (clicked, now, status_code, error, link_id, link_id)
+                for link_id, clicked, status_code, error, now in self._link_statuses
+            ])
+        if self._redirects:
+            cursor.executemany(UPDATE_LINK_REDIRECTS_SQL, self._redirects)
+        if self._redirect_prefixes:
+            cursor.executemany(UPSERT_REDIRECT_PREFIX_SQL, self._redirect_prefixes)
+        if self._domain_outcomes:
+            cursor.executemany(RECORD_DOMAIN_OUTCOME_SQL, self._domain_outcomes)
+        if self._operations:
+            cursor.executemany(INSERT_OPERATION_SQL, [
+                (operation_type, email_id, status, details)
+                for operation_type, email_id, message_id, status, details in self._operations
+                if message_id is None
+            ])
+            cursor.executemany(INSERT_OPERATION_BY_MESSAGE_SQL, [
+                (operation_type, email_id, message_id, status, details)
+                for operation_type, email_id, message_id, status, details in self._operations
+                if message_id is not None
+            ])
+        if self._scan_checkpoints:
+            cursor.executemany(UPDATE_SCAN_CHECKPOINT_SQL, list(self._scan_checkpoints.values()))
+
+    def checkpoint(self):
+        """
+        Flush and make everything written so far durable
+
+        The final commit runs with synchronous=FULL, which syncs the whole
+        write-ahead log and with it every earlier flush.
+        """
+        if not self._pending and not self._unsynced:
+            return
+
+        if self.db.writer is not None:
+            self.flush()
+            self.db.writer.checkpoint().result()
+            self._unsynced = False
+            return
+
+        conn = self.db.connect()
+        conn.execute("PRAGMA synchronous=FULL")
+        try:
+            if not self._pending:
+                # Nothing buffered: commit a small write so the log is synced
+                conn.execute("""
+                    INSERT OR REPLACE INTO settings (key, value, updated_at)
+                    VALUES ('last_checkpoint', ?, CURRENT_TIMESTAMP)
+                """, (datetime.now().isoformat(),))
+                conn.commit()
+            else:
+                self.flush()
+            self._unsynced = False
+        finally:
+            conn.execute(f"PRAGMA synchronous={self._batch_synchronous}")
+
+    def close(self):
+        """Checkpoint and restore the connection's synchronous setting"""
+        try:
+            self.checkpoint()
+        finally:
+            if self._previous_synchronous is not None:
+                self.db.connect().execute(
+                    f"PRAGMA synchronous={int(self._previous_synchronous)}"
+                )
+
+    def _clear(self):
+        """Drop all buffered records"""
+        for buffer in (self._emails, self._links, self._link_statuses, self._redirects,
+                       self._redirect_prefixes, self._domain_outcomes, self._operations,
+                       self._scan_checkpoints, self._scan_progress):
+            buffer.clear()
+        self._pending = 0
+        self._oldest_pending_at = None
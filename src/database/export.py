@@ -0,0 +1,301 @@
+"""Streaming export of links, emails and operation history
+
+Rows are read from a single cursor in chunks of chunk_size and written as
+they arrive, so memory use does not grow with the table. Files are written
+under a temporary name and renamed when complete, so a consumer never sees
+a partial export.
+
+Exports are ordered by id. Passing the returned watermark (the highest id
+written) as after_id to the next export gives incremental exports of the
+rows added since.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from src.database.models import Database
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_COMPRESSIONS = ("gzip", "zstd")
+
+
+class Dataset(NamedTuple):
+    """An exportable listing
+
+    columns pairs each exported column with its Parquet type. time_column
+    is what date_from/date_to filter on; status and category are SQL
+    expressions for those filters (None if the dataset has no such field).
+    """
+    query: str
+    columns: List[tuple]
+    id_column: str
+    time_column: str
+    status: Optional[str]
+    category: Optional[str]
+
+
+_LINK_STATUS = """CASE WHEN ul.clicked = 0 THEN 'pending'
+                       WHEN ul.status_code BETWEEN 200 AND 399 THEN 'success'
+                       ELSE 'failed' END"""
+
+DATASETS: Dict[str, Dataset] = {
+    "links": Dataset(
+        query=f"""
+            SELECT ul.id, ul.link, ul.canonical_url, ul.clicked, ul.click_timestamp,
+                   ul.status_code, ul.error_message, {_LINK_STATUS} AS status,
+                   ul.created_at, e.id AS email_id, e.sender, e.subject, e.category,
+                   e.received_date
+            FROM unsubscribe_links ul
+            JOIN emails e ON e.id = ul.email_id
+        """,
+        columns=[("id", "int64"), ("link", "string"), ("canonical_url", "string"),
+                 ("clicked", "bool"), ("click_timestamp", "string"), ("status_code", "int64"),
+                 ("error_message", "string"), ("status", "string"), ("created_at", "string"),
+                 ("email_id", "int64"), ("sender", "string"), ("subject", "string"),
+                 ("category", "string"), ("received_date", "string")],
+        id_column="ul.id",
+        time_column="ul.created_at",
+        status=_LINK_STATUS,
+        category="e.category",
+    ),
+    "emails": Dataset(
+        query="""
+            SELECT e.id, e.message_id, e.sender, e.subject, e.received_date, e.category,
+                   e.has_unsubscribe_link, e.processed, e.created_at
+            FROM emails e
+        """,
+        columns=[("id", "int64"), ("message_id", "string"), ("sender", "string"),
+                 ("subject", "string"), ("received_date", "string"), ("category", "string"),
+                 ("has_unsubscribe_link", "bool"), ("processed", "bool"),
+                 ("created_at", "string")],
+        id_column="e.id",
+        time_column="e.received_date",
+        status="CASE WHEN e.processed THEN 'processed' ELSE 'unprocessed' END",
+        category="e.category",
+    ),
+    "operations": Dataset(
+        query="""
+            SELECT id, operation_type, email_id, status, details, timestamp
+            FROM operation_history
+        """,
+        columns=[("id", "int64"), ("operation_type", "string"), ("email_id", "int64"),
+                 ("status", "string"), ("details", "string"), ("timestamp", "string")],
+        id_column="id",
+        time_column="timestamp",
+        status="status",
+        category=None,
+    ),
+}
+
+
+def _open_output(path: str, compression: Optional[str]):
+    """Open a binary output stream, compressed if asked"""
+    if compression == "gzip":
+        return gzip.open(path, "wb")
+    raw = open(path, "wb")
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    return raw
+
+
+def _text_value(value):
+    """Format a value for CSV and JSON"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _CsvWriter:
+    def __init__(self, stream, columns: List[str]):
+        self.text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(columns)
+
+    def write(self, rows: List[tuple]):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.text.close()
+
+
+class _JsonlWriter:
+    def __init__(self, stream, columns: List[str]):
+        self.text = io.TextIOWrapper(stream, encoding="utf-8")
+        self.columns = columns
+
+    def write(self, rows: List[tuple]):
+        self.text.writelines(
+            json.dumps(dict(zip(self.columns, map(_text_value, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+    def close(self):
+        self.text.close()
+
+
+class _ParquetWriter:
+    """Writes each chunk as one row group"""
+
+    def __init__(self, path: str, columns: List[tuple], compression: Optional[str]):
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in columns])
+        self.names = [name for name, _ in columns]
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema,
+                                                    compression=compression or "none")
+
+    def write(self, rows: List[tuple]):
+        data = {name: [row[idx] for row in rows] for idx, name in enumerate(self.names)}
+        for name, kind in zip(self.names, self.schema.types):
+            if pyarrow.types.is_boolean(kind):
+                data[name] = [None if value is None else bool(value) for value in data[name]]
+            elif pyarrow.types.is_string(kind):
+                data[name] = [None if value is None else str(value) for value in data[name]]
+        self.writer.write_table(pyarrow.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_dataset(db: Database, dataset: str, path: str, fmt: str = "csv",
+                   compression: str = None, date_from: Union[str, datetime] = None,
+                   date_to: Union[str, datetime] = None, status: Union[str, List[str]] = None,
+                   category: Union[str, List[str]] = None, after_id: int = None,
+                   chunk_size: int = 5000) -> Dict:
+    """
+    Stream a dataset to a CSV, JSONL or Parquet file
+
+    Args:
+        db: Database to export from
+        dataset: "links", "emails" or "operations"
+        path: Output file
+        fmt: "csv", "jsonl" or "parquet" (needs pyarrow)
+        compression: None, "gzip" or "zstd" (zstd needs zstandard for
+                     CSV and JSONL; Parquet compresses its pages instead)
+        date_from: Only rows at or after this time (see Dataset.time_column)
+        date_to: Only rows before this time
+        status: Status or list of statuses (links: pending, success,
+                failed; emails: processed, unprocessed; operations: as logged)
+        category: Email category or list of categories
+        after_id: Watermark of a previous export; only newer rows are written
+        chunk_size: Rows fetched and written at a time
+
+    Returns:
+        Dict with rows (written), path and watermark (highest id written,
+        or after_id if nothing was new)
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown export dataset: {dataset} (expected one of {', '.join(DATASETS)})")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"Unknown export compression: {compression}")
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    if compression == "zstd" and fmt != "parquet" and zstandard is None:
+        raise RuntimeError("zstd compression requires the zstandard package")
+
+    spec = DATASETS[dataset]
+    conditions, params = [], []
+    if after_id is not None:
+        conditions.append(f"{spec.id_column} > ?")
+        params.append(after_id)
+    if date_from is not None:
+        conditions.append(f"{spec.time_column} >= ?")
+        params.append(str(date_from))
+    if date_to is not None:
+        conditions.append(f"{spec.time_column} < ?")
+        params.append(str(date_to))
+    for name, expression, value in (("status", spec.status, status),
+                                    ("category", spec.category, category)):
+        if value is None:
+            continue
+        if expression is None:
+            raise ValueError(f"The {dataset} dataset cannot be filtered by {name}")
+        values = [value] if isinstance(value, str) else list(value)
+        conditions.append(f"{expression} IN ({','.join('?' * len(values))})" if values else "0")
+        params.extend(values)
+
+    query = spec.query
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {spec.id_column}"
+
+    logger = logging.getLogger(__name__)
+    columns = [name for name, _ in spec.columns]
+    temp_path = f"{path}.tmp"
+    rows_written = 0
+    watermark = after_id
+
+    if fmt == "parquet":
+        writer = _ParquetWriter(temp_path, spec.columns, compression)
+    else:
+        stream = _open_output(temp_path, compression)
+        writer = (_CsvWriter if fmt == "csv" else _JsonlWriter)(stream, columns)
+
+    # A plain cursor (no sqlite3.Row) keeps each chunk as small tuples
+    conn = db.connect()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.write(rows)
+            rows_written += len(rows)
+            watermark = rows[-1][0]
+        writer.close()
+    except Exception:
+        writer.close()
+        os.unlink(temp_path)
+        raise
+    finally:
+        cursor.close()
+
+    os.replace(temp_path, path)
+    logger.info(f"Exported {rows_written} {dataset} rows to {path}")
+    return {"rows": rows_written, "path": path, "watermark": watermark}
+
+
+def export_incremental(db: Database, name: str, dataset: str, path: str, **kwargs) -> Dict:
+    """
+    Export the rows added since the last export of the same name
+
+    The watermark is kept in the settings table under
+    export_watermark:<name> and only advanced once the file is complete,
+    so a failed export is simply repeated next time.
+
+    Args:
+        db: Database to export from
+        name: Name of the incremental export (e.g. "warehouse-links")
+        dataset: Dataset to export
+        path: Output file
+        **kwargs: Other export_dataset arguments
+
+    Returns:
+        export_dataset's result
+    """
+    key = f"export_watermark:{name}"
+    stored = db.get_setting(key)
+    result = export_dataset(db, dataset, path,
+                            after_id=int(stored) if stored is not None else None, **kwargs)
+    if result["watermark"] is not None:
+        db.set_setting(key, str(result["watermark"]))
+    return result
@@ -0,0 +1,269 @@
+"""Durable click job queue backed by SQLite"""
+import time
+from typing import List, Dict, Optional
+
+from src.database.models import Database
+from src.utils.url_canonicalizer import url_domain
+
+
+# Job states
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobQueue:
+    """Persistent queue of unsubscribe click jobs
+
+    Jobs move pending -> leased -> done/failed. A worker leases a batch of
+    jobs for ``lease_seconds``; if it dies before finishing, the lease
+    expires and the job becomes available again. Every lease counts as an
+    attempt and jobs that run out of attempts are marked failed.
+    """
+
+    def __init__(self, db: Database, lease_seconds: int = 300, max_attempts: int = 3,
+                 failure_threshold: int = 3):
+        """Initialize job queue"""
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.failure_threshold = failure_threshold
+
+    def _write(self, func, *args):
+        """
+        Run func(*args) as one write transaction and return its result
+
+        In single-writer mode the transaction is queued for the writer
+        thread; otherwise it runs on this thread's connection, taking the
+        write lock up front so concurrent workers are serialized.
+        """
+        if self.db.writer is not None:
+            return self.db.writer.submit(func, *args).result()
+        conn = self.db.connect()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(*args)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return result
+
+    def enqueue(self, link_ids: List[int], force: bool = False) -> int:
+        """
+        Add click jobs for the given link IDs
+
+        Only one job is created per subscription, for its lowest unclicked
+        link; the click result is fanned out to the other links. Links that
+        are already clicked or already queued are ignored. Jobs that
+        previously failed are reset to pending.
+
+        Args:
+            link_ids: Link IDs to queue
+            force: Click even if the link's domain keeps failing
+
+        Returns:
+            Number of jobs that were added or reset
+        """
+        if not link_ids:
+            return 0
+        return self._write(self._enqueue, self.db.get_subscription_links(link_ids), force)
+
+    def _enqueue(self, rows: List[Dict], force: bool) -> int:
+        cursor = self.db.connect().cursor()
+        enqueued = 0
+        for row in rows:
+            cursor.execute("""
+                INSERT INTO click_jobs (link_id, domain, force, state)
+                SELECT id, ?, ?, ? FROM unsubscribe_links WHERE id = ? AND clicked = 0
+                ON CONFLICT(link_id) DO UPDATE
+                SET state = excluded.state, force = excluded.force, attempts = 0,
+                    last_error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE click_jobs.state = ?
+            """, (url_domain(row["link"]), force, JOB_PENDING, row["id"], JOB_FAILED))
+            enqueued += cursor.rowcount
+        return enqueued
+
+    def enqueue_all_unclicked(self, force: bool = False) -> int:
+        """Add click jobs for every subscription with unclicked links"""
+        link_ids = [row["id"] for row in self.db.get_subscription_links()]
+        return self.enqueue(link_ids, force=force)
+
+    def lease(self, worker_id: str, batch_size: int = 10) -> List[Dict]:
+        """
+        Lease up to batch_size jobs for a worker
+
+        Pending jobs and leased jobs whose lease has expired are eligible.
+        Jobs for fast, reliable domains are handed out first, and jobs for
+        domains that keep failing are marked failed unless forced. The
+        selection and the state change happen in a single write
+        transaction, so concurrent workers never receive the same job.
+
+        Returns:
+            List of job dicts with id, link_id, link, domain and attempts
+        """
+        jobs = self._write(self._lease, worker_id, batch_size)
+        for job in jobs:
+            job["attempts"] += 1
+        return jobs
+
+    def _lease(self, worker_id: str, batch_size: int) -> List[Dict]:
+        cursor = self.db.connect().cursor()
+        now = time.time()
+        # Jobs whose lease expired on their last attempt are given up on
+        cursor.execute("""
+            UPDATE click_jobs
+            SET state = ?, lease_owner = NULL,
+                last_error = 'Lease expired on final attempt',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE state = ? AND lease_expires_at < ? AND attempts >= ?
+        """, (JOB_FAILED, JOB_LEASED, now, self.max_attempts))
+
+        # Links clicked by some other path don't need a job any more
+        cursor.execute("""
+            UPDATE click_jobs
+            SET state = ?, lease_owner = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE state IN (?, ?)
+              AND link_id IN (SELECT id FROM unsubscribe_links WHERE clicked = 1)
+        """, (JOB_DONE, JOB_PENDING, JOB_LEASED))
+
+        # Domains that keep failing are not worth a full timeout each
+        cursor.execute("""
+            UPDATE click_jobs
+            SET state = ?, last_error = 'Skipped: domain keeps failing',
+                updated_at = CURRENT_TIMESTAMP
+            WHERE state = ? AND force = 0 AND domain IN (
+                SELECT domain FROM domain_stats WHERE consecutive_failures >= ?
+            )
+        """, (JOB_FAILED, JOB_PENDING, self.failure_threshold))
+
+        # Fast, reliable hosts first; unknown hosts rank as 50% reliable
+        cursor.execute("""
+            SELECT j.id, j.link_id, ul.link, j.domain, j.attempts
+            FROM click_jobs j
+            JOIN unsubscribe_links ul ON ul.id = j.link_id
+            LEFT JOIN domain_stats d ON d.domain = j.domain
+            WHERE j.state = ? OR (j.state = ? AND j.lease_expires_at < ?)
+            ORDER BY COALESCE(CAST(d.successes AS REAL) / d.attempts, 0.5) DESC,
+                     COALESCE(d.success_latency / NULLIF(d.successes, 0), 1e9) ASC,
+                     j.id
+            LIMIT ?
+        """, (JOB_PENDING, JOB_LEASED, now, batch_size))
+        jobs = [dict(row) for row in cursor.fetchall()]
+
+        if jobs:
+            placeholders = ",".join("?" * len(jobs))
+            cursor.execute(f"""
+                UPDATE click_jobs
+                SET state = ?, lease_owner = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id IN ({placeholders})
+            """, [JOB_LEASED, worker_id, now + self.lease_seconds] +
+                 [job["id"] for job in jobs])
+        return jobs
+
+    def complete(self, job: Dict, result: Dict):
+        """
+        Record the click result for a leased job
+
+        The link status, the operation log entry and the job state are
+        written in one transaction, so a crash can never leave a clicked
+        link with a job that will be handed out again. A failed click
+        leaves the link unclicked, so enqueueing it again retries it.
+        """
+        self._write(self._complete, job, result)
+
+    def _complete(self, job: Dict, result: Dict):
+        link = job["link"]
+        self.db.update_link_status(
+            job["link_id"],
+            clicked=bool(result.get("success")),
+            status_code=result.get("status_code"),
+            error_message=result.get("error_message"),
+            commit=False
+        )
+        self.db.record_redirects(job["link_id"], result, commit=False)
+        self.db.record_domain_outcome(
+            job.get("domain") or url_domain(link),
+            bool(result.get("success")),
+            response_time=result.get("response_time"),
+            status_code=result.get("status_code"),
+            error_message=result.get("error_message"),
+            commit=False
+        )
+
+        if result.get("success"):
+            self.db.log_operation(
+                "unsubscribe", None, "success",
+                f"Successfully unsubscribed: {link}",
+                commit=False
+            )
+        else:
+            self.db.log_operation(
+                "unsubscribe", None, "failed",
+                f"Failed to unsubscribe: {link} - {result.get('error_message')}",
+                commit=False
+            )
+
+        self.db.connect().execute("""
+            UPDATE click_jobs
+            SET state = ?, lease_owner = NULL, last_error = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (JOB_DONE if result.get("success") else JOB_FAILED,
+              result.get("error_message"), job["id"]))
+
+    def release(self, job: Dict, error: str):
+        """
+        Give a leased job back after a worker-side error
+
+        The job returns to pending for another attempt, or is marked failed
+        once it has used up max_attempts.
+        """
+        state = JOB_FAILED if job["attempts"] >= self.max_attempts else JOB_PENDING
+        self._write(self._set_state, job["id"], state, error)
+
+    def _set_state(self, job_id: int, state: str, error: str):
+        self.db.connect().execute("""
+            UPDATE click_jobs
+            SET state = ?, lease_owner = NULL, lease_expires_at = NULL,
+                last_error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (state, error, job_id))
+
+    def get_pending_domains(self, limit: int = 500) -> List[str]:
+        """Get distinct domains of pending jobs, in lease order"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT domain FROM click_jobs
+            WHERE state = ? AND domain IS NOT NULL AND domain != ''
+            GROUP BY domain
+            ORDER BY MIN(id)
+            LIMIT ?
+        """, (JOB_PENDING, limit))
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_counts(self) -> Dict[str, int]:
+        """Get the number of jobs in each state"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+
+        counts = {JOB_PENDING: 0, JOB_LEASED: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        cursor.execute("SELECT state, COUNT(*) FROM click_jobs GROUP BY state")
+        for state, count in cursor.fetchall():
+            counts[state] = count
+        return counts
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """Get a single job by ID"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM click_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,141 @@
+"""SQLite performance profiles and maintenance tasks"""
+import logging
+import sqlite3
+import time
+from typing import Dict, List
+
+
+# Connection settings per profile. cache_size is in KiB when negative,
+# mmap_size in bytes; wal_autocheckpoint is in pages.
+PROFILES: Dict[str, Dict[str, object]] = {
+    # Every commit is synced; nothing is lost on power failure
+    "safe": {
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000,
+    },
+    # WAL is synced at checkpoints only: consistent after a crash, but the
+    # last commits may be lost on power failure
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    },
+    # For large one-off imports and rescans: no syncing at all and fewer,
+    # larger checkpoints. Run a checkpoint afterwards.
+    "bulk-import": {
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 10000,
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+MAINTENANCE_TASKS = ("optimize", "analyze", "vacuum", "checkpoint")
+
+
+def apply_profile(conn: sqlite3.Connection, profile: str = DEFAULT_PROFILE):
+    """Apply a performance profile's PRAGMAs to a connection"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile: {profile} "
+                         f"(expected one of {', '.join(PROFILES)})")
+    for pragma, value in PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+
+
+def analyze(conn: sqlite3.Connection) -> Dict:
+    """Refresh the query planner statistics for every index"""
+    conn.execute("ANALYZE")
+    conn.commit()
+    return {}
+
+
+def optimize(conn: sqlite3.Connection) -> Dict:
+    """Let SQLite refresh planner statistics where they look stale (cheap)"""
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+    return {}
+
+
+def incremental_vacuum(conn: sqlite3.Connection, max_pages: int = 1000) -> Dict:
+    """
+    Return up to max_pages free pages to the file system
+
+    Databases created before incremental auto-vacuum was enabled are
+    converted with one full VACUUM the first time this runs.
+
+    Returns:
+        Dict with the free pages before and after
+    """
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.in_transaction:
+        conn.commit()
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # incremental_vacuum frees one page per step and execute() only
+        # steps once; executescript() runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"free_pages_before": free_before, "free_pages_after": free_after}
+
+
+def checkpoint(conn: sqlite3.Connection, mode: str = "TRUNCATE") -> Dict:
+    """
+    Copy the write-ahead log into the database file
+
+    TRUNCATE also resets the WAL file to zero bytes. Pages still needed by
+    open readers stay in the log, so busy can be 1 while the app is in use.
+
+    Returns:
+        Dict with busy, log_pages and checkpointed_pages
+    """
+    if conn.in_transaction:
+        conn.commit()
+    busy, log_pages, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return {"busy": busy, "log_pages": log_pages, "checkpointed_pages": checkpointed}
+
+
+def run_maintenance(db, tasks: List[str] = None, vacuum_pages: int = 1000) -> Dict[str, Dict]:
+    """
+    Run maintenance tasks on a database
+
+    Args:
+        db: Database to maintain
+        tasks: Names from MAINTENANCE_TASKS (defaults to all, in that order)
+        vacuum_pages: Pages released per incremental vacuum
+
+    Returns:
+        Dict mapping task name to its result and duration in seconds
+    """
+    logger = logging.getLogger(__name__)
+    conn = db.connect()
+    results = {}
+
+    for task in tasks or MAINTENANCE_TASKS:
+        started = time.monotonic()
+        if task == "optimize":
+            result = optimize(conn)
+        elif task == "analyze":
+            result = analyze(conn)
+        elif task == "vacuum":
+            result = incremental_vacuum(conn, vacuum_pages)
+        elif task == "checkpoint":
+            result = checkpoint(conn)
+        else:
+            raise ValueError(f"Unknown maintenance task: {task}")
+        result["seconds"] = time.monotonic() - started
+        results[task] = result
+        logger.info(f"Database maintenance {task} done in {result['seconds']:.2f}s")
+
+    return results
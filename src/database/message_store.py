@@ -0,0 +1,294 @@
+"""Content-addressed, compressed store of fetched message headers and HTML parts
+
+Scans can keep what they fetched so extraction and categorization can be
+re-run later from local disk (see EmailUnsubscribeOrchestrator.reprocess)
+instead of downloading the mailbox again. Only the headers and the HTML
+parts are kept, which is all the extraction pipeline reads.
+
+Records are appended to segment files (segment-000001.bin, ...) and never
+rewritten; the message_store table maps each record's hash to its segment,
+offset and length. A record is written once per distinct content, so a
+message fetched again by a later scan costs one index lookup.
+"""
+import email as email_module
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from email.message import Message
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.database.models import Database
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CODECS = ("zstd", "zlib")
+
+INSERT_STORED_MESSAGE_SQL = """
+    INSERT INTO message_store (hash, message_id, segment, byte_offset, length, raw_size, codec)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (hash) DO NOTHING
+"""
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.bin$")
+
+
+class StoredMessage(NamedTuple):
+    """A stored message: its header-only Message and decoded HTML parts"""
+    hash: str
+    message_id: str
+    headers: Message
+    html_parts: List[str]
+
+
+def encode_record(msg: Message, html_parts: List[str]) -> bytes:
+    """
+    Serialize a message's headers and HTML parts
+
+    Layout: part count, then each part's length (little-endian uint32),
+    then the parts: the raw header block first, then the HTML parts.
+    """
+    header_block = "".join(f"{name}: {value}\n" for name, value in msg.items()) + "\n"
+    parts = [header_block.encode("utf-8", "surrogateescape")]
+    parts += [html.encode("utf-8", "surrogateescape") for html in html_parts]
+    return struct.pack(f"<{len(parts) + 1}I", len(parts), *map(len, parts)) + b"".join(parts)
+
+
+def decode_record(data: bytes) -> Tuple[Message, List[str]]:
+    """Inverse of encode_record"""
+    (count,) = struct.unpack_from("<I", data)
+    lengths = struct.unpack_from(f"<{count}I", data, 4)
+    position = 4 * (count + 1)
+    parts = []
+    for length in lengths:
+        parts.append(data[position:position + length])
+        position += length
+    headers = email_module.message_from_bytes(parts[0])
+    return headers, [part.decode("utf-8", "surrogateescape") for part in parts[1:]]
+
+
+class MessageStore:
+    """Append-only segment files of compressed records, indexed in SQLite
+
+    put() appends records and buffers their index rows; flush() syncs the
+    segment to disk before the index rows are committed, so every indexed
+    record is readable after a crash (an unindexed tail is just ignored).
+    """
+
+    def __init__(self, db: Database, directory: str, codec: str = "auto",
+                 segment_bytes: int = 64 * 1024 * 1024, flush_every: int = 500):
+        """
+        Initialize the store
+
+        Args:
+            db: Database holding the message_store index
+            directory: Directory for the segment files
+            codec: "zstd", "zlib" or "auto" (zstd when the zstandard
+                   package is installed, zlib otherwise)
+            segment_bytes: Size at which a new segment file is started
+            flush_every: Buffered index rows that trigger a flush
+        """
+        self.db = db
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_every = flush_every
+        self.logger = logging.getLogger(__name__)
+
+        if codec not in ("auto",) + CODECS:
+            raise ValueError(f"Unknown message store codec: {codec} "
+                             f"(expected auto, {', '.join(CODECS)})")
+        if codec == "zstd" and zstandard is None:
+            self.logger.warning("zstandard is not installed, storing messages with zlib")
+        self.codec = "zstd" if codec in ("auto", "zstd") and zstandard is not None else "zlib"
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.codec == "zstd" else None
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._pending_hashes = set()
+        self._file = None
+        self._segment = max(self._segments(), default=1)
+        self.written = 0
+        self.deduplicated = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _segments(self) -> List[int]:
+        """Numbers of the segment files in the directory"""
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def segment_path(self, segment: int) -> str:
+        """Get the file path of a segment"""
+        return os.path.join(self.directory, f"segment-{segment:06d}.bin")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._compressor.compress(data)
+        return zlib.compress(data, 6)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if zstandard is None:
+            raise RuntimeError("Reading zstd records requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def put(self, message_id: str, msg: Message, html_parts: List[str]) -> str:
+        """
+        Store a fetched message unless identical content is already stored
+
+        Args:
+            message_id: Message-ID header, kept in the index for lookups
+            msg: The fetched message (only its headers are stored)
+            html_parts: Its decoded HTML parts
+
+        Returns:
+            Hex SHA-256 of the record
+        """
+        record = encode_record(msg, html_parts)
+        digest = hashlib.sha256(record).hexdigest()
+
+        with self._lock:
+            if digest in self._pending_hashes or self._is_indexed(digest):
+                self.deduplicated += 1
+                return digest
+
+            compressed = self._compress(record)
+            if self._file is None:
+                self._file = open(self.segment_path(self._segment), "ab")
+            if self._file.tell() and self._file.tell() + len(compressed) > self.segment_bytes:
+                self._sync()
+                self._file.close()
+                self._segment += 1
+                self._file = open(self.segment_path(self._segment), "ab")
+
+            offset = self._file.tell()
+            self._file.write(compressed)
+            self._pending.append((digest, message_id, self._segment, offset, len(compressed),
+                                  len(record), self.codec))
+            self._pending_hashes.add(digest)
+            self.written += 1
+            should_flush = len(self._pending) >= self.flush_every
+
+        if should_flush:
+            self.flush()
+        return digest
+
+    def _is_indexed(self, digest: str) -> bool:
+        row = self.db.connect().execute(
+            "SELECT 1 FROM message_store WHERE hash = ?", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def _sync(self):
+        """Write the open segment through to disk"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def flush(self):
+        """Sync the segment file, then commit the buffered index rows"""
+        with self._lock:
+            if not self._pending:
+                return
+            self._sync()
+            rows = self._pending
+            self._pending = []
+            self._pending_hashes = set()
+
+        def index_rows():
+            self.db.connect().executemany(INSERT_STORED_MESSAGE_SQL, rows)
+
+        self.db.submit(index_rows).result()
+
+    def close(self):
+        """Flush and close the open segment"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get(self, digest: str) -> Optional[StoredMessage]:
+        """Read one stored message by hash"""
+        self.flush()
+        row = self.db.connect().execute("""
+            SELECT hash, message_id, segment, byte_offset, length, codec
+            FROM message_store WHERE hash = ?
+        """, (digest,)).fetchone()
+        if row is None:
+            return None
+        with open(self.segment_path(row["segment"]), "rb") as f:
+            f.seek(row["byte_offset"])
+            return self._read(row, f.read(row["length"]))
+
+    def _read(self, row, data: bytes) -> StoredMessage:
+        headers, html_parts = decode_record(self._decompress(data, row["codec"]))
+        return StoredMessage(row["hash"], row["message_id"], headers, html_parts)
+
+    def iter_messages(self, page_size: int = 1000) -> Iterator[StoredMessage]:
+        """
+        Yield every stored message in segment order
+
+        Records are read front to back, one segment file at a time, so a
+        full replay is a sequential read of the store.
+        """
+        self.flush()
+        conn = self.db.connect()
+        after = (0, -1)
+        f, open_segment = None, None
+        try:
+            while True:
+                rows = conn.execute("""
+                    SELECT hash, message_id, segment, byte_offset, length, codec
+                    FROM message_store
+                    WHERE (segment, byte_offset) > (?, ?)
+                    ORDER BY segment, byte_offset
+                    LIMIT ?
+                """, (*after, page_size)).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    if row["segment"] != open_segment:
+                        if f is not None:
+                            f.close()
+                        f = open(self.segment_path(row["segment"]), "rb")
+                        open_segment = row["segment"]
+                    f.seek(row["byte_offset"])
+                    yield self._read(row, f.read(row["length"]))
+                after = (rows[-1]["segment"], rows[-1]["byte_offset"])
+        finally:
+            if f is not None:
+                f.close()
+
+    def get_stats(self) -> Dict:
+        """Get the stored message count, compressed and raw bytes, and segment count"""
+        self.flush()
+        row = self.db.connect().execute("""
+            SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(raw_size), 0)
+            FROM message_store
+        """).fetchone()
+        return {
+            "messages": row[0],
+            "stored_bytes": row[1],
+            "raw_bytes": row[2],
+            "segments": len(self._segments()),
+        }
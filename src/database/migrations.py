@@ -0,0 +1,836 @@
+"""Versioned schema migrations
+
+Each migration is a numbered step that runs once, in order, inside its own
+transaction. Applied versions are recorded in the schema_version table.
+To change the schema, append a new migration; never edit one that has
+already shipped.
+"""
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from src.utils.url_canonicalizer import canonicalize_url
+
+
+class Migration(NamedTuple):
+    """A single schema migration step"""
+    version: int
+    name: str
+    apply: Callable
+
+
+def _base_schema(db, cursor: sqlite3.Cursor):
+    """Create the tables, upgrading databases created before versioning
+
+    Tables from older versions of the app may already exist, so every
+    statement is idempotent and missing columns are added in place.
+    """
+    # Email table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE,
+            sender TEXT NOT NULL,
+            subject TEXT,
+            received_date TIMESTAMP,
+            category TEXT DEFAULT 'uncategorized',
+            has_unsubscribe_link BOOLEAN DEFAULT 0,
+            processed BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Unsubscribe links table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS unsubscribe_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_id INTEGER,
+            link TEXT NOT NULL,
+            clicked BOOLEAN DEFAULT 0,
+            click_timestamp TIMESTAMP,
+            status_code INTEGER,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            canonical_url TEXT,
+            subscription_id INTEGER,
+            final_url TEXT,
+            redirect_chain TEXT,
+            redirect_hops INTEGER,
+            redirect_latency REAL,
+            shortcut_used BOOLEAN DEFAULT 0,
+            latency_saved REAL DEFAULT 0,
+            FOREIGN KEY (email_id) REFERENCES emails (id),
+            FOREIGN KEY (subscription_id) REFERENCES subscriptions (id)
+        )
+    """)
+    
+    # Subscriptions table: one row per logical unsubscribe endpoint
+    # (canonical URL + sender), shared by every email that links to it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            canonical_url TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            clicked BOOLEAN DEFAULT 0,
+            click_timestamp TIMESTAMP,
+            status_code INTEGER,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (canonical_url, sender)
+        )
+    """)
+    
+    # Whitelist table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS whitelist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_pattern TEXT UNIQUE NOT NULL,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        )
+    """)
+    
+    # Blacklist table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blacklist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email_pattern TEXT UNIQUE NOT NULL,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        )
+    """)
+    
+    # Custom filters table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS custom_filters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            filter_type TEXT NOT NULL,
+            enabled BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Operation history table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS operation_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            operation_type TEXT NOT NULL,
+            email_id INTEGER,
+            status TEXT NOT NULL,
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (email_id) REFERENCES emails (id)
+        )
+    """)
+    
+    # Settings table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Sender status table: senders we successfully unsubscribed from,
+    # derived from unsubscribe_links results
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sender_status'")
+    sender_status_missing = cursor.fetchone() is None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sender_status (
+            sender TEXT PRIMARY KEY,
+            domain TEXT NOT NULL,
+            status TEXT NOT NULL,
+            unsubscribed_at TIMESTAMP NOT NULL
+        )
+    """)
+    
+    # Click job queue table (see src/database/job_queue.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS click_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            link_id INTEGER UNIQUE NOT NULL,
+            domain TEXT,
+            force BOOLEAN DEFAULT 0,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (link_id) REFERENCES unsubscribe_links (id)
+        )
+    """)
+    db._add_missing_columns(cursor, "click_jobs", {
+        "domain": "TEXT",
+        "force": "BOOLEAN DEFAULT 0",
+    })
+    
+    # Per-domain click outcome statistics
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS domain_stats (
+            domain TEXT PRIMARY KEY,
+            attempts INTEGER DEFAULT 0,
+            successes INTEGER DEFAULT 0,
+            failures INTEGER DEFAULT 0,
+            consecutive_failures INTEGER DEFAULT 0,
+            success_latency REAL DEFAULT 0,
+            last_status_code INTEGER,
+            last_error TEXT,
+            last_attempt_at TIMESTAMP
+        )
+    """)
+    
+    # Click-tracker prefixes known to redirect to a URL carried in one
+    # of their query parameters (see src/core/redirect_cache.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS redirect_prefixes (
+            prefix TEXT PRIMARY KEY,
+            param TEXT NOT NULL,
+            observations INTEGER DEFAULT 0,
+            hops_total INTEGER DEFAULT 0,
+            latency_total REAL DEFAULT 0,
+            last_seen_at TIMESTAMP
+        )
+    """)
+    
+    db._add_missing_columns(cursor, "unsubscribe_links", {
+        "canonical_url": "TEXT",
+        "subscription_id": "INTEGER",
+        "final_url": "TEXT",
+        "redirect_chain": "TEXT",
+        "redirect_hops": "INTEGER",
+        "redirect_latency": "REAL",
+        "shortcut_used": "BOOLEAN DEFAULT 0",
+        "latency_saved": "REAL DEFAULT 0",
+    })
+    
+    # Existing links are canonicalized and attached to their subscription
+    cursor.execute("""
+        SELECT id, email_id, link FROM unsubscribe_links
+        WHERE canonical_url IS NULL
+    """)
+    for link_id, email_id, link in cursor.fetchall():
+        canonical_url = canonicalize_url(link)
+        # Subscriptions are per account from migration 13 on
+        cursor.execute("""
+            INSERT INTO subscriptions (canonical_url, sender)
+            SELECT ?, LOWER(sender) FROM emails WHERE id = ?
+            ON CONFLICT (canonical_url, sender) DO NOTHING
+        """, (canonical_url, email_id))
+        cursor.execute("""
+            UPDATE unsubscribe_links
+            SET canonical_url = ?,
+                subscription_id = (
+                    SELECT s.id FROM subscriptions s
+                    JOIN emails e ON s.sender = LOWER(e.sender)
+                    WHERE e.id = ? AND s.canonical_url = ?
+                )
+            WHERE id = ?
+        """, (canonical_url, email_id, canonical_url, link_id))
+    
+    # Superseded by the senders table (migration 8), which rebuilds from
+    # the same link results
+    if sender_status_missing:
+        cursor.execute("""
+            INSERT INTO sender_status (sender, domain, status, unsubscribed_at)
+            SELECT LOWER(e.sender), LOWER(SUBSTR(e.sender, INSTR(e.sender, '@') + 1)),
+                   'unsubscribed', MAX(ul.click_timestamp)
+            FROM unsubscribe_links ul
+            JOIN emails e ON e.id = ul.email_id
+            WHERE ul.clicked = 1 AND ul.status_code BETWEEN 200 AND 399
+              AND ul.click_timestamp IS NOT NULL
+            GROUP BY LOWER(e.sender)
+        """)
+
+
+def _hot_query_indexes(db, cursor: sqlite3.Cursor):
+    """Add indexes for the queries that run on every scan, click batch and page load"""
+    # Unclicked links, one per subscription (get_subscription_links)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unsubscribe_links_unclicked
+        ON unsubscribe_links (subscription_id, link) WHERE clicked = 0
+    """)
+    # Click counts and success rates, links already clicked (job leasing)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unsubscribe_links_clicked
+        ON unsubscribe_links (status_code) WHERE clicked = 1
+    """)
+    # Joins from emails to their links
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unsubscribe_links_email_id
+        ON unsubscribe_links (email_id)
+    """)
+    # Fanning click results out to the links of a subscription
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unsubscribe_links_subscription_id
+        ON unsubscribe_links (subscription_id)
+    """)
+    # Recent operations
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_operation_history_timestamp
+        ON operation_history (timestamp)
+    """)
+    # Unprocessed emails newest first, processed / with-links counts
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_emails_processed
+        ON emails (processed, received_date, has_unsubscribe_link)
+    """)
+    # Category breakdown
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_emails_category
+        ON emails (category)
+    """)
+    # Job leasing, queue counts and pending domains
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_click_jobs_state
+        ON click_jobs (state, domain)
+    """)
+    cursor.execute("ANALYZE")
+
+
+def _unique_email_links(db, cursor: sqlite3.Cursor):
+    """Remove duplicate links left by rescans and make (email_id, link) unique
+    
+    The oldest copy of each link is kept. Click jobs of removed copies are
+    moved to the kept link, or dropped if it already has one.
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE duplicate_links AS
+        SELECT id, keep_id FROM (
+            SELECT id, MIN(id) OVER (PARTITION BY email_id, link) AS keep_id
+            FROM unsubscribe_links
+            WHERE email_id IS NOT NULL
+        )
+        WHERE id != keep_id
+    """)
+    cursor.execute("""
+        UPDATE OR IGNORE click_jobs
+        SET link_id = (SELECT keep_id FROM duplicate_links WHERE id = click_jobs.link_id)
+        WHERE link_id IN (SELECT id FROM duplicate_links)
+    """)
+    cursor.execute("DELETE FROM click_jobs WHERE link_id IN (SELECT id FROM duplicate_links)")
+    cursor.execute("DELETE FROM unsubscribe_links WHERE id IN (SELECT id FROM duplicate_links)")
+    cursor.execute("DROP TABLE duplicate_links")
+    
+    # Also serves the joins from emails, so the email_id index is redundant
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_unsubscribe_links_email_link
+        ON unsubscribe_links (email_id, link)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_unsubscribe_links_email_id")
+
+
+def _bump(table: str, key_column: str, key: str, column: str, delta: str) -> str:
+    """Trigger statement adding delta to a counter row, skipped when delta is 0"""
+    return f"""
+            INSERT INTO {table} ({key_column}, {column})
+            SELECT {key}, {delta} WHERE ({delta}) != 0 AND {key} IS NOT NULL
+            ON CONFLICT ({key_column}) DO UPDATE SET {column} = {column} + excluded.{column};"""
+
+
+def _counter(name: str, delta: str) -> str:
+    """Trigger statement adjusting a stat_counters row"""
+    return _bump("stat_counters", "name", name, "value", delta)
+
+
+def _daily(day: str, column: str, delta: str) -> str:
+    """Trigger statement adjusting a daily_stats column"""
+    return _bump("daily_stats", "day", f"date({day})", column, delta)
+
+
+def _email_stats(row: str, sign: str) -> str:
+    """Counter changes for adding (sign '+') or removing (sign '-') an email row"""
+    return "".join([
+        _counter("'total_processed'", f"{sign}({row}.processed IS 1)"),
+        _counter("'emails_with_links'", f"{sign}({row}.has_unsubscribe_link IS 1)"),
+        _counter(f"'category:' || COALESCE({row}.category, 'uncategorized')", f"{sign}1"),
+        _daily(f"{row}.created_at", "emails_scanned", f"{sign}1"),
+    ])
+
+
+def _link_click_stats(row: str, sign: str) -> str:
+    """Counter changes for the click outcome of a link row"""
+    clicked = f"({row}.clicked IS 1)"
+    successful = f"({row}.clicked IS 1 AND {row}.status_code BETWEEN 200 AND 299)"
+    return "".join([
+        _counter("'links_clicked'", f"{sign}{clicked}"),
+        _counter("'successful_clicks'", f"{sign}{successful}"),
+        _daily(f"COALESCE({row}.click_timestamp, {row}.created_at)", "links_clicked",
+               f"{sign}{clicked}"),
+        _daily(f"COALESCE({row}.click_timestamp, {row}.created_at)", "successful_clicks",
+               f"{sign}{successful}"),
+    ])
+
+
+def _statistics_counters(db, cursor: sqlite3.Cursor):
+    """Add trigger-maintained counters for the dashboard statistics
+
+    stat_counters holds running totals (category counts are stored as
+    'category:<name>'), daily_stats holds per-day rollups. Triggers keep both
+    in step with every write, so reading the statistics no longer scans the
+    mail tables. Operation history deletes are deliberately not counted:
+    the daily rollups outlive pruned history rows.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            emails_scanned INTEGER NOT NULL DEFAULT 0,
+            links_found INTEGER NOT NULL DEFAULT 0,
+            links_clicked INTEGER NOT NULL DEFAULT 0,
+            successful_clicks INTEGER NOT NULL DEFAULT 0,
+            operations INTEGER NOT NULL DEFAULT 0,
+            failed_operations INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    triggers = {
+        "trg_emails_stats_insert": ("AFTER INSERT ON emails", _email_stats("NEW", "+")),
+        "trg_emails_stats_delete": ("AFTER DELETE ON emails", _email_stats("OLD", "-")),
+        "trg_emails_stats_update": (
+            "AFTER UPDATE OF processed, has_unsubscribe_link, category, created_at ON emails",
+            _email_stats("OLD", "-") + _email_stats("NEW", "+"),
+        ),
+        "trg_links_stats_insert": (
+            "AFTER INSERT ON unsubscribe_links",
+            _daily("NEW.created_at", "links_found", "1") + _link_click_stats("NEW", "+"),
+        ),
+        "trg_links_stats_delete": (
+            "AFTER DELETE ON unsubscribe_links",
+            _daily("OLD.created_at", "links_found", "-1") + _link_click_stats("OLD", "-"),
+        ),
+        "trg_links_stats_update": (
+            "AFTER UPDATE OF clicked, status_code, click_timestamp ON unsubscribe_links",
+            _link_click_stats("OLD", "-") + _link_click_stats("NEW", "+"),
+        ),
+        "trg_subscriptions_stats_insert": (
+            "AFTER INSERT ON subscriptions", _counter("'unique_subscriptions'", "1"),
+        ),
+        "trg_subscriptions_stats_delete": (
+            "AFTER DELETE ON subscriptions", _counter("'unique_subscriptions'", "-1"),
+        ),
+        "trg_operations_stats_insert": (
+            "AFTER INSERT ON operation_history",
+            _daily("NEW.timestamp", "operations", "1")
+            + _daily("NEW.timestamp", "failed_operations", "(NEW.status != 'success')"),
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN {body}\n        END")
+
+    db.rebuild_statistics(commit=False)
+
+
+def _keyset_indexes(db, cursor: sqlite3.Cursor):
+    """Index (created_at, id) for keyset-paginated listings
+    
+    The rowid is implicitly the last column of every index, so an index on
+    created_at serves ORDER BY created_at, id and (created_at, id) cursors.
+    Operation history is already covered by idx_operation_history_timestamp.
+    """
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_unsubscribe_links_created
+        ON unsubscribe_links (created_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_emails_created
+        ON emails (created_at)
+    """)
+
+
+def _operation_daily(db, cursor: sqlite3.Cursor):
+    """Add per-day operation counts for history pruned by the retention policy"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS operation_daily (
+            day TEXT NOT NULL,
+            operation_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, operation_type, status)
+        )
+    """)
+
+
+def _email_search_index(db, cursor: sqlite3.Cursor):
+    """Add a full-text index over email sender, subject and category
+    
+    emails_fts is an external-content FTS5 table: it stores only the index
+    and reads the text from emails, and triggers keep it in sync. The
+    trigram tokenizer makes every term a case-insensitive substring match,
+    so "shop" finds news@myshop.com. SQLite builds without FTS5 or the
+    trigram tokenizer (3.34+) skip the index; search then falls back to
+    LIKE scans.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+                sender, subject, category,
+                content='emails', content_rowid='id',
+                tokenize='trigram case_sensitive 0'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Email search index not created, search will be slow: {str(e)}")
+        return
+    
+    columns = "sender, subject, category"
+    indexed = "{row}.sender, {row}.subject, {row}.category"
+    delete = (f"INSERT INTO emails_fts (emails_fts, rowid, {columns}) "
+              f"VALUES ('delete', old.id, {indexed.format(row='old')});")
+    insert = (f"INSERT INTO emails_fts (rowid, {columns}) "
+              f"VALUES (new.id, {indexed.format(row='new')});")
+    triggers = {
+        "trg_emails_fts_insert": ("AFTER INSERT ON emails", insert),
+        "trg_emails_fts_delete": ("AFTER DELETE ON emails", delete),
+        "trg_emails_fts_update": (f"AFTER UPDATE OF {columns} ON emails", delete + insert),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+    
+    cursor.execute("INSERT INTO emails_fts (emails_fts) VALUES ('rebuild')")
+
+
+# The sender of the email a link row belongs to, in the senders table's form
+_LINK_SENDER = "(SELECT LOWER(sender) FROM emails WHERE id = {row}.email_id)"
+
+# Newest unclicked link of a sender, reached through its subscriptions
+_BEST_LINK = """(
+                SELECT MAX(ul.id) FROM subscriptions sub
+                JOIN unsubscribe_links ul ON ul.subscription_id = sub.id AND ul.clicked = 0
+                WHERE sub.sender = senders.address
+            )"""
+
+
+def _senders(db, cursor: sqlite3.Cursor):
+    """Replace sender_status with a senders table maintained by triggers
+    
+    One row per lowercased sender address with its message count, first
+    and last email, latest category, unsubscribe status and the newest
+    unclicked link (best_link_id), so sender-level listings and bulk
+    actions never aggregate over emails.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS senders (
+            address TEXT PRIMARY KEY,
+            domain TEXT NOT NULL,
+            first_seen TIMESTAMP,
+            last_seen TIMESTAMP,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            category TEXT,
+            status TEXT NOT NULL DEFAULT 'subscribed',
+            unsubscribed_at TIMESTAMP,
+            best_link_id INTEGER
+        )
+    """)
+    # Listings sorted by volume or recency, and filtered by domain
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_senders_volume
+        ON senders (message_count, address)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_senders_recent
+        ON senders (last_seen, address)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_senders_domain ON senders (domain)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_senders_status ON senders (status)")
+    # Subscriptions of a sender (best link, bulk unsubscribe)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_sender
+        ON subscriptions (sender)
+    """)
+    
+    seen = "COALESCE({row}.received_date, {row}.created_at)"
+    triggers = {
+        "trg_senders_email_insert": ("AFTER INSERT ON emails", f"""
+            INSERT INTO senders (address, domain, first_seen, last_seen, message_count, category)
+            VALUES (LOWER(new.sender), LOWER(SUBSTR(new.sender, INSTR(new.sender, '@') + 1)),
+                    {seen.format(row='new')}, {seen.format(row='new')}, 1, new.category)
+            ON CONFLICT (address) DO UPDATE SET
+                message_count = message_count + 1,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                category = CASE WHEN excluded.last_seen >= last_seen
+                                THEN excluded.category ELSE category END,
+                last_seen = MAX(last_seen, excluded.last_seen);"""),
+        "trg_senders_email_delete": ("AFTER DELETE ON emails", """
+            UPDATE senders SET message_count = message_count - 1
+            WHERE address = LOWER(old.sender);"""),
+        "trg_senders_email_category": ("AFTER UPDATE OF category ON emails", """
+            UPDATE senders SET category = new.category
+            WHERE address = LOWER(new.sender);"""),
+        "trg_senders_link_insert": ("AFTER INSERT ON unsubscribe_links WHEN new.clicked = 0", f"""
+            UPDATE senders SET best_link_id = MAX(COALESCE(best_link_id, 0), new.id)
+            WHERE address = {_LINK_SENDER.format(row='new')};"""),
+        "trg_senders_link_clicked": (
+            "AFTER UPDATE OF clicked ON unsubscribe_links WHEN old.clicked = 0 AND new.clicked = 1",
+            f"""
+            UPDATE senders SET best_link_id = {_BEST_LINK}
+            WHERE address = {_LINK_SENDER.format(row='new')} AND best_link_id = new.id;"""),
+        "trg_senders_link_delete": ("AFTER DELETE ON unsubscribe_links", f"""
+            UPDATE senders SET best_link_id = {_BEST_LINK}
+            WHERE address = {_LINK_SENDER.format(row='old')} AND best_link_id = old.id;"""),
+        "trg_senders_unsubscribed": (
+            "AFTER UPDATE OF clicked, status_code ON unsubscribe_links "
+            "WHEN new.clicked = 1 AND new.status_code BETWEEN 200 AND 399",
+            f"""
+            UPDATE senders SET status = 'unsubscribed', unsubscribed_at = new.click_timestamp
+            WHERE address = {_LINK_SENDER.format(row='new')};"""),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN {body}\n        END")
+    
+    db.rebuild_senders(commit=False)
+    cursor.execute("DROP TABLE IF EXISTS sender_status")
+
+
+def _message_store(db, cursor: sqlite3.Cursor):
+    """Add the index of the raw message store (see src/database/message_store.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS message_store (
+            hash TEXT PRIMARY KEY,
+            message_id TEXT,
+            segment INTEGER NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            raw_size INTEGER NOT NULL,
+            codec TEXT NOT NULL,
+            stored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Replays read the segments front to back
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_message_store_position
+        ON message_store (segment, byte_offset)
+    """)
+
+
+def _scan_runs(db, cursor: sqlite3.Cursor):
+    """Add scan runs, whose checkpoints let an interrupted scan be resumed"""
+    # checkpoint_uid: every UID of the run up to it is committed; done_uids
+    # is a JSON list of [first, last] ranges of the run's UIDs above it
+    # committed out of order (older runs saved single UIDs)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scan_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            folder TEXT NOT NULL DEFAULT 'INBOX',
+            criteria TEXT NOT NULL,
+            uidvalidity INTEGER,
+            first_uid INTEGER,
+            last_uid INTEGER,
+            total INTEGER NOT NULL DEFAULT 0,
+            checkpoint_uid INTEGER,
+            done_uids TEXT NOT NULL DEFAULT '[]',
+            processed INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',
+            error TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_scan_runs_status
+        ON scan_runs (status, id)
+    """)
+
+
+def _accounts(db, cursor: sqlite3.Cursor):
+    """Add the accounts scanned by the scheduler and tie scan runs to them"""
+    # credentials_ref points at the password (env:NAME or file:PATH, see
+    # resolve_secret); folders is a JSON list of mailbox names
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            email_address TEXT NOT NULL,
+            imap_server TEXT NOT NULL DEFAULT 'imap.gmail.com',
+            credentials_ref TEXT NOT NULL,
+            folders TEXT NOT NULL DEFAULT '["INBOX"]',
+            enabled BOOLEAN NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_scan_at TIMESTAMP
+        )
+    """)
+    
+    # Runs without an account scanned the configured EMAIL mailbox
+    db._add_missing_columns(cursor, "scan_runs", {"account_id": "INTEGER"})
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_scan_runs_account
+        ON scan_runs (account_id, folder, id)
+    """)
+
+
+def _scan_run_timings(db, cursor: sqlite3.Cursor):
+    """Keep each scan run's per-stage timings for the scan planner"""
+    # JSON object of stage name -> workers, items and busy_seconds
+    db._add_missing_columns(cursor, "scan_runs", {"timings": "TEXT"})
+
+
+def _account_scoping(db, cursor: sqlite3.Cursor):
+    """Tie emails and subscriptions to the account they were scanned from
+    
+    Subscriptions were unique on (canonical_url, sender), so a click in
+    one account was shared with every account on the same list, and the
+    senders skipped by a scan were those unsubscribed from in any account.
+    The table is rebuilt to be unique per account; rows of the configured
+    EMAIL mailbox (and everything stored before this) have no account, like
+    its scan runs. The senders table stays a rollup over all accounts.
+    """
+    db._add_missing_columns(cursor, "emails", {"account_id": "INTEGER"})
+    
+    cursor.execute("""
+        CREATE TABLE subscriptions_scoped (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER,
+            canonical_url TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            clicked BOOLEAN DEFAULT 0,
+            click_timestamp TIMESTAMP,
+            status_code INTEGER,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO subscriptions_scoped (id, canonical_url, sender, clicked, click_timestamp,
+                                          status_code, error_message, created_at)
+        SELECT id, canonical_url, sender, clicked, click_timestamp,
+               status_code, error_message, created_at
+        FROM subscriptions
+    """)
+    cursor.execute("DROP TABLE subscriptions")
+    # Triggers on other tables still name subscriptions, which does not
+    # exist until the rename, so the rename must not check them
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    cursor.execute("ALTER TABLE subscriptions_scoped RENAME TO subscriptions")
+    cursor.execute("PRAGMA legacy_alter_table = OFF")
+    
+    # NULL accounts are distinct in a plain unique index
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_subscriptions_endpoint
+        ON subscriptions (canonical_url, sender, COALESCE(account_id, 0))
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_sender
+        ON subscriptions (sender)
+    """)
+    # Senders unsubscribed from in an account (get_unsubscribed_senders)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_subscriptions_unsubscribed
+        ON subscriptions (account_id, sender) WHERE clicked = 1
+    """)
+    triggers = {
+        "trg_subscriptions_stats_insert": (
+            "AFTER INSERT ON subscriptions", _counter("'unique_subscriptions'", "1"),
+        ),
+        "trg_subscriptions_stats_delete": (
+            "AFTER DELETE ON subscriptions", _counter("'unique_subscriptions'", "-1"),
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN {body}\n        END")
+    
+    # Links clicked before subscriptions existed were attached to one
+    # without their result; the skip list now reads it from there
+    cursor.execute("""
+        UPDATE subscriptions
+        SET clicked = 1, click_timestamp = done.at, status_code = done.status_code
+        FROM (
+            SELECT subscription_id, MAX(click_timestamp) AS at, status_code
+            FROM unsubscribe_links
+            WHERE clicked = 1 AND status_code BETWEEN 200 AND 399
+              AND click_timestamp IS NOT NULL
+            GROUP BY subscription_id
+        ) AS done
+        WHERE subscriptions.id = done.subscription_id AND subscriptions.clicked = 0
+    """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base schema", _base_schema),
+    Migration(2, "hot query indexes", _hot_query_indexes),
+    Migration(3, "unique email links", _unique_email_links),
+    Migration(4, "statistics counters", _statistics_counters),
+    Migration(5, "keyset pagination indexes", _keyset_indexes),
+    Migration(6, "operation history rollups", _operation_daily),
+    Migration(7, "email search index", _email_search_index),
+    Migration(8, "senders", _senders),
+    Migration(9, "raw message store", _message_store),
+    Migration(10, "scan runs", _scan_runs),
+    Migration(11, "accounts", _accounts),
+    Migration(12, "scan run timings", _scan_run_timings),
+    Migration(13, "account scoping", _account_scoping),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the highest applied migration version (0 for a new database)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(db, migrations: List[Migration] = None) -> List[int]:
+    """
+    Apply all pending migrations to a database
+    
+    Args:
+        db: Database to migrate
+        migrations: Migration steps (defaults to MIGRATIONS)
+    
+    Returns:
+        Versions that were applied
+    """
+    logger = logging.getLogger(__name__)
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    conn = db.connect()
+    if conn.in_transaction:
+        conn.commit()
+    
+    applied = []
+    current = get_schema_version(conn)
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+        
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if get_schema_version(conn) >= migration.version:
+                conn.commit()
+                continue
+            migration.apply(db, cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {migration.version} ({migration.name}) failed")
+            raise
+        
+        logger.info(f"Applied migration {migration.version}: {migration.name}")
+        applied.append(migration.version)
+    return applied
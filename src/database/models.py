@@ -1,20 +1,173 @@
 """Database models for email unsubscribe automation"""
 import sqlite3
+import json
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+import functools
 import os
 import threading
+from concurrent.futures import Future
+
+from src.database.maintenance import DEFAULT_PROFILE, apply_profile
+from src.database.search import (
+    MIN_INDEXED_TERM_LENGTH, SEARCH_COLUMNS, fts_match_expression, parse_search_query
+)
+from src.utils.url_canonicalizer import canonicalize_url
+
+# Statements shared by the Database methods below and BatchWriter, which
+# runs them with executemany (see src/database/batch_writer.py)
+UPDATE_SUBSCRIPTION_STATUS_SQL = """
+    UPDATE subscriptions
+    SET clicked = ?, click_timestamp = ?, status_code = ?, error_message = ?
+    WHERE id = (SELECT subscription_id FROM unsubscribe_links WHERE id = ?)
+"""
+
+UPDATE_LINK_STATUS_SQL = """
+    UPDATE unsubscribe_links
+    SET clicked = ?, click_timestamp = ?, status_code = ?, error_message = ?
+    WHERE id = ?
+       OR subscription_id = (SELECT subscription_id FROM unsubscribe_links WHERE id = ?)
+"""
+
+RECORD_DOMAIN_OUTCOME_SQL = """
+    INSERT INTO domain_stats (domain, attempts, successes, failures,
+                              consecutive_failures, success_latency,
+                              last_status_code, last_error, last_attempt_at)
+    VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (domain) DO UPDATE SET
+        attempts = attempts + 1,
+        successes = successes + excluded.successes,
+        failures = failures + excluded.failures,
+        consecutive_failures = CASE WHEN excluded.successes = 1 THEN 0
+                                    ELSE consecutive_failures + 1 END,
+        success_latency = success_latency + excluded.success_latency,
+        last_status_code = excluded.last_status_code,
+        last_error = excluded.last_error,
+        last_attempt_at = excluded.last_attempt_at
+"""
+
+UPDATE_LINK_REDIRECTS_SQL = """
+    UPDATE unsubscribe_links
+    SET final_url = ?, redirect_chain = ?, redirect_hops = ?,
+        redirect_latency = ?, shortcut_used = ?, latency_saved = ?
+    WHERE id = ?
+"""
+
+UPSERT_REDIRECT_PREFIX_SQL = """
+    INSERT INTO redirect_prefixes (prefix, param, observations, hops_total,
+                                   latency_total, last_seen_at)
+    VALUES (?, ?, 1, ?, ?, ?)
+    ON CONFLICT (prefix) DO UPDATE SET
+        observations = CASE WHEN param = excluded.param
+                            THEN observations + 1 ELSE 1 END,
+        hops_total = CASE WHEN param = excluded.param
+                          THEN hops_total + excluded.hops_total
+                          ELSE excluded.hops_total END,
+        latency_total = CASE WHEN param = excluded.param
+                             THEN latency_total + excluded.latency_total
+                             ELSE excluded.latency_total END,
+        param = excluded.param,
+        last_seen_at = excluded.last_seen_at
+"""
+
+INSERT_OPERATION_SQL = """
+    INSERT INTO operation_history (operation_type, email_id, status, details)
+    VALUES (?, ?, ?, ?)
+"""
+
+UPDATE_SCAN_CHECKPOINT_SQL = """
+    UPDATE scan_runs
+    SET checkpoint_uid = ?, done_uids = ?, processed = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+
+
+def domain_outcome_params(domain: str, success: bool, response_time: Optional[float],
+                          status_code: Optional[int], error_message: Optional[str],
+                          now: datetime) -> tuple:
+    """Build the RECORD_DOMAIN_OUTCOME_SQL parameters for a click result"""
+    latency = response_time if success and response_time else 0.0
+    return (domain, int(success), int(not success), int(not success), latency,
+            status_code, error_message, now)
+
+
+def redirect_params(link_id: int, result: Dict) -> Optional[tuple]:
+    """Build the UPDATE_LINK_REDIRECTS_SQL parameters, None if nothing was fetched"""
+    chain = result.get("redirect_chain")
+    if not result.get("final_url") or not chain:
+        return None
+    return (result["final_url"], json.dumps(chain), len(chain) - 1,
+            sum(result.get("hop_latencies") or []), bool(result.get("shortcut")),
+            result.get("latency_saved") or 0.0, link_id)
+
+
+def redirect_prefix_params(learned: Dict, now: datetime) -> tuple:
+    """Build the UPSERT_REDIRECT_PREFIX_SQL parameters for a learned tracker"""
+    return (learned["prefix"], learned["param"], learned["hops"], learned["latency"], now)
+
+
+# Sort orders of page_senders: the column sorted on (descending)
+SENDER_SORTS = {
+    "volume": "s.message_count",
+    "recent": "s.last_seen",
+}
+
+
+class Page(NamedTuple):
+    """One page of a keyset-paginated listing
+    
+    rows are sqlite3.Row tuples (indexable by column name). next_cursor is
+    the sort key and id of the last row, usually (created_at, id), to pass
+    as after= for the next page, or None on the last page.
+    """
+    rows: List[sqlite3.Row]
+    next_cursor: Optional[Tuple]
+
+
+def _routed_write(method):
+    """Send a committing write through the single writer thread, if there is one
+    
+    Decorated methods take a commit argument. With commit=False the caller
+    owns the transaction, so the method runs on the caller's connection as
+    usual.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, commit: bool = True, **kwargs):
+        writer = self.writer
+        if writer is None or not commit:
+            return method(self, *args, commit=commit, **kwargs)
+        if writer.in_writer_thread():
+            return method(self, *args, commit=False, **kwargs)
+        return writer.submit(method, self, *args, commit=False, **kwargs).result()
+    return wrapper
 
 
 class Database:
     """Main database class for managing email operations"""
     
-    def __init__(self, db_path: str = "email_automation.db"):
-        """Initialize database connection"""
+    def __init__(self, db_path: str = "email_automation.db", single_writer: bool = False,
+                 write_queue_size: int = 1000, profile: str = DEFAULT_PROFILE):
+        """Initialize database connection
+        
+        Args:
+            db_path: Path to the SQLite database file
+            single_writer: Run all committing writes on one background thread
+                           (see src/database/writer.py); readers keep their
+                           own connections
+            write_queue_size: Writes that may be queued before submitters block
+            profile: Connection performance profile (see src/database/maintenance.py)
+        """
         self.db_path = db_path
+        self.profile = profile
         # Use thread-local storage for connections
         self._local = threading.local()
+        # Migrations write with commit=False on this thread's connection
+        self.writer = None
         self.create_tables()
+        
+        if single_writer:
+            from src.database.writer import DatabaseWriter
+            self.writer = DatabaseWriter(self, max_queue=write_queue_size)
     
     def connect(self):
         """Create database connection (thread-safe)
@@ -31,12 +184,24 @@ class Database:
                 check_same_thread=False
             )
             self._local.connection.row_factory = sqlite3.Row
+            # Only takes effect on a new database (and must come before WAL
+            # mode writes the header); older ones are converted by the first
+            # vacuum maintenance run
+            self._local.connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
             # Enable WAL mode for better concurrency
             self._local.connection.execute("PRAGMA journal_mode=WAL")
+            apply_profile(self._local.connection, self.profile)
         return self._local.connection
     
     def close(self):
-        """Close database connection for current thread"""
+        """Close database connection for current thread
+        
+        Also stops the single writer thread, after it has written
+        everything queued, unless called from the writer thread itself.
+        """
+        writer = getattr(self, "writer", None)
+        if writer is not None and not writer.in_writer_thread():
+            writer.close()
         if hasattr(self._local, 'connection') and self._local.connection:
             try:
                 self._local.connection.close()
@@ -45,142 +210,347 @@ class Database:
             finally:
                 self._local.connection = None
     
+    def submit(self, func, *args, **kwargs) -> Future:
+        """
+        Run a write and return a future for its result
+        
+        In single-writer mode the write is queued for the writer thread and
+        may be grouped with other writes into one transaction; otherwise it
+        runs and is committed right away on this thread's connection.
+        
+        Args:
+            func: Callable performing the write, e.g. a Database method
+        """
+        if self.writer is not None:
+            return self.writer.submit(func, *args, **kwargs)
+        
+        future = Future()
+        conn = self.connect()
+        try:
+            result = func(*args, **kwargs)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        return future
+    
     def create_tables(self):
-        """Create all necessary tables"""
+        """Create or upgrade all tables by applying pending migrations"""
+        from src.database.migrations import migrate
+        migrate(self)
+        # SQLite builds without FTS5 have no search index (see search_emails)
+        self.has_search_index = self.connect().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emails_fts'"
+        ).fetchone() is not None
+    
+    def _add_missing_columns(self, cursor, table: str, columns: Dict[str, str]):
+        """Add columns that tables created by older versions lack"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    
+    def _attach_subscription(self, cursor, link_id: int, email_id: int, canonical_url: str):
+        """Create the link's subscription if needed and point the link at it"""
+        cursor.execute("""
+            INSERT INTO subscriptions (account_id, canonical_url, sender)
+            SELECT account_id, ?, LOWER(sender) FROM emails WHERE id = ?
+            ON CONFLICT (canonical_url, sender, COALESCE(account_id, 0)) DO NOTHING
+        """, (canonical_url, email_id))
+        cursor.execute("""
+            UPDATE unsubscribe_links
+            SET canonical_url = ?,
+                subscription_id = (
+                    SELECT s.id FROM subscriptions s
+                    JOIN emails e ON s.sender = LOWER(e.sender) AND s.account_id IS e.account_id
+                    WHERE e.id = ? AND s.canonical_url = ?
+                )
+            WHERE id = ?
+        """, (canonical_url, email_id, canonical_url, link_id))
+    
+    @_routed_write
+    def add_email(self, message_id: str, sender: str, subject: str, 
+                  received_date: datetime, category: str = "uncategorized",
+                  account_id: int = None, commit: bool = True) -> int:
+        """Add an email record
+        
+        account_id is the registered account the email was scanned from
+        (None for the configured EMAIL mailbox). Adding an email that
+        already exists (same message ID) leaves the row unchanged and
+        returns its ID.
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
-        # Email table
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS emails (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_id TEXT UNIQUE,
-                sender TEXT NOT NULL,
-                subject TEXT,
-                received_date TIMESTAMP,
-                category TEXT DEFAULT 'uncategorized',
-                has_unsubscribe_link BOOLEAN DEFAULT 0,
-                processed BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+            INSERT INTO emails (message_id, sender, subject, received_date, category, account_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (message_id) DO UPDATE SET message_id = excluded.message_id
+            RETURNING id
+        """, (message_id, sender, subject, received_date, category, account_id))
+        email_id = cursor.fetchone()[0]
+        if commit:
+            conn.commit()
+        return email_id
+    
+    @_routed_write
+    def add_unsubscribe_link(self, email_id: int, link: str, commit: bool = True) -> int:
+        """Add an unsubscribe link
         
-        # Unsubscribe links table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS unsubscribe_links (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_id INTEGER,
-                link TEXT NOT NULL,
-                clicked BOOLEAN DEFAULT 0,
-                click_timestamp TIMESTAMP,
-                status_code INTEGER,
-                error_message TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails (id)
-            )
-        """)
+        The link is canonicalized and attached to the subscription for its
+        canonical URL and the email's sender, so copies of the same endpoint
+        in different emails share one subscription. Adding a link an email
+        already has returns the existing row's ID.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        # Whitelist table
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS whitelist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_pattern TEXT UNIQUE NOT NULL,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT
-            )
-        """)
+            INSERT INTO unsubscribe_links (email_id, link)
+            VALUES (?, ?)
+            ON CONFLICT (email_id, link) DO UPDATE SET link = excluded.link
+            RETURNING id, subscription_id
+        """, (email_id, link))
+        link_id, subscription_id = cursor.fetchone()
+        if subscription_id is None:
+            self._attach_subscription(cursor, link_id, email_id, canonicalize_url(link))
+        if commit:
+            conn.commit()
+        return link_id
+    
+    @_routed_write
+    def update_link_status(self, link_id: int, clicked: bool, status_code: int = None, 
+                          error_message: str = None, commit: bool = True):
+        """Update the status of an unsubscribe link
         
-        # Blacklist table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS blacklist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email_pattern TEXT UNIQUE NOT NULL,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT
-            )
-        """)
+        The result is fanned out to the link's subscription and to every
+        other link that belongs to it. Pass commit=False to make the update
+        part of a larger transaction (the caller is then responsible for
+        committing).
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        now = datetime.now()
         
-        # Custom filters table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS custom_filters (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                pattern TEXT NOT NULL,
-                filter_type TEXT NOT NULL,
-                enabled BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        cursor.execute(UPDATE_SUBSCRIPTION_STATUS_SQL,
+                       (clicked, now, status_code, error_message, link_id))
+        cursor.execute(UPDATE_LINK_STATUS_SQL,
+                       (clicked, now, status_code, error_message, link_id, link_id))
+        if commit:
+            conn.commit()
+    
+    @_routed_write
+    def record_domain_outcome(self, domain: str, success: bool, response_time: float = None,
+                              status_code: int = None, error_message: str = None,
+                              commit: bool = True):
+        """Add a click result to the per-domain outcome statistics"""
+        if not domain:
+            return
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        # Operation history table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS operation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                operation_type TEXT NOT NULL,
-                email_id INTEGER,
-                status TEXT NOT NULL,
-                details TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (email_id) REFERENCES emails (id)
-            )
-        """)
+        cursor.execute(RECORD_DOMAIN_OUTCOME_SQL, domain_outcome_params(
+            domain, success, response_time, status_code, error_message, datetime.now()
+        ))
+        if commit:
+            conn.commit()
+    
+    @_routed_write
+    def record_redirects(self, link_id: int, result: Dict, commit: bool = True):
+        """Store the redirect chain of a click and what the redirect cache learned from it"""
+        params = redirect_params(link_id, result)
+        if params is None:
+            return
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(UPDATE_LINK_REDIRECTS_SQL, params)
+        learned = result.get("learned_redirect")
+        if learned:
+            cursor.execute(UPSERT_REDIRECT_PREFIX_SQL,
+                           redirect_prefix_params(learned, datetime.now()))
+        if commit:
+            conn.commit()
+    
+    def get_redirect_prefixes(self) -> List[Dict]:
+        """Get the learned click-tracker prefixes"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM redirect_prefixes ORDER BY observations DESC")
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_redirect_stats(self) -> Dict:
+        """Get redirect chain statistics for clicked links
+        
+        Returns the number of links with a recorded chain, their average
+        hop count and redirect latency, how many clicks skipped a tracker
+        and the total latency those shortcuts saved (seconds, estimated
+        from earlier clicks through the same tracker).
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        # Settings table
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            SELECT COUNT(*) AS links,
+                   COALESCE(AVG(redirect_hops), 0) AS avg_hops,
+                   COALESCE(AVG(redirect_latency), 0) AS avg_redirect_latency,
+                   COALESCE(SUM(shortcut_used), 0) AS shortcuts,
+                   COALESCE(SUM(latency_saved), 0) AS latency_saved
+            FROM unsubscribe_links
+            WHERE redirect_hops IS NOT NULL
         """)
+        stats = dict(cursor.fetchone())
         
-        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM redirect_prefixes")
+        stats["known_trackers"] = cursor.fetchone()[0]
+        return stats
     
-    def add_email(self, message_id: str, sender: str, subject: str, 
-                  received_date: datetime, category: str = "uncategorized") -> int:
-        """Add an email record"""
+    def get_domain_stats(self, limit: int = None) -> List[Dict]:
+        """Get per-domain click statistics, busiest domains first
+        
+        Each row also carries success_rate and avg_latency (average response
+        time of successful clicks, None if there were none).
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
-        try:
-            cursor.execute("""
-                INSERT INTO emails (message_id, sender, subject, received_date, category)
-                VALUES (?, ?, ?, ?, ?)
-            """, (message_id, sender, subject, received_date, category))
-            conn.commit()
-            return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            # Email already exists, return existing ID
-            cursor.execute("SELECT id FROM emails WHERE message_id = ?", (message_id,))
-            result = cursor.fetchone()
-            return result[0] if result else None
+        query = """
+            SELECT *,
+                   CAST(successes AS REAL) / attempts AS success_rate,
+                   success_latency / NULLIF(successes, 0) AS avg_latency
+            FROM domain_stats
+            ORDER BY attempts DESC, domain
+        """
+        params = []
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
     
-    def add_unsubscribe_link(self, email_id: int, link: str) -> int:
-        """Add an unsubscribe link"""
+    @_routed_write
+    def rebuild_senders(self, commit: bool = True):
+        """Recompute the senders table from emails and unsubscribe link results
+        
+        The table is kept up to date by triggers (see migration 8); this is
+        for repairs and the initial fill.
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
+        cursor.execute("DELETE FROM senders")
+        # category is a bare column next to MAX(), so SQLite takes it from
+        # the sender's latest email
         cursor.execute("""
-            INSERT INTO unsubscribe_links (email_id, link)
-            VALUES (?, ?)
-        """, (email_id, link))
-        conn.commit()
-        return cursor.lastrowid
+            INSERT INTO senders (address, domain, first_seen, last_seen, message_count, category)
+            SELECT LOWER(sender), LOWER(SUBSTR(sender, INSTR(sender, '@') + 1)),
+                   MIN(COALESCE(received_date, created_at)),
+                   MAX(COALESCE(received_date, created_at)), COUNT(*), category
+            FROM emails
+            GROUP BY LOWER(sender)
+        """)
+        cursor.execute("""
+            UPDATE senders SET status = 'unsubscribed', unsubscribed_at = done.at
+            FROM (
+                SELECT LOWER(e.sender) AS address, MAX(ul.click_timestamp) AS at
+                FROM unsubscribe_links ul
+                JOIN emails e ON e.id = ul.email_id
+                WHERE ul.clicked = 1 AND ul.status_code BETWEEN 200 AND 399
+                  AND ul.click_timestamp IS NOT NULL
+                GROUP BY LOWER(e.sender)
+            ) AS done
+            WHERE senders.address = done.address
+        """)
+        cursor.execute("""
+            UPDATE senders SET best_link_id = best.id
+            FROM (
+                SELECT sub.sender AS address, MAX(ul.id) AS id
+                FROM subscriptions sub
+                JOIN unsubscribe_links ul ON ul.subscription_id = sub.id AND ul.clicked = 0
+                GROUP BY sub.sender
+            ) AS best
+            WHERE senders.address = best.address
+        """)
+        if commit:
+            conn.commit()
     
-    def update_link_status(self, link_id: int, clicked: bool, status_code: int = None, 
-                          error_message: str = None):
-        """Update the status of an unsubscribe link"""
+    def get_unsubscribed_senders(self, account_id: int = None) -> Dict[str, datetime]:
+        """Get senders that were successfully unsubscribed from in one mailbox
+        
+        Args:
+            account_id: Registered account (None for the configured EMAIL
+                        mailbox); unsubscribes in other accounts do not count
+        
+        Returns:
+            Dict mapping lowercased sender address to the unsubscribe time
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
         cursor.execute("""
-            UPDATE unsubscribe_links 
-            SET clicked = ?, click_timestamp = ?, status_code = ?, error_message = ?
-            WHERE id = ?
-        """, (clicked, datetime.now(), status_code, error_message, link_id))
-        conn.commit()
+            SELECT sender, MAX(click_timestamp) FROM subscriptions
+            WHERE account_id IS ? AND clicked = 1
+              AND status_code BETWEEN 200 AND 399 AND click_timestamp IS NOT NULL
+            GROUP BY sender
+        """, (account_id,))
+        senders = {}
+        for sender, unsubscribed_at in cursor.fetchall():
+            if isinstance(unsubscribed_at, str):
+                unsubscribed_at = datetime.fromisoformat(unsubscribed_at)
+            senders[sender] = unsubscribed_at
+        return senders
+    
+    def get_known_senders(self, addresses: List[str]) -> set:
+        """Get which of the given sender addresses (any case) have been seen before, lowercased"""
+        addresses = list({address.lower() for address in addresses if address})
+        if not addresses:
+            return set()
+        cursor = self.connect().cursor()
+        cursor.execute("""
+            SELECT address FROM senders
+            WHERE address IN (SELECT value FROM json_each(?))
+        """, (json.dumps(addresses),))
+        return {row[0] for row in cursor.fetchall()}
+    
+    def get_subscription_links(self, link_ids: List[int] = None) -> List[Dict]:
+        """Get one unclicked link per subscription
+        
+        Args:
+            link_ids: Restrict to the subscriptions of these links. If None,
+                all subscriptions with unclicked links are returned.
+        
+        Returns:
+            List of dicts with the representative link id and link
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT MIN(id) AS id, link FROM unsubscribe_links
+            WHERE clicked = 0
+        """
+        params = []
+        if link_ids is not None:
+            if not link_ids:
+                return []
+            placeholders = ",".join("?" * len(link_ids))
+            query += f"""
+              AND (id IN ({placeholders}) OR subscription_id IN (
+                  SELECT subscription_id FROM unsubscribe_links
+                  WHERE id IN ({placeholders})
+              ))
+            """
+            params = list(link_ids) * 2
+        query += " GROUP BY COALESCE(subscription_id, -id) ORDER BY id"
+        
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
     
-    def add_to_whitelist(self, email_pattern: str, notes: str = None):
+    @_routed_write
+    def add_to_whitelist(self, email_pattern: str, notes: str = None, commit: bool = True):
         """Add an email pattern to whitelist"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -190,12 +560,14 @@ class Database:
                 INSERT INTO whitelist (email_pattern, notes)
                 VALUES (?, ?)
             """, (email_pattern, notes))
-            conn.commit()
+            if commit:
+                conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
     
-    def add_to_blacklist(self, email_pattern: str, notes: str = None):
+    @_routed_write
+    def add_to_blacklist(self, email_pattern: str, notes: str = None, commit: bool = True):
         """Add an email pattern to blacklist"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -205,7 +577,8 @@ class Database:
                 INSERT INTO blacklist (email_pattern, notes)
                 VALUES (?, ?)
             """, (email_pattern, notes))
-            conn.commit()
+            if commit:
+                conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -226,21 +599,27 @@ class Database:
         cursor.execute("SELECT * FROM blacklist ORDER BY added_at DESC")
         return [dict(row) for row in cursor.fetchall()]
     
-    def remove_from_whitelist(self, pattern_id: int):
+    @_routed_write
+    def remove_from_whitelist(self, pattern_id: int, commit: bool = True):
         """Remove entry from whitelist"""
         conn = self.connect()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM whitelist WHERE id = ?", (pattern_id,))
-        conn.commit()
+        if commit:
+            conn.commit()
     
-    def remove_from_blacklist(self, pattern_id: int):
+    @_routed_write
+    def remove_from_blacklist(self, pattern_id: int, commit: bool = True):
         """Remove entry from blacklist"""
         conn = self.connect()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM blacklist WHERE id = ?", (pattern_id,))
-        conn.commit()
+        if commit:
+            conn.commit()
     
-    def add_custom_filter(self, name: str, pattern: str, filter_type: str) -> int:
+    @_routed_write
+    def add_custom_filter(self, name: str, pattern: str, filter_type: str,
+                          commit: bool = True) -> int:
         """Add a custom filter"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -249,7 +628,8 @@ class Database:
             INSERT INTO custom_filters (name, pattern, filter_type)
             VALUES (?, ?, ?)
         """, (name, pattern, filter_type))
-        conn.commit()
+        if commit:
+            conn.commit()
         return cursor.lastrowid
     
     def get_custom_filters(self) -> List[Dict]:
@@ -260,65 +640,439 @@ class Database:
         cursor.execute("SELECT * FROM custom_filters WHERE enabled = 1")
         return [dict(row) for row in cursor.fetchall()]
     
+    @_routed_write
     def log_operation(self, operation_type: str, email_id: int = None, 
-                     status: str = "success", details: str = None):
+                     status: str = "success", details: str = None, commit: bool = True):
         """Log an operation to history"""
         conn = self.connect()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO operation_history (operation_type, email_id, status, details)
-            VALUES (?, ?, ?, ?)
-        """, (operation_type, email_id, status, details))
-        conn.commit()
+        cursor.execute(INSERT_OPERATION_SQL, (operation_type, email_id, status, details))
+        if commit:
+            conn.commit()
     
     def get_statistics(self) -> Dict:
-        """Get statistics about email operations"""
+        """Get statistics about email operations
+        
+        Reads the trigger-maintained counters, so the cost does not grow
+        with the size of the mailbox history.
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
-        stats = {}
+        stats = {
+            'total_processed': 0,
+            'emails_with_links': 0,
+            'links_clicked': 0,
+            'successful_clicks': 0,
+            'unique_subscriptions': 0,
+            'category_breakdown': {},
+        }
+        
+        cursor.execute("SELECT name, value FROM stat_counters")
+        for name, value in cursor.fetchall():
+            if name.startswith('category:'):
+                if value:
+                    stats['category_breakdown'][name[len('category:'):]] = value
+            else:
+                stats[name] = value
         
-        # Total emails processed
-        cursor.execute("SELECT COUNT(*) FROM emails WHERE processed = 1")
-        stats['total_processed'] = cursor.fetchone()[0]
+        return stats
+    
+    def get_daily_statistics(self, days: int = 30) -> List[Dict]:
+        """Get the per-day rollups for the last few days, oldest first"""
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        # Total emails with unsubscribe links
-        cursor.execute("SELECT COUNT(*) FROM emails WHERE has_unsubscribe_link = 1")
-        stats['emails_with_links'] = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT * FROM daily_stats
+            WHERE day >= date('now', ?)
+            ORDER BY day
+        """, (f"-{days} days",))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_routed_write
+    def rebuild_statistics(self, commit: bool = True):
+        """Recompute the statistics counters and daily rollups from scratch
         
-        # Total links clicked
-        cursor.execute("SELECT COUNT(*) FROM unsubscribe_links WHERE clicked = 1")
-        stats['links_clicked'] = cursor.fetchone()[0]
+        Operation counts include history rows that were pruned into the
+        operation_daily aggregates (see src/database/retention.py).
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
         
-        # Success rate
+        cursor.execute("DELETE FROM stat_counters")
         cursor.execute("""
-            SELECT COUNT(*) FROM unsubscribe_links 
+            INSERT INTO stat_counters (name, value)
+            SELECT 'total_processed', COUNT(*) FROM emails WHERE processed = 1
+            UNION ALL
+            SELECT 'emails_with_links', COUNT(*) FROM emails WHERE has_unsubscribe_link = 1
+            UNION ALL
+            SELECT 'links_clicked', COUNT(*) FROM unsubscribe_links WHERE clicked = 1
+            UNION ALL
+            SELECT 'successful_clicks', COUNT(*) FROM unsubscribe_links
             WHERE clicked = 1 AND status_code BETWEEN 200 AND 299
+            UNION ALL
+            SELECT 'unique_subscriptions', COUNT(*) FROM subscriptions
+            UNION ALL
+            SELECT 'category:' || COALESCE(category, 'uncategorized'), COUNT(*)
+            FROM emails GROUP BY COALESCE(category, 'uncategorized')
         """)
-        stats['successful_clicks'] = cursor.fetchone()[0]
         
-        # Category breakdown
-        cursor.execute("""
-            SELECT category, COUNT(*) as count 
-            FROM emails 
-            GROUP BY category
-        """)
-        stats['category_breakdown'] = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.execute("DELETE FROM daily_stats")
         
-        return stats
+        operations = """
+            SELECT date(timestamp) AS day, status, COUNT(*) AS count FROM operation_history
+            WHERE timestamp IS NOT NULL GROUP BY 1, 2
+        """
+        # operation_daily is created by a later migration than the one that
+        # first rebuilds the statistics
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'operation_daily'")
+        if cursor.fetchone():
+            operations += " UNION ALL SELECT day, status, count FROM operation_daily"
+        
+        rollups = [
+            ("emails_scanned", """
+                SELECT date(created_at), COUNT(*) FROM emails
+                WHERE created_at IS NOT NULL GROUP BY 1
+            """),
+            ("links_found", """
+                SELECT date(created_at), COUNT(*) FROM unsubscribe_links
+                WHERE created_at IS NOT NULL GROUP BY 1
+            """),
+            ("links_clicked", """
+                SELECT date(COALESCE(click_timestamp, created_at)), COUNT(*)
+                FROM unsubscribe_links
+                WHERE clicked = 1 AND COALESCE(click_timestamp, created_at) IS NOT NULL
+                GROUP BY 1
+            """),
+            ("successful_clicks", """
+                SELECT date(COALESCE(click_timestamp, created_at)), COUNT(*)
+                FROM unsubscribe_links
+                WHERE clicked = 1 AND status_code BETWEEN 200 AND 299
+                  AND COALESCE(click_timestamp, created_at) IS NOT NULL
+                GROUP BY 1
+            """),
+            ("operations", f"""
+                SELECT day, SUM(count) FROM ({operations}) GROUP BY 1
+            """),
+            ("failed_operations", f"""
+                SELECT day, SUM(count) FROM ({operations}) WHERE status != 'success' GROUP BY 1
+            """),
+        ]
+        for column, query in rollups:
+            cursor.execute(f"""
+                INSERT INTO daily_stats (day, {column})
+                SELECT * FROM ({query}) WHERE true
+                ON CONFLICT (day) DO UPDATE SET {column} = excluded.{column}
+            """)
+        if commit:
+            conn.commit()
     
     def get_recent_operations(self, limit: int = 50) -> List[Dict]:
         """Get recent operations"""
-        conn = self.connect()
-        cursor = conn.cursor()
+        return [dict(row) for row in self.page_operations(limit=limit).rows]
+    
+    def _keyset_page(self, query: str, conditions: List[str], params: List,
+                     order: Tuple[str, str], after: Optional[Sequence], limit: int) -> Page:
+        """
+        Run a listing query one page at a time, newest first
         
-        cursor.execute("""
-            SELECT * FROM operation_history 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        """, (limit,))
-        return [dict(row) for row in cursor.fetchall()]
+        Args:
+            query: SELECT ... FROM ... without WHERE or ORDER BY; it must
+                   select the two order columns under their own names
+            conditions: WHERE conditions, ANDed together
+            params: Parameters of the conditions
+            order: Time (or other sort) and unique id columns, e.g.
+                   ("ul.created_at", "ul.id")
+            after: Cursor returned with the previous page
+            limit: Page size
+        """
+        time_column, id_column = order
+        conditions = list(conditions)
+        params = list(params)
+        if after is not None:
+            conditions.append(f"({time_column}, {id_column}) < (?, ?)")
+            params.extend(after)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {time_column} DESC, {id_column} DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        cursor = self.connect().cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        if len(rows) <= limit:
+            return Page(rows, None)
+        rows = rows[:limit]
+        last = rows[-1]
+        time_key = time_column.split(".")[-1]
+        id_key = id_column.split(".")[-1]
+        return Page(rows, (last[time_key], last[id_key]))
+    
+    @staticmethod
+    def _listing_filters(category: Union[str, List[str], None] = None,
+                         sender: str = None) -> Tuple[List[str], List]:
+        """Build the category and sender conditions shared by the listings"""
+        conditions, params = [], []
+        if category is not None:
+            categories = [category] if isinstance(category, str) else list(category)
+            if not categories:
+                conditions.append("0")
+            else:
+                # Unary + keeps the planner walking the created_at index
+                # (no sort) instead of collecting a whole category
+                conditions.append(f"+e.category IN ({','.join('?' * len(categories))})")
+                params.extend(categories)
+        if sender:
+            conditions.append("e.sender LIKE ?")
+            params.append(f"%{sender}%")
+        return conditions, params
+    
+    def page_links(self, after: Sequence = None, limit: int = 100, clicked: bool = None,
+                   category: Union[str, List[str]] = None, sender: str = None) -> Page:
+        """
+        Get a page of unsubscribe links with their email, newest first
+        
+        Args:
+            after: Cursor from the previous page
+            limit: Page size
+            clicked: Only clicked (True) or unclicked (False) links
+            category: Email category or list of categories
+            sender: Case-insensitive substring of the sender address
+        """
+        conditions, params = self._listing_filters(category, sender)
+        if clicked is not None:
+            conditions.append("ul.clicked = ?")
+            params.append(int(clicked))
+        return self._keyset_page("""
+            SELECT ul.id, ul.link, ul.clicked, ul.click_timestamp, ul.status_code,
+                   ul.created_at, e.sender, e.subject, e.category
+            FROM unsubscribe_links ul
+            JOIN emails e ON e.id = ul.email_id
+        """, conditions, params, ("ul.created_at", "ul.id"), after, limit)
+    
+    def page_pending_subscriptions(self, after: Sequence = None, limit: int = 50,
+                                   category: Union[str, List[str]] = None,
+                                   sender: str = None) -> Page:
+        """
+        Get a page of subscriptions that still have unclicked links, newest first
+        
+        Each row is the subscription's lowest unclicked link (the one that
+        gets queued) with its email and email_count, the number of
+        unclicked links sharing the subscription.
+        """
+        conditions, params = self._listing_filters(category, sender)
+        conditions = ["ul.clicked = 0", """(ul.subscription_id IS NULL OR ul.id = (
+                SELECT MIN(m.id) FROM unsubscribe_links m
+                WHERE m.subscription_id = ul.subscription_id AND m.clicked = 0
+            ))"""] + conditions
+        return self._keyset_page("""
+            SELECT ul.id, ul.link, ul.created_at, e.sender, e.subject, e.category,
+                   CASE WHEN ul.subscription_id IS NULL THEN 1 ELSE (
+                       SELECT COUNT(*) FROM unsubscribe_links c
+                       WHERE c.subscription_id = ul.subscription_id AND c.clicked = 0
+                   ) END AS email_count
+            FROM unsubscribe_links ul
+            JOIN emails e ON e.id = ul.email_id
+        """, conditions, params, ("ul.created_at", "ul.id"), after, limit)
+    
+    def page_emails(self, after: Sequence = None, limit: int = 100, processed: bool = None,
+                    category: Union[str, List[str]] = None, sender: str = None) -> Page:
+        """Get a page of stored emails, newest first (filters as page_links)"""
+        conditions, params = self._listing_filters(category, sender)
+        if processed is not None:
+            conditions.append("e.processed = ?")
+            params.append(int(processed))
+        return self._keyset_page("""
+            SELECT e.id, e.message_id, e.sender, e.subject, e.received_date, e.category,
+                   e.has_unsubscribe_link, e.processed, e.created_at
+            FROM emails e
+        """, conditions, params, ("e.created_at", "e.id"), after, limit)
+    
+    def page_operations(self, after: Sequence = None, limit: int = 50,
+                        operation_type: Union[str, List[str]] = None,
+                        status: Union[str, List[str]] = None) -> Page:
+        """
+        Get a page of operation history, newest first
+        
+        Args:
+            after: (timestamp, id) cursor from the previous page
+            limit: Page size
+            operation_type: Operation type or list of types
+            status: Status or list of statuses
+        """
+        conditions, params = [], []
+        for column, value in (("operation_type", operation_type), ("status", status)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            conditions.append(f"{column} IN ({','.join('?' * len(values))})" if values else "0")
+            params.extend(values)
+        return self._keyset_page("""
+            SELECT id, operation_type, email_id, status, details, timestamp
+            FROM operation_history
+        """, conditions, params, ("timestamp", "id"), after, limit)
+    
+    def page_senders(self, after: Sequence = None, limit: int = 50, sort: str = "volume",
+                     category: Union[str, List[str]] = None, domain: str = None,
+                     address: str = None, status: str = None, pending: bool = None) -> Page:
+        """
+        Get a page of senders from the senders table
+        
+        Rows include pending_subscriptions, the number of the sender's
+        subscriptions that still have an unclicked link.
+        
+        Args:
+            after: Cursor from the previous page
+            limit: Page size
+            sort: "volume" (most emails first) or "recent" (latest email first)
+            category: Latest category or list of categories
+            domain: Exact sender domain
+            address: Case-insensitive substring of the sender address
+            status: "subscribed" or "unsubscribed"
+            pending: Only senders with (True) or without (False) an unclicked link
+        """
+        if sort not in SENDER_SORTS:
+            raise ValueError(f"Unknown sender sort: {sort} (expected one of {', '.join(SENDER_SORTS)})")
+        conditions, params = [], []
+        if category is not None:
+            categories = [category] if isinstance(category, str) else list(category)
+            conditions.append(f"s.category IN ({','.join('?' * len(categories))})"
+                              if categories else "0")
+            params.extend(categories)
+        if domain:
+            conditions.append("s.domain = ?")
+            params.append(domain.lower())
+        if address:
+            conditions.append("s.address LIKE ?")
+            params.append(f"%{address}%")
+        if status:
+            conditions.append("s.status = ?")
+            params.append(status)
+        if pending is not None:
+            conditions.append(f"s.best_link_id IS {'NOT ' if pending else ''}NULL")
+        return self._keyset_page("""
+            SELECT s.address, s.domain, s.first_seen, s.last_seen, s.message_count,
+                   s.category, s.status, s.unsubscribed_at, s.best_link_id,
+                   (SELECT COUNT(*) FROM subscriptions sub
+                    WHERE sub.sender = s.address AND EXISTS (
+                        SELECT 1 FROM unsubscribe_links ul
+                        WHERE ul.subscription_id = sub.id AND ul.clicked = 0
+                    )) AS pending_subscriptions
+            FROM senders s
+        """, conditions, params, (SENDER_SORTS[sort], "s.address"), after, limit)
+    
+    def get_sender_link_ids(self, addresses: List[str] = None,
+                            domains: List[str] = None) -> List[int]:
+        """
+        Get the links to queue to unsubscribe from whole senders or domains
+        
+        One unclicked link per pending subscription of the senders (the
+        lowest, as page_pending_subscriptions lists them).
+        
+        Args:
+            addresses: Sender addresses (any case)
+            domains: Sender domains; every sender at these domains is included
+        """
+        addresses = [address.lower() for address in addresses or []]
+        domains = [domain.lower() for domain in domains or []]
+        if not addresses and not domains:
+            return []
+        
+        senders = []
+        params = []
+        if addresses:
+            senders.append("SELECT value FROM json_each(?)")
+            params.append(json.dumps(addresses))
+        if domains:
+            senders.append("SELECT address FROM senders WHERE domain IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(domains))
+        
+        cursor = self.connect().cursor()
+        cursor.execute(f"""
+            SELECT MIN(ul.id) FROM subscriptions sub
+            JOIN unsubscribe_links ul ON ul.subscription_id = sub.id AND ul.clicked = 0
+            WHERE sub.sender IN ({" UNION ".join(senders)})
+            GROUP BY sub.id
+            ORDER BY 1
+        """, params)
+        return [row[0] for row in cursor.fetchall()]
+    
+    def search_emails(self, query: str, limit: int = 50, after: Sequence = None) -> Page:
+        """
+        Search stored emails by sender, subject and category, newest first
+        
+        Every word or "quoted phrase" of the query must appear somewhere in
+        the three fields (case-insensitive substrings); prefix a term with
+        sender:, subject: or category: to search one field only (see
+        src/database/search.py). Terms are looked up in the emails_fts
+        index; terms under three characters are checked with LIKE on the
+        index matches, or on all emails if nothing else narrows them down.
+        
+        Rows are ordered by email id, newest stored first, which the index
+        returns without sorting, so the cursor is just (id,).
+        
+        Args:
+            query: Search box text
+            limit: Page size
+            after: Cursor from the previous page
+        """
+        terms = parse_search_query(query)
+        if not terms:
+            return Page([], None)
+        
+        indexed = [term for term in terms
+                   if self.has_search_index and len(term.text) >= MIN_INDEXED_TERM_LENGTH]
+        
+        conditions, params = [], []
+        if indexed:
+            query = "FROM emails_fts JOIN emails e ON e.id = emails_fts.rowid"
+            id_column = "emails_fts.rowid"
+            conditions.append("emails_fts MATCH ?")
+            params.append(fts_match_expression(indexed))
+        else:
+            query = "FROM emails e"
+            id_column = "e.id"
+        for term in terms:
+            if term in indexed:
+                continue
+            columns = [term.column] if term.column else SEARCH_COLUMNS
+            conditions.append("(" + " OR ".join(f"e.{column} LIKE ?" for column in columns) + ")")
+            params.extend([f"%{term.text}%"] * len(columns))
+        if after is not None:
+            conditions.append(f"{id_column} < ?")
+            params.append(after[0])
+        params.append(limit + 1)
+        
+        cursor = self.connect().cursor()
+        cursor.execute(f"""
+            SELECT e.id, e.message_id, e.sender, e.subject, e.received_date, e.category,
+                   e.has_unsubscribe_link, e.processed, e.created_at
+            {query}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {id_column} DESC LIMIT ?
+        """, params)
+        rows = cursor.fetchall()
+        if len(rows) <= limit:
+            return Page(rows, None)
+        rows = rows[:limit]
+        return Page(rows, (rows[-1]["id"],))
+    
+    def iter_pages(self, page_method: Callable[..., Page], page_size: int = 500,
+                   **filters) -> Iterator[sqlite3.Row]:
+        """
+        Yield every row of a paginated listing, one page in memory at a time
+        
+        Example: for row in db.iter_pages(db.page_links, clicked=True): ...
+        """
+        after = None
+        while True:
+            page = page_method(after=after, limit=page_size, **filters)
+            yield from page.rows
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
     
     def get_unprocessed_emails(self) -> List[Dict]:
         """Get unprocessed emails"""
@@ -332,7 +1086,9 @@ class Database:
         """)
         return [dict(row) for row in cursor.fetchall()]
     
-    def mark_email_processed(self, email_id: int, has_unsubscribe: bool = False):
+    @_routed_write
+    def mark_email_processed(self, email_id: int, has_unsubscribe: bool = False,
+                             commit: bool = True):
         """Mark an email as processed"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -342,9 +1098,11 @@ class Database:
             SET processed = 1, has_unsubscribe_link = ?
             WHERE id = ?
         """, (has_unsubscribe, email_id))
-        conn.commit()
+        if commit:
+            conn.commit()
     
-    def update_email_category(self, email_id: int, category: str):
+    @_routed_write
+    def update_email_category(self, email_id: int, category: str, commit: bool = True):
         """Update email category"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -354,7 +1112,8 @@ class Database:
             SET category = ?
             WHERE id = ?
         """, (category, email_id))
-        conn.commit()
+        if commit:
+            conn.commit()
     
     def get_setting(self, key: str) -> Optional[str]:
         """Get a setting value"""
@@ -365,7 +1124,8 @@ class Database:
         result = cursor.fetchone()
         return result[0] if result else None
     
-    def set_setting(self, key: str, value: str):
+    @_routed_write
+    def set_setting(self, key: str, value: str, commit: bool = True):
         """Set a setting value"""
         conn = self.connect()
         cursor = conn.cursor()
@@ -374,4 +1134,231 @@ class Database:
             INSERT OR REPLACE INTO settings (key, value, updated_at)
             VALUES (?, ?, CURRENT_TIMESTAMP)
         """, (key, value))
-        conn.commit()
+        if commit:
+            conn.commit()
+    
+    @_routed_write
+    def create_scan_run(self, criteria: str, uids: List[int], uidvalidity: int = None,
+                        folder: str = "INBOX", account_id: int = None,
+                        commit: bool = True) -> int:
+        """
+        Record the start of a scan over the given message UIDs
+        
+        Only the UID range is stored: a resumed run searches the same
+        criteria within it again (see EmailUnsubscribeOrchestrator.iter_scan).
+        account_id is None for the mailbox configured by EMAIL.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO scan_runs (account_id, folder, criteria, uidvalidity, first_uid,
+                                   last_uid, total)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (account_id, folder, criteria, uidvalidity, min(uids, default=None),
+              max(uids, default=None), len(uids)))
+        if commit:
+            conn.commit()
+        return cursor.lastrowid
+    
+    def get_scan_run(self, run_id: int) -> Optional[Dict]:
+        """Get a scan run, with done_uids decoded"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM scan_runs WHERE id = ?", (run_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["done_uids"] = json.loads(run["done_uids"] or "[]")
+        return run
+    
+    def get_scan_runs(self, limit: int = 20, status: str = None) -> List[Dict]:
+        """Get the most recent scan runs, optionally with one status"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT r.id, r.account_id, a.name AS account, r.folder, r.criteria, r.total,
+                   r.processed, r.checkpoint_uid, r.last_uid, r.status, r.error,
+                   r.started_at, r.updated_at, r.finished_at
+            FROM scan_runs r
+            LEFT JOIN accounts a ON a.id = r.account_id
+        """
+        params = []
+        if status:
+            query += " WHERE r.status = ?"
+            params.append(status)
+        query += " ORDER BY r.id DESC LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_routed_write
+    def set_scan_run_status(self, run_id: int, status: str, error: str = None,
+                            timings: Dict = None, commit: bool = True):
+        """
+        Mark a scan run running, completed, interrupted or failed
+        
+        Args:
+            run_id: Scan run ID
+            status: New status
+            error: Error that stopped the run
+            timings: Per-stage timings of the scan (see get_scan_timings);
+                     earlier ones are kept if None
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE scan_runs
+            SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP,
+                finished_at = CASE WHEN ? = 'completed' THEN CURRENT_TIMESTAMP END,
+                timings = COALESCE(?, timings)
+            WHERE id = ?
+        """, (status, error, status, json.dumps(timings) if timings else None, run_id))
+        if commit:
+            conn.commit()
+    
+    def get_scan_timings(self, limit: int = 10) -> List[Dict]:
+        """
+        Get the per-stage timings of the most recent scans that recorded them
+        
+        Returns:
+            One dict per scan run mapping stage name ("headers", "fetch",
+            "parse", "write") to its workers, items and busy_seconds
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT timings FROM scan_runs
+            WHERE timings IS NOT NULL
+            ORDER BY id DESC LIMIT ?
+        """, (limit,))
+        return [json.loads(row[0]) for row in cursor.fetchall()]
+    
+    def get_stored_message_ids(self, message_ids: List[str]) -> set:
+        """Get which of the given message IDs are already stored as emails"""
+        message_ids = [message_id for message_id in set(message_ids) if message_id]
+        if not message_ids:
+            return set()
+        cursor = self.connect().cursor()
+        cursor.execute("""
+            SELECT message_id FROM emails
+            WHERE message_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(message_ids),))
+        return {row[0] for row in cursor.fetchall()}
+    
+    def get_open_scan_run(self, account_id: Optional[int], folder: str) -> Optional[int]:
+        """
+        Get the latest unfinished (interrupted, or running when the process
+        died) scan run of a mailbox, if any
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id FROM scan_runs
+            WHERE account_id IS ? AND folder = ? AND status IN ('running', 'interrupted')
+            ORDER BY id DESC LIMIT 1
+        """, (account_id, folder))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    @_routed_write
+    def add_account(self, name: str, email_address: str, credentials_ref: str,
+                    imap_server: str = "imap.gmail.com", folders: List[str] = None,
+                    commit: bool = True) -> int:
+        """
+        Register a mailbox for the scan scheduler, or update it by name
+        
+        Args:
+            name: Unique account name
+            email_address: Login address
+            credentials_ref: Where the password is found (env:NAME or
+                             file:PATH, see resolve_secret)
+            imap_server: IMAP server host
+            folders: Mailboxes to scan (default INBOX)
+        
+        Returns:
+            Account ID
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO accounts (name, email_address, imap_server, credentials_ref, folders)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                email_address = excluded.email_address,
+                imap_server = excluded.imap_server,
+                credentials_ref = excluded.credentials_ref,
+                folders = excluded.folders
+        """, (name, email_address, imap_server, credentials_ref, json.dumps(folders or ["INBOX"])))
+        cursor.execute("SELECT id FROM accounts WHERE name = ?", (name,))
+        account_id = cursor.fetchone()[0]
+        if commit:
+            conn.commit()
+        return account_id
+    
+    def get_account(self, account_id: int) -> Optional[Dict]:
+        """Get an account, with folders decoded"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        account = dict(row)
+        account["folders"] = json.loads(account["folders"])
+        return account
+    
+    def get_accounts(self, enabled_only: bool = False) -> List[Dict]:
+        """Get all accounts by name, with folders decoded"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        query = "SELECT * FROM accounts"
+        if enabled_only:
+            query += " WHERE enabled = 1"
+        cursor.execute(query + " ORDER BY name")
+        accounts = [dict(row) for row in cursor.fetchall()]
+        for account in accounts:
+            account["folders"] = json.loads(account["folders"])
+        return accounts
+    
+    @_routed_write
+    def set_account_enabled(self, name: str, enabled: bool, commit: bool = True) -> bool:
+        """Include or exclude an account from scheduled scans; False if it doesn't exist"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("UPDATE accounts SET enabled = ? WHERE name = ?", (enabled, name))
+        if commit:
+            conn.commit()
+        return cursor.rowcount > 0
+    
+    @_routed_write
+    def remove_account(self, name: str, commit: bool = True) -> bool:
+        """Delete an account (its scan runs are kept); False if it doesn't exist"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM accounts WHERE name = ?", (name,))
+        if commit:
+            conn.commit()
+        return cursor.rowcount > 0
+    
+    @_routed_write
+    def touch_account(self, account_id: int, commit: bool = True):
+        """Record that an account finished a scheduled scan"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("UPDATE accounts SET last_scan_at = CURRENT_TIMESTAMP WHERE id = ?",
+                       (account_id,))
+        if commit:
+            conn.commit()
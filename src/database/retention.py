@@ -0,0 +1,137 @@
+"""Operation history retention: roll up, archive and prune old rows"""
+import gzip
+import json
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+
+from src.database.models import Database
+
+
+UPSERT_OPERATION_DAILY_SQL = """
+    INSERT INTO operation_daily (day, operation_type, status, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (day, operation_type, status) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def segment_path(archive_dir: str, timestamp: str) -> str:
+    """Get the archive segment (one per month) for a history timestamp"""
+    return os.path.join(archive_dir, f"operation_history-{timestamp[:7]}.jsonl.gz")
+
+
+def _archive(archive_dir: str, rows: List[Dict]) -> List[str]:
+    """
+    Append rows to their monthly segments and sync them to disk
+
+    Each call appends one gzip member per segment; gzip readers treat
+    concatenated members as a single stream.
+    """
+    by_segment: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_segment.setdefault(segment_path(archive_dir, str(row["timestamp"])), []).append(row)
+
+    for path, segment_rows in by_segment.items():
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for row in segment_rows:
+                    f.write(json.dumps(row, default=str).encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+    return list(by_segment)
+
+
+def prune_operation_history(db: Database, retention_days: int = 30,
+                            archive_dir: str = "operation_archive", batch_size: int = 1000,
+                            max_batches: int = None, pause_seconds: float = 0.05) -> Dict:
+    """
+    Move operation history older than the retention period into the archive
+
+    Works oldest first in batches of batch_size rows. Each batch is written
+    to the archive segments and synced, then counted into operation_daily
+    and deleted in one short transaction (through the writer thread in
+    single-writer mode), and the next batch waits pause_seconds so other
+    writers get the database in between. Whole days are kept: the cutoff
+    is midnight (UTC, like the stored timestamps) retention_days ago.
+
+    A crash between archiving and deleting a batch archives its rows again
+    on the next run; archived rows keep their id so readers can drop
+    duplicates.
+
+    Args:
+        db: Database to prune
+        retention_days: Days of detailed history to keep (0 or less keeps all)
+        archive_dir: Directory for the compressed JSONL segments
+        batch_size: Rows per batch
+        max_batches: Stop after this many batches (None runs until done)
+        pause_seconds: Sleep between batches
+
+    Returns:
+        Dict with archived (rows), batches, segments (paths written) and cutoff
+    """
+    logger = logging.getLogger(__name__)
+    results = {"archived": 0, "batches": 0, "segments": [], "cutoff": None}
+    if retention_days <= 0:
+        return results
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    results["cutoff"] = cutoff
+    os.makedirs(archive_dir, exist_ok=True)
+    cursor = db.connect().cursor()
+
+    while max_batches is None or results["batches"] < max_batches:
+        cursor.execute("""
+            SELECT id, operation_type, email_id, status, details, timestamp
+            FROM operation_history
+            WHERE timestamp < ?
+            ORDER BY timestamp, id
+            LIMIT ?
+        """, (cutoff, batch_size))
+        rows = [dict(row) for row in cursor.fetchall()]
+        if not rows:
+            break
+
+        for path in _archive(archive_dir, rows):
+            if path not in results["segments"]:
+                results["segments"].append(path)
+
+        daily = Counter((str(row["timestamp"])[:10], row["operation_type"], row["status"])
+                        for row in rows)
+        ids = [row["id"] for row in rows]
+
+        def remove_batch():
+            conn = db.connect()
+            conn.executemany(UPSERT_OPERATION_DAILY_SQL,
+                             [(*key, count) for key, count in daily.items()])
+            conn.execute(f"DELETE FROM operation_history WHERE id IN ({','.join('?' * len(ids))})",
+                         ids)
+
+        db.submit(remove_batch).result()
+        results["archived"] += len(rows)
+        results["batches"] += 1
+
+        if len(rows) < batch_size:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    if results["archived"]:
+        logger.info(f"Archived {results['archived']} operation history rows "
+                    f"older than {cutoff} in {results['batches']} batches")
+    return results
+
+
+def iter_archived_operations(archive_dir: str = "operation_archive") -> Iterator[Dict]:
+    """Yield archived operation history rows, oldest segment first"""
+    if not os.path.isdir(archive_dir):
+        return
+    for name in sorted(os.listdir(archive_dir)):
+        if not (name.startswith("operation_history-") and name.endswith(".jsonl.gz")):
+            continue
+        with gzip.open(os.path.join(archive_dir, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -0,0 +1,53 @@
+"""Search box query parsing for the emails full-text index"""
+import re
+from typing import List, NamedTuple, Optional
+
+
+# Columns of the emails_fts index, in index order
+SEARCH_COLUMNS = ("sender", "subject", "category")
+
+# The trigram tokenizer indexes 3-character substrings, so shorter terms
+# cannot be looked up in the index and are matched with LIKE instead
+MIN_INDEXED_TERM_LENGTH = 3
+
+_TERM_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+
+
+class SearchTerm(NamedTuple):
+    """One word or quoted phrase of a search, optionally limited to a column"""
+    column: Optional[str]
+    text: str
+
+
+def parse_search_query(query: str) -> List[SearchTerm]:
+    """
+    Split a search box query into terms that must all match
+
+    Words and "quoted phrases" each become a term matching anywhere in the
+    sender, subject or category, case-insensitively. A sender:, subject:
+    or category: prefix limits a term to that field; * wildcards are
+    dropped since every term is already a substring match.
+
+    Example: 'sender:shop "black friday"'
+    """
+    terms = []
+    for match in _TERM_RE.finditer(query or ""):
+        column, phrase, word = match.groups()
+        text = phrase if phrase is not None else word
+        if column is not None and column.lower() not in SEARCH_COLUMNS:
+            # Not a field prefix, e.g. a time like 10:30
+            text = f"{column}:{text}"
+            column = None
+        text = text.strip().strip("*")
+        if text:
+            terms.append(SearchTerm(column.lower() if column else None, text))
+    return terms
+
+
+def fts_match_expression(terms: List[SearchTerm]) -> str:
+    """Build an FTS5 MATCH expression requiring every term"""
+    parts = []
+    for term in terms:
+        quoted = '"' + term.text.replace('"', '""') + '"'
+        parts.append(f"{term.column} : {quoted}" if term.column else quoted)
+    return " AND ".join(parts)
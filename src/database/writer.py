@@ -0,0 +1,157 @@
+"""Single-writer background thread for SQLite writes"""
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+
+_STOP = object()
+
+
+class DatabaseWriter:
+    """Background thread that owns the database's write connection
+
+    Writes are submitted as callables and queued on a bounded queue (a full
+    queue blocks the submitter, which throttles producers to the speed of
+    the disk). The thread drains up to max_batch queued writes at a time and
+    runs them in one transaction, so concurrent writers neither contend for
+    the write lock nor pay an fsync each. Every write runs under its own
+    savepoint: one that raises is rolled back on its own and its future gets
+    the exception, while the rest of the batch still commits. Futures are
+    resolved after the commit, so a caller waiting on one sees its write.
+
+    Callables run on the writer thread, where Database.connect() returns the
+    writer's connection; Database methods can therefore be submitted as-is
+    with commit=False.
+    """
+
+    def __init__(self, db, max_queue: int = 1000, max_batch: int = 500):
+        """Initialize and start the writer thread"""
+        self.db = db
+        self.max_batch = max_batch
+        self.logger = logging.getLogger(__name__)
+        self.transactions = 0
+        self.writes = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    @property
+    def running(self) -> bool:
+        """Whether the writer thread is alive"""
+        return self._thread.is_alive()
+
+    def in_writer_thread(self) -> bool:
+        """Whether the caller is running on the writer thread"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a write and return a future for its result
+
+        Args:
+            func: Callable that performs the write on Database.connect()
+                  without committing (None only marks the batch durable,
+                  see checkpoint())
+
+        Returns:
+            Future resolved with func's return value once it is committed
+        """
+        if not self.running:
+            raise RuntimeError("Database writer is stopped")
+        future: Future = Future()
+        if self.in_writer_thread():
+            # Nested write from inside a queued callable: already in a transaction
+            future.set_result(func(*args, **kwargs) if func else None)
+            return future
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def checkpoint(self) -> Future:
+        """
+        Make every write queued so far durable
+
+        Returns:
+            Future resolved once the transaction holding the writes queued
+            before this call has been committed with synchronous=FULL
+        """
+        return self.submit(None)
+
+    def close(self, timeout: Optional[float] = None):
+        """Write everything still queued and stop the thread"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Writer thread main loop"""
+        conn = self.db.connect()
+        # Transactions are managed explicitly below
+        conn.isolation_level = None
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._started.set()
+
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self._queue.get()]
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [item for item in batch if item is not _STOP]
+                if batch:
+                    self._write_batch(conn, batch)
+        finally:
+            conn.execute("PRAGMA synchronous=FULL")
+            self.db.close()
+
+    def _write_batch(self, conn, batch: List[Tuple]):
+        """Run a batch of queued writes in one transaction"""
+        outcomes = []
+        durable = any(func is None for _, func, _, _ in batch)
+        if durable:
+            conn.execute("PRAGMA synchronous=FULL")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if func is None:
+                    outcomes.append((future, None, None))
+                    continue
+                conn.execute("SAVEPOINT queued_write")
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO queued_write")
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+                conn.execute("RELEASE queued_write")
+            conn.execute("COMMIT")
+        except Exception as e:
+            self.logger.error(f"Database writer transaction failed: {str(e)}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(future, None, e) for future, _, _, _ in batch
+                        if not future.cancelled()]
+        finally:
+            if durable:
+                conn.execute("PRAGMA synchronous=NORMAL")
+
+        self.transactions += 1
+        self.writes += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
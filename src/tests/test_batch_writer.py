@@ -0,0 +1,172 @@
+"""Tests for batched database writes"""
+import unittest
+import os
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+from src.core.scan_progress import ScanProgress
+from src.database.models import Database
+from src.database.batch_writer import BatchWriter
+
+
+class TestBatchWriter(unittest.TestCase):
+    """Test cases for BatchWriter class"""
+
+    def setUp(self):
+        """Set up test database"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def count(self, table: str) -> int:
+        """Count committed rows from a separate connection"""
+        other = Database(self.temp_db.name)
+        try:
+            return other.connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            other.close()
+
+    def test_buffers_until_flush(self):
+        """Test nothing is written before a flush"""
+        writer = BatchWriter(self.db, max_records=100, max_delay_ms=60000)
+        writer.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now())
+
+        self.assertEqual(writer.pending, 1)
+        self.assertEqual(self.count("emails"), 0)
+
+        writer.flush()
+
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self.count("emails"), 1)
+        writer.close()
+
+    def test_flushes_every_n_records(self):
+        """Test reaching max_records flushes the batch"""
+        writer = BatchWriter(self.db, max_records=3, max_delay_ms=60000)
+        for idx in range(7):
+            writer.log_operation("scan", details=str(idx))
+
+        self.assertEqual(writer.flushes, 2)
+        self.assertEqual(writer.pending, 1)
+        self.assertEqual(self.count("operation_history"), 6)
+        writer.close()
+
+    def test_flushes_after_interval(self):
+        """Test a buffered write older than max_delay_ms triggers a flush"""
+        writer = BatchWriter(self.db, max_records=100, max_delay_ms=50)
+        with patch("src.database.batch_writer.time.monotonic", side_effect=[0.0, 0.01, 0.1]):
+            writer.log_operation("scan", details="first")
+            writer.log_operation("scan", details="second")
+
+        self.assertEqual(writer.flushes, 1)
+        self.assertEqual(self.count("operation_history"), 2)
+        writer.close()
+
+    def test_scanned_email_with_links(self):
+        """Test links and log entries are attached to emails by message ID"""
+        with BatchWriter(self.db) as writer:
+            writer.add_email("<1@shop.com>", "News@Shop.com", "Hi", datetime.now(),
+                             "marketing", has_unsubscribe_link=True)
+            writer.add_unsubscribe_link("<1@shop.com>", "https://shop.com/unsub?utm_source=a")
+            writer.add_email("<2@shop.com>", "news@shop.com", "Hi again", datetime.now(),
+                             "marketing", has_unsubscribe_link=True)
+            writer.add_unsubscribe_link("<2@shop.com>", "https://shop.com/unsub?utm_source=b")
+            writer.log_operation("scan", status="success", details="Found 1",
+                                 message_id="<2@shop.com>")
+
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT processed, has_unsubscribe_link FROM emails")
+        self.assertEqual([tuple(row) for row in cursor.fetchall()], [(1, 1), (1, 1)])
+        cursor.execute("SELECT COUNT(DISTINCT subscription_id) FROM unsubscribe_links")
+        self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(len(self.db.get_subscription_links()), 1)
+        cursor.execute("""
+            SELECT e.message_id FROM operation_history o JOIN emails e ON e.id = o.email_id
+        """)
+        self.assertEqual(cursor.fetchone()[0], "<2@shop.com>")
+
+    def test_rescanned_email_is_marked_processed(self):
+        """Test an existing email keeps its row and is marked processed"""
+        email_id = self.db.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now())
+
+        with BatchWriter(self.db) as writer:
+            writer.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now(),
+                             has_unsubscribe_link=True)
+
+        emails = self.db.get_unprocessed_emails()
+        self.assertEqual(emails, [])
+        row = self.db.connect().execute("SELECT id FROM emails").fetchall()
+        self.assertEqual([r[0] for r in row], [email_id])
+
+    def test_click_results_fan_out(self):
+        """Test buffered link status updates behave like Database.update_link_status"""
+        first = self.db.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now())
+        second = self.db.add_email("<2@shop.com>", "news@shop.com", "Hi", datetime.now())
+        link_id = self.db.add_unsubscribe_link(first, "https://shop.com/unsub")
+        self.db.add_unsubscribe_link(second, "https://shop.com/unsub")
+
+        with BatchWriter(self.db) as writer:
+            writer.update_link_status(link_id, True, 200, None)
+            writer.record_domain_outcome("shop.com", True, 0.2, 200)
+
+        stats = self.db.get_statistics()
+        self.assertEqual(stats["links_clicked"], 2)
+        self.assertIn("news@shop.com", self.db.get_unsubscribed_senders())
+        self.assertEqual(self.db.get_domain_stats()[0]["successes"], 1)
+
+    def test_scan_progress_is_read_once_per_flush(self):
+        """Test a run's checkpoint is built when the batch flushes, not per message"""
+        run_id = self.db.create_scan_run("ALL", list(range(1, 11)))
+        progress = ScanProgress(range(1, 11))
+        writer = BatchWriter(self.db, max_records=4, max_delay_ms=60000)
+
+        with patch.object(progress, "state", wraps=progress.state) as state:
+            for uid in range(10, 0, -1):
+                progress.mark_done(uid)
+                writer.set_scan_progress(run_id, progress)
+
+            self.assertEqual((writer.flushes, state.call_count), (2, 2))
+            self.assertEqual(self.db.get_scan_run(run_id)["done_uids"], [[3, 10]])
+            writer.close()
+
+        run = self.db.get_scan_run(run_id)
+        self.assertEqual((run["checkpoint_uid"], run["done_uids"], run["processed"]),
+                         (10, [], 10))
+
+    def test_failed_flush_rolls_back(self):
+        """Test a failing batch writes nothing and is discarded"""
+        writer = BatchWriter(self.db, max_records=100)
+        writer.log_operation("scan", details="kept out")
+        writer._operations.append(("scan", None, None, None, "status is NOT NULL"))
+        writer._pending += 1
+
+        with self.assertRaises(Exception):
+            writer.flush()
+
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(self.count("operation_history"), 0)
+        writer.close()
+
+    def test_close_restores_synchronous(self):
+        """Test the connection's synchronous setting is restored on close"""
+        conn = self.db.connect()
+        before = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+        writer = BatchWriter(self.db)
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        writer.log_operation("scan")
+        writer.close()
+
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], before)
+        self.assertEqual(self.count("operation_history"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
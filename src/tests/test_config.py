@@ -14,7 +14,7 @@ class TestConfig(unittest.TestCase):
         # Clear environment variables
         for key in ['EMAIL', 'EMAIL_ADDRESS', 'PASSWORD', 'EMAIL_PASSWORD', 
                     'IMAP_SERVER', 'DATABASE_PATH', 'MAX_EMAILS_PER_SCAN',
-                    'LINK_CLICK_DELAY', 'REQUEST_TIMEOUT']:
+                    'LINK_CLICK_DELAY', 'REQUEST_TIMEOUT', 'DB_SINGLE_WRITER']:
             if key in os.environ:
                 del os.environ[key]
     
@@ -122,6 +122,13 @@ class TestConfig(unittest.TestCase):
         config = Config()
         self.assertEqual(config.request_timeout, 10)
     
+    def test_db_single_writer(self):
+        """Test the single writer flag defaults to off and accepts true"""
+        self.assertFalse(Config().db_single_writer)
+        os.environ['DB_SINGLE_WRITER'] = 'true'
+        self.addCleanup(os.environ.pop, 'DB_SINGLE_WRITER', None)
+        self.assertTrue(Config().db_single_writer)
+    
     def test_validate_missing_email(self):
         """Test validation fails without email"""
         config = Config()
@@ -1,6 +1,7 @@
 """Tests for database models"""
 import unittest
 import os
+import sqlite3
 import tempfile
 from datetime import datetime
 
@@ -41,11 +42,21 @@ class TestDatabase(unittest.TestCase):
         tables = [row[0] for row in cursor.fetchall()]
         
         expected_tables = [
+            'accounts',
             'blacklist',
+            'click_jobs',
             'custom_filters',
+            'daily_stats',
             'emails',
+            'emails_fts',
+            'operation_daily',
             'operation_history',
+            'redirect_prefixes',
+            'scan_runs',
+            'senders',
             'settings',
+            'stat_counters',
+            'subscriptions',
             'unsubscribe_links',
             'whitelist'
         ]
@@ -98,6 +109,20 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNotNone(link_id)
         self.assertIsInstance(link_id, int)
     
+    def test_add_duplicate_unsubscribe_link(self):
+        """Test adding a link an email already has returns the existing ID"""
+        email_id = self.db.add_email("test123", "test@example.com", "Test", datetime.now())
+        
+        link_id1 = self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+        link_id2 = self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+        
+        self.assertEqual(link_id1, link_id2)
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT COUNT(*), MIN(subscription_id) FROM unsubscribe_links")
+        count, subscription_id = cursor.fetchone()
+        self.assertEqual(count, 1)
+        self.assertIsNotNone(subscription_id)
+    
     def test_update_link_status(self):
         """Test updating link status"""
         email_id = self.db.add_email(
@@ -120,6 +145,89 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(result[0], 1)  # clicked = True (1 in SQLite)
         self.assertEqual(result[1], 200)
     
+    def test_links_share_subscription(self):
+        """Test tracked copies of one endpoint share a subscription"""
+        email_id1 = self.db.add_email("test1", "news@example.com", "Jan", datetime.now())
+        email_id2 = self.db.add_email("test2", "News@Example.com", "Feb", datetime.now())
+        email_id3 = self.db.add_email("test3", "other@example.com", "Mar", datetime.now())
+        
+        self.db.add_unsubscribe_link(email_id1, "https://example.com/unsub?utm_source=jan")
+        self.db.add_unsubscribe_link(email_id2, "https://EXAMPLE.com/unsub?mc_eid=42")
+        self.db.add_unsubscribe_link(email_id3, "https://example.com/unsub")
+        
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT subscription_id FROM unsubscribe_links")
+        # Same endpoint for two different senders is two subscriptions
+        self.assertEqual(len(cursor.fetchall()), 2)
+        self.assertEqual(len(self.db.get_subscription_links()), 2)
+    
+    def test_update_link_status_fans_out(self):
+        """Test a click result is applied to every link of the subscription"""
+        email_id1 = self.db.add_email("test1", "news@example.com", "Jan", datetime.now())
+        email_id2 = self.db.add_email("test2", "news@example.com", "Feb", datetime.now())
+        link_id1 = self.db.add_unsubscribe_link(email_id1, "https://example.com/unsub?utm_source=a")
+        link_id2 = self.db.add_unsubscribe_link(email_id2, "https://example.com/unsub?utm_source=b")
+        
+        self.assertEqual(self.db.get_subscription_links([link_id2]),
+                         [{"id": link_id1, "link": "https://example.com/unsub?utm_source=a"}])
+        
+        self.db.update_link_status(link_id1, True, 200, None)
+        
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT clicked, status_code FROM unsubscribe_links WHERE id = ?", (link_id2,))
+        self.assertEqual(tuple(cursor.fetchone()), (1, 200))
+        cursor.execute("SELECT clicked FROM subscriptions")
+        self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(self.db.get_subscription_links(), [])
+    
+    def test_existing_links_are_upgraded(self):
+        """Test links stored before canonicalization get subscriptions"""
+        self.db.close()
+        os.unlink(self.temp_db.name)
+        conn = sqlite3.connect(self.temp_db.name)
+        conn.execute("""
+            CREATE TABLE emails (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT UNIQUE,
+                sender TEXT NOT NULL, subject TEXT, received_date TIMESTAMP,
+                category TEXT DEFAULT 'uncategorized',
+                has_unsubscribe_link BOOLEAN DEFAULT 0, processed BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE unsubscribe_links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, email_id INTEGER,
+                link TEXT NOT NULL, clicked BOOLEAN DEFAULT 0,
+                click_timestamp TIMESTAMP, status_code INTEGER, error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO emails (message_id, sender) VALUES ('a', 'news@example.com')")
+        conn.execute("INSERT INTO emails (message_id, sender) VALUES ('b', 'news@example.com')")
+        conn.execute("INSERT INTO unsubscribe_links (email_id, link) VALUES (1, 'https://example.com/u?utm_source=a')")
+        conn.execute("INSERT INTO unsubscribe_links (email_id, link) VALUES (2, 'https://example.com/u?utm_source=b')")
+        conn.execute("""
+            UPDATE unsubscribe_links SET clicked = 1, status_code = 200,
+                                         click_timestamp = '2024-01-01 00:00:00'
+            WHERE id = 1
+        """)
+        conn.commit()
+        conn.close()
+        
+        self.db = Database(self.temp_db.name)
+        
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT canonical_url, subscription_id FROM unsubscribe_links")
+        rows = [tuple(row) for row in cursor.fetchall()]
+        self.assertEqual(rows[0], rows[1])
+        self.assertEqual(rows[0][0], "https://example.com/u")
+        self.assertIsNotNone(rows[0][1])
+        # The legacy click result reaches the subscription and the skip list
+        self.assertEqual(self.db.get_unsubscribed_senders(),
+                         {"news@example.com": datetime(2024, 1, 1)})
+    
     def test_whitelist_operations(self):
         """Test whitelist add, get, and remove"""
         # Add to whitelist
@@ -270,6 +378,156 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(stats["successful_clicks"], 1)
         self.assertIn("newsletter", stats["category_breakdown"])
         self.assertIn("promotion", stats["category_breakdown"])
+    
+    def test_statistics_follow_updates(self):
+        """Test counters track recategorized, reclicked and deleted rows"""
+        email_id = self.db.add_email("test1", "news@example.com", "Jan", datetime.now(),
+                                     "newsletter")
+        link_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsub")
+        self.db.update_link_status(link_id, True, 500, "Server error")
+        self.db.update_link_status(link_id, True, 200, None)
+        self.db.update_email_category(email_id, "promotion")
+        other_id = self.db.add_email("test2", "other@example.com", "Feb", datetime.now())
+        self.db.connect().execute("DELETE FROM emails WHERE id = ?", (other_id,))
+        
+        stats = self.db.get_statistics()
+        
+        self.assertEqual(stats["links_clicked"], 1)
+        self.assertEqual(stats["successful_clicks"], 1)
+        self.assertEqual(stats["unique_subscriptions"], 1)
+        self.assertEqual(stats["category_breakdown"], {"promotion": 1})
+        
+        daily = self.db.get_daily_statistics()
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily[0]["emails_scanned"], 1)
+        self.assertEqual(daily[0]["links_found"], 1)
+        self.assertEqual(daily[0]["successful_clicks"], 1)
+    
+    def test_page_links_walks_every_row_once(self):
+        """Test (created_at, id) cursors neither skip nor repeat rows with equal timestamps"""
+        for idx in range(7):
+            email_id = self.db.add_email(f"test{idx}", "news@example.com", "Hi", datetime.now(),
+                                         "newsletter" if idx % 2 else "promotion")
+            self.db.add_unsubscribe_link(email_id, f"https://example.com/u{idx}")
+        
+        seen = []
+        page = self.db.page_links(limit=3)
+        seen += [row["id"] for row in page.rows]
+        while page.next_cursor is not None:
+            page = self.db.page_links(after=page.next_cursor, limit=3)
+            seen += [row["id"] for row in page.rows]
+        
+        self.assertEqual(seen, list(range(7, 0, -1)))
+        newsletters = list(self.db.iter_pages(self.db.page_links, page_size=2,
+                                              category=["newsletter"]))
+        self.assertEqual([row["id"] for row in newsletters], [6, 4, 2])
+        self.assertEqual(self.db.page_links(sender="NEWS@").rows[0]["sender"], "news@example.com")
+        self.assertEqual(self.db.page_links(sender="other").rows, [])
+    
+    def test_page_pending_subscriptions(self):
+        """Test pending subscriptions are listed once with their link count"""
+        for idx in range(3):
+            email_id = self.db.add_email(f"test{idx}", "news@example.com", "Hi", datetime.now())
+            self.db.add_unsubscribe_link(email_id, f"https://example.com/unsub?utm_source={idx}")
+        other_id = self.db.add_email("other", "shop@example.org", "Sale", datetime.now())
+        clicked_id = self.db.add_unsubscribe_link(other_id, "https://example.org/unsub")
+        self.db.update_link_status(clicked_id, True, 200, None)
+        
+        page = self.db.page_pending_subscriptions()
+        
+        self.assertEqual([(row["id"], row["email_count"]) for row in page.rows], [(1, 3)])
+        self.assertIsNone(page.next_cursor)
+    
+    def test_page_operations(self):
+        """Test operation history pages filter by type and status"""
+        for idx in range(5):
+            self.db.log_operation("scan" if idx % 2 else "unsubscribe", None,
+                                  "success" if idx < 3 else "failed")
+        
+        first = self.db.page_operations(limit=2, status=["success"])
+        second = self.db.page_operations(after=first.next_cursor, limit=2, status=["success"])
+        
+        self.assertEqual([row["id"] for row in first.rows + second.rows], [3, 2, 1])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(len(self.db.page_operations(operation_type="scan").rows), 2)
+    
+    def test_search_emails(self):
+        """Test search matches substrings of every term and follows updates"""
+        self.db.add_email("a", "news@MyShop.com", "Black Friday deals", datetime.now(), "marketing")
+        self.db.add_email("b", "deals@shopify.com", "Friday digest", datetime.now(), "newsletter")
+        other_id = self.db.add_email("c", "me@example.org", "Re: 10:30 call", datetime.now())
+        
+        def ids(query, **kwargs):
+            return [row["id"] for row in self.db.search_emails(query, **kwargs).rows]
+        
+        self.assertEqual(ids("shop"), [2, 1])
+        self.assertEqual(ids('sender:shop "black friday"'), [1])
+        self.assertEqual(ids("subject:shop"), [])
+        self.assertEqual(ids("category:news friday"), [2])
+        self.assertEqual(ids("re 10:30"), [3])
+        self.assertEqual(ids("   "), [])
+        
+        first = self.db.search_emails("*friday*", limit=1)
+        self.assertEqual(first.next_cursor, (2,))
+        self.assertEqual(ids("friday", after=first.next_cursor), [1])
+        
+        self.db.update_email_category(other_id, "personal")
+        self.assertEqual(ids("category:personal"), [3])
+        self.db.connect().execute("DELETE FROM emails WHERE id = 1")
+        self.assertEqual(ids("black"), [])
+    
+    def test_senders_follow_emails_and_links(self):
+        """Test the senders table tracks volume, category, best link and status"""
+        first = self.db.add_email("a", "News@Shop.com", "Hi", datetime(2024, 1, 1), "marketing")
+        second = self.db.add_email("b", "news@shop.com", "Hi", datetime(2024, 1, 3), "newsletter")
+        other = self.db.add_email("c", "deals@shop.com", "Sale", datetime(2024, 1, 2), "marketing")
+        first_link = self.db.add_unsubscribe_link(first, "https://shop.com/u?list=1")
+        second_link = self.db.add_unsubscribe_link(second, "https://shop.com/u?list=2")
+        other_link = self.db.add_unsubscribe_link(other, "https://shop.com/u?list=3")
+        
+        senders = {row["address"]: row for row in self.db.page_senders().rows}
+        news = senders["news@shop.com"]
+        self.assertEqual(news["message_count"], 2)
+        self.assertEqual(news["category"], "newsletter")
+        self.assertEqual(news["best_link_id"], second_link)
+        self.assertEqual(news["pending_subscriptions"], 2)
+        self.assertEqual([row["address"] for row in self.db.page_senders(sort="recent").rows],
+                         ["news@shop.com", "deals@shop.com"])
+        self.assertEqual(self.db.get_sender_link_ids(["NEWS@shop.com"]), [first_link, second_link])
+        self.assertEqual(self.db.get_sender_link_ids(domains=["shop.com"]),
+                         [first_link, second_link, other_link])
+        
+        self.db.update_link_status(second_link, True, 200, None)
+        
+        news = self.db.page_senders(address="news@").rows[0]
+        self.assertEqual(news["status"], "unsubscribed")
+        self.assertEqual(news["best_link_id"], first_link)
+        self.assertIn("news@shop.com", self.db.get_unsubscribed_senders())
+        self.assertEqual(self.db.page_senders(status="unsubscribed", limit=5).next_cursor, None)
+        
+        before = [dict(row) for row in self.db.page_senders().rows]
+        self.db.rebuild_senders()
+        self.assertEqual([dict(row) for row in self.db.page_senders().rows], before)
+    
+    def test_rebuild_statistics(self):
+        """Test rebuilding gives the same counters the triggers maintain"""
+        for idx in range(3):
+            email_id = self.db.add_email(f"test{idx}", "news@example.com", "Hi",
+                                         datetime.now(), "newsletter")
+            self.db.mark_email_processed(email_id, True)
+            link_id = self.db.add_unsubscribe_link(email_id, f"https://example.com/u{idx}")
+            self.db.log_operation("scan", email_id, "success" if idx else "error")
+        self.db.update_link_status(link_id, True, 200, None)
+        
+        stats = self.db.get_statistics()
+        daily = self.db.get_daily_statistics()
+        self.db.connect().execute("UPDATE stat_counters SET value = 99")
+        self.db.rebuild_statistics()
+        
+        self.assertEqual(self.db.get_statistics(), stats)
+        self.assertEqual(self.db.get_daily_statistics(), daily)
+        self.assertEqual(daily[0]["operations"], 3)
+        self.assertEqual(daily[0]["failed_operations"], 1)
 
 
 if __name__ == "__main__":
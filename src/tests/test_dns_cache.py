@@ -0,0 +1,134 @@
+"""Tests for the DNS cache and click engine connection tuning"""
+import unittest
+import socket
+from unittest.mock import Mock, patch
+
+from src.core.dns_cache import DNSCache, SessionReusingSSLContext
+from src.core.unsubscribe_handler import UnsubscribeHandler, TunedHTTPAdapter
+
+
+def fake_resolver(host, port, family=0, type=0, proto=0, flags=0):
+    """Resolve every host to a fixed IPv4 and IPv6 address"""
+    if host == "missing.example.com":
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return [
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0)),
+        (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("::1", 0, 0, 0)),
+    ]
+
+
+class TestDNSCache(unittest.TestCase):
+    """Test cases for DNSCache class"""
+
+    def setUp(self):
+        """Set up a cache with a counting fake resolver"""
+        self.resolver = Mock(side_effect=fake_resolver)
+        self.cache = DNSCache(ttl=60, negative_ttl=5, resolver=self.resolver)
+
+    def test_lookup_is_cached(self):
+        """Test a host is resolved only once within the TTL"""
+        self.cache.lookup("example.com")
+        self.cache.lookup("example.com")
+
+        self.assertEqual(self.resolver.call_count, 1)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_lookup_expires(self):
+        """Test entries are resolved again after the TTL"""
+        with patch("src.core.dns_cache.time.monotonic", return_value=1000):
+            self.cache.lookup("example.com")
+        with patch("src.core.dns_cache.time.monotonic", return_value=1061):
+            self.cache.lookup("example.com")
+
+        self.assertEqual(self.resolver.call_count, 2)
+
+    def test_negative_caching(self):
+        """Test failed lookups are cached too"""
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                self.cache.lookup("missing.example.com")
+
+        self.assertEqual(self.resolver.call_count, 1)
+
+    def test_getaddrinfo_sets_port_and_filters_family(self):
+        """Test answers are derived from the cached addresses"""
+        results = self.cache.getaddrinfo("example.com", 443, socket.AF_INET, socket.SOCK_STREAM)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], socket.AF_INET)
+        self.assertEqual(results[0][4], ("127.0.0.1", 443))
+
+        results = self.cache.getaddrinfo("example.com", "80")
+        self.assertEqual(results[1][4], ("::1", 80, 0, 0))
+        self.assertEqual(self.resolver.call_count, 1)
+
+    def test_prefetch_resolves_in_parallel_once(self):
+        """Test prefetch resolves each uncached host once"""
+        self.cache.lookup("a.example.com")
+
+        results = self.cache.prefetch(["a.example.com", "b.example.com", "b.example.com",
+                                       "missing.example.com", ""])
+
+        self.assertEqual(results, {"b.example.com": True, "missing.example.com": False})
+        self.assertEqual(self.resolver.call_count, 3)
+
+    def test_connections_retry_failed_lookups(self):
+        """Test a cached failure is resolved again by connections but not by prefetch"""
+        with self.assertRaises(socket.gaierror):
+            self.cache.lookup("missing.example.com")
+        self.assertEqual(self.cache.prefetch(["missing.example.com"]), {})
+
+        with self.assertRaises(socket.gaierror):
+            self.cache.getaddrinfo("missing.example.com", 443)
+        self.assertEqual(self.resolver.call_count, 2)
+
+    def test_only_the_click_session_uses_the_cache(self):
+        """Test the handler's connections resolve through the cache and nothing else does"""
+        original = socket.getaddrinfo
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        self.addCleanup(server.close)
+        handler = UnsubscribeHandler(dns_cache=self.cache)
+
+        adapter = handler.session.get_adapter("http://example.com")
+        pool = adapter.poolmanager.connection_from_url(
+            f"http://example.com:{server.getsockname()[1]}"
+        )
+        conn = pool._new_conn()
+        conn.connect()
+        conn.close()
+
+        self.assertIs(socket.getaddrinfo, original)
+        self.resolver.assert_called_once_with("example.com", None, 0, socket.SOCK_STREAM)
+
+
+class TestClickEngineTuning(unittest.TestCase):
+    """Test cases for connection tuning in UnsubscribeHandler"""
+
+    def test_adapter_pool_sizes(self):
+        """Test the session uses the tuned adapter and pool sizes"""
+        handler = UnsubscribeHandler(pool_connections=50, pool_maxsize=3)
+
+        adapter = handler.session.get_adapter("https://example.com")
+        self.assertIsInstance(adapter, TunedHTTPAdapter)
+        self.assertEqual(adapter._pool_connections, 50)
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_tls_session_reuse_context(self):
+        """Test the shared SSL context is passed to the pool manager"""
+        handler = UnsubscribeHandler(reuse_tls_sessions=True)
+
+        self.assertIsInstance(handler.ssl_context, SessionReusingSSLContext)
+        adapter = handler.session.get_adapter("https://example.com")
+        self.assertIs(adapter.poolmanager.connection_pool_kw["ssl_context"], handler.ssl_context)
+
+    def test_prefetch_without_cache(self):
+        """Test prefetching is a no-op without a DNS cache"""
+        handler = UnsubscribeHandler()
+        self.assertEqual(handler.prefetch_hosts(["example.com"]), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 """Tests for email manager"""
 import unittest
+import imaplib
 from unittest.mock import Mock, MagicMock, patch
 from datetime import datetime
 import email as email_module
@@ -270,6 +271,87 @@ class TestEmailManagerIntegration(unittest.TestCase):
         manager.disconnect()
         
         mock_mail.logout.assert_called_once()
+    
+    @patch('imaplib.IMAP4_SSL')
+    def test_fetch_headers(self, mock_imap):
+        """Test fetching headers for several emails in one round trip"""
+        mock_mail = MagicMock()
+        mock_imap.return_value = mock_mail
+        mock_mail.uid.return_value = ("OK", [
+            (b'1 (UID 101 RFC822.SIZE 2048 BODY[HEADER.FIELDS (FROM SUBJECT)] {40}', b'From: a@example.com\r\nSubject: One\r\n\r\n'),
+            b')',
+            (b'2 (UID 102 BODY[HEADER.FIELDS (FROM SUBJECT)] {40}', b'From: b@example.com\r\nSubject: Two\r\n\r\n'),
+            b')',
+        ])
+        
+        manager = EmailManager("test@example.com", "password")
+        manager.connect()
+        sizes = {}
+        headers = manager.fetch_headers([b"101", b"102"], sizes=sizes)
+        
+        self.assertEqual(mock_mail.uid.call_count, 1)
+        self.assertEqual(mock_mail.uid.call_args[0][:2], ("FETCH", "101,102"))
+        self.assertIn("BODY.PEEK", mock_mail.uid.call_args[0][2])
+        self.assertEqual(headers[b"101"]["From"], "a@example.com")
+        self.assertEqual(headers[b"102"]["Subject"], "Two")
+        self.assertEqual(sizes, {b"101": 2048})
+        
+        mock_mail.uid.reset_mock()
+        calls = []
+        manager.fetch_headers([b"101", b"102", b"103"], batch_size=1,
+                              stop=lambda: calls.append(1) or len(calls) > 2)
+        
+        self.assertEqual(mock_mail.uid.call_count, 2)
+    
+    @patch('imaplib.IMAP4_SSL')
+    def test_mailbox_status(self, mock_imap):
+        """Test the folder's counters are read with one STATUS command"""
+        mock_mail = MagicMock()
+        mock_imap.return_value = mock_mail
+        mock_mail.status.return_value = ("OK", [
+            b'"Archive 2024" (MESSAGES 231 UNSEEN 3 UIDNEXT 44292 UIDVALIDITY 7)'
+        ])
+        
+        manager = EmailManager("test@example.com", "password", folder="Archive 2024")
+        manager.connect()
+        status = manager.mailbox_status()
+        
+        mock_mail.status.assert_called_once_with('"Archive 2024"',
+                                                 "(MESSAGES UNSEEN UIDNEXT UIDVALIDITY)")
+        self.assertEqual(status, {"messages": 231, "unseen": 3, "uidnext": 44292,
+                                  "uidvalidity": 7})
+    
+    @patch('src.core.email_manager.time.sleep')
+    @patch('imaplib.IMAP4_SSL')
+    def test_reconnect_with_backoff(self, mock_imap, mock_sleep):
+        """Test a dropped connection is re-established and the command retried"""
+        dead, fresh = MagicMock(), MagicMock()
+        mock_imap.side_effect = [dead, fresh]
+        dead.uid.side_effect = imaplib.IMAP4.abort("socket error: EOF")
+        fresh.uid.return_value = ("OK", [(b"1 (UID 7 RFC822 {30}", b"Subject: Hi\r\n\r\nBody")])
+        
+        manager = EmailManager("test@example.com", "password", reconnect_backoff=0.5)
+        manager.connect()
+        msg = manager.fetch_email(b"7")
+        
+        self.assertEqual(msg["Subject"], "Hi")
+        self.assertEqual(manager.reconnects, 1)
+        mock_sleep.assert_called_once_with(0.5)
+    
+    @patch('src.core.email_manager.time.sleep')
+    @patch('imaplib.IMAP4_SSL')
+    def test_reconnect_gives_up(self, mock_imap, mock_sleep):
+        """Test a connection that cannot be restored raises instead of failing every email"""
+        mock_mail = MagicMock()
+        mock_imap.return_value = mock_mail
+        mock_mail.uid.side_effect = ConnectionResetError("reset by peer")
+        
+        manager = EmailManager("test@example.com", "password", reconnect_attempts=3)
+        manager.connect()
+        with self.assertRaises(ConnectionError):
+            manager.fetch_email(b"7")
+        
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list], [1.0, 2.0, 4.0])
 
 
 if __name__ == "__main__":
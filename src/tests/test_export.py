@@ -0,0 +1,115 @@
+"""Tests for streaming exports"""
+import unittest
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from src.database.batch_writer import BatchWriter
+from src.database.export import export_dataset, export_incremental, pyarrow
+from src.database.models import Database
+
+
+class TestExport(unittest.TestCase):
+    """Test cases for CSV/JSONL export, filters and incremental watermarks"""
+
+    def setUp(self):
+        """Set up test database with two emails and their links"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.out_dir = tempfile.mkdtemp()
+        self.db = Database(self.temp_db.name)
+
+        shop = self.db.add_email("<1@test>", "news@shop.com", "Sale", datetime(2024, 1, 5),
+                                 category="marketing")
+        digest = self.db.add_email("<2@test>", "digest@news.io", "Weekly", datetime(2024, 3, 1),
+                                   category="newsletter")
+        self.clicked = self.db.add_unsubscribe_link(shop, "https://shop.com/unsub")
+        self.db.add_unsubscribe_link(digest, "https://news.io/unsub")
+        self.db.update_link_status(self.clicked, True, status_code=200)
+
+    def tearDown(self):
+        """Clean up test database and exports"""
+        self.db.close()
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def _path(self, name):
+        return os.path.join(self.out_dir, name)
+
+    def test_csv_export(self):
+        """Test links are written as CSV with a header and joined email fields"""
+        result = export_dataset(self.db, "links", self._path("links.csv"))
+
+        with open(result["path"], newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(result["rows"], 2)
+        self.assertEqual([row["sender"] for row in rows], ["news@shop.com", "digest@news.io"])
+        self.assertEqual([row["status"] for row in rows], ["success", "pending"])
+        self.assertEqual(result["watermark"], int(rows[-1]["id"]))
+        self.assertFalse(os.path.exists(self._path("links.csv.tmp")))
+
+    def test_gzip_jsonl_with_filters(self):
+        """Test filters apply and gzip output is valid JSON lines"""
+        path = self._path("emails.jsonl.gz")
+        result = export_dataset(self.db, "emails", path, fmt="jsonl", compression="gzip",
+                                date_from="2024-02-01", category=["newsletter", "marketing"])
+
+        with gzip.open(path, "rt") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(result["rows"], 1)
+        self.assertEqual(rows[0]["message_id"], "<2@test>")
+
+        result = export_dataset(self.db, "links", self._path("pending.csv"), status="pending")
+        self.assertEqual(result["rows"], 1)
+
+        with self.assertRaises(ValueError):
+            export_dataset(self.db, "operations", self._path("ops.csv"), category="marketing")
+
+    def test_incremental_export(self):
+        """Test a named incremental export only writes rows added since its last run"""
+        first = export_incremental(self.db, "warehouse", "links", self._path("1.csv"))
+        self.assertEqual(first["rows"], 2)
+
+        empty = export_incremental(self.db, "warehouse", "links", self._path("2.csv"))
+        self.assertEqual(empty["rows"], 0)
+        self.assertEqual(empty["watermark"], first["watermark"])
+
+        email_id = self.db.add_email("<3@test>", "a@b.com", "New", datetime(2024, 4, 1))
+        self.db.add_unsubscribe_link(email_id, "https://b.com/unsub")
+        third = export_incremental(self.db, "warehouse", "links", self._path("3.csv"))
+        self.assertEqual(third["rows"], 1)
+        self.assertGreater(third["watermark"], first["watermark"])
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_parquet_requires_pyarrow(self):
+        """Test a Parquet export without pyarrow fails before writing anything"""
+        with self.assertRaises(RuntimeError):
+            export_dataset(self.db, "links", self._path("links.parquet"), fmt="parquet")
+        self.assertEqual(os.listdir(self.out_dir), [])
+
+    def test_memory_does_not_grow_with_rows(self):
+        """Test peak memory stays flat as the exported table grows"""
+        def peak_for(count):
+            with BatchWriter(self.db, max_records=5000) as writer:
+                for idx in range(count):
+                    writer.add_email(f"<bulk{count}-{idx}@test>", "bulk@test.com",
+                                     "x" * 100, datetime(2024, 5, 1))
+            tracemalloc.start()
+            export_dataset(self.db, "emails", self._path(f"{count}.csv"), chunk_size=500)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        small = peak_for(2000)
+        large = peak_for(20000)
+        self.assertLess(large, small * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Tests for per-domain host policy"""
+import unittest
+import os
+import tempfile
+
+from src.database.models import Database
+from src.core.host_policy import HostPolicy
+
+
+class TestHostPolicy(unittest.TestCase):
+    """Test cases for HostPolicy class"""
+
+    def setUp(self):
+        """Set up test database and policy"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+        self.policy = HostPolicy(self.db, base_timeout=10, min_timeout=2,
+                                 latency_factor=4, failure_threshold=3)
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_record_domain_outcome(self):
+        """Test outcomes are aggregated per domain"""
+        self.db.record_domain_outcome("example.com", True, 0.5, 200)
+        self.db.record_domain_outcome("example.com", True, 1.5, 200)
+        self.db.record_domain_outcome("example.com", False, None, 500, "HTTP 500")
+
+        stats = self.db.get_domain_stats()[0]
+
+        self.assertEqual(stats["attempts"], 3)
+        self.assertEqual(stats["successes"], 2)
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(stats["consecutive_failures"], 1)
+        self.assertAlmostEqual(stats["avg_latency"], 1.0)
+        self.assertAlmostEqual(stats["success_rate"], 2 / 3)
+        self.assertEqual(stats["last_error"], "HTTP 500")
+
+    def test_success_resets_failure_streak(self):
+        """Test a success resets the consecutive failure counter"""
+        self.db.record_domain_outcome("example.com", False, None, None, "Connection error")
+        self.db.record_domain_outcome("example.com", False, None, None, "Connection error")
+        self.db.record_domain_outcome("example.com", True, 0.2, 200)
+
+        self.assertEqual(self.db.get_domain_stats()[0]["consecutive_failures"], 0)
+
+    def test_dead_domain(self):
+        """Test domains with a long failure streak are considered dead"""
+        for _ in range(3):
+            self.db.record_domain_outcome("dead.com", False, None, None, "Connection error")
+        self.db.record_domain_outcome("flaky.com", False, None, None, "Request timeout")
+        self.policy.load()
+
+        self.assertTrue(self.policy.is_dead("dead.com"))
+        self.assertFalse(self.policy.is_dead("flaky.com"))
+        self.assertFalse(self.policy.is_dead("unknown.com"))
+
+    def test_timeout_for(self):
+        """Test known-good hosts get a timeout sized to their latency"""
+        self.db.record_domain_outcome("fast.com", True, 0.1, 200)
+        self.db.record_domain_outcome("slow.com", True, 1.5, 200)
+        self.db.record_domain_outcome("crawl.com", True, 8.0, 200)
+        self.policy.load()
+
+        self.assertEqual(self.policy.timeout_for("fast.com"), 2)
+        self.assertEqual(self.policy.timeout_for("slow.com"), 6)
+        self.assertEqual(self.policy.timeout_for("crawl.com"), 10)
+        self.assertEqual(self.policy.timeout_for("unknown.com"), 10)
+
+    def test_order(self):
+        """Test reliable fast hosts come first and dead hosts last"""
+        self.db.record_domain_outcome("fast.com", True, 0.1, 200)
+        self.db.record_domain_outcome("slow.com", True, 2.0, 200)
+        for _ in range(3):
+            self.db.record_domain_outcome("dead.com", False, None, None, "Connection error")
+        self.policy.load()
+
+        items = [{"domain": d} for d in ("dead.com", "unknown.com", "slow.com", "fast.com")]
+        ordered = [item["domain"] for item in self.policy.order(items)]
+
+        self.assertEqual(ordered, ["fast.com", "slow.com", "unknown.com", "dead.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
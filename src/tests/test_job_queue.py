@@ -0,0 +1,290 @@
+"""Tests for the click job queue and workers"""
+import unittest
+import os
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from src.database.models import Database
+from src.database.job_queue import JobQueue
+from src.core.worker import ClickWorker
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for JobQueue class"""
+
+    def setUp(self):
+        """Set up test database and queue"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+        self.queue = JobQueue(self.db, lease_seconds=60, max_attempts=2)
+
+        email_id = self.db.add_email(
+            message_id="test123",
+            sender="test@example.com",
+            subject="Test",
+            received_date=datetime.now()
+        )
+        self.link_ids = [
+            self.db.add_unsubscribe_link(email_id, f"https://example.com/unsub{i}")
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_enqueue(self):
+        """Test enqueueing links creates pending jobs"""
+        enqueued = self.queue.enqueue(self.link_ids)
+
+        self.assertEqual(enqueued, 3)
+        self.assertEqual(self.queue.get_counts()["pending"], 3)
+
+    def test_enqueue_is_idempotent(self):
+        """Test enqueueing the same link twice creates one job"""
+        self.queue.enqueue(self.link_ids)
+        enqueued = self.queue.enqueue(self.link_ids)
+
+        self.assertEqual(enqueued, 0)
+        self.assertEqual(self.queue.get_counts()["pending"], 3)
+
+    def test_enqueue_skips_clicked_links(self):
+        """Test already clicked links are not queued"""
+        self.db.update_link_status(self.link_ids[0], True, 200, None)
+
+        enqueued = self.queue.enqueue(self.link_ids)
+
+        self.assertEqual(enqueued, 2)
+
+    def test_enqueue_dedupes_subscriptions(self):
+        """Test copies of one endpoint produce a single job"""
+        email_id = self.db.add_email("test456", "test@example.com", "Test 2", datetime.now())
+        copy_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsub0?utm_source=x")
+
+        enqueued = self.queue.enqueue([copy_id])
+
+        self.assertEqual(enqueued, 1)
+        job = self.queue.lease("worker-1")[0]
+        self.assertEqual(job["link_id"], self.link_ids[0])
+
+    def test_enqueue_all_unclicked(self):
+        """Test queueing all unclicked links"""
+        self.assertEqual(self.queue.enqueue_all_unclicked(), 3)
+
+    def test_lease_batch(self):
+        """Test leasing marks jobs as leased and counts attempts"""
+        self.queue.enqueue(self.link_ids)
+
+        jobs = self.queue.lease("worker-1", batch_size=2)
+
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]["attempts"], 1)
+        self.assertIn("link", jobs[0])
+        counts = self.queue.get_counts()
+        self.assertEqual(counts["leased"], 2)
+        self.assertEqual(counts["pending"], 1)
+
+    def test_lease_does_not_hand_out_leased_jobs(self):
+        """Test two workers never receive the same job"""
+        self.queue.enqueue(self.link_ids)
+
+        first = self.queue.lease("worker-1", batch_size=2)
+        second = self.queue.lease("worker-2", batch_size=2)
+
+        first_ids = {job["id"] for job in first}
+        second_ids = {job["id"] for job in second}
+        self.assertEqual(len(second), 1)
+        self.assertFalse(first_ids & second_ids)
+
+    def test_expired_lease_is_released(self):
+        """Test jobs from a crashed worker become available again"""
+        self.queue.enqueue(self.link_ids[:1])
+        self.queue.lease("worker-1")
+
+        with patch("src.database.job_queue.time.time", return_value=time.time() + 120):
+            jobs = self.queue.lease("worker-2")
+
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["attempts"], 2)
+
+    def test_expired_lease_on_final_attempt_fails(self):
+        """Test jobs that run out of attempts are marked failed"""
+        self.queue.enqueue(self.link_ids[:1])
+        self.queue.lease("worker-1")
+        with patch("src.database.job_queue.time.time", return_value=time.time() + 120):
+            self.queue.lease("worker-2")
+
+        with patch("src.database.job_queue.time.time", return_value=time.time() + 240):
+            jobs = self.queue.lease("worker-3")
+
+        self.assertEqual(jobs, [])
+        self.assertEqual(self.queue.get_counts()["failed"], 1)
+
+    def test_complete_updates_link_and_job(self):
+        """Test completing a job records the click result atomically"""
+        self.queue.enqueue(self.link_ids[:1])
+        job = self.queue.lease("worker-1")[0]
+
+        self.queue.complete(job, {"success": True, "status_code": 200, "error_message": None})
+
+        self.assertEqual(self.queue.get_job(job["id"])["state"], "done")
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT clicked, status_code FROM unsubscribe_links WHERE id = ?",
+                       (job["link_id"],))
+        self.assertEqual(tuple(cursor.fetchone()), (1, 200))
+        self.assertEqual(self.db.get_recent_operations(10)[0]["status"], "success")
+
+    def test_complete_failed_click(self):
+        """Test an unsuccessful click marks the job failed"""
+        self.queue.enqueue(self.link_ids[:1])
+        job = self.queue.lease("worker-1")[0]
+
+        self.queue.complete(job, {"success": False, "status_code": 404, "error_message": "HTTP 404"})
+
+        job_row = self.queue.get_job(job["id"])
+        self.assertEqual(job_row["state"], "failed")
+        self.assertEqual(job_row["last_error"], "HTTP 404")
+
+    def test_failed_click_can_be_requeued(self):
+        """Test a link whose click failed stays unclicked and is queued again"""
+        self.queue.enqueue(self.link_ids[:1])
+        job = self.queue.lease("worker-1")[0]
+        self.queue.complete(job, {"success": False, "status_code": 500, "error_message": "HTTP 500"})
+
+        self.assertEqual(self.queue.enqueue_all_unclicked(), 3)
+        job_row = self.queue.get_job(job["id"])
+        self.assertEqual((job_row["state"], job_row["attempts"]), ("pending", 0))
+        self.assertIn(job["id"], [leased["id"] for leased in self.queue.lease("worker-1")])
+
+    def test_lease_orders_by_domain_reliability(self):
+        """Test jobs on reliable hosts are leased first"""
+        email_id = self.db.add_email("test456", "other@example.com", "Test 2", datetime.now())
+        good_link = self.db.add_unsubscribe_link(email_id, "https://good.example.org/unsub")
+        self.db.record_domain_outcome("example.com", False, None, 500, "HTTP 500")
+        self.db.record_domain_outcome("good.example.org", True, 0.2, 200)
+        self.queue.enqueue(self.link_ids + [good_link])
+
+        jobs = self.queue.lease("worker-1", batch_size=1)
+
+        self.assertEqual(jobs[0]["link_id"], good_link)
+        self.assertEqual(jobs[0]["domain"], "good.example.org")
+
+    def test_dead_domain_is_skipped_unless_forced(self):
+        """Test jobs on failing hosts are failed unless forced"""
+        for _ in range(3):
+            self.db.record_domain_outcome("example.com", False, None, None, "Connection error")
+        self.queue.enqueue(self.link_ids[:1])
+        self.queue.enqueue(self.link_ids[1:2], force=True)
+
+        jobs = self.queue.lease("worker-1")
+
+        self.assertEqual([job["link_id"] for job in jobs], [self.link_ids[1]])
+        self.assertEqual(self.queue.get_counts()["failed"], 1)
+
+    def test_complete_records_domain_outcome(self):
+        """Test completing a job updates the domain statistics"""
+        self.queue.enqueue(self.link_ids[:1])
+        job = self.queue.lease("worker-1")[0]
+
+        self.queue.complete(job, {"success": True, "status_code": 200,
+                                  "error_message": None, "response_time": 0.3})
+
+        stats = self.db.get_domain_stats()[0]
+        self.assertEqual(stats["domain"], "example.com")
+        self.assertEqual(stats["successes"], 1)
+
+    def test_release_retries_then_fails(self):
+        """Test released jobs are retried until max attempts"""
+        self.queue.enqueue(self.link_ids[:1])
+
+        job = self.queue.lease("worker-1")[0]
+        self.queue.release(job, "boom")
+        self.assertEqual(self.queue.get_job(job["id"])["state"], "pending")
+
+        job = self.queue.lease("worker-1")[0]
+        self.queue.release(job, "boom")
+        self.assertEqual(self.queue.get_job(job["id"])["state"], "failed")
+
+    def test_failed_job_can_be_requeued(self):
+        """Test failed jobs are reset when enqueued again"""
+        self.queue.enqueue(self.link_ids[:1])
+        job = self.queue.lease("worker-1")[0]
+        self.queue.release(job, "boom")
+        job = self.queue.lease("worker-1")[0]
+        self.queue.release(job, "boom")
+
+        enqueued = self.queue.enqueue(self.link_ids[:1])
+
+        self.assertEqual(enqueued, 1)
+        job_row = self.queue.get_job(job["id"])
+        self.assertEqual(job_row["state"], "pending")
+        self.assertEqual(job_row["attempts"], 0)
+
+
+class TestClickWorker(unittest.TestCase):
+    """Test cases for ClickWorker class"""
+
+    def setUp(self):
+        """Set up test database and worker"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+
+        config = Mock()
+        config.database_path = self.temp_db.name
+        config.request_timeout = 5
+        config.link_click_delay = 0
+        config.worker_lease_seconds = 60
+        config.dns_cache_ttl = 0
+        config.click_pool_connections = 10
+        config.click_pool_maxsize = 4
+        config.worker_batch_size = 10
+        config.redirect_shortcut_min_observations = 2
+        self.worker = ClickWorker(config, db=self.db, worker_id="test-worker")
+
+        email_id = self.db.add_email(
+            message_id="test123",
+            sender="test@example.com",
+            subject="Test",
+            received_date=datetime.now()
+        )
+        self.link_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsub")
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_run_processes_queue(self):
+        """Test the worker drains the queue"""
+        self.worker.queue.enqueue([self.link_id])
+        self.worker.unsubscribe_handler.click_link = Mock(return_value={
+            "success": True, "status_code": 200, "error_message": None, "response_time": 0.1
+        })
+
+        processed = self.worker.run(stop_when_empty=True)
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(self.worker.queue.get_counts()["done"], 1)
+
+    def test_run_once_releases_on_error(self):
+        """Test a worker-side error puts the job back in the queue"""
+        self.worker.queue.enqueue([self.link_id])
+        self.worker.unsubscribe_handler.click_link = Mock(side_effect=RuntimeError("boom"))
+
+        self.worker.run_once()
+
+        counts = self.worker.queue.get_counts()
+        self.assertEqual(counts["pending"], 1)
+        self.assertEqual(counts["leased"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
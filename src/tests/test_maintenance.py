@@ -0,0 +1,222 @@
+"""Tests for database profiles, maintenance and the daemon schedule"""
+import unittest
+import os
+import sqlite3
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import Mock, patch
+
+from src.core.daemon import Daemon
+from src.database.maintenance import apply_profile, run_maintenance
+from src.database.models import Database
+from src.utils.metrics import REGISTRY
+
+
+class TestMaintenance(unittest.TestCase):
+    """Test cases for performance profiles and maintenance tasks"""
+
+    def setUp(self):
+        """Set up test database path"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+
+    def tearDown(self):
+        """Clean up test database"""
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_profile_pragmas(self):
+        """Test connections get their profile's settings"""
+        db = Database(self.temp_db.name, profile="safe")
+        conn = db.connect()
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 2)
+        self.assertEqual(conn.execute("PRAGMA mmap_size").fetchone()[0], 0)
+        db.close()
+
+        db = Database(self.temp_db.name, profile="bulk-import")
+        conn = db.connect()
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+        self.assertEqual(conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0], 10000)
+        db.close()
+
+    def test_unknown_profile(self):
+        """Test an unknown profile name is rejected"""
+        conn = sqlite3.connect(":memory:")
+        with self.assertRaises(ValueError):
+            apply_profile(conn, "turbo")
+        conn.close()
+
+    def test_incremental_vacuum_frees_pages(self):
+        """Test free pages left by deletes are returned to the file system"""
+        db = Database(self.temp_db.name)
+        conn = db.connect()
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        for idx in range(500):
+            db.log_operation("scan", details="x" * 500, commit=False)
+        conn.commit()
+        conn.execute("DELETE FROM operation_history")
+        conn.commit()
+
+        results = run_maintenance(db)
+
+        self.assertEqual(list(results), ["optimize", "analyze", "vacuum", "checkpoint"])
+        self.assertGreater(results["vacuum"]["free_pages_before"], 0)
+        self.assertEqual(results["vacuum"]["free_pages_after"], 0)
+        self.assertEqual(results["checkpoint"]["busy"], 0)
+        db.close()
+
+    def test_old_database_is_converted(self):
+        """Test a database without auto-vacuum is converted by the first vacuum"""
+        conn = sqlite3.connect(self.temp_db.name)
+        conn.execute("CREATE TABLE legacy (id INTEGER)")
+        conn.commit()
+        conn.close()
+
+        db = Database(self.temp_db.name)
+        self.assertEqual(db.connect().execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+        run_maintenance(db, ["vacuum"])
+        self.assertEqual(db.connect().execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        db.close()
+
+
+class TestDaemon(unittest.TestCase):
+    """Test cases for the Daemon schedule"""
+
+    def setUp(self):
+        """Set up a daemon with maintenance every minute and every hour"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+        config = Mock()
+        config.maintenance_interval_minutes = 1
+        config.vacuum_interval_hours = 1
+        config.operation_retention_days = 0
+        config.account_scan_interval_minutes = 0
+        self.daemon = Daemon(config, db=self.db)
+        self.start = min(self.daemon._next_run.values()) - 60
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_tasks_run_when_due(self):
+        """Test each task runs once per interval"""
+        self.assertEqual(self.daemon.run_pending(self.start + 30), [])
+        self.assertEqual(self.daemon.run_pending(self.start + 61),
+                         ["maintenance", "history retention"])
+        self.assertEqual(self.daemon.run_pending(self.start + 90), [])
+        self.assertEqual(self.daemon.run_pending(self.start + 3601),
+                         ["maintenance", "history retention", "full maintenance"])
+
+    def test_failing_task_is_rescheduled(self):
+        """Test a task that raises does not stop the others"""
+        self.daemon.tasks.clear()
+        self.daemon._next_run.clear()
+        broken = Mock(side_effect=RuntimeError("boom"))
+        self.daemon.add_task("broken", 10, broken)
+
+        self.daemon.run_pending(self.start + 3600)
+        self.daemon.run_pending(self.start + 3600)
+
+        self.assertEqual(broken.call_count, 1)
+        self.assertEqual(self.daemon.seconds_until_next(self.start + 3600), 10)
+
+    def test_account_scans_run_in_background_and_stop(self):
+        """Test a long account scan round doesn't hold up other tasks and stop() ends it"""
+        started, stopped = threading.Event(), threading.Event()
+
+        class BlockingScheduler:
+            def __init__(self, orchestrator):
+                pass
+
+            def run(self):
+                started.set()
+                stopped.wait(5)
+                return {"scanned": 0, "mailboxes": [], "failed": 0}
+
+            def stop(self):
+                stopped.set()
+
+        self.daemon.tasks.clear()
+        self.daemon._next_run.clear()
+        self.daemon.add_task("account scans", 60, self.daemon._scan_accounts)
+        maintenance = Mock()
+        self.daemon.add_task("maintenance", 60, maintenance)
+
+        with patch("src.core.scheduler.ScanScheduler", BlockingScheduler), \
+                patch("src.core.orchestrator.EmailUnsubscribeOrchestrator"):
+            ran = self.daemon.run_pending(self.start + 3600)
+            self.assertTrue(started.wait(5))
+            self.assertEqual(ran, ["account scans", "maintenance"])
+            maintenance.assert_called_once()
+
+            self.daemon.run_pending(self.start + 7200)
+            self.daemon.stop()
+            self.assertTrue(stopped.is_set())
+            self.daemon._scan_thread.join(5)
+            self.assertFalse(self.daemon._scan_thread.is_alive())
+
+    def test_maintenance_waits_for_scan_round(self):
+        """Test maintenance is deferred while a scan round runs and catches up after it"""
+        started, stopped = threading.Event(), threading.Event()
+
+        class BlockingScheduler:
+            def __init__(self, orchestrator):
+                pass
+
+            def run(self):
+                started.set()
+                stopped.wait(5)
+                return {"scanned": 0, "mailboxes": [], "failed": 0}
+
+            def stop(self):
+                stopped.set()
+
+        self.daemon.tasks.clear()
+        self.daemon._next_run.clear()
+        self.daemon.add_task("account scans", 3600, self.daemon._scan_accounts)
+        vacuum = Mock()
+        self.daemon.add_task("full maintenance", 7200, vacuum, defer_while_scanning=True)
+        retention = Mock()
+        self.daemon.add_task("history retention", 60, retention)
+
+        with patch("src.core.scheduler.ScanScheduler", BlockingScheduler), \
+                patch("src.core.orchestrator.EmailUnsubscribeOrchestrator"):
+            ran = self.daemon.run_pending(self.start + 10000)
+            self.assertTrue(started.wait(5))
+            self.assertEqual(ran, ["account scans", "history retention"])
+            vacuum.assert_not_called()
+            self.assertEqual(self.daemon._next_run["full maintenance"],
+                             self.start + 10000 + Daemon.SCAN_DEFER_SECONDS)
+
+            self.daemon.stop()
+            self.daemon._scan_thread.join(5)
+            self.assertFalse(self.daemon.scanning())
+
+            ran = self.daemon.run_pending(self.start + 10000 + Daemon.SCAN_DEFER_SECONDS)
+            self.assertIn("full maintenance", ran)
+            vacuum.assert_called_once()
+
+    def test_metrics_endpoint(self):
+        """Test the daemon serves the registry in the Prometheus text format"""
+        REGISTRY.histogram("test_daemon_seconds", "Test timer").observe(0.003)
+        port = self.daemon.start_metrics_server(port=0, host="127.0.0.1")
+        self.addCleanup(self.daemon.stop_metrics_server)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            self.assertIn("text/plain", response.headers["Content-Type"])
+            body = response.read().decode()
+        self.assertIn("# TYPE email_unsub_test_daemon_seconds histogram", body)
+        self.assertIn('email_unsub_test_daemon_seconds_bucket{le="0.005"} 1', body)
+
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+        self.assertEqual(error.exception.code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
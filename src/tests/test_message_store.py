@@ -0,0 +1,104 @@
+"""Tests for the raw message store"""
+import unittest
+import os
+import shutil
+import tempfile
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from src.database.message_store import MessageStore
+from src.database.models import Database
+
+
+def make_message(message_id: str, body: str):
+    """Build an HTML email with a List-Unsubscribe header"""
+    msg = MIMEMultipart()
+    msg["From"] = "News <news@example.com>"
+    msg["Subject"] = "=?utf-8?q?Caf=C3=A9_news?="
+    msg["Message-ID"] = message_id
+    msg["List-Unsubscribe"] = "<https://example.com/u>"
+    msg.attach(MIMEText(body, "html"))
+    return msg
+
+
+class TestMessageStore(unittest.TestCase):
+    """Test cases for MessageStore"""
+
+    def setUp(self):
+        """Set up test database and store directory"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.store_dir = tempfile.mkdtemp()
+        self.db = Database(self.temp_db.name)
+
+    def tearDown(self):
+        """Clean up test database and store"""
+        self.db.close()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_round_trip(self):
+        """Test headers and HTML parts come back as stored"""
+        with MessageStore(self.db, self.store_dir, codec="zlib") as store:
+            digest = store.put("<1@example.com>", make_message("<1@example.com>", "<p>Café</p>"),
+                               ["<p>Café</p>"])
+
+            stored = store.get(digest)
+
+        self.assertEqual(stored.message_id, "<1@example.com>")
+        self.assertEqual(stored.headers["From"], "News <news@example.com>")
+        self.assertEqual(stored.headers["List-Unsubscribe"], "<https://example.com/u>")
+        self.assertEqual(stored.html_parts, ["<p>Café</p>"])
+        self.assertIsNone(store.get("0" * 64))
+
+    def test_identical_content_is_stored_once(self):
+        """Test a message fetched again is deduplicated by hash"""
+        msg = make_message("<1@example.com>", "<p>Hi</p>")
+        with MessageStore(self.db, self.store_dir, codec="zlib") as store:
+            first = store.put("<1@example.com>", msg, ["<p>Hi</p>"])
+        with MessageStore(self.db, self.store_dir, codec="zlib") as store:
+            second = store.put("<1@example.com>", msg, ["<p>Hi</p>"])
+            store.put("<2@example.com>", make_message("<2@example.com>", "<p>Hi</p>"), ["<p>Hi</p>"])
+
+            self.assertEqual(first, second)
+            self.assertEqual(store.deduplicated, 1)
+            self.assertEqual(store.get_stats()["messages"], 2)
+
+    def test_segments_roll_over_and_replay_in_order(self):
+        """Test full segments are closed and replay reads every record once"""
+        with MessageStore(self.db, self.store_dir, codec="zlib", segment_bytes=600,
+                          flush_every=3) as store:
+            for idx in range(10):
+                body = f"<p>{idx} {os.urandom(200).hex()}</p>"
+                store.put(f"<{idx}@example.com>", make_message(f"<{idx}@example.com>", body), [body])
+
+            replayed = [stored.message_id for stored in store.iter_messages(page_size=4)]
+            stats = store.get_stats()
+
+        self.assertEqual(replayed, [f"<{idx}@example.com>" for idx in range(10)])
+        self.assertGreater(stats["segments"], 1)
+        self.assertLess(stats["stored_bytes"], stats["raw_bytes"])
+
+    def test_unindexed_tail_is_ignored(self):
+        """Test bytes appended without an index row (a crash) do not break reads"""
+        store = MessageStore(self.db, self.store_dir, codec="zlib")
+        store.put("<1@example.com>", make_message("<1@example.com>", "<p>1</p>"), ["<p>1</p>"])
+        store.close()
+        with open(store.segment_path(1), "ab") as f:
+            f.write(b"partial record")
+
+        with MessageStore(self.db, self.store_dir, codec="zlib") as store:
+            store.put("<2@example.com>", make_message("<2@example.com>", "<p>2</p>"), ["<p>2</p>"])
+            replayed = [stored.html_parts for stored in store.iter_messages()]
+
+        self.assertEqual(replayed, [["<p>1</p>"], ["<p>2</p>"]])
+
+    def test_unknown_codec(self):
+        """Test an unknown codec is rejected"""
+        with self.assertRaises(ValueError):
+            MessageStore(self.db, self.store_dir, codec="lzma")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Tests for the metrics registry"""
+import unittest
+
+from src.utils.metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for counters, histograms, summaries and the Prometheus output"""
+
+    def setUp(self):
+        """Set up an empty registry"""
+        self.registry = MetricsRegistry(namespace="test")
+
+    def test_summary_covers_changes_since_snapshot(self):
+        """Test summaries only count what happened after the snapshot"""
+        timer = self.registry.histogram("parse_seconds", "Parsing", buckets=(0.01, 0.1, 1.0))
+        clicks = self.registry.counter("clicks_total", "Clicks")
+        timer.observe(0.5)
+        clicks.inc()
+        before = self.registry.snapshot()
+
+        for value in (0.002, 0.004, 0.006, 0.008, 0.05):
+            timer.observe(value)
+        with timer.time():
+            pass
+        clicks.inc(2)
+        self.registry.counter("idle_total")
+        summary = self.registry.summary(since=before)
+
+        self.assertEqual(set(summary), {"parse_seconds", "clicks_total"})
+        self.assertEqual(summary["clicks_total"], {"value": 2})
+        stats = summary["parse_seconds"]
+        self.assertEqual(stats["count"], 6)
+        self.assertAlmostEqual(stats["sum"], 0.07, places=3)
+        self.assertAlmostEqual(stats["p50"], 0.006)
+        self.assertGreater(stats["p99"], 0.01)
+        self.assertLessEqual(stats["p99"], 0.1)
+        self.assertIs(self.registry.histogram("parse_seconds"), timer)
+        with self.assertRaises(ValueError):
+            self.registry.counter("parse_seconds")
+
+    def test_render_prometheus(self):
+        """Test cumulative buckets, +Inf, sum and count in the text format"""
+        timer = self.registry.histogram("fetch_seconds", "IMAP fetches", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            timer.observe(value)
+        self.registry.counter("bytes_total", "Bytes fetched").inc(1024)
+
+        text = self.registry.render_prometheus()
+
+        self.assertIn("# TYPE test_bytes_total counter\ntest_bytes_total 1024\n", text)
+        self.assertIn("# HELP test_fetch_seconds IMAP fetches\n"
+                      "# TYPE test_fetch_seconds histogram\n"
+                      'test_fetch_seconds_bucket{le="0.1"} 1\n'
+                      'test_fetch_seconds_bucket{le="1"} 2\n'
+                      'test_fetch_seconds_bucket{le="+Inf"} 3\n'
+                      "test_fetch_seconds_sum 5.55\n"
+                      "test_fetch_seconds_count 3\n", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
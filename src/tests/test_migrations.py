@@ -0,0 +1,264 @@
+"""Tests for schema migrations and hot query plans"""
+import unittest
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from src.database.models import Database
+from src.database.job_queue import JobQueue
+from src.database.migrations import MIGRATIONS, Migration, get_schema_version, migrate
+
+
+# Tables bounded by the number of domains, senders or settings rather than
+# by mail volume; reading them in full is expected
+SMALL_TABLES = {"domain_stats", "senders", "settings", "whitelist", "blacklist",
+                "redirect_prefixes", "custom_filters", "stat_counters", "daily_stats"}
+
+# Indexes that queries walk end to end on purpose
+INTENDED_INDEX_WALKS = {
+    # Newest operations first, stopped by the LIMIT
+    "idx_operation_history_timestamp",
+    # Partial indexes holding only unclicked / clicked links
+    "idx_unsubscribe_links_unclicked",
+    "idx_unsubscribe_links_clicked",
+    # Queue counts by state, from the covering index
+    "idx_click_jobs_state",
+    # Senders by recency (a small table, read under an alias)
+    "idx_senders_recent",
+}
+
+
+class TestMigrations(unittest.TestCase):
+    """Test cases for the migration runner"""
+
+    def setUp(self):
+        """Set up test database path"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+
+    def tearDown(self):
+        """Clean up test database"""
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_new_database_is_at_latest_version(self):
+        """Test a new database has every migration applied once"""
+        db = Database(self.temp_db.name)
+        conn = db.connect()
+
+        self.assertEqual(get_schema_version(conn), MIGRATIONS[-1].version)
+        versions = [row[0] for row in conn.execute("SELECT version FROM schema_version")]
+        self.assertEqual(versions, [m.version for m in MIGRATIONS])
+        db.close()
+
+    def test_reopening_applies_nothing(self):
+        """Test migrations are not re-run on an up-to-date database"""
+        Database(self.temp_db.name).close()
+        db = Database(self.temp_db.name)
+
+        self.assertEqual(migrate(db), [])
+        db.close()
+
+    def test_pending_migration_is_applied(self):
+        """Test a new migration step runs once on an existing database"""
+        db = Database(self.temp_db.name)
+        extra = Migration(
+            MIGRATIONS[-1].version + 1, "test table",
+            lambda db, cursor: cursor.execute("CREATE TABLE test_extra (id INTEGER)")
+        )
+
+        self.assertEqual(migrate(db, MIGRATIONS + [extra]), [extra.version])
+        self.assertEqual(migrate(db, MIGRATIONS + [extra]), [])
+        self.assertEqual(get_schema_version(db.connect()), extra.version)
+        db.close()
+
+    def test_failed_migration_rolls_back(self):
+        """Test a failing migration leaves neither changes nor a version row"""
+        db = Database(self.temp_db.name)
+
+        def broken(db, cursor):
+            cursor.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        extra = Migration(MIGRATIONS[-1].version + 1, "broken", broken)
+        with self.assertRaises(RuntimeError):
+            migrate(db, MIGRATIONS + [extra])
+
+        conn = db.connect()
+        self.assertEqual(get_schema_version(conn), MIGRATIONS[-1].version)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        self.assertNotIn("half_done", tables)
+        db.close()
+
+    def test_unversioned_database_is_adopted(self):
+        """Test a database created before versioning is upgraded in place"""
+        conn = sqlite3.connect(self.temp_db.name)
+        conn.execute("""
+            CREATE TABLE emails (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, message_id TEXT UNIQUE,
+                sender TEXT NOT NULL, subject TEXT, received_date TIMESTAMP,
+                category TEXT DEFAULT 'uncategorized',
+                has_unsubscribe_link BOOLEAN DEFAULT 0, processed BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE unsubscribe_links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, email_id INTEGER, link TEXT NOT NULL,
+                clicked BOOLEAN DEFAULT 0, click_timestamp TIMESTAMP, status_code INTEGER,
+                error_message TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO emails (message_id, sender) VALUES ('<1@a.com>', 'x@a.com')")
+        conn.execute("INSERT INTO unsubscribe_links (email_id, link) VALUES (1, 'https://a.com/u')")
+        conn.commit()
+        conn.close()
+
+        db = Database(self.temp_db.name)
+
+        self.assertEqual(get_schema_version(db.connect()), MIGRATIONS[-1].version)
+        self.assertEqual(len(db.get_subscription_links()), 1)
+        senders = db.page_senders().rows
+        self.assertEqual([(row["address"], row["message_count"], row["best_link_id"])
+                          for row in senders], [("x@a.com", 1, 1)])
+        db.close()
+
+    def test_duplicate_links_are_removed(self):
+        """Test the unique-links migration dedupes links left by rescans"""
+        db = Database(self.temp_db.name)
+        conn = db.connect()
+        conn.execute("DROP INDEX idx_unsubscribe_links_email_link")
+        conn.execute("DELETE FROM schema_version WHERE version >= 3")
+        conn.commit()
+
+        email_id = db.add_email("<1@a.com>", "x@a.com", "Hi", datetime.now())
+        for _ in range(3):
+            conn.execute("INSERT INTO unsubscribe_links (email_id, link) VALUES (?, ?)",
+                         (email_id, "https://a.com/u"))
+        conn.execute("INSERT INTO click_jobs (link_id) VALUES (2)")
+        conn.execute("INSERT INTO click_jobs (link_id) VALUES (3)")
+        conn.commit()
+
+        migrate(db)
+
+        self.assertEqual([row[0] for row in conn.execute("SELECT id FROM unsubscribe_links")], [1])
+        self.assertEqual([row[0] for row in conn.execute("SELECT link_id FROM click_jobs")], [1])
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO unsubscribe_links (email_id, link) VALUES (?, ?)",
+                         (email_id, "https://a.com/u"))
+        conn.rollback()
+        db.close()
+
+
+class TestHotQueryPlans(unittest.TestCase):
+    """EXPLAIN QUERY PLAN regression tests for the hot queries
+
+    Every statement the hot code paths run is captured and explained; the
+    test fails if any of them reads a mail-volume table without an index.
+    """
+
+    def setUp(self):
+        """Set up a test database with some rows"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+        self.queue = JobQueue(self.db)
+
+        for idx in range(5):
+            email_id = self.db.add_email(f"<{idx}@shop.com>", "news@shop.com", "Hi",
+                                         datetime.now(), "marketing")
+            self.db.add_unsubscribe_link(email_id, f"https://shop.com/unsub?list={idx}")
+            self.db.log_operation("scan", email_id, "success")
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def capture(self, action) -> list:
+        """Run an action and return the statements it executed"""
+        conn = self.db.connect()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            action()
+        finally:
+            conn.set_trace_callback(None)
+        return [
+            sql for sql in statements
+            if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT"))
+        ]
+
+    def assert_no_table_scans(self, action):
+        """Fail if any statement run by the action scans a large table"""
+        conn = self.db.connect()
+        statements = self.capture(action)
+        self.assertTrue(statements)
+
+        for sql in statements:
+            for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                detail = row[3]
+                # Virtual tables (full-text matches, json_each) are not scans
+                if not detail.startswith("SCAN ") or " VIRTUAL TABLE " in detail:
+                    continue
+                table = detail.split()[1]
+                if table in SMALL_TABLES or table.startswith(("CONSTANT", "(")):
+                    continue
+                if " INDEX " in detail and detail.split()[-1] in INTENDED_INDEX_WALKS:
+                    continue
+                self.fail(f"Full scan of {table}: {detail}\n{sql}")
+
+    def test_subscription_links(self):
+        """Test unclicked links per subscription use the partial index"""
+        self.assert_no_table_scans(lambda: self.db.get_subscription_links())
+        self.assert_no_table_scans(lambda: self.db.get_subscription_links([1, 2]))
+
+    def test_recent_operations(self):
+        """Test recent operations are read in timestamp order from an index"""
+        self.assert_no_table_scans(lambda: self.db.get_recent_operations(10))
+
+    def test_paginated_listings(self):
+        """Test keyset pages are read from the created_at indexes"""
+        cursor = ("9999-12-31", 1 << 62)
+        self.assert_no_table_scans(lambda: self.db.page_links(after=cursor, category="marketing"))
+        self.assert_no_table_scans(lambda: self.db.page_pending_subscriptions(after=cursor))
+        self.assert_no_table_scans(lambda: self.db.page_emails(after=cursor))
+        self.assert_no_table_scans(lambda: self.db.page_operations(after=cursor, status="success"))
+
+    def test_email_search(self):
+        """Test search terms are looked up in the full-text index"""
+        self.assert_no_table_scans(lambda: self.db.search_emails('sender:shop "hi there"'))
+        self.assert_no_table_scans(lambda: self.db.search_emails("shop", after=(3,)))
+
+    def test_senders(self):
+        """Test sender listings and bulk link lookups use the senders indexes"""
+        self.assert_no_table_scans(lambda: self.db.page_senders(after=(1 << 62, "~")))
+        self.assert_no_table_scans(lambda: self.db.page_senders(sort="recent", pending=True))
+        self.assert_no_table_scans(lambda: self.db.page_senders(domain="shop.com"))
+        self.assert_no_table_scans(lambda: self.db.get_sender_link_ids(["news@shop.com"],
+                                                                       ["shop.com"]))
+
+    def test_unprocessed_emails(self):
+        """Test unprocessed emails are looked up in the processed index"""
+        self.assert_no_table_scans(self.db.get_unprocessed_emails)
+
+    def test_statistics(self):
+        """Test the statistics counts and category breakdown"""
+        self.assert_no_table_scans(self.db.get_statistics)
+
+    def test_link_status_fan_out(self):
+        """Test click results are fanned out through the subscription index"""
+        self.assert_no_table_scans(lambda: self.db.update_link_status(1, True, 200, None))
+
+    def test_job_queue(self):
+        """Test enqueueing, leasing and queue counts"""
+        self.assert_no_table_scans(lambda: self.queue.enqueue([1, 2, 3]))
+        self.assert_no_table_scans(lambda: self.queue.lease("worker", 2))
+        self.assert_no_table_scans(self.queue.get_counts)
+        self.assert_no_table_scans(self.queue.get_pending_domains)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,487 @@
+"""Tests for the orchestrator"""
+import unittest
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from unittest.mock import Mock, patch
+
+from src.database.models import Database
+from src.core.orchestrator import EmailUnsubscribeOrchestrator
+
+
+def make_message(message_id: str, sender: str, subject: str = "Weekly newsletter",
+                 date: datetime = None, link: str = "https://example.com/unsubscribe"):
+    """Build a simple HTML email with one unsubscribe link"""
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["Subject"] = subject
+    msg["Date"] = (date or datetime.now()).strftime("%a, %d %b %Y %H:%M:%S")
+    msg["Message-ID"] = message_id
+    msg.attach(MIMEText(f'<a href="{link}">Unsubscribe</a>', "html"))
+    return msg
+
+
+class TestOrchestrator(unittest.TestCase):
+    """Test cases for EmailUnsubscribeOrchestrator class"""
+
+    def setUp(self):
+        """Set up test database, config and a fake mailbox"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+
+        self.config = Mock()
+        self.config.database_path = self.temp_db.name
+        self.config.email_address = "me@example.com"
+        self.config.email_password = "password"
+        self.config.imap_server = "imap.test.com"
+        self.config.request_timeout = 5
+        self.config.max_emails_per_scan = 100
+        self.config.link_click_delay = 0
+        self.config.worker_lease_seconds = 60
+        self.config.dns_cache_ttl = 0
+        self.config.click_pool_connections = 10
+        self.config.click_pool_maxsize = 4
+        self.config.unsubscribe_grace_days = 7
+        self.config.redirect_shortcut_min_observations = 2
+        self.config.batch_write_size = 500
+        self.config.batch_write_interval_ms = 1000
+        self.config.message_store_dir = ""
+        self.config.scan_fetch_workers = 1
+        self.config.scan_parse_workers = 2
+        self.config.scan_queue_size = 10
+        self.config.imap_reconnect_attempts = 0
+        self.config.imap_reconnect_backoff = 0
+
+        self.orchestrator = EmailUnsubscribeOrchestrator(self.config, self.db)
+        self.messages = {}
+
+        manager = self.orchestrator.email_manager
+        manager.connect = Mock(return_value=True)
+        manager.disconnect = Mock()
+        manager.search_emails = Mock(side_effect=lambda **kwargs: list(self.messages))
+        manager.fetch_headers = Mock(side_effect=lambda ids: {i: self.messages[i] for i in ids})
+        manager.fetch_email = Mock(side_effect=lambda email_id: self.messages.get(email_id))
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_scan_emails_stores_links(self):
+        """Test a scan stores emails and their unsubscribe links"""
+        self.messages[b"1"] = make_message("<1@example.com>", "news@example.com")
+        self.messages[b"2"] = make_message("<2@example.com>", "deals@shop.com",
+                                           link="https://shop.com/unsub")
+
+        results = self.orchestrator.scan_emails()
+
+        self.assertEqual(results["total_scanned"], 2)
+        self.assertEqual(results["emails_with_links"], 2)
+        self.assertEqual(results["total_links_found"], 2)
+        self.assertEqual(results["errors"], 0)
+        self.assertEqual(len(self.db.get_subscription_links()), 2)
+        self.assertEqual(results["metrics"]["categorize_seconds"]["count"], 2)
+        self.assertEqual(results["metrics"]["html_extract_seconds"]["count"], 2)
+        self.assertGreaterEqual(results["metrics"]["db_write_seconds"]["count"], 1)
+
+    def test_scan_pipeline_fetches_on_extra_connections(self):
+        """Test extra fetch workers open and close their own IMAP connections"""
+        for idx in range(20):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+        self.config.scan_fetch_workers = 3
+        extra = Mock()
+        extra.connect.return_value = True
+        extra.fetch_email.side_effect = lambda email_id: self.messages.get(email_id)
+
+        with patch("src.core.orchestrator.EmailManager", return_value=extra) as factory:
+            results = self.orchestrator.scan_emails()
+
+        self.assertEqual(factory.call_count, 2)
+        self.assertEqual(extra.disconnect.call_count, 2)
+        self.assertEqual(len(results["emails_processed"]), 20)
+        self.assertEqual(len(self.db.get_subscription_links()), 20)
+        self.assertEqual(results["pipeline"]["fetch"]["items"], 20)
+        self.assertEqual(results["pipeline"]["write"]["items"], 20)
+        self.assertIn(results["bottleneck"], ("fetch", "parse", "write"))
+
+    def test_iter_scan_streams_results(self):
+        """Test iter_scan yields one record per email, skipped ones included"""
+        self.db.add_to_whitelist("friend@example.com")
+        self.messages[b"1"] = make_message("<1@example.com>", "friend@example.com")
+        self.messages[b"2"] = make_message("<2@example.com>", "news@shop.com")
+        summary = {}
+
+        results = list(self.orchestrator.iter_scan(summary=summary))
+
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual({r.status for r in results}, {"whitelisted", "processed"})
+        processed = [r for r in results if r.status == "processed"][0]
+        self.assertEqual((processed.sender, processed.links_found), ("news@shop.com", 1))
+        self.assertIn("pipeline", summary)
+        self.orchestrator.email_manager.disconnect.assert_called_once()
+
+    def test_iter_scan_stopped_early_keeps_yielded_results(self):
+        """Test stopping the stream commits what was yielded and disconnects"""
+        for idx in range(30):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+
+        scan = self.orchestrator.iter_scan()
+        first = [next(scan) for _ in range(5)]
+        scan.close()
+
+        stored = {row["message_id"] for row in self.db.page_emails(limit=100).rows}
+        self.assertTrue({r.message_id for r in first} <= stored)
+        self.orchestrator.email_manager.disconnect.assert_called_once()
+
+    def _search_uid_range(self, criteria=None, max_emails=None):
+        """Fake UID SEARCH honouring the UID range of a resumed run"""
+        uids = sorted(self.messages, key=int)
+        match = re.match(r"\(UID (\d+):(\d+) ", criteria or "")
+        if match:
+            low, high = int(match.group(1)), int(match.group(2))
+            uids = [uid for uid in uids if low <= int(uid) <= high]
+        return uids[-max_emails:] if max_emails else uids
+
+    def test_resume_scan_skips_committed_messages(self):
+        """Test a resumed run fetches only the messages not yet committed"""
+        for idx in range(1, 31):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+        manager = self.orchestrator.email_manager
+        manager.search_emails.side_effect = self._search_uid_range
+
+        summary = {}
+        scan = self.orchestrator.iter_scan(summary=summary)
+        first = [next(scan) for _ in range(5)]
+        scan.close()
+        run = self.db.get_scan_run(summary["run_id"])
+        self.assertEqual(run["status"], "interrupted")
+        self.assertEqual(run["processed"], 5)
+
+        manager.fetch_email.reset_mock()
+        results = self.orchestrator.resume_scan(summary["run_id"])
+
+        refetched = {call[0][0] for call in manager.fetch_email.call_args_list}
+        self.assertFalse(refetched & {r.email_id for r in first})
+        self.assertEqual(len(refetched), 25)
+        self.assertEqual(results["total_scanned"], 25)
+        run = self.db.get_scan_run(summary["run_id"])
+        self.assertEqual((run["status"], run["processed"], run["checkpoint_uid"]),
+                         ("completed", 30, 30))
+        self.assertEqual(self.orchestrator.resume_scan(run["id"])["total_scanned"], 0)
+
+    def test_lost_connection_interrupts_scan(self):
+        """Test a connection that cannot be restored stops the scan for a later resume"""
+        for idx in range(1, 11):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+        manager = self.orchestrator.email_manager
+        manager.search_emails.side_effect = self._search_uid_range
+        fetch = manager.fetch_email.side_effect
+
+        def flaky_fetch(email_id):
+            if int(email_id) > 6:
+                raise ConnectionError("Lost connection to imap.test.com")
+            return fetch(email_id)
+
+        manager.fetch_email.side_effect = flaky_fetch
+        results = self.orchestrator.scan_emails()
+
+        self.assertEqual(results["errors"], 1)
+        run = self.db.get_scan_run(results["run_id"])
+        self.assertEqual(run["status"], "interrupted")
+        self.assertIn("Lost connection", run["error"])
+        self.assertEqual(run["checkpoint_uid"], 6)
+
+        manager.fetch_email.side_effect = fetch
+        results = self.orchestrator.resume_scan(run["id"])
+        self.assertEqual(results["total_scanned"], 4)
+        self.assertEqual(self.db.get_scan_run(run["id"])["status"], "completed")
+
+    def _fetch_headers_with_sizes(self, ids, sizes=None, stop=None):
+        """Fake header fetch reporting each message's size"""
+        if sizes is not None:
+            sizes.update({i: len(self.messages[i].as_bytes()) for i in ids})
+        return {i: self.messages[i] for i in ids}
+
+    def test_message_budget_takes_valuable_emails_first_and_leaves_the_rest(self):
+        """Test a budgeted scan goes by value and the next one picks up what was left"""
+        self.db.add_email("<old@example.com>", "known@example.com", "Old", datetime.now())
+        for idx in range(1, 9):
+            sender = "known@example.com" if idx % 2 else f"new{idx}@example.com"
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>", sender)
+        self.messages[b"1"]["List-Unsubscribe"] = "<https://example.com/unsubscribe>"
+        manager = self.orchestrator.email_manager
+        manager.search_emails.side_effect = self._search_uid_range
+        manager.fetch_headers.side_effect = self._fetch_headers_with_sizes
+
+        results = self.orchestrator.scan_emails(max_messages=3)
+
+        fetched = [call[0][0] for call in manager.fetch_email.call_args_list]
+        self.assertEqual(sorted(fetched), [b"4", b"6", b"8"])
+        self.assertEqual((results["stopped_by"], results["remaining"]), ("messages", 5))
+        run = self.db.get_scan_run(results["run_id"])
+        self.assertEqual((run["status"], run["processed"]), ("interrupted", 3))
+
+        manager.fetch_email.reset_mock()
+        results = self.orchestrator.scan_emails(max_messages=2)
+        fetched = [call[0][0] for call in manager.fetch_email.call_args_list]
+        self.assertEqual(results["run_id"], run["id"])
+        self.assertEqual(sorted(fetched), [b"1", b"2"])
+
+        results = self.orchestrator.scan_emails(max_bytes=10 ** 6)
+        self.assertEqual((results["stopped_by"], results["remaining"]), (None, 0))
+        self.assertEqual(self.db.get_scan_run(run["id"])["status"], "completed")
+
+        self.messages.clear()
+        self.assertEqual(self.orchestrator.scan_emails(max_messages=5)["total_scanned"], 0)
+
+    def test_deadline_stops_scan_with_work_committed(self):
+        """Test a scan stops near its deadline and reports what is left"""
+        for idx in range(1, 41):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+        manager = self.orchestrator.email_manager
+        manager.search_emails.side_effect = self._search_uid_range
+        manager.fetch_headers.side_effect = self._fetch_headers_with_sizes
+        fetch = manager.fetch_email.side_effect
+
+        def slow_fetch(email_id):
+            time.sleep(0.02)
+            return fetch(email_id)
+
+        manager.fetch_email.side_effect = slow_fetch
+        started = time.monotonic()
+        results = self.orchestrator.scan_emails(deadline=0.2)
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(results["stopped_by"], "deadline")
+        run = self.db.get_scan_run(results["run_id"])
+        self.assertEqual(run["status"], "interrupted")
+        self.assertGreater(run["processed"], 0)
+        self.assertEqual(results["remaining"], 40 - run["processed"])
+        self.assertEqual(len(self.db.page_emails(limit=100).rows), run["processed"])
+
+    def test_deadline_stops_header_phase(self):
+        """Test the deadline is checked between header batches, newest first"""
+        for idx in range(1, 41):
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>",
+                                                            f"news{idx}@example.com")
+        manager = self.orchestrator.email_manager
+        manager.search_emails.side_effect = self._search_uid_range
+        batches = []
+
+        def slow_headers(ids, sizes=None, stop=None):
+            headers = {}
+            for start in range(0, len(ids), 10):
+                if stop():
+                    break
+                batches.append(ids[start:start + 10])
+                time.sleep(0.1)
+                headers.update(self._fetch_headers_with_sizes(ids[start:start + 10], sizes))
+            return headers
+
+        manager.fetch_headers.side_effect = slow_headers
+        results = self.orchestrator.scan_emails(deadline=0.15)
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(batches[0][0], b"40")
+        self.assertEqual(results["stopped_by"], "deadline")
+        self.assertEqual(results["remaining"], 40)
+        manager.fetch_email.assert_not_called()
+
+    def test_plan_scan_estimates_without_scanning(self):
+        """Test the planner samples headers, then uses recorded timings once a scan ran"""
+        self.db.add_to_whitelist("friend@example.com")
+        for idx in range(1, 11):
+            sender = "friend@example.com" if idx <= 2 else f"news{idx}@example.com"
+            self.messages[str(idx).encode()] = make_message(f"<{idx}@example.com>", sender)
+        manager = self.orchestrator.email_manager
+        manager.fetch_headers.side_effect = self._fetch_headers_with_sizes
+        manager.mailbox_status = Mock(return_value={"messages": 10, "unseen": 3})
+
+        plan = self.orchestrator.plan_scan()
+
+        self.assertEqual((plan["matching"], plan["candidates"], plan["sampled"]), (10, 10, 10))
+        self.assertEqual(plan["skipped"], {"whitelisted": 2, "unsubscribed": 0})
+        self.assertEqual((plan["to_fetch"], plan["already_stored"]), (8, 0))
+        self.assertEqual(plan["bytes"], sum(len(self.messages[str(idx).encode()].as_bytes())
+                                            for idx in range(3, 11)))
+        self.assertEqual(plan["timing_basis"], "sample")
+        self.assertEqual(plan["workers"], {"fetch": 1, "parse": 2, "write": 1})
+        manager.fetch_email.assert_not_called()
+        self.assertEqual(self.db.get_scan_runs(), [])
+
+        self.orchestrator.scan_emails()
+        plan = self.orchestrator.plan_scan(max_emails=5, sample_size=3)
+
+        self.assertEqual((plan["candidates"], plan["sampled"]), (5, 3))
+        self.assertEqual(plan["already_stored"], plan["to_fetch"])
+        self.assertEqual(plan["timing_basis"], "history")
+        self.assertEqual(set(plan["stage_seconds"]), {"headers", "fetch", "parse", "write"})
+        self.assertIn(plan["bottleneck"], ("fetch", "parse", "write"))
+
+    def test_reprocess_stored_messages_offline(self):
+        """Test stored messages are re-extracted with the current rules, without IMAP"""
+        store_dir = tempfile.mkdtemp()
+        self.config.message_store_dir = store_dir
+        self.config.message_store_codec = "zlib"
+        self.config.message_store_segment_mb = 64
+        orchestrator = EmailUnsubscribeOrchestrator(self.config, self.db)
+        orchestrator.email_manager = self.orchestrator.email_manager
+        self.messages[b"1"] = make_message("<1@example.com>", "news@example.com")
+        orchestrator.scan_emails()
+        orchestrator.scan_emails()
+        self.assertEqual(orchestrator.message_store.get_stats()["messages"], 1)
+
+        manager = orchestrator.email_manager
+        manager.connect.reset_mock()
+        manager.fetch_email.reset_mock()
+        with patch.object(manager, "categorize_email", return_value="promotions"), \
+                patch.object(manager, "extract_unsubscribe_links",
+                             return_value=["https://example.com/unsubscribe",
+                                           "https://example.com/preferences"]):
+            results = orchestrator.reprocess()
+        orchestrator.message_store.close()
+
+        self.assertEqual(results["reprocessed"], 1)
+        self.assertEqual(results["total_links_found"], 2)
+        manager.connect.assert_not_called()
+        manager.fetch_email.assert_not_called()
+        email = self.db.page_emails().rows[0]
+        self.assertEqual(email["category"], "promotions")
+        self.assertEqual(len(self.db.page_links().rows), 2)
+        for name in os.listdir(store_dir):
+            os.unlink(os.path.join(store_dir, name))
+        os.rmdir(store_dir)
+
+    def test_rescan_does_not_duplicate_links(self):
+        """Test scanning the same messages twice stores each link once"""
+        self.messages[b"1"] = make_message("<1@example.com>", "news@example.com")
+
+        self.orchestrator.scan_emails()
+        self.orchestrator.scan_emails()
+
+        cursor = self.db.connect().cursor()
+        cursor.execute("SELECT COUNT(*) FROM emails")
+        self.assertEqual(cursor.fetchone()[0], 1)
+        cursor.execute("SELECT COUNT(*) FROM unsubscribe_links")
+        self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_scan_skips_whitelisted_without_fetching(self):
+        """Test whitelisted senders are skipped in the header phase"""
+        self.db.add_to_whitelist("*@example.com")
+        self.messages[b"1"] = make_message("<1@example.com>", "news@example.com")
+
+        results = self.orchestrator.scan_emails()
+
+        self.assertEqual(results["emails_processed"], [])
+        self.orchestrator.email_manager.fetch_email.assert_not_called()
+
+    def test_scan_skips_unsubscribed_senders(self):
+        """Test stragglers from unsubscribed senders are only counted"""
+        email_id = self.db.add_email("<0@example.com>", "news@example.com", "Old", datetime.now())
+        link_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+        self.db.update_link_status(link_id, True, 200, None)
+
+        self.messages[b"1"] = make_message("<1@example.com>", "News@Example.com")
+
+        results = self.orchestrator.scan_emails()
+
+        self.assertEqual(results["skipped_unsubscribed"], 1)
+        self.assertEqual(results["emails_processed"], [])
+        self.orchestrator.email_manager.fetch_email.assert_not_called()
+
+    def test_scan_processes_senders_after_grace_period(self):
+        """Test mail arriving after the grace period is processed again"""
+        email_id = self.db.add_email("<0@example.com>", "news@example.com", "Old", datetime.now())
+        link_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+        self.db.update_link_status(link_id, True, 200, None)
+
+        self.messages[b"1"] = make_message("<1@example.com>", "news@example.com",
+                                           date=datetime.now() + timedelta(days=8))
+
+        results = self.orchestrator.scan_emails()
+
+        self.assertEqual(results["skipped_unsubscribed"], 0)
+        self.assertEqual(len(results["emails_processed"]), 1)
+
+    def test_failed_unsubscribe_does_not_skip_sender(self):
+        """Test only successful unsubscribes populate the skip-list"""
+        email_id = self.db.add_email("<0@example.com>", "news@example.com", "Old", datetime.now())
+        link_id = self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+        self.db.update_link_status(link_id, True, 404, "HTTP 404")
+
+        self.assertEqual(self.db.get_unsubscribed_senders(), {})
+
+    def test_failed_click_is_retried(self):
+        """Test a failed click leaves every link of the subscription unclicked"""
+        link_ids = []
+        for idx in range(2):
+            email_id = self.db.add_email(f"<{idx}@example.com>", "news@example.com", "Hi",
+                                         datetime.now())
+            link_ids.append(self.db.add_unsubscribe_link(
+                email_id, f"https://example.com/unsubscribe?utm_source={idx}"))
+
+        with patch.object(self.orchestrator.unsubscribe_handler, "click_link",
+                          return_value={"success": False, "status_code": 503,
+                                        "error_message": "HTTP 503"}):
+            results = self.orchestrator.unsubscribe_from_links(link_ids[:1])
+
+        self.assertEqual(results["failed"], 1)
+        self.assertEqual([row["id"] for row in self.db.get_subscription_links()], link_ids[:1])
+        self.assertEqual(self.db.get_unsubscribed_senders(), {})
+
+    def test_enqueue_unsubscribe(self):
+        """Test links are queued rather than clicked"""
+        email_id = self.db.add_email("<0@example.com>", "news@example.com", "Old", datetime.now())
+        self.db.add_unsubscribe_link(email_id, "https://example.com/unsubscribe")
+
+        with patch.object(self.orchestrator.unsubscribe_handler, "click_link") as mock_click:
+            results = self.orchestrator.enqueue_unsubscribe(auto_mode=True)
+
+        self.assertEqual(results["enqueued"], 1)
+        self.assertEqual(results["queue"]["pending"], 1)
+        mock_click.assert_not_called()
+
+    def test_unsubscribe_senders(self):
+        """Test a whole domain is queued one link per subscription"""
+        for idx, sender in enumerate(["news@shop.com", "news@shop.com", "deals@shop.com",
+                                      "news@example.com"]):
+            email_id = self.db.add_email(f"<{idx}@example.com>", sender, "Hi", datetime.now())
+            self.db.add_unsubscribe_link(email_id, f"https://{sender.split('@')[1]}/unsub?s={sender}")
+
+        results = self.orchestrator.unsubscribe_senders(domains=["shop.com"])
+
+        self.assertEqual(results["enqueued"], 2)
+        self.assertEqual(self.orchestrator.unsubscribe_senders(["nobody@example.com"])["enqueued"], 0)
+        self.assertEqual(self.orchestrator.whitelist_senders(["News@Example.com"]), 1)
+        self.assertEqual(self.db.get_whitelist()[0]["email_pattern"], "news@example.com")
+
+    def test_export_links(self):
+        """Test every link is exported, page by page"""
+        for idx in range(3):
+            email_id = self.db.add_email(f"<{idx}@example.com>", "news@example.com",
+                                         f"Issue {idx}", datetime.now())
+            self.db.add_unsubscribe_link(email_id, f"https://example.com/unsubscribe?i={idx}")
+        filename = os.path.join(tempfile.mkdtemp(), "links.txt")
+
+        self.assertTrue(self.orchestrator.export_links(filename))
+
+        with open(filename) as f:
+            content = f.read()
+        os.unlink(filename)
+        os.rmdir(os.path.dirname(filename))
+        self.assertEqual(content.count("Link: https://example.com/unsubscribe?i="), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Tests for the staged scan pipeline"""
+import unittest
+import threading
+import time
+from unittest.mock import Mock
+
+from src.core.pipeline import Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for Pipeline stages, backpressure and counters"""
+
+    def test_every_item_passes_through_every_stage(self):
+        """Test results arrive from all workers and counters add up"""
+        pipeline = Pipeline(queue_size=4)
+        pipeline.add_stage("double", lambda item, _: item * 2, workers=3)
+        pipeline.add_stage("odd", lambda item, _: item + 1 if item % 4 else None, workers=2)
+
+        results = list(pipeline.run(range(100)))
+
+        self.assertEqual(sorted(results), [n * 2 + 1 for n in range(100) if (n * 2) % 4])
+        stats = pipeline.stats()
+        self.assertEqual(list(stats), ["double", "odd", "consume"])
+        self.assertEqual(stats["double"]["items"], 100)
+        self.assertEqual(stats["odd"]["items"], 100)
+        self.assertEqual(stats["consume"]["items"], 50)
+        self.assertEqual(stats["double"]["workers"], 3)
+
+    def test_backpressure_bounds_items_in_flight(self):
+        """Test a slow consumer stops the first stage from running ahead"""
+        started = []
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add_stage("fetch", lambda item, _: started.append(item) or item, workers=2)
+        pipeline.add_stage("parse", lambda item, _: item, workers=1)
+
+        in_flight = []
+        for count, _ in enumerate(pipeline.run(range(200)), 1):
+            time.sleep(0.001)
+            in_flight.append(len(started) - count)
+
+        # Two queues of 2 plus the output queue, and one item per worker
+        self.assertLessEqual(max(in_flight), 2 * 3 + 3)
+        self.assertEqual(len(started), 200)
+        self.assertEqual(pipeline.bottleneck(), "consume")
+
+    def test_worker_setup_failure(self):
+        """Test one failed worker leaves the others running, all failing ends the run"""
+        calls = iter([RuntimeError("no connection"), "conn"])
+
+        def setup():
+            value = next(calls)
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add_stage("fetch", lambda item, conn: (conn, item), workers=2, setup=setup)
+        results = list(pipeline.run(range(10)))
+        self.assertEqual(sorted(results), [("conn", n) for n in range(10)])
+        self.assertEqual(pipeline.stats()["fetch"]["errors"], 1)
+
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add_stage("fetch", lambda item, conn: item, workers=2,
+                           setup=Mock(side_effect=RuntimeError("down")))
+        self.assertEqual(list(pipeline.run(range(10))), [])
+
+    def test_errors_and_early_exit(self):
+        """Test on_error replaces failed items and closing the iterator stops the threads"""
+        def parse(item, _):
+            if item == 3:
+                raise ValueError("bad message")
+            return item
+
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add_stage("parse", parse, on_error=lambda item, e: ("error", str(e)))
+        results = list(pipeline.run(range(5)))
+        self.assertIn(("error", "bad message"), results)
+        self.assertEqual(pipeline.stats()["parse"]["errors"], 1)
+
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add_stage("slow", lambda item, _: item, workers=2)
+        for result in pipeline.run(range(10000)):
+            break
+        self.assertFalse([t for t in threading.enumerate() if t.name.startswith("pipeline-")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""Tests for redirect chain recording and tracker shortcuts"""
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from src.database.models import Database
+from src.core.redirect_cache import RedirectCache, tracker_prefix
+from src.core.unsubscribe_handler import UnsubscribeHandler
+
+
+TRACKER = "https://click.esp.com/track?u=https%3A%2F%2Fshop.com%2Funsub%3Fid%3D{id}"
+
+
+def make_response(url: str, status_code: int = 200, history=None):
+    """Build a fake requests response"""
+    response = Mock()
+    response.url = url
+    response.status_code = status_code
+    response.history = history or []
+    response.elapsed = timedelta(milliseconds=100)
+    return response
+
+
+def tracker_response(link_id: int):
+    """Fake response for a tracker link redirecting to its embedded URL"""
+    hop = make_response(TRACKER.format(id=link_id), 302)
+    return make_response(f"https://shop.com/unsub?id={link_id}", 200, [hop])
+
+
+class TestRedirectCache(unittest.TestCase):
+    """Test cases for RedirectCache class"""
+
+    def setUp(self):
+        """Set up test database, cache and handler"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+        self.cache = RedirectCache(self.db, min_observations=2)
+        self.handler = UnsubscribeHandler(timeout=5, retry_count=1, redirect_cache=self.cache)
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_tracker_prefix(self):
+        """Test prefixes keep host and path only"""
+        self.assertEqual(tracker_prefix(TRACKER.format(id=1)), "click.esp.com/track")
+
+    def test_click_records_redirect_chain(self):
+        """Test a click returns every hop and the final URL"""
+        self.handler.session.get = Mock(return_value=tracker_response(1))
+
+        result = self.handler.click_link(TRACKER.format(id=1))
+
+        self.assertEqual(result["redirect_chain"],
+                         [TRACKER.format(id=1), "https://shop.com/unsub?id=1"])
+        self.assertEqual(result["final_url"], "https://shop.com/unsub?id=1")
+        self.assertEqual(result["learned_redirect"]["param"], "u")
+        self.assertAlmostEqual(result["learned_redirect"]["latency"], 0.1)
+
+    def test_opaque_tracker_is_not_learned(self):
+        """Test trackers without the destination in the URL are never skipped"""
+        hop = make_response("https://click.esp.com/ls/click?upn=abc123", 302)
+        self.handler.session.get = Mock(
+            return_value=make_response("https://shop.com/unsub", 200, [hop])
+        )
+
+        result = self.handler.click_link("https://click.esp.com/ls/click?upn=abc123")
+
+        self.assertIsNone(result["learned_redirect"])
+
+    def test_shortcut_after_min_observations(self):
+        """Test a tracker is skipped once it has been seen redirecting enough times"""
+        self.handler.session.get = Mock(side_effect=lambda url, **kwargs: tracker_response(
+            int(url.rsplit("%3D", 1)[-1])
+        ) if "esp.com" in url else make_response(url))
+
+        first = self.handler.click_link(TRACKER.format(id=1))
+        self.assertFalse(first["shortcut"])
+        self.assertIsNone(self.cache.shortcut(TRACKER.format(id=2)))
+
+        self.handler.click_link(TRACKER.format(id=2))
+        third = self.handler.click_link(TRACKER.format(id=3))
+
+        self.assertTrue(third["shortcut"])
+        self.assertEqual(third["redirect_chain"], ["https://shop.com/unsub?id=3"])
+        self.assertAlmostEqual(third["latency_saved"], 0.1)
+        self.handler.session.get.assert_called_with("https://shop.com/unsub?id=3",
+                                                    timeout=5, allow_redirects=True)
+
+    def test_failed_shortcut_falls_back_to_full_link(self):
+        """Test the full tracker link is clicked when the shortcut fails"""
+        self.cache._prefixes["click.esp.com/track"] = {
+            "prefix": "click.esp.com/track", "param": "u", "observations": 5,
+            "hops_total": 5, "latency_total": 0.5
+        }
+        self.handler.session.get = Mock(side_effect=[
+            make_response("https://shop.com/unsub?id=1", 404),
+            tracker_response(1),
+        ])
+
+        result = self.handler.click_link(TRACKER.format(id=1))
+
+        self.assertTrue(result["success"])
+        self.assertFalse(result["shortcut"])
+        self.assertEqual(self.handler.session.get.call_count, 2)
+
+    def test_record_redirects_and_stats(self):
+        """Test chains are stored per link and learned prefixes persist"""
+        email_id = self.db.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now())
+        link_id = self.db.add_unsubscribe_link(email_id, TRACKER.format(id=1))
+        self.handler.session.get = Mock(return_value=tracker_response(1))
+
+        for _ in range(2):
+            result = self.handler.click_link(TRACKER.format(id=1))
+            self.db.record_redirects(link_id, result)
+
+        stats = self.db.get_redirect_stats()
+        self.assertEqual(stats["links"], 1)
+        self.assertEqual(stats["avg_hops"], 1)
+        self.assertEqual(stats["known_trackers"], 1)
+
+        reloaded = RedirectCache(self.db, min_observations=2)
+        reloaded.load()
+        shortcut = reloaded.shortcut(TRACKER.format(id=9))
+        self.assertEqual(shortcut["url"], "https://shop.com/unsub?id=9")
+
+    def test_shortcuts_disabled(self):
+        """Test min_observations of 0 disables shortcuts"""
+        cache = RedirectCache(self.db, min_observations=0)
+        cache._prefixes["click.esp.com/track"] = {
+            "prefix": "click.esp.com/track", "param": "u", "observations": 5,
+            "hops_total": 5, "latency_total": 0.5
+        }
+        self.assertIsNone(cache.shortcut(TRACKER.format(id=1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
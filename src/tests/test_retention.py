@@ -0,0 +1,100 @@
+"""Tests for operation history retention"""
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.database.models import Database
+from src.database.retention import iter_archived_operations, prune_operation_history
+
+
+class TestRetention(unittest.TestCase):
+    """Test cases for archiving and pruning operation history"""
+
+    def setUp(self):
+        """Set up test database and archive directory"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.archive_dir = tempfile.mkdtemp()
+        self.db = Database(self.temp_db.name)
+
+    def tearDown(self):
+        """Clean up test database and archive"""
+        self.db.close()
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def _add_operations(self, timestamp, count, status="success"):
+        """Insert history rows with a fixed timestamp"""
+        conn = self.db.connect()
+        for idx in range(count):
+            conn.execute(
+                "INSERT INTO operation_history (operation_type, status, details, timestamp) "
+                "VALUES ('scan', ?, ?, ?)",
+                (status, f"op {idx}", timestamp)
+            )
+        conn.commit()
+
+    def _prune(self, **kwargs):
+        """Prune with the test archive and no pauses"""
+        kwargs.setdefault("pause_seconds", 0)
+        return prune_operation_history(self.db, archive_dir=self.archive_dir, **kwargs)
+
+    def test_old_history_is_archived_and_rolled_up(self):
+        """Test old rows move to the archive and operation_daily"""
+        self._add_operations("2020-01-05 10:00:00", 5)
+        self._add_operations("2020-02-07 10:00:00", 2, status="failed")
+        self.db.log_operation("scan", details="recent")
+
+        results = self._prune(retention_days=30, batch_size=3)
+
+        self.assertEqual(results["archived"], 7)
+        self.assertEqual(results["batches"], 3)
+        self.assertEqual(len(results["segments"]), 2)
+        remaining = self.db.get_recent_operations(10)
+        self.assertEqual([op["details"] for op in remaining], ["recent"])
+
+        conn = self.db.connect()
+        daily = conn.execute(
+            "SELECT day, status, count FROM operation_daily ORDER BY day"
+        ).fetchall()
+        self.assertEqual([tuple(row) for row in daily],
+                         [("2020-01-05", "success", 5), ("2020-02-07", "failed", 2)])
+
+        archived = list(iter_archived_operations(self.archive_dir))
+        self.assertEqual(len(archived), 7)
+        self.assertEqual(len({row["id"] for row in archived}), 7)
+
+    def test_statistics_keep_pruned_operations(self):
+        """Test rebuilt statistics still count archived operations"""
+        self._add_operations("2020-01-05 10:00:00", 4)
+        self._prune(retention_days=30)
+
+        self.db.rebuild_statistics()
+
+        days = {row["day"]: row for row in self.db.get_daily_statistics(days=100000)}
+        self.assertEqual(days["2020-01-05"]["operations"], 4)
+
+    def test_max_batches(self):
+        """Test pruning stops after max_batches"""
+        self._add_operations("2020-01-05 10:00:00", 10)
+
+        results = self._prune(retention_days=30, batch_size=4, max_batches=1)
+
+        self.assertEqual(results["archived"], 4)
+        count = self.db.connect().execute("SELECT COUNT(*) FROM operation_history").fetchone()[0]
+        self.assertEqual(count, 6)
+
+    def test_disabled_retention(self):
+        """Test retention_days of 0 keeps everything"""
+        self._add_operations("2020-01-05 10:00:00", 3)
+
+        results = self._prune(retention_days=0)
+
+        self.assertEqual(results["archived"], 0)
+        self.assertEqual(os.listdir(self.archive_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests for scan budgets and prioritization"""
+import unittest
+import time
+from datetime import datetime, timedelta
+from email.message import Message
+
+from src.core.scan_budget import ScanBudget, prioritize
+
+
+def headers_for(sender: str, list_unsubscribe: bool = False) -> Message:
+    """Build a header-only message"""
+    msg = Message()
+    msg["From"] = sender
+    if list_unsubscribe:
+        msg["List-Unsubscribe"] = "<https://example.com/unsub>"
+    return msg
+
+
+class TestScanBudget(unittest.TestCase):
+    """Test cases for prioritize and ScanBudget"""
+
+    def test_prioritize_weighs_recency_senders_and_list_unsubscribe(self):
+        """Test unknown senders and List-Unsubscribe outrank recency alone"""
+        headers = {
+            b"1": headers_for("new@shop.com", list_unsubscribe=True),
+            b"2": headers_for("known@news.com", list_unsubscribe=True),
+            b"3": headers_for("new@deals.com"),
+            b"4": headers_for("known@news.com"),
+        }
+
+        order = prioritize([b"4", b"1", b"3", b"2", b"5"], headers, {"known@news.com"})
+
+        self.assertEqual(order, [b"1", b"3", b"2", b"5", b"4"])
+
+    def test_limits(self):
+        """Test message and byte budgets, skipping too-large messages, and the deadline"""
+        budget = ScanBudget(max_messages=2)
+        self.assertEqual(list(budget.admit(range(5), lambda item: 0)), [0, 1])
+        self.assertEqual(budget.stopped_by, "messages")
+
+        sizes = {"a": 60, "b": 50, "c": 30, "d": 10}
+        budget = ScanBudget(max_bytes=100)
+        self.assertEqual(list(budget.admit("abcd", sizes.get)), ["a", "c", "d"])
+        self.assertEqual((budget.stopped_by, budget.bytes_taken), ("bytes", 100))
+
+        budget = ScanBudget(deadline=datetime.now() + timedelta(seconds=0.05))
+        self.assertFalse(budget.expired())
+        self.assertGreater(budget.seconds_left(), 0)
+        time.sleep(0.06)
+        self.assertFalse(budget.take())
+        self.assertEqual(budget.stopped_by, "deadline")
+
+    def test_message_limit_ends_scan_after_bytes_pass_over(self):
+        """Test the message limit stops admitting after a message was passed over for its size"""
+        sizes = {"a": 60, "b": 50, "c": 30, "d": 10, "e": 1}
+        budget = ScanBudget(deadline=60, max_bytes=100, max_messages=2)
+        seen = []
+
+        admitted = list(budget.admit("abcde", lambda item: seen.append(item) or sizes[item]))
+
+        self.assertEqual(admitted, ["a", "c"])
+        self.assertEqual(seen, ["a", "b", "c", "d"])
+        self.assertEqual(budget.stopped_by, "messages")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests for scan run checkpoints"""
+import unittest
+
+from src.core.scan_progress import ScanProgress
+
+
+class TestScanProgress(unittest.TestCase):
+    """Test cases for ScanProgress"""
+
+    def test_checkpoint_only_covers_contiguous_uids(self):
+        """Test UIDs done out of order are kept until the gap below them closes"""
+        progress = ScanProgress([10, 11, 12, 15])
+
+        progress.mark_done(12)
+        progress.mark_done(15)
+        self.assertEqual(progress.state(), (None, [[12, 15]], 2))
+
+        progress.mark_done(10)
+        self.assertEqual(progress.state(), (10, [[12, 15]], 3))
+        self.assertEqual(progress.remaining(), [11])
+
+        progress.mark_done(11)
+        self.assertEqual(progress.state(), (15, [], 4))
+        self.assertTrue(progress.complete)
+
+    def test_resume_from_saved_state(self):
+        """Test a saved checkpoint and done UIDs are not handed out again"""
+        progress = ScanProgress([21, 22, 23, 24], checkpoint_uid=20, done_uids=[23, 99],
+                                processed=8)
+
+        self.assertEqual(progress.remaining(), [21, 22, 24])
+        progress.mark_done(21)
+        progress.mark_done(22)
+        self.assertEqual(progress.state(), (23, [], 10))
+
+    def test_newest_first_progress_stays_one_range(self):
+        """Test UIDs done from the top down are saved as one range and resumed from it"""
+        uids = list(range(1, 1001))
+        progress = ScanProgress(uids)
+        for uid in reversed(uids[500:]):
+            progress.mark_done(uid)
+        progress.mark_done(3)
+
+        self.assertEqual(progress.state(), (None, [[3, 3], [501, 1000]], 501))
+
+        resumed = ScanProgress(uids, *progress.state())
+        self.assertEqual(resumed.remaining(), [1, 2] + list(range(4, 501)))
+
+    def test_resume_from_single_uids(self):
+        """Test done UIDs saved one by one, as older runs did, still resume"""
+        progress = ScanProgress([5, 6, 7], done_uids=[6, 7], processed=2)
+
+        self.assertEqual(progress.remaining(), [5])
+        self.assertEqual(progress.state(), (None, [[6, 7]], 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+"""Tests for the multi-account scan scheduler"""
+import unittest
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from src.core.orchestrator import EmailUnsubscribeOrchestrator
+from src.core.scheduler import ScanScheduler
+from src.database.models import Database
+from src.tests.test_orchestrator import make_message
+
+
+class FakeMailbox:
+    """Stands in for EmailManager, serving one folder of the test's mailboxes"""
+
+    def __init__(self, test, address, password, server, folder="inbox", **kwargs):
+        self.test = test
+        self.password = password
+        self.imap_server = server
+        self.messages = test.mailboxes.get((address, folder), {})
+        self.uidvalidity = 1
+
+    def connect(self):
+        with self.test.lock:
+            open_now = self.test.open_connections.get(self.imap_server, 0) + 1
+            self.test.open_connections[self.imap_server] = open_now
+            peak = self.test.peak_connections.get(self.imap_server, 0)
+            self.test.peak_connections[self.imap_server] = max(peak, open_now)
+        return True
+
+    def disconnect(self):
+        with self.test.lock:
+            self.test.open_connections[self.imap_server] -= 1
+
+    def search_emails(self, criteria=None, max_emails=None):
+        uids = sorted(self.messages, key=int)
+        match = re.match(r"\(UID (\d+):(\d+) ", criteria or "")
+        if match:
+            low, high = int(match.group(1)), int(match.group(2))
+            uids = [uid for uid in uids if low <= int(uid) <= high]
+        return uids[-max_emails:] if max_emails else uids
+
+    def fetch_headers(self, email_ids):
+        return {email_id: self.messages[email_id] for email_id in email_ids}
+
+    def fetch_email(self, email_id):
+        self.test.fetched.append(email_id)
+        time.sleep(self.test.fetch_delay)
+        return self.messages.get(email_id)
+
+
+class TestScanScheduler(unittest.TestCase):
+    """Test cases for round-robin slices, connection caps and per-account checkpoints"""
+
+    def setUp(self):
+        """Set up test database, config and an empty set of mailboxes"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name)
+
+        self.config = Mock()
+        self.config.email_address = "me@example.com"
+        self.config.email_password = "password"
+        self.config.imap_server = "imap.test.com"
+        self.config.request_timeout = 5
+        self.config.max_emails_per_scan = 100
+        self.config.link_click_delay = 0
+        self.config.worker_lease_seconds = 60
+        self.config.dns_cache_ttl = 0
+        self.config.click_pool_connections = 10
+        self.config.click_pool_maxsize = 4
+        self.config.unsubscribe_grace_days = 7
+        self.config.redirect_shortcut_min_observations = 2
+        self.config.batch_write_size = 500
+        self.config.batch_write_interval_ms = 1000
+        self.config.message_store_dir = ""
+        self.config.scan_fetch_workers = 2
+        self.config.scan_parse_workers = 1
+        self.config.scan_queue_size = 10
+        self.config.imap_reconnect_attempts = 0
+        self.config.imap_reconnect_backoff = 0
+        self.config.scan_max_workers = 2
+        self.config.scan_max_connections_per_server = 2
+        self.config.scan_slice_size = 100
+
+        self.orchestrator = EmailUnsubscribeOrchestrator(self.config, self.db)
+        self.mailboxes = {}
+        self.lock = threading.Lock()
+        self.open_connections = {}
+        self.peak_connections = {}
+        self.fetched = []
+        self.fetch_delay = 0
+
+        patcher = patch("src.core.orchestrator.EmailManager",
+                        side_effect=lambda *args, **kwargs: FakeMailbox(self, *args, **kwargs))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        env = patch.dict(os.environ, {"TEST_ACCOUNT_PASSWORD": "secret"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def _add_account(self, name, counts, server="imap.test.com"):
+        """Register an account whose folders hold counts[folder] messages"""
+        address = f"{name}@example.com"
+        for folder, count in counts.items():
+            self.mailboxes[(address, folder)] = {
+                str(uid).encode(): make_message(f"<{name}-{folder}-{uid}@example.com>",
+                                                f"news{uid}@{name}.com")
+                for uid in range(1, count + 1)
+            }
+        return self.db.add_account(name, address, "env:TEST_ACCOUNT_PASSWORD",
+                                   imap_server=server, folders=list(counts))
+
+    def test_accounts_take_turns_in_slices(self):
+        """Test slices rotate between accounts and every mailbox gets its own checkpointed run"""
+        alpha = self._add_account("alpha", {"INBOX": 5, "Archive": 2})
+        self._add_account("bravo", {"INBOX": 2})
+        self._add_account("charlie", {"INBOX": 1})
+        order = []
+
+        summary = ScanScheduler(self.orchestrator, max_workers=1, slice_size=2).run(
+            progress_callback=lambda account, folder, result: order.append((account, folder))
+        )
+
+        self.assertEqual(order, [("alpha", "INBOX")] * 2 + [("bravo", "INBOX")] * 2
+                         + [("charlie", "INBOX"), ("alpha", "Archive"), ("alpha", "Archive")]
+                         + [("alpha", "INBOX")] * 3)
+        self.assertEqual(summary["scanned"], 10)
+        self.assertEqual(summary["failed"], 0)
+        runs = self.db.get_scan_runs()
+        self.assertEqual(len(runs), 4)
+        self.assertTrue(all(run["status"] == "completed" for run in runs))
+        inbox = next(m for m in summary["mailboxes"] if m["account"] == "alpha"
+                     and m["folder"] == "INBOX")
+        self.assertEqual((inbox["scanned"], inbox["slices"]), (5, 3))
+        self.assertEqual(self.db.get_scan_run(inbox["run_id"])["account_id"], alpha)
+        self.assertIsNotNone(self.db.get_account(alpha)["last_scan_at"])
+        self.assertEqual(len(self.db.page_emails(limit=100).rows), 10)
+
+    def test_connection_caps_and_credentials(self):
+        """Test per-server caps hold under concurrency and a bad account fails alone"""
+        for idx in range(4):
+            self._add_account(f"shared{idx}", {"INBOX": 3}, server="imap.shared.com")
+        self._add_account("solo", {"INBOX": 3}, server="imap.solo.com")
+        self.db.add_account("broken", "broken@example.com", "env:MISSING_PASSWORD",
+                            imap_server="imap.solo.com")
+        self.fetch_delay = 0.01
+
+        summary = self.orchestrator.scan_accounts(max_workers=4, max_connections_per_server=2,
+                                                  slice_size=2)
+
+        self.assertLessEqual(self.peak_connections["imap.shared.com"], 2)
+        self.assertEqual(self.peak_connections["imap.solo.com"], 1)
+        self.assertEqual(summary["workers"], 4)
+        self.assertEqual(summary["scanned"], 15)
+        self.assertEqual(summary["failed"], 1)
+        broken = next(m for m in summary["mailboxes"] if m["account"] == "broken")
+        self.assertIn("MISSING_PASSWORD", broken["error"])
+
+    def test_stopped_round_resumes_each_mailbox(self):
+        """Test a stopped round continues every mailbox from its own checkpoint"""
+        self._add_account("alpha", {"INBOX": 4})
+        self._add_account("bravo", {"INBOX": 4})
+        scheduler = ScanScheduler(self.orchestrator, max_workers=1, slice_size=3)
+
+        def stop_after_first(account, folder, result):
+            scheduler.stop()
+
+        first = scheduler.run(progress_callback=stop_after_first)
+        self.assertEqual(first["scanned"], 1)
+        self.assertEqual(self.db.get_scan_runs(status="interrupted")[0]["processed"], 1)
+
+        self.fetched.clear()
+        second = ScanScheduler(self.orchestrator, max_workers=2, slice_size=3).run()
+
+        self.assertEqual(second["scanned"], 7)
+        self.assertEqual(len(self.fetched), 7)
+        self.assertEqual(len(self.db.get_scan_runs()), 2)
+        self.assertTrue(all(run["status"] == "completed" for run in self.db.get_scan_runs()))
+
+    def test_unsubscribe_applies_to_its_account_only(self):
+        """Test unsubscribing in one account neither clicks nor skips the other's mail"""
+        alpha = self._add_account("alpha", {})
+        bravo = self._add_account("bravo", {})
+        for name in ("alpha", "bravo"):
+            self.mailboxes[(f"{name}@example.com", "INBOX")] = {
+                b"1": make_message(f"<{name}-1@example.com>", "news@shop.com",
+                                   link="https://shop.com/unsubscribe?list=1")
+            }
+        self.orchestrator.scan_accounts()
+
+        links = {row["message_id"]: row["link_id"] for row in self.db.connect().execute("""
+            SELECT e.message_id, ul.id AS link_id FROM unsubscribe_links ul
+            JOIN emails e ON e.id = ul.email_id
+        """)}
+        self.db.update_link_status(links["<alpha-1@example.com>"], True, 200)
+
+        self.assertEqual([link["id"] for link in self.db.get_subscription_links()],
+                         [links["<bravo-1@example.com>"]])
+        self.assertIn("news@shop.com", self.db.get_unsubscribed_senders(alpha))
+        self.assertEqual(self.db.get_unsubscribed_senders(bravo), {})
+
+        for name in ("alpha", "bravo"):
+            self.mailboxes[(f"{name}@example.com", "INBOX")][b"2"] = make_message(
+                f"<{name}-2@example.com>", "news@shop.com",
+                link="https://shop.com/unsubscribe?list=1"
+            )
+        self.orchestrator.scan_accounts()
+
+        stored = {row["message_id"] for row in self.db.page_emails(limit=100).rows}
+        self.assertNotIn("<alpha-2@example.com>", stored)
+        self.assertIn("<bravo-2@example.com>", stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for URL canonicalization"""
+import unittest
+
+from src.utils.url_canonicalizer import canonicalize_url, unwrap_redirector
+
+
+class TestUrlCanonicalizer(unittest.TestCase):
+    """Test cases for canonicalize_url and unwrap_redirector"""
+
+    def test_lowercases_scheme_and_host(self):
+        """Test scheme and host are lowercased but the path is not"""
+        self.assertEqual(
+            canonicalize_url("HTTPS://Example.COM/Unsub?id=1"),
+            "https://example.com/Unsub?id=1"
+        )
+
+    def test_strips_tracking_params(self):
+        """Test utm_* and ESP tracking parameters are removed"""
+        url = ("https://example.com/unsubscribe?list=42&utm_source=news"
+               "&utm_medium=email&mc_eid=abc123&mc_cid=xyz")
+        self.assertEqual(canonicalize_url(url), "https://example.com/unsubscribe?list=42")
+
+    def test_sorts_query_params(self):
+        """Test parameter order does not matter"""
+        self.assertEqual(
+            canonicalize_url("https://example.com/u?b=2&a=1"),
+            canonicalize_url("https://example.com/u?a=1&b=2")
+        )
+
+    def test_drops_fragment_and_default_port(self):
+        """Test fragments and default ports are dropped"""
+        self.assertEqual(
+            canonicalize_url("https://example.com:443/unsub#top"),
+            "https://example.com/unsub"
+        )
+        self.assertEqual(
+            canonicalize_url("http://example.com:8080/unsub"),
+            "http://example.com:8080/unsub"
+        )
+
+    def test_empty_path(self):
+        """Test an empty path is normalized to /"""
+        self.assertEqual(canonicalize_url("https://example.com"), "https://example.com/")
+
+    def test_unwraps_google_redirect(self):
+        """Test Google redirector links are unwrapped"""
+        url = "https://www.google.com/url?q=https://example.com/unsub?id%3D1&sa=D"
+        self.assertEqual(unwrap_redirector(url), "https://example.com/unsub?id=1")
+        self.assertEqual(canonicalize_url(url), "https://example.com/unsub?id=1")
+
+    def test_unwraps_safelinks(self):
+        """Test Outlook Safe Links wrappers are unwrapped"""
+        url = ("https://eur01.safelinks.protection.outlook.com/?url="
+               "https%3A%2F%2Fexample.com%2Funsub%3Futm_source%3Dx&data=abc")
+        self.assertEqual(canonicalize_url(url), "https://example.com/unsub")
+
+    def test_unwraps_urldefense_v3(self):
+        """Test Proofpoint URL Defense v3 links are unwrapped"""
+        url = "https://urldefense.com/v3/__https://example.com/unsub__;!!abc$"
+        self.assertEqual(canonicalize_url(url), "https://example.com/unsub")
+
+    def test_non_redirector_is_not_unwrapped(self):
+        """Test URL parameters on ordinary hosts are left alone"""
+        url = "https://example.com/unsub?url=https://other.com/"
+        self.assertIsNone(unwrap_redirector(url))
+
+    def test_copies_share_canonical_form(self):
+        """Test tracked copies of one endpoint canonicalize identically"""
+        copies = [
+            "https://Example.com/unsubscribe?list=7&utm_campaign=jan",
+            "https://example.com/unsubscribe?utm_campaign=feb&list=7&mc_eid=1",
+            "https://www.google.com/url?q=https://example.com/unsubscribe?list%3D7",
+        ]
+        self.assertEqual(len({canonicalize_url(url) for url in copies}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
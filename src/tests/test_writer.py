@@ -0,0 +1,155 @@
+"""Tests for the single-writer database thread"""
+import unittest
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+from src.database.models import Database
+from src.database.batch_writer import BatchWriter
+from src.database.job_queue import JobQueue
+
+
+class TestDatabaseWriter(unittest.TestCase):
+    """Test cases for DatabaseWriter class"""
+
+    def setUp(self):
+        """Set up test database in single-writer mode"""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db = Database(self.temp_db.name, single_writer=True)
+
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        if os.path.exists(self.temp_db.name):
+            os.unlink(self.temp_db.name)
+
+    def test_submit_returns_row_id(self):
+        """Test a submitted write resolves to its return value after commit"""
+        future = self.db.submit(self.db.add_email, "<1@shop.com>", "news@shop.com", "Hi",
+                                datetime.now())
+        email_id = future.result(timeout=5)
+
+        other = Database(self.temp_db.name)
+        row = other.connect().execute("SELECT id FROM emails").fetchone()
+        other.close()
+        self.assertEqual(row[0], email_id)
+
+    def test_methods_are_routed_through_writer(self):
+        """Test committing Database methods run on the writer thread"""
+        email_id = self.db.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now(),
+                                     "marketing")
+        link_id = self.db.add_unsubscribe_link(email_id, "https://shop.com/unsub")
+        self.db.update_link_status(link_id, True, 200, None)
+
+        self.assertGreaterEqual(self.db.writer.writes, 3)
+        self.assertEqual(self.db.get_statistics()["successful_clicks"], 1)
+
+    def test_no_writes_on_caller_connection(self):
+        """Test list edits, rebuilds and click jobs never write on the caller's connection"""
+        conn = self.db.connect()
+        changes = conn.total_changes
+        statements = []
+        conn.set_trace_callback(statements.append)
+        queue = JobQueue(self.db)
+
+        email_id = self.db.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now())
+        link_id = self.db.add_unsubscribe_link(email_id, "https://shop.com/unsub")
+        self.assertTrue(self.db.add_to_whitelist("friend@example.com"))
+        self.assertFalse(self.db.add_to_whitelist("friend@example.com"))
+        self.db.add_to_blacklist("spam@example.com")
+        self.db.remove_from_whitelist(self.db.get_whitelist()[0]["id"])
+        self.db.remove_from_blacklist(self.db.get_blacklist()[0]["id"])
+        self.db.add_custom_filter("shops", "*@shop.com", "sender")
+        self.db.rebuild_statistics()
+        self.db.rebuild_senders()
+        self.assertEqual(queue.enqueue([link_id]), 1)
+        job = queue.lease("worker-1")[0]
+        queue.release(job, "boom")
+        job = queue.lease("worker-1")[0]
+        queue.complete(job, {"success": True, "status_code": 200})
+
+        conn.set_trace_callback(None)
+        self.assertEqual(conn.total_changes, changes)
+        self.assertFalse([sql for sql in statements
+                          if sql.lstrip().split()[0].upper() in ("BEGIN", "COMMIT", "INSERT",
+                                                                 "UPDATE", "DELETE")])
+        self.assertEqual(queue.get_job(job["id"])["state"], "done")
+        self.assertEqual(self.db.get_whitelist(), [])
+        self.assertEqual(len(self.db.get_custom_filters()), 1)
+
+    def test_concurrent_writes_are_grouped(self):
+        """Test writes from many threads share transactions"""
+        futures = []
+        lock = threading.Lock()
+
+        def produce(thread_idx):
+            for idx in range(20):
+                future = self.db.submit(self.db.log_operation, "scan",
+                                        details=f"{thread_idx}-{idx}")
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=produce, args=(idx,)) for idx in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            future.result(timeout=5)
+
+        count = self.db.connect().execute("SELECT COUNT(*) FROM operation_history").fetchone()[0]
+        self.assertEqual(count, 100)
+        self.assertLessEqual(self.db.writer.transactions, 100)
+
+    def test_failed_write_fails_only_its_future(self):
+        """Test a raising write is rolled back without affecting its batch"""
+        def broken():
+            self.db.connect().execute(
+                "INSERT INTO settings (key, value) VALUES ('half', 'done')"
+            )
+            raise ValueError("boom")
+
+        bad = self.db.writer.submit(broken)
+        good = self.db.submit(self.db.set_setting, "kept", "yes")
+
+        with self.assertRaises(ValueError):
+            bad.result(timeout=5)
+        good.result(timeout=5)
+        self.assertIsNone(self.db.get_setting("half"))
+        self.assertEqual(self.db.get_setting("kept"), "yes")
+
+    def test_close_drains_queue(self):
+        """Test closing writes everything that was queued"""
+        futures = [self.db.submit(self.db.log_operation, "scan") for _ in range(50)]
+        self.db.close()
+
+        self.assertFalse(self.db.writer.running)
+        self.assertTrue(all(future.done() for future in futures))
+        with self.assertRaises(RuntimeError):
+            self.db.submit(self.db.log_operation, "scan")
+
+    def test_batch_writer_uses_writer_thread(self):
+        """Test BatchWriter flushes are queued as single writes"""
+        with BatchWriter(self.db, max_records=100) as writer:
+            writer.add_email("<1@shop.com>", "news@shop.com", "Hi", datetime.now(),
+                             has_unsubscribe_link=True)
+            writer.add_unsubscribe_link("<1@shop.com>", "https://shop.com/unsub")
+
+        self.assertEqual(len(self.db.get_subscription_links()), 1)
+        self.assertGreaterEqual(self.db.writer.transactions, 1)
+
+    def test_submit_without_writer(self):
+        """Test submit runs and commits immediately without a writer thread"""
+        db = Database(self.temp_db.name)
+        future = db.submit(db.add_email, "<2@shop.com>", "news@shop.com", "Hi", datetime.now())
+
+        self.assertTrue(future.done())
+        self.assertIsNone(db.writer)
+        self.assertGreater(future.result(), 0)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 """Streamlit web interface for Email Unsubscribe Automation"""
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 import time
 import os
 import sys
@@ -13,6 +14,7 @@ from src.utils.config import Config
 from src.utils.logger import setup_logging
 from src.database.models import Database
 from src.core.orchestrator import EmailUnsubscribeOrchestrator
+from src.core.scan_budget import ScanBudget
 
 
 # Page configuration
@@ -73,6 +75,38 @@ def initialize_session_state():
         st.session_state.scan_results = None
 
 
+def keyset_pager(key: str, filters: tuple):
+    """Keep the cursor of the current page of a paginated listing
+    
+    Cursors of the pages visited so far are kept in session state so the
+    user can step back; changing the filters starts over at the first page.
+    
+    Returns:
+        Cursor to pass as after= for the current page
+    """
+    state = st.session_state.setdefault(f"{key}_pager", {"filters": None, "cursors": [None]})
+    if state["filters"] != filters:
+        state["filters"] = filters
+        state["cursors"] = [None]
+    return state["cursors"][-1]
+
+
+def keyset_pager_controls(key: str, next_cursor):
+    """Render previous/next buttons for a listing paginated with keyset_pager"""
+    state = st.session_state[f"{key}_pager"]
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor)
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(state['cursors'])}")
+
+
 def sidebar_navigation():
     """Render sidebar navigation"""
     st.sidebar.title("📧 Email Unsubscribe")
@@ -81,7 +115,7 @@ def sidebar_navigation():
     # Navigation
     page = st.sidebar.radio(
         "Navigation",
-        ["Dashboard", "Email Scanner", "Unsubscribe Manager", "Whitelist/Blacklist", 
+        ["Dashboard", "Email Scanner", "Search", "Unsubscribe Manager", "Whitelist/Blacklist", 
          "Settings", "Statistics", "Operation History"]
     )
     
@@ -141,7 +175,12 @@ def settings_page():
                             st.session_state.credentials_verified = True
                             
                             # Initialize database and orchestrator
-                            st.session_state.db = Database(st.session_state.config.database_path)
+                            st.session_state.db = Database(
+                                st.session_state.config.database_path,
+                                single_writer=st.session_state.config.db_single_writer,
+                                write_queue_size=st.session_state.config.db_write_queue_size,
+                                profile=st.session_state.config.db_profile
+                            )
                             st.session_state.orchestrator = EmailUnsubscribeOrchestrator(
                                 st.session_state.config,
                                 st.session_state.db
@@ -283,145 +322,379 @@ def email_scanner_page():
             value=100,
             step=10
         )
+        time_limit = st.number_input(
+            "Time limit in minutes (0 = none)",
+            min_value=0.0,
+            value=0.0,
+            step=1.0,
+            help="Scan the newest emails, unknown senders and mailing lists first and "
+                 "stop at the limit; the rest is scanned first next time"
+        )
     
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
         scan_button = st.button("🔍 Start Scan", type="primary", use_container_width=True)
+        estimate_button = st.button("📋 Estimate", use_container_width=True,
+                                    help="Sample the mailbox and estimate the scan without running it")
+    
+    if estimate_button:
+        with st.spinner("Sampling the mailbox..."):
+            try:
+                plan = st.session_state.orchestrator.plan_scan(max_emails=max_emails)
+            except (ConnectionError, ValueError) as e:
+                st.error(f"❌ {e}")
+                plan = None
+        if plan is not None:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Would Scan", plan["candidates"])
+            with col2:
+                st.metric("To Fetch", plan["to_fetch"],
+                          help=f"{plan['already_stored']} of them are already stored")
+            with col3:
+                st.metric("Download", f"{plan['bytes'] / 1024 / 1024:.1f} MiB")
+            with col4:
+                st.metric("Duration", str(timedelta(seconds=round(plan["seconds"])))
+                          if plan["timing_basis"] else "unknown")
+            skipped = plan["skipped"]
+            st.caption(f"Sampled {plan['sampled']} of {plan['matching']} matching emails; "
+                       f"{skipped['whitelisted']} whitelisted and {skipped['unsubscribed']} "
+                       f"unsubscribed would be skipped on their headers. "
+                       + ("Timings from earlier scans." if plan["timing_basis"] == "history"
+                          else "No earlier scans: the duration is a lower bound."))
+            if plan["stage_seconds"]:
+                st.dataframe(pd.DataFrame({"seconds": plan["stage_seconds"]}),
+                             use_container_width=True)
+    
+    # Scans that were stopped or lost their connection can be continued
+    resume_run_id = None
+    interrupted = st.session_state.orchestrator.db.get_scan_runs(limit=5, status="interrupted")
+    if interrupted:
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            run = st.selectbox(
+                "Interrupted scans",
+                interrupted,
+                format_func=lambda r: (f"Run {r['id']} from {r['started_at']}: "
+                                       f"{r['processed']} of {r['total']} done")
+            )
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("⏯️ Resume Scan", use_container_width=True):
+                resume_run_id = run["id"]
     
-    if scan_button:
+    if scan_button or resume_run_id is not None:
         progress_bar = st.progress(0)
         status_text = st.empty()
+        metrics = st.empty()
+        live_table = st.empty()
         
-        def progress_callback(current, total):
-            progress = current / total
-            progress_bar.progress(progress)
-            status_text.text(f"Processing email {current} of {total}...")
+        # Results are streamed: only the counters and the most recent rows
+        # are kept, however large the scan
+        results = {"total_scanned": 0, "emails_with_links": 0, "total_links_found": 0,
+                   "skipped_unsubscribed": 0, "errors": 0}
+        recent = deque(maxlen=200)
+        summary = {}
         
-        with st.spinner("Scanning emails..."):
-            results = st.session_state.orchestrator.scan_emails(
-                max_emails=max_emails,
-                progress_callback=progress_callback
-            )
-            st.session_state.scan_results = results
+        def show_metrics():
+            with metrics.container():
+                col1, col2, col3, col4, col5 = st.columns(5)
+                with col1:
+                    st.metric("Total Scanned", results["total_scanned"])
+                with col2:
+                    st.metric("With Unsubscribe Links", results["emails_with_links"])
+                with col3:
+                    st.metric("Total Links Found", results["total_links_found"])
+                with col4:
+                    st.metric("Already Unsubscribed", results["skipped_unsubscribed"])
+                with col5:
+                    st.metric("Errors", results["errors"])
+        
+        try:
+            budget = ScanBudget(time_limit * 60) if time_limit else None
+            scan = st.session_state.orchestrator.iter_scan(max_emails=max_emails,
+                                                           summary=summary,
+                                                           run_id=resume_run_id,
+                                                           budget=budget)
+            for done, result in enumerate(scan, 1):
+                results["total_scanned"] = done
+                results["emails_with_links"] += result.links_found > 0
+                results["total_links_found"] += result.links_found
+                results["skipped_unsubscribed"] += result.status == "unsubscribed"
+                results["errors"] += result.status == "error"
+                if result.status == "processed":
+                    recent.appendleft({"sender": result.sender, "subject": result.subject,
+                                       "links_found": result.links_found,
+                                       "category": result.category})
+                
+                progress_bar.progress(done / summary["total"])
+                status_text.text(f"Processing email {done} of {summary['total']}...")
+                # Redrawing is slower than scanning; refresh every 25 emails
+                if done % 25 == 0 or done == summary["total"]:
+                    show_metrics()
+                    if recent:
+                        live_table.dataframe(pd.DataFrame(list(recent)),
+                                             use_container_width=True)
+        except (ConnectionError, ValueError) as e:
+            st.error(f"❌ {e}")
+            if summary.get("run_id"):
+                st.info(f"Scan run {summary['run_id']} can be resumed from where it stopped.")
+            return
+        
+        results["pipeline"] = summary.get("pipeline", {})
+        results["bottleneck"] = summary.get("bottleneck")
+        results["metrics"] = summary.get("metrics", {})
+        st.session_state.scan_results = results
         
         progress_bar.empty()
         status_text.empty()
+        show_metrics()
         
         # Display results
-        st.success("✅ Scan complete!")
+        if summary.get("stopped_by"):
+            st.warning(f"⏱️ Time limit reached: {summary['remaining']} emails are left and "
+                       f"will be scanned first next time.")
+        else:
+            st.success("✅ Scan complete!")
         
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("Total Scanned", results["total_scanned"])
-        with col2:
-            st.metric("With Unsubscribe Links", results["emails_with_links"])
-        with col3:
-            st.metric("Total Links Found", results["total_links_found"])
-        with col4:
-            st.metric("Errors", results["errors"])
+        if results["pipeline"]:
+            with st.expander(f"⚙️ Pipeline stages (bottleneck: {results['bottleneck']})"):
+                st.dataframe(pd.DataFrame.from_dict(results["pipeline"], orient="index"),
+                             use_container_width=True)
+        
+        timers = {name: stats for name, stats in results["metrics"].items() if "count" in stats}
+        if timers:
+            with st.expander("⏱️ Where the time went"):
+                st.dataframe(pd.DataFrame.from_dict(timers, orient="index")
+                             .sort_values("sum", ascending=False),
+                             use_container_width=True)
         
         # Show processed emails
-        if results["emails_processed"]:
+        if recent:
             st.markdown("### 📧 Processed Emails")
-            df = pd.DataFrame(results["emails_processed"])
-            st.dataframe(df, use_container_width=True)
+            live_table.empty()
+            st.dataframe(pd.DataFrame(list(recent)), use_container_width=True)
 
 
-def unsubscribe_manager_page():
-    """Unsubscribe management page"""
-    st.markdown('<p class="main-header">✉️ Unsubscribe Manager</p>', unsafe_allow_html=True)
+def search_page():
+    """Email search page"""
+    st.markdown('<p class="main-header">🔎 Search Emails</p>', unsafe_allow_html=True)
     
     if not st.session_state.credentials_verified:
         st.warning("⚠️ Please configure your credentials in the Settings page first.")
         return
     
-    # Get unclicked links
-    conn = st.session_state.db.connect()
-    cursor = conn.cursor()
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        query = st.text_input(
+            "Search sender, subject and category",
+            placeholder='sender:shop "black friday"',
+            help='Every word or "quoted phrase" must match. Prefix a term with '
+                 'sender:, subject: or category: to search one field.'
+        )
+    with col2:
+        page_size = st.selectbox("Per page", [25, 50, 100, 200], index=1)
+    
+    if not query.strip():
+        st.info("Type to search the scanned emails")
+        return
+    
+    after = keyset_pager("search", (query, page_size))
+    started = time.perf_counter()
+    page = st.session_state.orchestrator.search_emails(query, page_size, after)
+    elapsed_ms = (time.perf_counter() - started) * 1000
     
-    cursor.execute("""
-        SELECT ul.id, ul.link, e.sender, e.subject, e.category, ul.created_at
-        FROM unsubscribe_links ul
-        JOIN emails e ON ul.email_id = e.id
-        WHERE ul.clicked = 0
-        ORDER BY ul.created_at DESC
-    """)
+    if not page.rows:
+        st.info("No emails match your search")
+        return
+    
+    st.caption(f"{len(page.rows)}{'+' if page.next_cursor else ''} results in {elapsed_ms:.0f} ms")
+    df = pd.DataFrame([dict(row) for row in page.rows])
+    st.dataframe(df, use_container_width=True)
+    keyset_pager_controls("search", page.next_cursor)
+
+
+def sender_manager_view():
+    """Unsubscribe Manager grouped by sender, read from the senders table"""
+    st.markdown("#### Select Senders to Unsubscribe")
+    
+    categories = sorted(st.session_state.orchestrator.get_statistics()["category_breakdown"])
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    with col1:
+        selected_categories = st.multiselect("Filter by category", categories, default=categories,
+                                             key="senders_categories")
+    with col2:
+        address_filter = st.text_input("Filter by sender", "", key="senders_address")
+    with col3:
+        sort = st.selectbox("Sort by", ["volume", "recent"], key="senders_sort")
+    with col4:
+        page_size = st.selectbox("Per page", [25, 50, 100, 200], index=1, key="senders_page_size")
+    
+    filters = (tuple(selected_categories), address_filter, sort, page_size)
+    after = keyset_pager("senders", filters)
+    page = st.session_state.orchestrator.page_senders(
+        after, page_size, sort, category=selected_categories,
+        address=address_filter or None, pending=True
+    )
+    
+    if not page.rows:
+        st.info("No senders with pending unsubscribe links match the selected filters")
+        return
     
-    unclicked_links = [dict(zip([col[0] for col in cursor.description], row)) 
-                       for row in cursor.fetchall()]
+    selected = st.session_state.setdefault("selected_senders", [])
+    for row in page.rows:
+        col1, col2 = st.columns([1, 10])
+        with col1:
+            checked = st.checkbox(f"Select {row['address']}", key=f"sender_{row['address']}",
+                                  label_visibility="collapsed")
+        with col2:
+            status = " | ✅ unsubscribed before" if row['status'] == "unsubscribed" else ""
+            st.markdown(f"""
+            **{row['address']}** ({row['domain']})  
+            Category: `{row['category']}` | Emails: {row['message_count']} | 
+            Lists: {row['pending_subscriptions']} | Last seen: {str(row['last_seen'])[:10]}{status}
+            """)
+        if checked and row['address'] not in selected:
+            selected.append(row['address'])
+        elif not checked and row['address'] in selected:
+            selected.remove(row['address'])
+    
+    keyset_pager_controls("senders", page.next_cursor)
+    
+    st.markdown("---")
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("✅ Unsubscribe Selected", type="primary", key="senders_unsubscribe"):
+            if selected:
+                results = st.session_state.orchestrator.unsubscribe_senders(selected)
+                st.success(f"✅ Queued {results['enqueued']} links from {len(selected)} senders")
+                st.session_state.selected_senders = []
+                time.sleep(2)
+                st.rerun()
+            else:
+                st.warning("Please select at least one sender")
+    with col2:
+        if st.button("🛡️ Whitelist Selected", key="senders_whitelist"):
+            if selected:
+                added = st.session_state.orchestrator.whitelist_senders(selected)
+                st.success(f"✅ Whitelisted {added} senders")
+                st.session_state.selected_senders = []
+                time.sleep(2)
+                st.rerun()
+            else:
+                st.warning("Please select at least one sender")
+    with col3:
+        domains = sorted({row['domain'] for row in page.rows})
+        domain = st.selectbox("Unsubscribe a whole domain", [""] + domains, key="senders_domain")
+        if domain and st.button(f"🔄 Unsubscribe everything from {domain}", key="senders_domain_go"):
+            results = st.session_state.orchestrator.unsubscribe_senders(domains=[domain])
+            st.success(f"✅ Queued {results['enqueued']} links from {domain}")
+            time.sleep(2)
+            st.rerun()
+
+
+def unsubscribe_manager_page():
+    """Unsubscribe management page"""
+    st.markdown('<p class="main-header">✉️ Unsubscribe Manager</p>', unsafe_allow_html=True)
     
-    if not unclicked_links:
-        st.info("📭 No pending unsubscribe links. Run a scan to find more!")
+    if not st.session_state.credentials_verified:
+        st.warning("⚠️ Please configure your credentials in the Settings page first.")
         return
     
-    st.markdown(f"### Found {len(unclicked_links)} pending unsubscribe links")
+    # Click job queue status
+    queue_counts = st.session_state.orchestrator.get_queue_status()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queued", queue_counts.get("pending", 0))
+    with col2:
+        st.metric("In Progress", queue_counts.get("leased", 0))
+    with col3:
+        st.metric("Done", queue_counts.get("done", 0))
+    with col4:
+        st.metric("Failed", queue_counts.get("failed", 0))
     
-    # Display as DataFrame with selection
-    df = pd.DataFrame(unclicked_links)
-    df['select'] = False
+    if queue_counts.get("pending", 0) or queue_counts.get("leased", 0):
+        st.info("Queued links are clicked by the worker processes. Start them with `python cli.py worker`.")
+    
+    view = st.radio("View", ["By sender", "By link"], horizontal=True)
+    if view == "By sender":
+        sender_manager_view()
+        return
     
-    # Display table
     st.markdown("#### Select Links to Unsubscribe")
     
-    # Category filter
-    categories = df['category'].unique().tolist()
-    selected_categories = st.multiselect(
-        "Filter by category",
-        categories,
-        default=categories
+    # Filters are applied by the database; only the current page is loaded
+    categories = sorted(st.session_state.orchestrator.get_statistics()["category_breakdown"])
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        selected_categories = st.multiselect("Filter by category", categories, default=categories)
+    with col2:
+        sender_filter = st.text_input("Filter by sender", "")
+    with col3:
+        page_size = st.selectbox("Per page", [25, 50, 100, 200], index=1)
+    
+    filters = (tuple(selected_categories), sender_filter, page_size)
+    after = keyset_pager("manager", filters)
+    page = st.session_state.orchestrator.page_pending_subscriptions(
+        after, page_size, category=selected_categories, sender=sender_filter or None
     )
     
-    filtered_df = df[df['category'].isin(selected_categories)]
+    if not page.rows:
+        if after is None and not sender_filter and selected_categories == categories:
+            st.info("📭 No pending unsubscribe links. Run a scan to find more!")
+        else:
+            st.info("No links match the selected filters")
+        return
     
     # Display emails with checkboxes
-    if len(filtered_df) > 0:
-        for idx, row in filtered_df.iterrows():
-            col1, col2 = st.columns([1, 10])
-            with col1:
-                selected = st.checkbox(f"Select {idx}", key=f"link_{row['id']}", label_visibility="collapsed")
-            with col2:
-                st.markdown(f"""
-                **{row['sender']}** - {row['subject']}  
-                Category: `{row['category']}` | Link: {row['link'][:60]}...
-                """)
-            
-            if selected:
-                if 'selected_links' not in st.session_state:
-                    st.session_state.selected_links = []
-                if row['id'] not in st.session_state.selected_links:
-                    st.session_state.selected_links.append(row['id'])
-        
-        st.markdown("---")
-        
-        col1, col2, col3 = st.columns([1, 1, 4])
-        
+    for row in page.rows:
+        col1, col2 = st.columns([1, 10])
         with col1:
-            if st.button("✅ Unsubscribe Selected", type="primary"):
-                if 'selected_links' in st.session_state and st.session_state.selected_links:
-                    with st.spinner("Unsubscribing..."):
-                        results = st.session_state.orchestrator.unsubscribe_from_links(
-                            st.session_state.selected_links
-                        )
-                    
-                    st.success(f"✅ Attempted: {results['total_attempted']}, Success: {results['successful']}, Failed: {results['failed']}")
-                    st.session_state.selected_links = []
-                    time.sleep(2)
-                    st.rerun()
-                else:
-                    st.warning("Please select at least one link")
-        
+            selected = st.checkbox(f"Select {row['id']}", key=f"link_{row['id']}", label_visibility="collapsed")
         with col2:
-            if st.button("🔄 Unsubscribe All", type="secondary"):
-                if st.checkbox("I confirm I want to unsubscribe from all links"):
-                    with st.spinner("Unsubscribing from all links..."):
-                        link_ids = filtered_df['id'].tolist()
-                        results = st.session_state.orchestrator.unsubscribe_from_links(link_ids)
-                    
-                    st.success(f"✅ Attempted: {results['total_attempted']}, Success: {results['successful']}, Failed: {results['failed']}")
-                    time.sleep(2)
-                    st.rerun()
-    else:
-        st.info("No links match the selected filters")
+            st.markdown(f"""
+            **{row['sender']}** - {row['subject']}  
+            Category: `{row['category']}` | Emails: {row['email_count']} | Link: {row['link'][:60]}...
+            """)
+        
+        if selected:
+            if 'selected_links' not in st.session_state:
+                st.session_state.selected_links = []
+            if row['id'] not in st.session_state.selected_links:
+                st.session_state.selected_links.append(row['id'])
+    
+    keyset_pager_controls("manager", page.next_cursor)
+    
+    st.markdown("---")
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    
+    with col1:
+        if st.button("✅ Unsubscribe Selected", type="primary"):
+            if 'selected_links' in st.session_state and st.session_state.selected_links:
+                results = st.session_state.orchestrator.enqueue_unsubscribe(
+                    st.session_state.selected_links
+                )
+                
+                st.success(f"✅ Queued {results['enqueued']} links for the click workers")
+                st.session_state.selected_links = []
+                time.sleep(2)
+                st.rerun()
+            else:
+                st.warning("Please select at least one link")
+    
+    with col2:
+        if st.button("🔄 Unsubscribe All", type="secondary"):
+            if st.checkbox("I confirm I want to unsubscribe from all links"):
+                link_ids = list(st.session_state.orchestrator.iter_pending_link_ids(
+                    category=selected_categories, sender=sender_filter or None
+                ))
+                results = st.session_state.orchestrator.enqueue_unsubscribe(link_ids)
+                
+                st.success(f"✅ Queued {results['enqueued']} links for the click workers")
+                time.sleep(2)
+                st.rerun()
 
 
 def whitelist_blacklist_page():
@@ -554,19 +827,86 @@ def statistics_page():
     else:
         st.info("No data available yet")
     
+    # Daily activity from the per-day rollups
+    daily_stats = st.session_state.orchestrator.get_daily_statistics(days=30)
+    if daily_stats:
+        st.markdown("### 📅 Last 30 Days")
+        df = pd.DataFrame(daily_stats).set_index("day")
+        df = df[["emails_scanned", "links_found", "links_clicked", "successful_clicks"]]
+        df.columns = ["Emails Scanned", "Links Found", "Links Clicked", "Successful Clicks"]
+        st.line_chart(df)
+    
+    # Top senders come straight from the senders table
+    top_senders = st.session_state.orchestrator.page_senders(limit=15).rows
+    if top_senders:
+        st.markdown("### 📮 Top Senders")
+        df = pd.DataFrame([dict(row) for row in top_senders])
+        df = df[["address", "message_count", "category", "status", "last_seen"]]
+        df.columns = ["Sender", "Emails", "Category", "Status", "Last Seen"]
+        st.dataframe(df, use_container_width=True)
+    
+    st.markdown("---")
+    
+    # Per-domain click outcomes
+    st.markdown("### 🌐 Unsubscribe Hosts")
+    domain_stats = st.session_state.orchestrator.get_domain_stats(limit=200)
+    
+    if domain_stats:
+        df = pd.DataFrame(domain_stats)
+        df["success_rate"] = (df["success_rate"] * 100).round(1)
+        df["avg_latency"] = df["avg_latency"].round(2)
+        df = df[["domain", "attempts", "successes", "failures", "consecutive_failures",
+                 "success_rate", "avg_latency", "last_status_code", "last_error"]]
+        df.columns = ["Domain", "Attempts", "Successes", "Failures", "Failing Streak",
+                      "Success Rate (%)", "Avg Latency (s)", "Last Status", "Last Error"]
+        st.dataframe(df, use_container_width=True)
+        st.caption("Hosts with a failing streak of 3 or more are skipped unless forced.")
+    else:
+        st.info("No links clicked yet")
+    
+    redirect_stats = st.session_state.orchestrator.get_redirect_stats()
+    if redirect_stats["links"]:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Avg Redirect Hops", f"{redirect_stats['avg_hops']:.1f}")
+        with col2:
+            st.metric("Avg Redirect Time", f"{redirect_stats['avg_redirect_latency']:.2f}s")
+        with col3:
+            st.metric("Tracker Shortcuts", redirect_stats["shortcuts"])
+        with col4:
+            st.metric("Time Saved", f"{redirect_stats['latency_saved']:.1f}s")
+    
     st.markdown("---")
     
     # Export functionality
     st.markdown("### 💾 Export Data")
     
-    col1, col2 = st.columns([1, 3])
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        if st.button("📥 Export Links"):
-            filename = f"unsubscribe_links_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            if st.session_state.orchestrator.export_links(filename):
-                st.success(f"Links exported to {filename}")
-            else:
-                st.error("Failed to export links")
+        export_dataset = st.selectbox("Dataset", ["links", "emails", "operations"])
+    with col2:
+        export_format = st.selectbox("Format", ["csv", "jsonl", "parquet"])
+    with col3:
+        export_compression = st.selectbox("Compression", ["none", "gzip", "zstd"])
+    with col4:
+        export_since = st.date_input("Since", value=None)
+    
+    if st.button("📥 Export"):
+        extension = {"gzip": ".gz", "zstd": ".zst"}.get(export_compression, "")
+        if export_format == "parquet":
+            extension = ""
+        filename = (f"{export_dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    f".{export_format}{extension}")
+        with st.spinner("Exporting..."):
+            result = st.session_state.orchestrator.export(
+                export_dataset, filename, fmt=export_format,
+                compression=None if export_compression == "none" else export_compression,
+                date_from=export_since.isoformat() if export_since else None
+            )
+        if result is not None:
+            st.success(f"Exported {result['rows']} rows to {filename}")
+        else:
+            st.error("Export failed, see the log for details")
 
 
 def operation_history_page():
@@ -577,30 +917,26 @@ def operation_history_page():
         st.warning("⚠️ Please configure your credentials in the Settings page first.")
         return
     
-    limit = st.slider("Number of operations to show", 10, 200, 50)
+    # Filters are applied by the database; only the current page is loaded
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        operation_types = ["scan", "unsubscribe"]
+        selected_types = st.multiselect("Filter by operation type", operation_types, default=operation_types)
+    with col2:
+        statuses = ["success", "failed", "error"]
+        selected_statuses = st.multiselect("Filter by status", statuses, default=statuses)
+    with col3:
+        limit = st.selectbox("Per page", [25, 50, 100, 200], index=1)
     
-    operations = st.session_state.orchestrator.get_recent_operations(limit)
+    after = keyset_pager("history", (tuple(selected_types), tuple(selected_statuses), limit))
+    page = st.session_state.orchestrator.page_operations(
+        after, limit, operation_type=selected_types, status=selected_statuses
+    )
     
-    if operations:
-        df = pd.DataFrame(operations)
-        
-        # Filter options
-        col1, col2 = st.columns(2)
-        with col1:
-            operation_types = df['operation_type'].unique().tolist()
-            selected_types = st.multiselect("Filter by operation type", operation_types, default=operation_types)
-        
-        with col2:
-            statuses = df['status'].unique().tolist()
-            selected_statuses = st.multiselect("Filter by status", statuses, default=statuses)
-        
-        # Filter dataframe
-        filtered_df = df[
-            (df['operation_type'].isin(selected_types)) &
-            (df['status'].isin(selected_statuses))
-        ]
-        
-        st.dataframe(filtered_df, use_container_width=True)
+    if page.rows:
+        df = pd.DataFrame([dict(row) for row in page.rows])
+        st.dataframe(df, use_container_width=True)
+        keyset_pager_controls("history", page.next_cursor)
     else:
         st.info("No operations recorded yet")
 
@@ -617,6 +953,8 @@ def main():
         dashboard_page()
     elif page == "Email Scanner":
         email_scanner_page()
+    elif page == "Search":
+        search_page()
     elif page == "Unsubscribe Manager":
         unsubscribe_manager_page()
     elif page == "Whitelist/Blacklist":
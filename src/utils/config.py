@@ -4,6 +4,32 @@ from typing import Optional
 from dotenv import load_dotenv
 
 
+def resolve_secret(ref: str) -> str:
+    """
+    Look up a secret by reference, so the database never stores passwords
+    
+    Args:
+        ref: "env:NAME" (environment variable) or "file:PATH" (first line
+             of a file, e.g. a mounted secret)
+    
+    Raises:
+        ValueError: If the reference is malformed or the secret is missing
+    """
+    scheme, _, name = (ref or "").partition(":")
+    if scheme == "env" and name:
+        value = os.getenv(name)
+        if not value:
+            raise ValueError(f"Environment variable {name} is not set")
+        return value
+    if scheme == "file" and name:
+        try:
+            with open(os.path.expanduser(name)) as f:
+                return f.readline().rstrip("\r\n")
+        except OSError as e:
+            raise ValueError(f"Cannot read secret file {name}: {e}") from e
+    raise ValueError(f"Unsupported credentials reference {ref!r} (use env:NAME or file:PATH)")
+
+
 class Config:
     """Configuration manager for the application"""
     
@@ -56,6 +82,247 @@ class Config:
         except:
             return 10
     
+    @property
+    def dns_cache_ttl(self) -> float:
+        """Get TTL in seconds for cached DNS lookups (0 disables the cache)"""
+        try:
+            return float(os.getenv("DNS_CACHE_TTL", "300"))
+        except:
+            return 300.0
+    
+    @property
+    def click_pool_connections(self) -> int:
+        """Get number of per-host HTTP connection pools to keep"""
+        try:
+            return int(os.getenv("CLICK_POOL_CONNECTIONS", "100"))
+        except:
+            return 100
+    
+    @property
+    def click_pool_maxsize(self) -> int:
+        """Get maximum keep-alive HTTP connections per host"""
+        try:
+            return int(os.getenv("CLICK_POOL_MAXSIZE", "4"))
+        except:
+            return 4
+    
+    @property
+    def unsubscribe_grace_days(self) -> float:
+        """Get grace period for mail still arriving after an unsubscribe"""
+        try:
+            return float(os.getenv("UNSUBSCRIBE_GRACE_DAYS", "7"))
+        except:
+            return 7.0
+    
+    @property
+    def worker_processes(self) -> int:
+        """Get number of click worker processes"""
+        try:
+            return int(os.getenv("WORKER_PROCESSES", "2"))
+        except:
+            return 2
+    
+    @property
+    def worker_batch_size(self) -> int:
+        """Get number of click jobs a worker leases at a time"""
+        try:
+            return int(os.getenv("WORKER_BATCH_SIZE", "10"))
+        except:
+            return 10
+    
+    @property
+    def worker_lease_seconds(self) -> int:
+        """Get how long a leased click job stays reserved for a worker"""
+        try:
+            return int(os.getenv("WORKER_LEASE_SECONDS", "300"))
+        except:
+            return 300
+    
+    @property
+    def batch_write_size(self) -> int:
+        """Get how many buffered writes trigger a batch flush"""
+        try:
+            return int(os.getenv("BATCH_WRITE_SIZE", "500"))
+        except:
+            return 500
+    
+    @property
+    def batch_write_interval_ms(self) -> int:
+        """Get the maximum age in milliseconds of a buffered write before it is flushed"""
+        try:
+            return int(os.getenv("BATCH_WRITE_INTERVAL_MS", "1000"))
+        except:
+            return 1000
+    
+    @property
+    def imap_reconnect_attempts(self) -> int:
+        """Get times an IMAP command is retried on a new connection after a disconnect"""
+        try:
+            return int(os.getenv("IMAP_RECONNECT_ATTEMPTS", "5"))
+        except:
+            return 5
+    
+    @property
+    def imap_reconnect_backoff(self) -> float:
+        """Get seconds before the first IMAP reconnect (doubled on each further attempt)"""
+        try:
+            return float(os.getenv("IMAP_RECONNECT_BACKOFF", "1.0"))
+        except:
+            return 1.0
+    
+    @property
+    def scan_fetch_workers(self) -> int:
+        """Get number of IMAP connections fetching messages during a scan"""
+        try:
+            return max(1, int(os.getenv("SCAN_FETCH_WORKERS", "2")))
+        except:
+            return 2
+    
+    @property
+    def scan_parse_workers(self) -> int:
+        """Get number of threads parsing and extracting links during a scan"""
+        try:
+            return max(1, int(os.getenv("SCAN_PARSE_WORKERS", "2")))
+        except:
+            return 2
+    
+    @property
+    def scan_queue_size(self) -> int:
+        """Get capacity of each queue between scan pipeline stages"""
+        try:
+            return max(1, int(os.getenv("SCAN_QUEUE_SIZE", "50")))
+        except:
+            return 50
+    
+    @property
+    def scan_max_workers(self) -> int:
+        """Get how many mailboxes the account scheduler scans at once"""
+        try:
+            return max(1, int(os.getenv("SCAN_MAX_WORKERS", "4")))
+        except:
+            return 4
+    
+    @property
+    def scan_max_connections_per_server(self) -> int:
+        """Get how many IMAP connections the account scheduler opens to one server"""
+        try:
+            return max(1, int(os.getenv("SCAN_MAX_CONNECTIONS_PER_SERVER", "2")))
+        except:
+            return 2
+    
+    @property
+    def scan_slice_size(self) -> int:
+        """Get how many messages the account scheduler scans before moving to the next account"""
+        try:
+            return max(1, int(os.getenv("SCAN_SLICE_SIZE", "200")))
+        except:
+            return 200
+    
+    @property
+    def account_scan_interval_minutes(self) -> float:
+        """Get how often the daemon scans the registered accounts (0 disables it)"""
+        try:
+            return float(os.getenv("ACCOUNT_SCAN_INTERVAL_MINUTES", "0"))
+        except:
+            return 0.0
+    
+    @property
+    def metrics_port(self) -> int:
+        """Get the port the daemon serves Prometheus metrics on (0 disables it)"""
+        try:
+            return int(os.getenv("METRICS_PORT", "0"))
+        except:
+            return 0
+    
+    @property
+    def metrics_host(self) -> str:
+        """Get the address the daemon's metrics endpoint listens on"""
+        return os.getenv("METRICS_HOST", "127.0.0.1")
+    
+    @property
+    def db_profile(self) -> str:
+        """Get the database performance profile (safe, balanced or bulk-import)"""
+        from src.database.maintenance import DEFAULT_PROFILE, PROFILES
+        profile = os.getenv("DB_PROFILE", DEFAULT_PROFILE)
+        return profile if profile in PROFILES else DEFAULT_PROFILE
+    
+    @property
+    def maintenance_interval_minutes(self) -> float:
+        """Get how often the daemon runs quick database maintenance"""
+        try:
+            return float(os.getenv("MAINTENANCE_INTERVAL_MINUTES", "60"))
+        except:
+            return 60.0
+    
+    @property
+    def vacuum_interval_hours(self) -> float:
+        """Get how often the daemon runs ANALYZE and incremental vacuum"""
+        try:
+            return float(os.getenv("VACUUM_INTERVAL_HOURS", "24"))
+        except:
+            return 24.0
+    
+    @property
+    def operation_retention_days(self) -> int:
+        """Get how many days of detailed operation history to keep (0 keeps all)"""
+        try:
+            return int(os.getenv("OPERATION_RETENTION_DAYS", "30"))
+        except:
+            return 30
+    
+    @property
+    def operation_archive_dir(self) -> str:
+        """Get the directory for archived operation history segments"""
+        return os.getenv("OPERATION_ARCHIVE_DIR", "operation_archive")
+    
+    @property
+    def retention_batch_size(self) -> int:
+        """Get how many history rows are archived and deleted per batch"""
+        try:
+            return int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+        except:
+            return 1000
+    
+    @property
+    def message_store_dir(self) -> str:
+        """Get the directory of the raw message store (empty disables it)"""
+        return os.getenv("MESSAGE_STORE_DIR", "")
+    
+    @property
+    def message_store_codec(self) -> str:
+        """Get the raw message store compression (auto, zstd or zlib)"""
+        codec = os.getenv("MESSAGE_STORE_CODEC", "auto").lower()
+        return codec if codec in ("auto", "zstd", "zlib") else "auto"
+    
+    @property
+    def message_store_segment_mb(self) -> int:
+        """Get the size in MiB at which the message store starts a new segment file"""
+        try:
+            return int(os.getenv("MESSAGE_STORE_SEGMENT_MB", "64"))
+        except:
+            return 64
+    
+    @property
+    def db_single_writer(self) -> bool:
+        """Get whether database writes go through a single background writer thread"""
+        return os.getenv("DB_SINGLE_WRITER", "false").lower() in ("1", "true", "yes")
+    
+    @property
+    def db_write_queue_size(self) -> int:
+        """Get how many writes may wait for the writer thread before submitters block"""
+        try:
+            return int(os.getenv("DB_WRITE_QUEUE_SIZE", "1000"))
+        except:
+            return 1000
+    
+    @property
+    def redirect_shortcut_min_observations(self) -> int:
+        """Get how often a tracker must be seen redirecting before it is skipped (0 disables)"""
+        try:
+            return int(os.getenv("REDIRECT_SHORTCUT_MIN_OBSERVATIONS", "2"))
+        except:
+            return 2
+    
     def validate(self) -> tuple[bool, str]:
         """
         Validate that required configuration is present
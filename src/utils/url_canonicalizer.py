@@ -0,0 +1,136 @@
+"""Canonicalization of unsubscribe URLs for cross-email deduplication"""
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
+from typing import Optional
+
+
+# Query parameters that only carry tracking data and never select the list
+TRACKING_PARAMS = {
+    "mc_eid", "mc_cid", "fbclid", "gclid", "dclid", "msclkid", "yclid",
+    "_hsenc", "_hsmi", "mkt_tok", "vero_id", "vero_conv", "oly_anon_id",
+    "oly_enc_id", "rb_clickid", "s_cid", "trk", "trkcampaign", "sc_campaign",
+    "sc_channel", "sc_content", "sc_medium", "sc_outcome", "sc_geo", "sc_country",
+    "ref_src", "igshid", "wickedid", "_ga", "_gl",
+}
+
+# Query parameter prefixes that only carry tracking data
+TRACKING_PARAM_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+
+# Known redirector hosts and the query parameter that holds the target URL
+REDIRECTORS = {
+    "www.google.com": ("/url", ("q", "url")),
+    "google.com": ("/url", ("q", "url")),
+    "l.facebook.com": ("/l.php", ("u",)),
+    "lm.facebook.com": ("/l.php", ("u",)),
+    "l.instagram.com": ("/", ("u",)),
+    "www.youtube.com": ("/redirect", ("q",)),
+    "out.reddit.com": ("/", ("url",)),
+    "slack-redir.net": ("/link", ("url",)),
+}
+
+# Redirector host suffixes (e.g. tenant-specific Outlook Safe Links hosts)
+REDIRECTOR_SUFFIXES = {
+    ".safelinks.protection.outlook.com": ("/", ("url",)),
+}
+
+_URLDEFENSE_V3 = re.compile(r"^https?://urldefense\.com/v3/__(.+?)__;", re.IGNORECASE)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Maximum number of nested redirector wrappers to unwrap
+MAX_UNWRAP_DEPTH = 5
+
+
+def unwrap_redirector(url: str) -> Optional[str]:
+    """
+    Return the target URL of a known redirector link
+
+    Returns:
+        The wrapped URL, or None if the link is not a known redirector
+    """
+    match = _URLDEFENSE_V3.match(url)
+    if match:
+        return match.group(1)
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    host = (parts.hostname or "").lower()
+    rule = REDIRECTORS.get(host)
+    if rule is None:
+        for suffix, suffix_rule in REDIRECTOR_SUFFIXES.items():
+            if host.endswith(suffix):
+                rule = suffix_rule
+                break
+    if rule is None:
+        return None
+
+    path_prefix, param_names = rule
+    if not parts.path.startswith(path_prefix):
+        return None
+
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    for name in param_names:
+        target = params.get(name)
+        if target:
+            target = unquote(target) if "%3A" in target.upper() else target
+            if target.lower().startswith(("http://", "https://")):
+                return target
+    return None
+
+
+def url_domain(url: str) -> str:
+    """Get the lowercased host name of a URL ("" if it has none)"""
+    try:
+        return (urlsplit(url.strip()).hostname or "").lower().rstrip(".")
+    except ValueError:
+        return ""
+
+
+def _is_tracking_param(name: str) -> bool:
+    """Check if a query parameter is a known tracking parameter"""
+    name_lower = name.lower()
+    return name_lower in TRACKING_PARAMS or name_lower.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce an unsubscribe URL to a canonical form
+
+    Known redirector wrappers are unwrapped, scheme and host are lowercased,
+    default ports and fragments are dropped, tracking parameters are removed
+    and the remaining query parameters are sorted. The canonical form is
+    only used as a deduplication key; the original link is what gets clicked.
+    """
+    url = url.strip()
+
+    for _ in range(MAX_UNWRAP_DEPTH):
+        target = unwrap_redirector(url)
+        if not target:
+            break
+        url = target.strip()
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    netloc = host
+    if port and _DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+
+    path = parts.path or "/"
+
+    query_params = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ]
+    query = urlencode(sorted(query_params))
+
+    return urlunsplit((scheme, netloc, path, query, ""))